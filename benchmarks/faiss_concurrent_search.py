@@ -0,0 +1,125 @@
+"""
+Латентность поиска в ``FaissBackend`` во время индексации.
+
+Запуск (нужны faiss-cpu и numpy)::
+
+    python benchmarks/faiss_concurrent_search.py --size 200000 --dim 384 \
+        --index-factory IVF256,Flat --train-size 20000
+
+Стор наполняется ``size`` документами в ``persist_path`` во временном
+каталоге (для ``index_factory`` — до ``train_size - 1``, чтобы обучение
+пришлось на фазу записи). Затем ``readers`` потоков ищут по одному вектору
+сначала без записи, потом параллельно с писателем, который upsert-ит
+пакеты по ``batch`` документов (лог мутаций, фоновое сжатие, обучение
+ANN-индекса). Печатаются p50/p99/max поиска в миллисекундах для обеих фаз.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import tempfile
+import threading
+import time
+from typing import List, Tuple
+
+import numpy as np
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.faiss import FaissBackend
+
+
+def _report(name: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} n={len(ordered):<6} p50={statistics.median(ordered):8.3f} ms  "
+        f"p99={p99:8.3f} ms  max={ordered[-1]:8.3f} ms"
+    )
+
+
+def _search_phase(
+    backend: FaissBackend, queries: np.ndarray, readers: int, stop: threading.Event
+) -> Tuple[List[float], List[threading.Thread]]:
+    timings: List[float] = []
+    lock = threading.Lock()
+
+    def _reader(offset: int) -> None:
+        local = []
+        i = offset
+        while not stop.is_set():
+            started = time.perf_counter()
+            backend.search(queries[i % len(queries)].tolist(), limit=10)
+            local.append((time.perf_counter() - started) * 1000.0)
+            i += readers
+        with lock:
+            timings.extend(local)
+
+    threads = [threading.Thread(target=_reader, args=(i,)) for i in range(readers)]
+    for thread in threads:
+        thread.start()
+    return timings, threads
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--index-factory", default=None)
+    parser.add_argument("--train-size", type=int, default=20_000)
+    parser.add_argument("--readers", type=int, default=4)
+    parser.add_argument("--batch", type=int, default=500)
+    parser.add_argument("--batches", type=int, default=40)
+    parser.add_argument("--idle-seconds", type=float, default=3.0)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    size = args.size
+    if args.index_factory:
+        size = min(size, args.train_size - 1)
+    with tempfile.TemporaryDirectory() as tmp:
+        backend = FaissBackend(
+            persist_path=f"{tmp}/faiss",
+            index_factory=args.index_factory,
+            train_size=args.train_size,
+            wal_max_bytes=4 * 1024 * 1024,
+        )
+        vectors = rng.random((size, args.dim), dtype="float32")
+        backend.add_documents(
+            Document(id=f"bench.Doc:{i}", embedding=vectors[i], metadata={"model": "bench.Doc"})
+            for i in range(size)
+        )
+        queries = rng.random((1000, args.dim), dtype="float32")
+        print(f"loaded {size} x {args.dim}")
+
+        stop = threading.Event()
+        timings, threads = _search_phase(backend, queries, args.readers, stop)
+        time.sleep(args.idle_seconds)
+        stop.set()
+        for thread in threads:
+            thread.join()
+        _report("idle", timings)
+
+        stop = threading.Event()
+        timings, threads = _search_phase(backend, queries, args.readers, stop)
+        started = time.perf_counter()
+        for b in range(args.batches):
+            backend.add_documents(
+                Document(
+                    id=f"bench.Doc:{size + b * args.batch + i}",
+                    embedding=rng.random(args.dim, dtype="float32"),
+                    metadata={"model": "bench.Doc"},
+                )
+                for i in range(args.batch)
+            )
+        if backend._compactor is not None:
+            backend._compactor.join()
+        stop.set()
+        for thread in threads:
+            thread.join()
+        print(f"indexed {args.batches} x {args.batch} in {time.perf_counter() - started:.1f} s")
+        _report("indexing", timings)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Recall@k и память сжатых режимов ``FaissBackend`` (``quantizer``).
+
+Запуск (нужны faiss-cpu и numpy)::
+
+    python benchmarks/faiss_quantized_recall.py --size 200000 --dim 384 --k 10
+
+Один и тот же набор случайных векторов индексируется точным flat-индексом
+и с ``quantizer`` sq8 / fp16 при разных ``rescore_factor``. Для каждого
+режима печатаются recall@k относительно точного поиска, память индекса
+(коды в RAM) и где лежат полные векторы.
+"""
+from __future__ import annotations
+
+import argparse
+import time
+from typing import List, Optional
+
+import faiss
+import numpy as np
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.faiss import FaissBackend
+
+
+def _top_ids(backend: FaissBackend, queries: np.ndarray, k: int) -> List[List[str]]:
+    return [[hit.id for hit in hits] for hits in backend.search_batch(queries.tolist(), limit=k)]
+
+
+def _index_mb(backend: FaissBackend) -> float:
+    return len(faiss.serialize_index(backend.index)) / 2**20
+
+
+def _build(
+    vectors: np.ndarray, metric: str, quantizer: Optional[str], rescore_factor: int
+) -> FaissBackend:
+    backend = FaissBackend(
+        metric=metric,
+        quantizer=quantizer,
+        rescore_factor=rescore_factor,
+        train_size=min(len(vectors), 50_000),
+    )
+    backend.add_documents(
+        Document(id=str(i), embedding=vectors[i], metadata={"model": "bench.Doc"})
+        for i in range(len(vectors))
+    )
+    return backend
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=200_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--queries", type=int, default=200)
+    parser.add_argument("--k", type=int, default=10)
+    parser.add_argument("--metric", default="cosine")
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    vectors = rng.standard_normal((args.size, args.dim), dtype="float32")
+    queries = rng.standard_normal((args.queries, args.dim), dtype="float32")
+
+    exact = _build(vectors, args.metric, None, 1)
+    truth = _top_ids(exact, queries, args.k)
+    print(f"{'mode':<14} {'recall@k':>9} {'index MB':>9} {'search ms':>10}  full vectors")
+    print(f"{'flat':<14} {1.0:>9.4f} {_index_mb(exact):>9.1f} {'':>10}  RAM (+ copy in index)")
+    del exact
+    for quantizer in ("sq8", "fp16"):
+        for factor in (1, 2, 4):
+            backend = _build(vectors, args.metric, quantizer, factor)
+            started = time.perf_counter()
+            found = _top_ids(backend, queries, args.k)
+            elapsed = (time.perf_counter() - started) * 1000.0 / args.queries
+            recall = np.mean(
+                [len(set(got) & set(want)) / args.k for got, want in zip(found, truth)]
+            )
+            storage = "mmap temp file" if isinstance(backend._vectors, np.memmap) else "RAM"
+            print(
+                f"{quantizer + ' x' + str(factor):<14} {recall:>9.4f} "
+                f"{_index_mb(backend):>9.1f} {elapsed:>10.3f}  {storage}"
+            )
+
+
+if __name__ == "__main__":
+    main()
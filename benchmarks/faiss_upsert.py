@@ -0,0 +1,77 @@
+"""
+Латентность upsert/delete одного документа в ``FaissBackend``.
+
+Запуск (нужны faiss-cpu и numpy)::
+
+    python benchmarks/faiss_upsert.py --size 1000000 --dim 384 --rounds 200
+
+Индекс наполняется одним пакетом случайных векторов, затем ``rounds`` раз
+переиндексируется существующий документ (``add_documents`` с тем же id),
+удаляется и добавляется заново. Печатаются p50/p95/max в миллисекундах.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import time
+from typing import Callable, List
+
+import numpy as np
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.faiss import FaissBackend
+
+
+def _measure(rounds: int, action: Callable[[int], None]) -> List[float]:
+    timings = []
+    for i in range(rounds):
+        started = time.perf_counter()
+        action(i)
+        timings.append((time.perf_counter() - started) * 1000.0)
+    return timings
+
+
+def _report(name: str, timings: List[float]) -> None:
+    ordered = sorted(timings)
+    p95 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.95))]
+    print(
+        f"{name:<8} p50={statistics.median(ordered):8.3f} ms  "
+        f"p95={p95:8.3f} ms  max={ordered[-1]:8.3f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[1])
+    parser.add_argument("--size", type=int, default=1_000_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--rounds", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(args.seed)
+    backend = FaissBackend()
+    started = time.perf_counter()
+    vectors = rng.random((args.size, args.dim), dtype="float32")
+    ids = [f"bench.Doc:{i}" for i in range(args.size)]
+    metas = [{"model": "bench.Doc", "pk": i} for i in range(args.size)]
+    with backend._lock, backend._rw.write():
+        backend._insert_locked(ids, metas, vectors)
+    print(f"loaded {args.size} x {args.dim} in {time.perf_counter() - started:.1f} s")
+
+    targets = rng.integers(0, args.size, size=args.rounds)
+
+    def _doc(i: int) -> Document:
+        pk = int(targets[i])
+        return Document(
+            id=f"bench.Doc:{pk}",
+            embedding=rng.random(args.dim, dtype="float32").tolist(),
+            metadata={"model": "bench.Doc", "pk": pk},
+        )
+
+    _report("upsert", _measure(args.rounds, lambda i: backend.add_documents([_doc(i)])))
+    _report("delete", _measure(args.rounds, lambda i: backend.delete([f"bench.Doc:{targets[i]}"])))
+    _report("insert", _measure(args.rounds, lambda i: backend.add_documents([_doc(i)])))
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,86 @@
+"""
+Пропускная способность ``FaissBackend.search`` с микробатчингом и без.
+
+Запуск (нужны faiss-cpu и numpy)::
+
+    python benchmarks/search_batching.py --size 100000 --dim 384 --threads 16 \
+        --window-ms 2 --max-batch 32 --omp-threads 4
+
+``threads`` потоков в течение ``seconds`` секунд ищут по одному вектору
+(``limit=10``) сначала напрямую в сторе, потом через
+``MicroBatchingVectorStore``. Печатаются запросы в секунду и p50/p99
+латентности в миллисекундах.
+"""
+from __future__ import annotations
+
+import argparse
+import statistics
+import threading
+import time
+from typing import Any, List
+
+import numpy as np
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.batching import MicroBatchingVectorStore
+from django_graph_search.backends.faiss import FaissBackend
+
+
+def _run(name: str, store: Any, queries: np.ndarray, threads: int, seconds: float) -> None:
+    timings: List[float] = []
+    lock = threading.Lock()
+    deadline = time.perf_counter() + seconds
+
+    def _worker(offset: int) -> None:
+        local = []
+        i = offset
+        while time.perf_counter() < deadline:
+            started = time.perf_counter()
+            store.search(queries[i % len(queries)].tolist(), limit=10)
+            local.append((time.perf_counter() - started) * 1000.0)
+            i += threads
+        with lock:
+            timings.extend(local)
+
+    workers = [threading.Thread(target=_worker, args=(i,)) for i in range(threads)]
+    for worker in workers:
+        worker.start()
+    for worker in workers:
+        worker.join()
+    ordered = sorted(timings)
+    p99 = ordered[min(len(ordered) - 1, int(len(ordered) * 0.99))]
+    print(
+        f"{name:<10} qps={len(ordered) / seconds:8.1f}  "
+        f"p50={statistics.median(ordered):7.2f} ms  p99={p99:7.2f} ms"
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--size", type=int, default=100_000)
+    parser.add_argument("--dim", type=int, default=384)
+    parser.add_argument("--threads", type=int, default=16)
+    parser.add_argument("--seconds", type=float, default=5.0)
+    parser.add_argument("--window-ms", type=float, default=2.0)
+    parser.add_argument("--max-batch", type=int, default=32)
+    parser.add_argument("--omp-threads", type=int, default=None)
+    args = parser.parse_args()
+
+    rng = np.random.default_rng(0)
+    vectors = rng.standard_normal((args.size, args.dim), dtype=np.float32)
+    backend = FaissBackend(omp_threads=args.omp_threads)
+    backend.add_documents(
+        Document(id=f"d:{i}", embedding=vectors[i], metadata={"model": "a"})
+        for i in range(args.size)
+    )
+    queries = rng.standard_normal((1024, args.dim), dtype=np.float32)
+
+    _run("direct", backend, queries, args.threads, args.seconds)
+    batcher = MicroBatchingVectorStore(
+        backend, window_ms=args.window_ms, max_batch=args.max_batch
+    )
+    _run("batched", batcher, queries, args.threads, args.seconds)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,36 @@
+"""URL-схема для ASGI: поиск и похожие объекты — async-вьюхи.
+
+Подключается вместо ``django_graph_search.urls``::
+
+    path("api/search/", include("django_graph_search.async_urls")),
+"""
+from django.urls import path
+
+from .views import (
+    AsyncSearchAPIView,
+    AsyncSimilarAPIView,
+    BatchSearchAPIView,
+    ConversationalSearchAPIView,
+    StreamingSearchAPIView,
+)
+
+
+urlpatterns = [
+    path("", AsyncSearchAPIView.as_view(), name="graph_search"),
+    path("batch/", BatchSearchAPIView.as_view(), name="graph_search_batch"),
+    path(
+        "similar/<str:model>/<str:pk>/",
+        AsyncSimilarAPIView.as_view(),
+        name="graph_search_similar",
+    ),
+    path(
+        "conversation/",
+        ConversationalSearchAPIView.as_view(),
+        name="graph_search_conversation",
+    ),
+    path(
+        "stream/",
+        StreamingSearchAPIView.as_view(),
+        name="graph_search_stream",
+    ),
+]
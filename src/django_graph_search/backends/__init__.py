@@ -1,4 +1,5 @@
 from .base import BaseVectorStore, Document, SearchResult
+from .batching import MicroBatchingVectorStore
 from .chromadb import ChromaDBBackend
 from .faiss import FaissBackend
 from .pgvector import PgvectorBackend
@@ -8,6 +9,7 @@ __all__ = [
     "BaseVectorStore",
     "Document",
     "SearchResult",
+    "MicroBatchingVectorStore",
     "ChromaDBBackend",
     "FaissBackend",
     "PgvectorBackend",
@@ -1,8 +1,11 @@
 from __future__ import annotations
 
 from abc import ABC, abstractmethod
+from contextlib import contextmanager
 from dataclasses import dataclass
-from typing import Any, Dict, Iterable, List, Optional
+from typing import Any, Dict, FrozenSet, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
 
 
 @dataclass(frozen=True)
@@ -20,7 +23,69 @@ class SearchResult:
     metadata: Dict[str, Any]
 
 
+# Значение фильтра-коллекции означает set-membership: ``{"model": [a, b]}`` —
+# ``model IN (a, b)``; скаляр — равенство. Ключи объединяются через AND.
+MEMBERSHIP_TYPES = (list, tuple, set, frozenset)
+# Служебный ключ фильтра: id документов, которые исключаются из выдачи.
+EXCLUDE_IDS_KEY = "$exclude_ids"
+
+
+def model_filters(models: Optional[Sequence[str]]) -> Optional[Dict[str, Any]]:
+    """Фильтр vector store по списку моделей (``None`` — без ограничения)."""
+    if not models:
+        return None
+    if len(models) == 1:
+        return {"model": models[0]}
+    return {"model": list(models)}
+
+
+def split_exclude_ids(
+    filters: Optional[Dict[str, Any]],
+) -> Tuple[Optional[Dict[str, Any]], FrozenSet[str]]:
+    """Отделить ``EXCLUDE_IDS_KEY`` от фильтров по metadata."""
+    if not filters or EXCLUDE_IDS_KEY not in filters:
+        return filters or None, frozenset()
+    rest = {key: value for key, value in filters.items() if key != EXCLUDE_IDS_KEY}
+    return rest or None, frozenset(str(doc_id) for doc_id in filters[EXCLUDE_IDS_KEY])
+
+
+def matches_filters(metadata: Dict[str, Any], filters: Optional[Dict[str, Any]]) -> bool:
+    """Проверка metadata на фильтр в Python (для сторов без where-условий).
+
+    ``EXCLUDE_IDS_KEY`` здесь не учитывается — id не хранится в metadata.
+    """
+    for key, value in (filters or {}).items():
+        if key == EXCLUDE_IDS_KEY:
+            continue
+        if isinstance(value, MEMBERSHIP_TYPES):
+            if metadata.get(key) not in value:
+                return False
+        elif metadata.get(key) != value:
+            return False
+    return True
+
+
 class BaseVectorStore(ABC):
+    """Контракт vector store.
+
+    ``filters`` в :meth:`search` и :meth:`count_documents` — dict
+    ``{ключ metadata: значение}``: скаляр — равенство, list/tuple/set —
+    вхождение в набор (см. :func:`matches_filters`). В :meth:`search`
+    дополнительно ``{EXCLUDE_IDS_KEY: [id, ...]}`` исключает документы по id —
+    только у store с ``supports_exclude_ids``.
+    Бэкенды транслируют фильтр в нативное условие индекса.
+    """
+
+    #: Выигрывает ли store от склейки конкурентных ``search`` в один
+    #: ``search_batch`` (``SEARCH_BATCHING``). Только in-process индексы:
+    #: сетевому клиенту окно батчера добавляет задержку, а pgvector выполнял
+    #: бы батч на соединении и в транзакции ведущего потока.
+    supports_micro_batching = False
+    #: Понимает ли :meth:`search` ключ ``EXCLUDE_IDS_KEY``. Остальным store
+    #: (свои и duck-typed) он не передаётся: ``find_similar`` просит
+    #: ``limit + 1`` и отбрасывает свой документ сам.
+    supports_exclude_ids = False
+
     @abstractmethod
     def add_documents(self, documents: Iterable[Document]) -> None:
         raise NotImplementedError
@@ -34,6 +99,70 @@ class BaseVectorStore(ABC):
     ) -> List[SearchResult]:
         raise NotImplementedError
 
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Поиск по нескольким векторам; список hits на каждый вектор, в том же
+        порядке. По умолчанию — последовательные ``search``; бэкенды с
+        пакетным API переопределяют метод одним обращением к индексу."""
+        return [self.search(vector, limit=limit, filters=filters) for vector in query_vectors]
+
+    async def asearch(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchResult]:
+        """Асинхронный :meth:`search` (для ASGI); см. :meth:`asearch_batch`."""
+        return (await self.asearch_batch([query_vector], limit=limit, filters=filters))[0]
+
+    async def asearch_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Асинхронный :meth:`search_batch`. По умолчанию — в пуле потоков
+        (FAISS/Chroma потокобезопасны и отпускают GIL на поиске); бэкенды с
+        async-клиентом переопределяют метод."""
+        return await sync_to_async(self.search_batch, thread_sensitive=False)(
+            list(query_vectors), limit=limit, filters=filters
+        )
+
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        """Сохранённые embeddings по id документов; отсутствующие id не входят
+        в результат. По умолчанию — пусто (вызывающий код пересчитает вектор)."""
+        del doc_ids
+        return {}
+
+    async def aget_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        """Асинхронный :meth:`get_vectors` (по умолчанию — в пуле потоков)."""
+        return await sync_to_async(self.get_vectors, thread_sensitive=False)(list(doc_ids))
+
+    def get_texts(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        """``Document.text`` по id — для сторов, хранящих его отдельно от
+        metadata (``TEXT_STORAGE.BACKEND = "vector_store"``). По умолчанию —
+        пусто."""
+        del doc_ids
+        return {}
+
+    @contextmanager
+    def bulk_ingest(self) -> Iterator["BaseVectorStore"]:
+        """Режим массовой загрузки в текущем потоке: ``add_documents`` может
+        вернуться до окончания записи, на выходе — :meth:`flush`. По умолчанию
+        записи синхронны и режим ничего не меняет."""
+        yield self
+        self.flush()
+
+    def flush(self) -> None:
+        """Дождаться отложенных записей и поднять их ошибки (барьер)."""
+
+    def close(self) -> None:
+        """Освободить фоновые ресурсы store (пулы потоков). По умолчанию их нет."""
+
     @abstractmethod
     def delete(self, doc_ids: Iterable[str]) -> None:
         raise NotImplementedError
@@ -48,3 +177,48 @@ class BaseVectorStore(ABC):
         по всем ключам (как в search)."""
         raise NotImplementedError
 
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        """Число документов для каждой метки ``metadata["model"]``.
+
+        По умолчанию — :meth:`count_documents` на модель; бэкенды с агрегацией
+        или инкрементальными счётчиками отвечают без прохода по коллекции.
+        """
+        return {label: self.count_documents({"model": label}) for label in models}
+
+    def reconcile_counts(self) -> None:
+        """Пересчитать счётчики :meth:`count_by_model` по данным (если бэкенд
+        их ведёт); по умолчанию считать нечего."""
+
+
+def batched_search(
+    store: Any,
+    query_vectors: Sequence[List[float]],
+    limit: int,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[List[Any]]:
+    """``store.search_batch`` с fallback на ``search`` для сторов, не
+    наследующих :class:`BaseVectorStore` (duck typing в ``VECTOR_STORE``)."""
+    vectors = list(query_vectors)
+    if not vectors:
+        return []
+    search_batch = getattr(store, "search_batch", None)
+    if callable(search_batch):
+        return [list(hits) for hits in search_batch(vectors, limit=limit, filters=filters)]
+    return [store.search(vector, limit=limit, filters=filters) for vector in vectors]
+
+
+async def abatched_search(
+    store: Any,
+    query_vectors: Sequence[List[float]],
+    limit: int,
+    filters: Optional[Dict[str, Any]] = None,
+) -> List[List[Any]]:
+    """Async-вариант :func:`batched_search`: ``store.asearch_batch`` или
+    синхронный поиск через ``sync_to_async`` для duck-typed сторов."""
+    vectors = list(query_vectors)
+    if not vectors:
+        return []
+    asearch_batch = getattr(store, "asearch_batch", None)
+    if callable(asearch_batch):
+        return [list(hits) for hits in await asearch_batch(vectors, limit=limit, filters=filters)]
+    return await sync_to_async(batched_search)(store, vectors, limit, filters)
@@ -0,0 +1,223 @@
+"""
+Микробатчинг поисковых запросов к vector store.
+
+Под нагрузкой каждый поток запроса вызывает ``store.search`` с матрицей из
+одной строки. FAISS и NumPy считают одну матрицу из многих строк заметно
+дешевле (BLAS вместо цикла, один проход по индексу), поэтому конкурентные
+``search`` с одинаковыми ``limit`` и ``filters`` собираются в один
+``search_batch``:
+
+* первый запрос группы становится ведущим и ждёт ``WINDOW_MS`` или пока
+  группа не наберёт ``MAX_BATCH`` векторов;
+* остальные дописывают свои векторы в ту же группу и ждут результата;
+* ведущий выполняет ``search_batch`` и раздаёт каждому его строки.
+
+Фоновых потоков нет; одиночный запрос платит не больше ``WINDOW_MS``.
+Оборачиваются только store с ``supports_micro_batching = True``.
+
+Конфигурация::
+
+    "SEARCH_BATCHING": {
+        "ENABLED": True,
+        "WINDOW_MS": 2,
+        "MAX_BATCH": 32,
+    }
+"""
+from __future__ import annotations
+
+import json
+import threading
+import weakref
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .base import BaseVectorStore, Document, SearchResult, batched_search
+
+_registry_lock = threading.Lock()
+_batchers: "weakref.WeakKeyDictionary[Any, MicroBatchingVectorStore]" = (
+    weakref.WeakKeyDictionary()
+)
+
+
+class _PendingBatch:
+    """Векторы одной группы ``(limit, filters)`` и общий результат."""
+
+    def __init__(self) -> None:
+        self.vectors: List[List[float]] = []
+        self.results: Optional[List[List[SearchResult]]] = None
+        self.error: Optional[BaseException] = None
+        self.full = threading.Event()
+        self.done = threading.Event()
+
+
+def _group_key(limit: int, filters: Optional[Dict[str, Any]]) -> Tuple[int, str]:
+    return int(limit), json.dumps(filters or {}, sort_keys=True, default=str)
+
+
+class MicroBatchingVectorStore(BaseVectorStore):
+    """Обёртка store: конкурентные ``search`` → один ``search_batch``.
+
+    Запись, счётчики и прочие атрибуты делегируются исходному store.
+    """
+
+    def __init__(self, store: Any, *, window_ms: float = 2.0, max_batch: int = 32) -> None:
+        self.store = store
+        self.window = max(0.0, float(window_ms)) / 1000.0
+        self.max_batch = max(1, int(max_batch))
+        self._lock = threading.Lock()
+        self._open: Dict[Tuple[int, str], _PendingBatch] = {}
+
+    def __getattr__(self, name: str) -> Any:
+        # Только для атрибутов, которых нет у обёртки (compact, index, ...).
+        return getattr(self.__dict__["store"], name)
+
+    # ------------------------------------------------------------------ search
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchResult]:
+        return self._submit([query_vector], limit, filters)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        if len(vectors) >= self.max_batch:
+            # Уже полноценный батч — ждать соседей незачем.
+            return batched_search(self.store, vectors, limit, filters)
+        return self._submit(vectors, limit, filters)
+
+    async def asearch_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        native = getattr(type(self.store), "asearch_batch", None)
+        if native is not None and native is not BaseVectorStore.asearch_batch:
+            # Нативный async-клиент (Qdrant, pgvector pool) — без батчера.
+            return await self.store.asearch_batch(query_vectors, limit=limit, filters=filters)
+        return await sync_to_async(self.search_batch, thread_sensitive=False)(
+            list(query_vectors), limit=limit, filters=filters
+        )
+
+    def _submit(
+        self,
+        vectors: List[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+    ) -> List[List[SearchResult]]:
+        key = _group_key(limit, filters)
+        with self._lock:
+            batch = self._open.get(key)
+            leader = batch is None
+            if leader:
+                batch = self._open[key] = _PendingBatch()
+            start = len(batch.vectors)
+            batch.vectors.extend(vectors)
+            if len(batch.vectors) >= self.max_batch:
+                # Группа полна: следующий запрос откроет новую.
+                del self._open[key]
+                batch.full.set()
+        if leader:
+            batch.full.wait(self.window)
+            with self._lock:
+                if self._open.get(key) is batch:
+                    del self._open[key]
+            try:
+                batch.results = batched_search(self.store, batch.vectors, limit, filters)
+            except BaseException as exc:  # noqa: BLE001 - отдаётся всем ждущим
+                batch.error = exc
+            finally:
+                batch.done.set()
+        else:
+            batch.done.wait()
+        if batch.error is not None:
+            raise batch.error
+        return batch.results[start : start + len(vectors)]
+
+    # ------------------------------------------------------------- delegation
+
+    @property
+    def supports_exclude_ids(self) -> bool:  # type: ignore[override]
+        return bool(getattr(self.store, "supports_exclude_ids", False))
+
+    def add_documents(self, documents: Iterable[Document]) -> None:
+        self.store.add_documents(documents)
+
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        get_vectors = getattr(self.store, "get_vectors", None)
+        return get_vectors(doc_ids) if callable(get_vectors) else {}
+
+    async def aget_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        aget_vectors = getattr(self.store, "aget_vectors", None)
+        if callable(aget_vectors):
+            return await aget_vectors(doc_ids)
+        return await super().aget_vectors(doc_ids)
+
+    def get_texts(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        get_texts = getattr(self.store, "get_texts", None)
+        return get_texts(doc_ids) if callable(get_texts) else {}
+
+    def bulk_ingest(self) -> Any:
+        bulk_ingest = getattr(self.store, "bulk_ingest", None)
+        return bulk_ingest() if callable(bulk_ingest) else super().bulk_ingest()
+
+    def flush(self) -> None:
+        flush = getattr(self.store, "flush", None)
+        if callable(flush):
+            flush()
+
+    def close(self) -> None:
+        close = getattr(self.store, "close", None)
+        if callable(close):
+            close()
+
+    def delete(self, doc_ids: Iterable[str]) -> None:
+        self.store.delete(doc_ids)
+
+    def clear_collection(self) -> None:
+        self.store.clear_collection()
+
+    def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
+        return self.store.count_documents(filters)
+
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        return self.store.count_by_model(models)
+
+    def reconcile_counts(self) -> None:
+        self.store.reconcile_counts()
+
+
+def wrap_search_batching(store: Any, config: Any) -> Any:
+    """Обернуть store батчером, если ``SEARCH_BATCHING.ENABLED`` и store
+    объявил ``supports_micro_batching`` (FAISS).
+
+    Обёртка одна на store: запросы разных ``Searcher`` одного процесса
+    попадают в общие батчи.
+    """
+    cfg = config.search_batching
+    if not cfg.enabled or isinstance(store, MicroBatchingVectorStore):
+        return store
+    if not getattr(store, "supports_micro_batching", False):
+        return store
+    with _registry_lock:
+        wrapper = _batchers.get(store)
+        if wrapper is None or (wrapper.window, wrapper.max_batch) != (
+            cfg.window_ms / 1000.0,
+            cfg.max_batch,
+        ):
+            wrapper = MicroBatchingVectorStore(
+                store, window_ms=cfg.window_ms, max_batch=cfg.max_batch
+            )
+            _batchers[store] = wrapper
+        return wrapper
@@ -1,16 +1,46 @@
 from __future__ import annotations
 
 import logging
-from typing import Any, Dict, Iterable, List, Literal, Optional, cast
+import os
+import threading
+from concurrent.futures import Future, ThreadPoolExecutor
+from contextlib import ExitStack, contextmanager
+from typing import Any, Dict, Iterable, Iterator, List, Literal, Optional, Sequence, cast
 
 from ..exceptions import BackendError
-from .base import BaseVectorStore, Document, SearchResult
+from .base import (
+    MEMBERSHIP_TYPES,
+    BaseVectorStore,
+    Document,
+    SearchResult,
+    split_exclude_ids,
+)
+from .counts import BackgroundReconcile, ModelCounters, model_deltas
 
 log = logging.getLogger(__name__)
 
+# Лимит пакета upsert, если клиент не сообщает свой (Chroma < 0.4.10).
+_DEFAULT_MAX_BATCH_SIZE = 5461
+
 
 _ChromaHnswSpace = Literal["cosine", "l2", "ip"]
 
+# Параметры HNSW (ключи configuration Chroma >= 1.0) → ключи legacy-metadata.
+_LEGACY_HNSW_KEYS = {
+    "max_neighbors": "hnsw:M",
+    "ef_construction": "hnsw:construction_ef",
+    "ef_search": "hnsw:search_ef",
+    "num_threads": "hnsw:num_threads",
+}
+# Меняются у существующей коллекции; M и construction_ef — только при создании.
+_MUTABLE_HNSW_KEYS = ("ef_search", "num_threads")
+# Опции пула HTTP-клиента → поля chromadb.config.Settings.
+_HTTP_POOL_SETTINGS = {
+    "http_keepalive_secs": "chroma_http_keepalive_secs",
+    "http_max_connections": "chroma_http_max_connections",
+    "http_max_keepalive_connections": "chroma_http_max_keepalive_connections",
+}
+
 
 def _requested_chroma_space(distance_metric: str) -> _ChromaHnswSpace:
     """Соответствие опции бэкенда ключу ``space`` в конфигурации HNSW Chroma."""
@@ -38,6 +68,18 @@ def _space_from_hnsw_block(hnsw: Any) -> Optional[str]:
     return None
 
 
+def _hnsw_value(collection: Any, key: str) -> Any:
+    """Текущее значение параметра HNSW коллекции (configuration или legacy-metadata)."""
+    cfg = getattr(collection, "configuration", None)
+    hnsw = cfg.get("hnsw") if isinstance(cfg, dict) else getattr(cfg, "hnsw", None)
+    if hnsw is not None:
+        value = hnsw.get(key) if isinstance(hnsw, dict) else getattr(hnsw, key, None)
+        if value is not None:
+            return value
+    meta = getattr(collection, "metadata", None) or {}
+    return meta.get(_LEGACY_HNSW_KEYS[key])
+
+
 def _effective_space_from_collection(collection: Any, fallback: str) -> str:
     """Фактическая метрика индекса (после get_or_create она может отличаться от запрошенной)."""
     cfg = getattr(collection, "configuration", None)
@@ -81,12 +123,97 @@ def chroma_distance_to_similarity(effective_space: str, distance: Any) -> float:
     return max(0.0, min(1.0, 1.0 / (1.0 + d)))
 
 
+def chroma_where(filters: Optional[Dict[str, Any]]) -> Optional[Dict[str, Any]]:
+    """Фильтр бэкенда → ``where`` Chroma: коллекция — ``$in``, несколько ключей — ``$and``."""
+    if not filters:
+        return None
+    clauses: List[Dict[str, Any]] = []
+    for key, value in filters.items():
+        if isinstance(value, MEMBERSHIP_TYPES):
+            clauses.append({key: {"$in": list(value)}})
+        else:
+            clauses.append({key: value})
+    if len(clauses) == 1:
+        return clauses[0]
+    return {"$and": clauses}
+
+
 class ChromaDBBackend(BaseVectorStore):
+    """ChromaDB-коллекция: встроенный ``PersistentClient`` / in-memory или
+    сервер Chroma через ``HttpClient``.
+
+    Options:
+        host, port, ssl, headers: адрес сервера Chroma — ``HttpClient`` вместо
+            встроенного клиента. Воркеры не открывают общие SQLite/HNSW-файлы,
+            а пишут и ищут через один сервер; с ``persist_directory`` несовместим.
+        http_keepalive_secs, http_max_connections, http_max_keepalive_connections:
+            пул keep-alive соединений HTTP-клиента (``chroma_http_*`` в
+            ``Settings``); по умолчанию — значения Chroma.
+        hnsw_m, hnsw_ef_construction: ``M`` и ``construction_ef`` HNSW для
+            новой коллекции (у существующей не меняются).
+        hnsw_ef_search, hnsw_num_threads: ``ef_search`` и ``num_threads`` —
+            задаются при создании и применяются к существующей коллекции
+            (``collection.modify``, Chroma >= 1.0); на ходу —
+            :meth:`configure_hnsw`.
+        upsert_batch_size: максимум документов в одном ``collection.upsert``;
+            по умолчанию ``client.get_max_batch_size()`` — больший пакет
+            Chroma отвергает.
+        upsert_workers: сколько upsert-пакетов отправляется параллельно.
+            Имеет смысл для HTTP-клиента (сеть, сервер пишет сам); встроенный
+            клиент пишет в SQLite под своей блокировкой — оставьте ``1``.
+        query_documents: возвращать ли ``documents`` в ``collection.query``
+            (текст hit, если его нет в metadata). ``False`` — для
+            ``TEXT_STORAGE`` ``external`` + ``vector_store``: поиск не тянет
+            текст кандидатов, он читается :meth:`get_texts` для итоговых hits.
+        model_counts: вести счётчики документов по модели для
+            :meth:`count_by_model` (страница покрытия индекса). Upsert и delete
+            вне :meth:`bulk_ingest` сначала читают свои id (``collection.get``
+            без payload), чтобы учесть только реально добавленные и удалённые
+            документы. В :meth:`bulk_ingest` этого лишнего запроса нет:
+            счётчики помечаются несверенными, и до следующей сверки
+            :meth:`count_by_model` считает точно по коллекции.
+        model_counts_path: SQLite-файл счётчиков; по умолчанию
+            ``<persist_directory>/<collection_name>.counts.sqlite`` (общий для
+            процессов), без ``persist_directory`` — в памяти процесса. С
+            ``host`` счётчики ведутся только при явном пути: в памяти одного
+            процесса не видны записи остальных клиентов сервера, и
+            :meth:`count_by_model` без пути считает ``count_documents``.
+        counts_reconcile_seconds: как часто счётчики сверяются полным
+            проходом по коллекции. Сверка устаревших счётчиков идёт в фоне,
+            пока отдаются текущие значения.
+
+    В :meth:`bulk_ingest` (``build_search_index``) ``add_documents`` ставит
+    пакеты в очередь и возвращается сразу: запись идёт в фоне, пока
+    эмбеддится следующий пакет. В очереди не больше ``upsert_workers``
+    пакетов, ошибки поднимаются следующим ``add_documents`` или
+    :meth:`flush`.
+    """
+
+    supports_exclude_ids = True
+
     def __init__(
         self,
         persist_directory: Optional[str] = None,
         collection_name: str = "django_graph_search",
         distance_metric: str = "cosine",
+        *,
+        upsert_batch_size: Optional[int] = None,
+        upsert_workers: int = 1,
+        query_documents: bool = True,
+        host: Optional[str] = None,
+        port: int = 8000,
+        ssl: bool = False,
+        headers: Optional[Dict[str, str]] = None,
+        http_keepalive_secs: Optional[float] = None,
+        http_max_connections: Optional[int] = None,
+        http_max_keepalive_connections: Optional[int] = None,
+        hnsw_m: Optional[int] = None,
+        hnsw_ef_construction: Optional[int] = None,
+        hnsw_ef_search: Optional[int] = None,
+        hnsw_num_threads: Optional[int] = None,
+        model_counts: bool = True,
+        model_counts_path: Optional[str] = None,
+        counts_reconcile_seconds: float = 3600.0,
         **options: Any,
     ) -> None:
         try:
@@ -97,10 +224,57 @@ class ChromaDBBackend(BaseVectorStore):
         self.distance_metric = (distance_metric or "cosine").lower()
         self._requested_space = _requested_chroma_space(self.distance_metric)
 
-        if persist_directory:
+        self.hnsw_params: Dict[str, int] = {
+            key: int(value)
+            for key, value in (
+                ("max_neighbors", hnsw_m),
+                ("ef_construction", hnsw_ef_construction),
+                ("ef_search", hnsw_ef_search),
+                ("num_threads", hnsw_num_threads),
+            )
+            if value is not None
+        }
+
+        if host:
+            if persist_directory:
+                raise BackendError("ChromaDB: use either host (HttpClient) or persist_directory.")
+            settings = self._http_settings(
+                options.pop("settings", None),
+                {
+                    "http_keepalive_secs": http_keepalive_secs,
+                    "http_max_connections": http_max_connections,
+                    "http_max_keepalive_connections": http_max_keepalive_connections,
+                },
+            )
+            if settings is not None:
+                options["settings"] = settings
+            client = chromadb.HttpClient(
+                host=host, port=int(port), ssl=bool(ssl), headers=headers, **options
+            )
+        elif persist_directory:
             client = chromadb.PersistentClient(path=persist_directory, **options)
         else:
             client = chromadb.Client(**options)
+        self.client = client
+        self.query_documents = bool(query_documents)
+        self.upsert_workers = max(1, int(upsert_workers))
+        self.upsert_batch_size = self._max_batch_size(client, upsert_batch_size)
+        self._executor: Optional[ThreadPoolExecutor] = None
+        self._executor_lock = threading.Lock()
+        # Ограничение очереди bulk-записи: не больше upsert_workers пакетов.
+        self._slots = threading.BoundedSemaphore(self.upsert_workers)
+        # Режим bulk и недописанные пакеты — свои у каждого потока.
+        self._bulk = threading.local()
+        self._counts: Optional[ModelCounters] = None
+        if model_counts and (model_counts_path or not host):
+            if not model_counts_path and persist_directory:
+                model_counts_path = os.path.join(
+                    persist_directory, f"{collection_name}.counts.sqlite"
+                )
+            self._counts = ModelCounters(
+                model_counts_path, reconcile_seconds=counts_reconcile_seconds
+            )
+        self._reconciler = BackgroundReconcile(self.reconcile_counts, "chroma-counts")
 
         self.collection = self._open_collection(
             client,
@@ -119,12 +293,78 @@ class ChromaDBBackend(BaseVectorStore):
                 self._effective_space,
                 self._requested_space,
             )
+        self._apply_hnsw_params()
+
+    @staticmethod
+    def _http_settings(settings: Any, pool: Dict[str, Any]) -> Any:
+        """``Settings`` с параметрами пула (поля есть в Chroma >= 0.5.4)."""
+        pool = {key: value for key, value in pool.items() if value is not None}
+        if not pool:
+            return settings
+        if settings is None:
+            from chromadb.config import Settings
+
+            settings = Settings()
+        for option, value in pool.items():
+            field = _HTTP_POOL_SETTINGS[option]
+            if hasattr(settings, field):
+                setattr(settings, field, value)
+            else:
+                log.warning("ChromaDB: this chromadb version has no %s; %s ignored.", field, option)
+        return settings
+
+    def _apply_hnsw_params(self) -> None:
+        """Параметры HNSW из OPTIONS для уже существующей коллекции."""
+        fixed = {
+            key: value
+            for key, value in self.hnsw_params.items()
+            if key not in _MUTABLE_HNSW_KEYS and _hnsw_value(self.collection, key) != value
+        }
+        if fixed:
+            log.info(
+                "ChromaDB: %s are set when the collection is created; existing values kept.",
+                ", ".join(sorted(fixed)),
+            )
+        changed = {
+            key: value
+            for key, value in self.hnsw_params.items()
+            if key in _MUTABLE_HNSW_KEYS and _hnsw_value(self.collection, key) != value
+        }
+        if changed:
+            self.configure_hnsw(**changed)
+
+    def configure_hnsw(
+        self, *, ef_search: Optional[int] = None, num_threads: Optional[int] = None
+    ) -> None:
+        """Изменить ``ef_search``/``num_threads`` HNSW коллекции без пересоздания
+        (``collection.modify``; Chroma >= 1.0, на сервере — для всех клиентов)."""
+        params = {
+            key: int(value)
+            for key, value in (("ef_search", ef_search), ("num_threads", num_threads))
+            if value is not None
+        }
+        if not params:
+            return
+        try:
+            from chromadb.api.collection_configuration import (
+                UpdateCollectionConfiguration,
+                UpdateHNSWConfiguration,
+            )
+        except Exception:  # pragma: no cover - старая версия chromadb
+            # modify(metadata=...) заменил бы metadata вместе с hnsw:space.
+            log.warning("ChromaDB: changing HNSW params of a collection needs chromadb>=1.0.")
+            return
+        self.collection.modify(
+            configuration=UpdateCollectionConfiguration(hnsw=UpdateHNSWConfiguration(**params))
+        )
+        self.hnsw_params.update(params)
 
     def _open_collection(self, client: Any, *, collection_name: str, requested_space: str) -> Any:
         """get_or_create с configuration (Chroma >= 0.5) и fallback на legacy-metadata."""
         legacy_meta: Optional[Dict[str, Any]] = None
         if requested_space == "cosine":
             legacy_meta = {"hnsw:space": "cosine"}
+        legacy_hnsw = {_LEGACY_HNSW_KEYS[key]: value for key, value in self.hnsw_params.items()}
 
         coll_cfg: Any = None
         try:
@@ -136,6 +376,7 @@ class ChromaDBBackend(BaseVectorStore):
             coll_cfg = CreateCollectionConfiguration(
                 hnsw=CreateHNSWConfiguration(
                     space=cast(_ChromaHnswSpace, requested_space),
+                    **self.hnsw_params,
                 )
             )
         except Exception:  # pragma: no cover - старая версия chromadb
@@ -151,23 +392,122 @@ class ChromaDBBackend(BaseVectorStore):
             except TypeError:
                 pass
 
+        if legacy_hnsw:
+            legacy_meta = {**(legacy_meta or {}), **legacy_hnsw}
         return client.get_or_create_collection(
             name=collection_name,
             metadata=legacy_meta,
         )
 
+    @staticmethod
+    def _max_batch_size(client: Any, requested: Optional[int]) -> int:
+        limit = _DEFAULT_MAX_BATCH_SIZE
+        getter = getattr(client, "get_max_batch_size", None)
+        try:
+            limit = int(getter() if callable(getter) else client.max_batch_size)
+        except Exception:  # noqa: BLE001 - старый клиент без лимита
+            pass
+        if requested:
+            return max(1, min(int(requested), limit))
+        return max(1, limit)
+
     def add_documents(self, documents: Iterable[Document]) -> None:
         docs = list(documents)
         if not docs:
             return
+        size = self.upsert_batch_size
+        chunks = [docs[start : start + size] for start in range(0, len(docs), size)]
+        if getattr(self._bulk, "depth", 0):
+            for chunk in chunks:
+                self._submit(chunk)
+        elif len(chunks) == 1 or self.upsert_workers == 1:
+            for chunk in chunks:
+                self._upsert(chunk)
+        else:
+            list(self._get_executor().map(self._upsert, chunks))
+
+    def _upsert(self, docs: List[Document], count: bool = True) -> None:
         # upsert: повторная индексация объекта (AUTO_INDEX при save) не должна
         # падать с DuplicateIDError — документ с тем же id перезаписывается.
+        ids = [doc.id for doc in docs]
+        fresh: Dict[str, Optional[Dict[str, Any]]] = {}
+        if count and self._counts is not None:
+            existing = set(self.collection.get(ids=ids, include=[]).get("ids") or [])
+            fresh = {doc.id: doc.metadata for doc in docs if doc.id not in existing}
         self.collection.upsert(
-            ids=[doc.id for doc in docs],
+            ids=ids,
             embeddings=[doc.embedding for doc in docs],
             metadatas=[doc.metadata for doc in docs],
             documents=[doc.text or "" for doc in docs],
         )
+        if fresh:
+            self._counts.apply(model_deltas(fresh.values()))
+
+    def _get_executor(self) -> ThreadPoolExecutor:
+        with self._executor_lock:
+            if self._executor is None:
+                self._executor = ThreadPoolExecutor(
+                    max_workers=self.upsert_workers, thread_name_prefix="chroma-upsert"
+                )
+            return self._executor
+
+    def _submit(self, docs: List[Document]) -> None:
+        """Поставить пакет в фоновую запись; ждёт, пока в очереди есть место."""
+        with ExitStack() as stack:
+            stack.enter_context(self._slots)
+            # Без проверки существующих id: счётчики сверятся после bulk.
+            future = self._get_executor().submit(self._upsert, docs, False)
+            # Слот занят до конца записи пакета — его освобождает future.
+            stack.pop_all()
+        future.add_done_callback(lambda _: self._slots.release())
+        pending = self._pending_futures() + [future]
+        self._bulk.pending = [f for f in pending if not f.done()]
+        # Ошибка уже записанного пакета прерывает загрузку сразу, а не в flush.
+        for finished in pending:
+            if finished.done():
+                finished.result()
+
+    def _pending_futures(self) -> List[Future]:
+        return list(getattr(self._bulk, "pending", None) or [])
+
+    def flush(self) -> None:
+        pending = self._pending_futures()
+        self._bulk.pending = []
+        error: Optional[BaseException] = None
+        for future in pending:
+            try:
+                future.result()
+            except BaseException as exc:  # noqa: BLE001 - дождаться остальных
+                error = error or exc
+        if error is not None:
+            raise error
+
+    def close(self) -> None:
+        """Дождаться фоновой записи и остановить пул потоков upsert; следующая
+        параллельная запись создаст новый."""
+        with self._executor_lock:
+            executor, self._executor = self._executor, None
+        if executor is not None:
+            executor.shutdown(wait=True)
+
+    @contextmanager
+    def bulk_ingest(self) -> Iterator["ChromaDBBackend"]:
+        self._bulk.depth = getattr(self._bulk, "depth", 0) + 1
+        if self._counts is not None:
+            self._counts.invalidate()
+        try:
+            yield self
+        except BaseException:
+            self._bulk.depth -= 1
+            if not self._bulk.depth:
+                try:
+                    self.flush()
+                except Exception as exc:  # noqa: BLE001 - исходная ошибка важнее
+                    log.warning("ChromaDB: background upsert failed: %s", exc)
+            raise
+        self._bulk.depth -= 1
+        if not self._bulk.depth:
+            self.flush()
 
     def search(
         self,
@@ -175,16 +515,54 @@ class ChromaDBBackend(BaseVectorStore):
         limit: int,
         filters: Optional[Dict[str, Any]] = None,
     ) -> List[SearchResult]:
+        return self.search_batch([query_vector], limit=limit, filters=filters)[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Один ``collection.query`` со всеми ``query_embeddings``."""
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        # where в Chroma фильтрует только metadata: исключаемые id добираем
+        # запасом в n_results и отбрасываем после запроса.
+        filters, exclude = split_exclude_ids(filters)
         response = self.collection.query(
-            query_embeddings=[query_vector],
-            n_results=limit,
-            where=filters,
-            include=["distances", "metadatas", "documents"],
+            query_embeddings=vectors,
+            n_results=limit + len(exclude),
+            where=chroma_where(filters),
+            include=self._query_include(),
         )
-        ids = response.get("ids", [[]])[0]
-        distances = response.get("distances", [[]])[0]
-        metadatas = response.get("metadatas", [[]])[0]
-        documents = response.get("documents", [[]])[0]
+        empty: List[List[Any]] = [[] for _ in vectors]
+        ids_rows = response.get("ids") or empty
+        distance_rows = response.get("distances") or empty
+        metadata_rows = response.get("metadatas") or empty
+        # Без include=documents строки документов пустые — по None на hit.
+        document_rows = response.get("documents") or [[None] * len(ids) for ids in ids_rows]
+        out = [
+            [hit for hit in self._to_results(ids, distances, metadatas, documents)
+             if hit.id not in exclude][:limit]
+            for ids, distances, metadatas, documents in zip(
+                ids_rows, distance_rows, metadata_rows, document_rows
+            )
+        ]
+        return out + [[] for _ in range(len(vectors) - len(out))]
+
+    def _query_include(self) -> List[str]:
+        if getattr(self, "query_documents", True):
+            return ["distances", "metadatas", "documents"]
+        return ["distances", "metadatas"]
+
+    def _to_results(
+        self,
+        ids: List[Any],
+        distances: List[Any],
+        metadatas: List[Any],
+        documents: List[Any],
+    ) -> List[SearchResult]:
         results = []
         for doc_id, distance, metadata, doc_text in zip(
             ids, distances, metadatas, documents
@@ -206,18 +584,81 @@ class ChromaDBBackend(BaseVectorStore):
         """Привести метрику Chroma к сходству в диапазоне [0, 1]."""
         return chroma_distance_to_similarity(self._effective_space, distance)
 
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        ids = list(doc_ids)
+        if not ids:
+            return {}
+        data = self.collection.get(ids=ids, include=["embeddings"])
+        embeddings = data.get("embeddings")
+        if embeddings is None:
+            return {}
+        return {
+            str(doc_id): [float(v) for v in embedding]
+            for doc_id, embedding in zip(data.get("ids") or [], embeddings)
+            if embedding is not None
+        }
+
+    def get_texts(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(doc_ids)
+        if not ids:
+            return {}
+        data = self.collection.get(ids=ids, include=["documents"])
+        return {
+            str(doc_id): text
+            for doc_id, text in zip(data.get("ids") or [], data.get("documents") or [])
+            if text
+        }
+
     def delete(self, doc_ids: Iterable[str]) -> None:
         ids = list(doc_ids)
         if not ids:
             return
+        if self._counts is None:
+            self.collection.delete(ids=ids)
+            return
+        data = self.collection.get(ids=ids, include=["metadatas"])
         self.collection.delete(ids=ids)
+        self._counts.apply(model_deltas(data.get("metadatas") or [], sign=-1))
 
     def clear_collection(self) -> None:
         self.collection.delete(where={})
+        if self._counts is not None:
+            self._counts.replace({})
 
     def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
         if filters:
-            data = self.collection.get(where=filters, include=[])
+            data = self.collection.get(where=chroma_where(filters), include=[])
             ids = data.get("ids") or []
             return len(ids)
         return int(self.collection.count())
+
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        labels = list(models)
+        if self._counts is None:
+            return super().count_by_model(labels)
+        if self._counts.reconciled_at() is None:
+            # Счётчики ещё не сверены (новый файл, обновление, bulk): точный
+            # подсчёт по коллекции, сверка — в фоне.
+            self._reconciler.start()
+            return super().count_by_model(labels)
+        if self._counts.is_stale():
+            self._reconciler.start()
+        counts = self._counts.snapshot()
+        return {label: counts.get(label, 0) for label in labels}
+
+    def reconcile_counts(self) -> None:
+        """Пересчитать счётчики постраничным ``collection.get`` metadata."""
+        if self._counts is None:
+            return
+        counts: Dict[str, int] = {}
+        page = self.upsert_batch_size
+        offset = 0
+        while True:
+            data = self.collection.get(include=["metadatas"], limit=page, offset=offset)
+            metadatas = data.get("metadatas") or []
+            for label, n in model_deltas(metadatas).items():
+                counts[label] = counts.get(label, 0) + n
+            if len(metadatas) < page:
+                break
+            offset += page
+        self._counts.replace(counts)
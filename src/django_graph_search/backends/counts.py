@@ -0,0 +1,132 @@
+"""
+Инкрементальные счётчики документов по ``metadata["model"]``.
+
+Для бэкендов без агрегации на стороне хранилища (ChromaDB): счётчики
+меняются в ``add_documents``/``delete`` на число реально добавленных и
+удалённых id, а раз в ``reconcile_seconds`` сверяются полным проходом по
+коллекции — это исправляет расхождения от записей других клиентов и гонок
+между сверкой и записью. Пока сверки не было (или после
+:meth:`ModelCounters.invalidate`), счётчикам верить нельзя: бэкенд считает
+точно сам.
+
+Хранятся в SQLite: файл рядом с данными общий для процессов
+(``UPDATE n = n + ?`` атомарен), без пути — в памяти процесса.
+
+Сверка никогда не идёт в потоке запроса: :class:`BackgroundReconcile`
+запускает её в фоне (ChromaDB и pgvector), пока отдаются текущие счётчики.
+"""
+from __future__ import annotations
+
+import logging
+import os
+import sqlite3
+import threading
+import time
+from typing import Any, Callable, Dict, Iterable, Optional
+
+log = logging.getLogger(__name__)
+
+
+def model_deltas(metadatas: Iterable[Optional[Dict[str, Any]]], sign: int = 1) -> Dict[str, int]:
+    """``model → ±число`` документов по их metadata (без ``model`` не считаются)."""
+    out: Dict[str, int] = {}
+    for meta in metadatas:
+        label = (meta or {}).get("model")
+        if label is not None:
+            out[str(label)] = out.get(str(label), 0) + sign
+    return out
+
+
+class ModelCounters:
+    """Счётчики ``model → число документов`` с отметкой последней сверки."""
+
+    def __init__(self, path: Optional[str] = None, *, reconcile_seconds: float = 3600.0) -> None:
+        self.path = path
+        self.reconcile_seconds = float(reconcile_seconds)
+        if path:
+            os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self._lock = threading.Lock()
+        self._conn = sqlite3.connect(path or ":memory:", timeout=30, check_same_thread=False)
+        with self._lock, self._conn:
+            if path:
+                self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS model_counts "
+                "(model TEXT PRIMARY KEY, n INTEGER NOT NULL) WITHOUT ROWID"
+            )
+            self._conn.execute(
+                "CREATE TABLE IF NOT EXISTS counts_state "
+                "(key TEXT PRIMARY KEY, value REAL NOT NULL) WITHOUT ROWID"
+            )
+
+    def apply(self, deltas: Dict[str, int]) -> None:
+        """Прибавить ``deltas`` (отрицательные — удаления)."""
+        rows = [(str(model), int(n)) for model, n in deltas.items() if n]
+        if not rows:
+            return
+        with self._lock, self._conn:
+            self._conn.executemany(
+                "INSERT INTO model_counts (model, n) VALUES (?, ?) "
+                "ON CONFLICT(model) DO UPDATE SET n = n + excluded.n",
+                rows,
+            )
+
+    def reconciled_at(self) -> Optional[float]:
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT value FROM counts_state WHERE key = 'reconciled_at'"
+            ).fetchone()
+        return float(row[0]) if row else None
+
+    def invalidate(self) -> None:
+        """Сбросить отметку сверки: запись шла мимо счётчиков (bulk)."""
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM counts_state WHERE key = 'reconciled_at'")
+
+    def is_stale(self) -> bool:
+        reconciled = self.reconciled_at()
+        return reconciled is None or time.time() - reconciled >= self.reconcile_seconds
+
+    def snapshot(self) -> Dict[str, int]:
+        with self._lock:
+            rows = self._conn.execute("SELECT model, n FROM model_counts").fetchall()
+        return {model: max(0, int(n)) for model, n in rows}
+
+    def replace(self, counts: Dict[str, int]) -> None:
+        """Записать результат сверки (или пустые счётчики после очистки коллекции)."""
+        rows = [(str(model), int(n)) for model, n in counts.items() if n]
+        with self._lock, self._conn:
+            self._conn.execute("DELETE FROM model_counts")
+            self._conn.executemany("INSERT INTO model_counts (model, n) VALUES (?, ?)", rows)
+            self._conn.execute(
+                "INSERT OR REPLACE INTO counts_state (key, value) VALUES ('reconciled_at', ?)",
+                (time.time(),),
+            )
+
+
+class BackgroundReconcile:
+    """Сверка счётчиков в фоновом потоке, не больше одной одновременно."""
+
+    def __init__(self, reconcile: Callable[[], None], name: str) -> None:
+        self._reconcile = reconcile
+        self._name = name
+        self._lock = threading.Lock()
+        self._running = False
+
+    def start(self) -> bool:
+        """Запустить сверку; ``False`` — предыдущая ещё идёт."""
+        with self._lock:
+            if self._running:
+                return False
+            self._running = True
+        threading.Thread(target=self._run, name=self._name, daemon=True).start()
+        return True
+
+    def _run(self) -> None:
+        try:
+            self._reconcile()
+        except Exception as exc:  # noqa: BLE001 - останутся прежние счётчики
+            log.warning("%s: model counts reconcile failed: %s", self._name, exc)
+        finally:
+            with self._lock:
+                self._running = False
@@ -2,104 +2,586 @@ from __future__ import annotations
 
 import logging
 import os
-import pickle
+import tempfile
 import threading
-from typing import Any, Dict, Iterable, List, Optional
+import time
+from contextlib import contextmanager
+from typing import (
+    Any,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
 
 from ..exceptions import BackendError
-from .base import BaseVectorStore, Document, SearchResult
+from .base import (
+    BaseVectorStore,
+    Document,
+    SearchResult,
+    matches_filters,
+    split_exclude_ids,
+)
+from .faiss_postings import FaissPostingsMixin
+from .faiss_snapshot import FaissSnapshotMixin, SnapshotMetadata, WalOverlay
 
 log = logging.getLogger(__name__)
 
+_METRICS = {"l2": "l2", "ip": "ip", "inner_product": "ip", "cosine": "cosine"}
+# quantizer → тип ScalarQuantizer.
+_QUANTIZERS = {"sq8": "QT_8bit", "fp16": "QT_fp16"}
+# С какого размера батча точный flat-поиск идёт через _matmul_search_locked.
+_MATMUL_MIN_QUERIES = 8
 
-class FaissBackend(BaseVectorStore):
-    """In-process FAISS flat index with optional disk persistence.
+
+class _ReadWriteLock:
+    """Много читателей или один писатель. Ждущий писатель не пускает новых
+    читателей — поток upsert-ов не голодает под постоянным поиском."""
+
+    def __init__(self) -> None:
+        self._cond = threading.Condition()
+        self._readers = 0
+        self._writer = False
+        self._waiting_writers = 0
+
+    @contextmanager
+    def read(self) -> Iterator[None]:
+        with self._cond:
+            while self._writer or self._waiting_writers:
+                self._cond.wait()
+            self._readers += 1
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._readers -= 1
+                if not self._readers:
+                    self._cond.notify_all()
+
+    @contextmanager
+    def write(self) -> Iterator[None]:
+        with self._cond:
+            self._waiting_writers += 1
+            while self._writer or self._readers:
+                self._cond.wait()
+            self._waiting_writers -= 1
+            self._writer = True
+        try:
+            yield
+        finally:
+            with self._cond:
+                self._writer = False
+                self._cond.notify_all()
+
+
+class FaissBackend(FaissSnapshotMixin, FaissPostingsMixin, BaseVectorStore):
+    """In-process FAISS index (flat or ANN) with optional disk persistence.
+
+    Векторы лежат в непрерывной float32-матрице ``_vectors`` по слотам; номер
+    слота — int64 id строки в индексе. В точном flat-индексе позиция строки
+    совпадает со слотом (как у ``IndexIDMap2``, но без ``remove_ids``, который
+    уплотняет весь индекс): upsert перезаписывает строку своего слота на месте,
+    delete помечает слот свободным (строка пропускается при поиске), новые
+    документы сначала занимают свободные слоты — всё O(k) от числа затронутых
+    документов.
+
+    С ``index_factory`` слоты передаются в ANN-индекс через ``add_with_ids`` /
+    ``remove_ids``. Индексы без ``remove_ids`` (HNSW) оставляют старую строку
+    «мёртвой» — она пропускается при поиске, а документ получает новый слот;
+    мёртвые слоты убирает :meth:`compact` (см. ``max_dead_ratio``).
 
     Options:
-        persist_path: путь к pickle-файлу, куда сохраняются (ids, metadata,
-            embeddings) после каждой мутации. Без него индекс живёт только в
-            памяти процесса и теряется при рестарте.
-
-    Security:
-        ``persist_path`` загружается через ``pickle.load`` — указывайте только
-        доверенный локальный путь, недоступный для записи посторонним
-        (подмена файла = remote code execution).
+        persist_path: каталог снапшотов и лога мутаций. Без него индекс
+            живёт только в памяти процесса и теряется при рестарте.
+        metric: ``"l2"`` (по умолчанию), ``"ip"`` или ``"cosine"``. Для
+            ``cosine`` векторы нормируются один раз при вставке (запросы — при
+            поиске) и ищутся по скалярному произведению (``IndexFlatIP``,
+            ``METRIC_INNER_PRODUCT`` в ANN). Score — как у ChromaDB и
+            pgvector: сходство, обрезанное до [0, 1], для ``ip``/``cosine`` и
+            ``1 / (1 + d)`` для квадрата L2.
+        index_factory: строка ``faiss.index_factory`` (``"IVF4096,PQ48"``,
+            ``"HNSW32"``, ``"IVF1024,SQ8"``). По умолчанию — точный
+            ``IndexFlatL2`` / ``IndexFlatIP``.
+        quantizer: ``"sq8"`` или ``"fp16"`` — flat-индекс хранит коды
+            ``IndexScalarQuantizer`` (1 или 2 байта на компоненту вместо 4);
+            ``sq8`` обучается как ANN-индекс, после ``train_size``
+            документов. С ``index_factory`` не используется — сжатие задаёт
+            сама строка фабрики.
+        rescore_factor: при сжатом или ANN-индексе первый проход берёт
+            ``limit * rescore_factor`` кандидатов, которые пересчитываются
+            точно по полным векторам. ``1`` — без пересчёта.
+        train_size: для индексов, которым нужно обучение (IVF, PQ): пока в
+            сторе меньше векторов, поиск идёт точным flat-индексом; затем
+            индекс обучается на случайной выборке такого размера.
+        nprobe: число просматриваемых IVF-списков по умолчанию.
+        ef_search: ``efSearch`` HNSW по умолчанию.
+        max_dead_ratio: доля мёртвых слотов к живым, после которой индекс
+            без ``remove_ids`` перестраивается в фоне (``0`` — только явным
+            :meth:`compact` и после ``build_search_index``).
+        exact_filter_rows: фильтр, под который попадает не больше строк,
+            считается точно по подмножеству — ANN с узким фильтром теряет
+            recall.
+        wal_max_bytes: размер лога мутаций, после которого он в фоне
+            сворачивается в новый снапшот.
+        filter_fields: ключи metadata с инвертированными postings (по
+            умолчанию ``("model",)``). Для каждого значения — битмап слотов;
+            фильтр по этим ключам собирается из битмапов и уходит в FAISS как
+            ``IDSelectorBitmap``: поиск считает расстояния только до подходящих
+            векторов и за один проход возвращает ровно ``limit`` хитов.
+            Остальные ключи фильтра проверяются в Python по кандидатам.
+            Подходит для полей с небольшим числом значений.
+        refresh_interval: как часто (секунды, не чаще) поиск проверяет, не
+            записал ли другой процесс в ``persist_path`` новые мутации или
+            снапшот; ``0`` — не проверять.
+        omp_threads: число OpenMP-потоков FAISS (``faiss.omp_set_num_threads``,
+            настройка на весь процесс). По умолчанию FAISS берёт все ядра на
+            каждый запрос; при многопоточном сервере и микробатчинге
+            (``SEARCH_BATCHING``) меньшее значение убирает переподписку ядер.
+
+    ``nprobe`` / ``ef_search`` можно переопределить на один запрос:
+    ``search(vector, limit, nprobe=64)``.
+
+    Снапшот в ``persist_path/<snapshot>/``: ``index.faiss``
+    (``faiss.write_index``), ``vectors.npy``, ``ids.npy`` и
+    ``metadata.sqlite``; ``persist_path/CURRENT`` указывает на актуальный.
+    Загрузка отображает файлы в память (``IO_FLAG_MMAP``, ``mmap_mode="r"``):
+    процесс стартует за миллисекунды, воркеры делят страницы через page cache
+    ОС. Первая мутация читает снапшот в память целиком.
+
+    Мутации не переписывают снапшот: батч upsert/delete дописывается в
+    ``<snapshot>/wal.log`` (append + fsync, стоимость пропорциональна
+    изменению), при загрузке лог проигрывается поверх снапшота. Когда лог
+    вырастает до ``wal_max_bytes``, фоновый поток сворачивает его в новый
+    снапшот (то же делает ``compact()``). Запись идёт под ``flock`` на
+    ``persist_path/LOCK``: перед ней процесс дочитывает чужие записи лога или
+    перечитывает снапшот, если другой процесс его уже свернул. Процессы,
+    которые только ищут (веб-воркеры при индексаторе в Celery), раз в
+    ``refresh_interval`` сверяют ``CURRENT`` и размер лога и при изменении в
+    фоновом потоке дочитывают хвост лога или отображают новый снапшот —
+    текущие запросы идут по старому состоянию до подмены. Хвост лога не
+    копирует снапшот в память процесса: он накладывается поверх отображения
+    (:class:`~.faiss_snapshot.WalOverlay` — маска скрытых слотов и небольшая
+    точная матрица новых документов) до следующего сжатия лога.
+
+    Поиск идёт под разделяемой блокировкой ``_rw``; писатели сериализуются
+    ``_lock`` и берут ``_rw`` эксклюзивно только на применение батча к
+    индексу (O(батча)). Долгие шаги — обучение ANN-индекса, чтение снапшота в
+    память, запись снапшота при сжатии лога, fsync — идут вне эксклюзивной
+    секции: новое состояние строится рядом и подменяется присваиванием, так
+    что поиск во время индексации их не ждёт.
+
+    Старый pickle-файл по ``persist_path`` загружается один раз и
+    конвертируется в снапшот (файл остаётся рядом с суффиксом ``.legacy``);
+    pickle загружайте только из доверенного пути.
+
+    Снапшот и лог — :class:`~.faiss_snapshot.FaissSnapshotMixin`, postings —
+    :class:`~.faiss_postings.FaissPostingsMixin`.
     """
 
-    def __init__(self, persist_path: Optional[str] = None, **options: Any) -> None:
+    supports_micro_batching = True
+    supports_exclude_ids = True
+
+    def __init__(
+        self,
+        persist_path: Optional[str] = None,
+        *,
+        metric: str = "l2",
+        index_factory: Optional[str] = None,
+        train_size: int = 10_000,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+        max_dead_ratio: float = 0.5,
+        exact_filter_rows: int = 10_000,
+        wal_max_bytes: int = 16 * 1024 * 1024,
+        filter_fields: Sequence[str] = ("model",),
+        refresh_interval: float = 1.0,
+        quantizer: Optional[str] = None,
+        rescore_factor: int = 1,
+        omp_threads: Optional[int] = None,
+        **options: Any,
+    ) -> None:
         self.options = options
         self.persist_path = persist_path
+        self.metric = _METRICS.get(str(metric or "l2").strip().lower(), "")
+        if not self.metric:
+            raise BackendError(f"FAISS metric must be 'l2', 'ip' or 'cosine', got {metric!r}.")
+        self.index_factory = (index_factory or "").strip() or None
+        if self.index_factory and self.index_factory.lower() == "flat":
+            self.index_factory = None
+        self.train_size = max(1, int(train_size))
+        self.nprobe = nprobe
+        self.ef_search = ef_search
+        self.max_dead_ratio = max(0.0, float(max_dead_ratio or 0))
+        self.exact_filter_rows = int(exact_filter_rows)
+        self.wal_max_bytes = int(wal_max_bytes)
+        self.filter_fields: Tuple[str, ...] = tuple(filter_fields or ())
+        self.refresh_interval = float(refresh_interval or 0)
+        self.quantizer = (quantizer or "").strip().lower() or None
+        if self.quantizer is not None and self.quantizer not in _QUANTIZERS:
+            raise BackendError(f"FAISS quantizer must be 'sq8' or 'fp16', got {quantizer!r}.")
+        self.rescore_factor = max(1, int(rescore_factor))
+        self.omp_threads = int(omp_threads) if omp_threads else None
+        if self.omp_threads is not None:
+            import faiss
+
+            faiss.omp_set_num_threads(max(1, self.omp_threads))
         self.index = None
-        self._ids: List[str] = []
-        self._metas: List[Dict[str, Any]] = []
-        self._embeddings: List[List[float]] = []
+        self._dim: Optional[int] = None
+        # np.ndarray (capacity, dim) float32; при quantizer / rescore_factor —
+        # np.memmap на временном файле: полные векторы читаются только для
+        # пересчёта кандидатов и не занимают анонимную память процесса.
+        self._vectors: Any = None
+        # По слотам: doc id / metadata, None — слот свободен.
+        self._ids: Any = []  # List[Optional[str]]
+        self._metas: Any = []  # List[Optional[Dict[str, Any]]]
+        self._slots: Optional[Dict[str, int]] = {}
+        self._free: List[int] = []
+        # ANN-состояние: _index_kind — "flat" | "ivf" | "hnsw" | "other".
+        self._index_kind = "flat"
+        self._untrained: Any = None
+        self._next_train_at = self.train_size
+        self._dead: Set[int] = set()
+        # {поле: {значение: битмап слотов (np.packbits, little)}}; None — ещё
+        # не построены (снапшот без postings или с другими filter_fields).
+        self._postings: Optional[Dict[str, Dict[Any, Any]]] = {}
+        # Снапшот, отображённый в память: _ids — ndarray ("" — пустой слот),
+        # _metas — SnapshotMetadata, _slots — None (id → слот через SQLite).
+        self._mapped: Optional[str] = None
+        self._mapped_live: Any = None
+        # Хвост лога чужих записей поверх отображённого снапшота.
+        self._overlay: Optional[WalOverlay] = None
+        # Снапшот на диске, поверх которого построено состояние в памяти, и
+        # сколько байт его лога уже применено.
+        self._snapshot: Optional[str] = None
+        self._wal_offset = 0
+        self._compactor: Optional[threading.Thread] = None
+        self._refresher: Optional[threading.Thread] = None
+        self._next_refresh_check = time.monotonic() + self.refresh_interval
+        self._seen_wal_size = 0
+        # _lock сериализует писателей, _rw — поиск против применения изменений.
         self._lock = threading.Lock()
+        self._rw = _ReadWriteLock()
         if self.persist_path:
             self._load()
 
-    # ------------------------------------------------------------- persistence
-
-    def _load(self) -> None:
-        path = self.persist_path
-        if not path or not os.path.exists(path):
-            return
-        try:
-            with open(path, "rb") as handle:
-                payload = pickle.load(handle)
-            self._ids = list(payload.get("ids") or [])
-            self._metas = list(payload.get("metas") or [])
-            self._embeddings = list(payload.get("embeddings") or [])
-            if self._embeddings:
-                self._ensure_index(len(self._embeddings[0]))
-                self._rebuild_index_locked()
-            log.info("FAISS: loaded %d documents from %s", len(self._ids), path)
-        except Exception as exc:  # noqa: BLE001
-            log.warning("FAISS: failed to load %s (%s); starting empty", path, exc)
-            self._ids = []
-            self._metas = []
-            self._embeddings = []
-            self.index = None
-
-    def _persist(self) -> None:
-        path = self.persist_path
-        if not path:
-            return
-        payload = {
-            "ids": self._ids,
-            "metas": self._metas,
-            "embeddings": self._embeddings,
-        }
-        directory = os.path.dirname(os.path.abspath(path))
-        os.makedirs(directory, exist_ok=True)
-        tmp_path = f"{path}.tmp"
-        with open(tmp_path, "wb") as handle:
-            pickle.dump(payload, handle)
-        os.replace(tmp_path, path)
-
     # ----------------------------------------------------------------- helpers
 
     def _ensure_index(self, dim: int):
         if self.index is not None:
+            if dim != self._dim:
+                raise BackendError(
+                    f"FAISS index dimension is {self._dim}, got vectors of dimension {dim}."
+                )
             return
         try:
             import faiss
         except Exception as exc:  # pragma: no cover - dependency error
             raise BackendError("faiss-cpu is not installed.") from exc
-        self.index = faiss.IndexFlatL2(dim)
+        self._dim = dim
+        self.index = self._flat_index(dim)
+        self._index_kind = "flat"
+        pending = self._build_pending_index(dim)
+        if pending is not None:
+            if pending[0].is_trained:
+                self.index, self._index_kind = pending
+            else:
+                # До train_size векторов — точный поиск, потом обучение.
+                self._untrained = pending
+                self._next_train_at = self.train_size
 
-    def _rebuild_index_locked(self) -> None:
-        """Пересоздать FAISS-индекс из текущих embeddings (вызывать под lock)."""
-        if not self._embeddings:
-            self.index = None
-            return
+    def _build_pending_index(self, dim: int) -> Optional[Tuple[Any, str]]:
+        """Целевой индекс вместо точного flat: ANN или сжатый flat."""
+        if self.index_factory:
+            return self._build_ann_index(dim)
+        if self.quantizer:
+            import faiss
+
+            qtype = getattr(faiss.ScalarQuantizer, _QUANTIZERS[self.quantizer])
+            metric = faiss.METRIC_L2 if self.metric == "l2" else faiss.METRIC_INNER_PRODUCT
+            # Позиция строки по-прежнему равна слоту — режим "flat".
+            return faiss.IndexScalarQuantizer(dim, qtype, metric), "flat"
+        return None
+
+    def _new_matrix(self, rows: int) -> Any:
+        import numpy as np
+
+        if not self.quantizer and self.rescore_factor <= 1:
+            return np.empty((rows, self._dim), dtype="float32")
+        directory = None
+        if self.persist_path and os.path.isdir(self.persist_path):
+            directory = self.persist_path
+        # Файл удаляется сразу после создания; место освобождается вместе с map.
+        with tempfile.TemporaryFile(prefix="vectors-", dir=directory) as handle:
+            return np.memmap(handle, dtype="float32", mode="w+", shape=(rows, self._dim))
+
+    def _flat_index(self, dim: int) -> Any:
+        import faiss
+
+        if self.metric == "l2":
+            return faiss.IndexFlatL2(dim)
+        return faiss.IndexFlatIP(dim)
+
+    def _normalized(self, matrix: Any) -> Any:
+        """Для ``cosine`` — строки единичной длины (нулевые остаются нулевыми)."""
+        if self.metric != "cosine":
+            return matrix
         import numpy as np
 
-        dim = len(self._embeddings[0])
+        norms = np.linalg.norm(matrix, axis=1, keepdims=True)
+        return np.ascontiguousarray(matrix / np.where(norms > 0, norms, 1.0), dtype="float32")
+
+    def _score(self, distance: float) -> Tuple[float, float]:
+        """``(score в [0, 1], vector_distance)``; distance — чем меньше, тем ближе."""
+        if self.metric == "l2":
+            return max(0.0, min(1.0, 1.0 / (1.0 + distance))), distance
+        # FAISS возвращает сходство; distance — как у Chroma (1 - сходство).
+        return max(0.0, min(1.0, distance)), 1.0 - distance
+
+    def _build_ann_index(self, dim: int) -> Tuple[Any, str]:
+        import faiss
+
+        metric = faiss.METRIC_L2 if self.metric == "l2" else faiss.METRIC_INNER_PRODUCT
+        try:
+            base = faiss.index_factory(dim, self.index_factory, metric)
+        except RuntimeError as exc:
+            raise BackendError(
+                f"Invalid FAISS index_factory {self.index_factory!r}: {exc}"
+            ) from exc
+        ivf = faiss.try_extract_index_ivf(base)
+        if ivf is not None:
+            if self.nprobe:
+                ivf.nprobe = int(self.nprobe)
+            # IVF сам хранит внешние id — IndexIDMap не нужен.
+            return base, "ivf"
+        hnsw = getattr(faiss.downcast_index(base), "hnsw", None)
+        if hnsw is not None and self.ef_search:
+            hnsw.efSearch = int(self.ef_search)
+        return faiss.IndexIDMap(base), "hnsw" if hnsw is not None else "other"
+
+    @property
+    def _is_ann(self) -> bool:
+        return self._index_kind != "flat"
+
+    def _live_count(self) -> int:
+        if self._slots is not None:
+            return len(self._slots)
+        return len(self._live_slots()) + len(self._overlay or ())
+
+    def _live_slots(self) -> Sequence[int]:
+        """Живые слоты индекса (документы оверлея сюда не входят)."""
+        if self._slots is not None:
+            return list(self._slots.values())
+        if self._mapped_live is None:
+            import numpy as np
+
+            live = self._ids != ""
+            if self._overlay is not None:
+                live &= ~self._overlay.tombstones
+            self._mapped_live = np.flatnonzero(live).tolist()
+        return self._mapped_live
+
+    def _doc_id(self, slot: int) -> Optional[str]:
+        if self._overlay is not None and self._overlay.tombstones[slot]:
+            return None
+        doc_id = self._ids[slot]
+        return str(doc_id) if doc_id else None
+
+    def _slot_of(self, doc_ids: Iterable[str]) -> Dict[str, int]:
+        if self._slots is None:
+            found = self._metas.slots_of(list(doc_ids))
+            if self._overlay is None:
+                return found
+            return {d: slot for d, slot in found.items() if not self._overlay.tombstones[slot]}
+        return {doc_id: self._slots[doc_id] for doc_id in doc_ids if doc_id in self._slots}
+
+    def _hit_metadata(self, slot: int) -> Dict[str, Any]:
+        if self._mapped is not None:
+            return self._metas.hit(slot)
+        return self._metas[slot]
+
+    def _reset_locked(self) -> None:
+        if isinstance(self._metas, SnapshotMetadata):
+            self._metas.close()
         self.index = None
-        self._ensure_index(dim)
-        if self.index is None:  # pragma: no cover - _ensure_index raises otherwise
-            raise BackendError("FAISS index was not initialized.")
-        self.index.add(np.array(self._embeddings, dtype="float32"))
+        self._dim = None
+        self._vectors = None
+        self._ids = []
+        self._metas = []
+        self._slots = {}
+        self._free = []
+        self._index_kind = "flat"
+        self._untrained = None
+        self._next_train_at = self.train_size
+        self._dead = set()
+        self._postings = {}
+        self._mapped = None
+        self._mapped_live = None
+        self._overlay = None
+
+    # ------------------------------------------------------------------- slots
+
+    def _allocate_slots_locked(self, count: int) -> List[int]:
+        """Слоты под ``count`` новых документов: сначала свободные, затем хвост
+        матрицы (ёмкость растёт удвоением — амортизированно O(1) на вставку)."""
+        import numpy as np
+
+        reused = [self._free.pop() for _ in range(min(count, len(self._free)))]
+        start = len(self._ids)
+        fresh = list(range(start, start + count - len(reused)))
+        if fresh:
+            needed = start + len(fresh)
+            capacity = 0 if self._vectors is None else self._vectors.shape[0]
+            if needed > capacity:
+                grown = self._new_matrix(max(needed, capacity * 2, 16))
+                if capacity:
+                    grown[:capacity] = self._vectors
+                self._vectors = grown
+            self._ids.extend([None] * len(fresh))
+            self._metas.extend([None] * len(fresh))
+        return reused + fresh
+
+    def _remove_indexed_locked(self, slots: List[int]) -> bool:
+        """``remove_ids`` в ANN-индексе; False — индекс его не поддерживает."""
+        import numpy as np
+
+        try:
+            self.index.remove_ids(np.asarray(slots, dtype="int64"))
+        except RuntimeError:
+            return False
+        return True
+
+    def _release_slots_locked(self, slots: List[int]) -> None:
+        for slot in slots:
+            self._unindex_slot_locked(slot)
+            self._ids[slot] = None
+            self._metas[slot] = None
+        if self._is_ann and not self._remove_indexed_locked(slots):
+            self._dead.update(slots)
+        else:
+            # Во flat-индексе строка остаётся до переиспользования слота.
+            self._free.extend(slots)
+
+    def _insert_locked(
+        self,
+        ids: Sequence[str],
+        metas: Sequence[Dict[str, Any]],
+        vectors: Any,
+    ) -> None:
+        """Upsert уникальных ``ids``: существующие остаются в своих слотах.
+
+        Вызывается под ``_rw.write()``; обучение отложенного индекса —
+        отдельно, ``_maybe_train_locked``."""
+        import numpy as np
+
+        matrix = np.ascontiguousarray(vectors, dtype="float32")
+        if matrix.ndim != 2 or matrix.shape[0] != len(ids):
+            raise BackendError("FAISS: embeddings must be a list of equal-length vectors.")
+        matrix = self._normalized(matrix)
+        self._ensure_index(int(matrix.shape[1]))
+        if self._is_ann:
+            existing = [self._slots[doc_id] for doc_id in ids if doc_id in self._slots]
+            if existing and not self._remove_indexed_locked(existing):
+                # remove_ids не поддерживается: старые строки — мёртвые,
+                # документы получат новые слоты.
+                for slot in existing:
+                    self._unindex_slot_locked(slot)
+                    del self._slots[self._ids[slot]]
+                    self._ids[slot] = None
+                    self._metas[slot] = None
+                self._dead.update(existing)
+        n_existing = sum(1 for doc_id in ids if doc_id in self._slots)
+        new_slots = iter(self._allocate_slots_locked(len(ids) - n_existing))
+        slots = [
+            self._slots[doc_id] if doc_id in self._slots else next(new_slots) for doc_id in ids
+        ]
+        slot_array = np.asarray(slots, dtype="int64")
+        self._vectors[slot_array] = matrix
+        for doc_id, meta, slot in zip(ids, metas, slots):
+            self._unindex_slot_locked(slot)
+            self._ids[slot] = doc_id
+            self._metas[slot] = meta
+            self._slots[doc_id] = slot
+            self._index_slot_locked(slot, meta)
+        if self._is_ann:
+            self.index.add_with_ids(matrix, slot_array)
+            return
+        n_indexed = int(self.index.ntotal)
+        in_place = slot_array[slot_array < n_indexed]
+        if in_place.size:
+            self._overwrite_rows_locked(in_place)
+        if len(self._ids) > n_indexed:
+            # Новые слоты всегда в хвосте: позиция в индексе совпадает со слотом.
+            self.index.add(self._vectors[n_indexed : len(self._ids)])
+
+    def _overwrite_rows_locked(self, rows: Any) -> None:
+        """Перезаписать строки flat-индекса на месте из ``_vectors``: float32
+        в ``IndexFlat``, коды ``sa_encode`` в ``IndexScalarQuantizer``."""
+        import faiss
+        import numpy as np
+
+        n_indexed = int(self.index.ntotal)
+        if hasattr(self.index, "get_xb"):
+            view = faiss.rev_swig_ptr(self.index.get_xb(), n_indexed * self._dim)
+            view.reshape(n_indexed, self._dim)[rows] = self._vectors[rows]
+            return
+        code_size = int(self.index.code_size)
+        view = faiss.rev_swig_ptr(self.index.codes.data(), n_indexed * code_size)
+        view.reshape(n_indexed, code_size)[rows] = self.index.sa_encode(
+            np.ascontiguousarray(self._vectors[rows])
+        )
+
+    def _maybe_train_locked(self) -> None:
+        if self._untrained is not None and len(self._slots) >= self._next_train_at:
+            self._train_locked()
+
+    def _train_locked(self) -> None:
+        """Обучить отложенный ANN-индекс на выборке и перенести в него все
+        живые слоты; при неудаче остаться на точном поиске.
+
+        Новый индекс не виден читателям, поэтому обучение и заполнение идут
+        параллельно с поиском по flat-индексу; эксклюзивно — только подмена."""
+        import numpy as np
+
+        index, kind = self._untrained
+        live = np.asarray(sorted(self._slots.values()), dtype="int64")
+        sample = live
+        if len(live) > self.train_size:
+            rng = np.random.default_rng(0)
+            sample = np.sort(rng.choice(live, self.train_size, replace=False))
+        try:
+            index.train(self._vectors[sample])
+        except RuntimeError as exc:
+            self._next_train_at = max(self._next_train_at, len(live)) * 2
+            log.warning(
+                "FAISS: training %r on %d vectors failed (%s); exact search until %d documents",
+                self.index_factory or self.quantizer,
+                len(sample),
+                exc,
+                self._next_train_at,
+            )
+            return
+        if kind == "flat":
+            # Сжатый flat: все строки по позициям, свободные слоты тоже.
+            index.add(self._vectors[: len(self._ids)])
+            with self._rw.write():
+                self.index, self._untrained = index, None
+        else:
+            index.add_with_ids(self._vectors[live], live)
+            free = [slot for slot, doc_id in enumerate(self._ids) if doc_id is None]
+            with self._rw.write():
+                self.index, self._index_kind, self._untrained = index, kind, None
+                self._free = free
+        log.info(
+            "FAISS: trained %r on %d vectors, %d documents indexed",
+            self.index_factory or self.quantizer,
+            len(sample),
+            len(live),
+        )
 
     # ------------------------------------------------------------------ CRUD
 
@@ -113,117 +595,406 @@ class FaissBackend(BaseVectorStore):
         for idx, doc in enumerate(docs):
             last_index[doc.id] = idx
         docs = [doc for idx, doc in enumerate(docs) if last_index[doc.id] == idx]
-        with self._lock:
-            # Upsert-семантика: документы с существующими id сначала удаляются,
-            # иначе повторная индексация создавала бы дубликаты.
-            incoming = {doc.id for doc in docs}
-            removed = bool(incoming) and bool(incoming.intersection(self._ids))
-            if removed:
-                remaining = [
-                    (doc_id, meta, embedding)
-                    for doc_id, meta, embedding in zip(self._ids, self._metas, self._embeddings)
-                    if doc_id not in incoming
-                ]
-                self._ids = [item[0] for item in remaining]
-                self._metas = [item[1] for item in remaining]
-                self._embeddings = [item[2] for item in remaining]
-            self._ids.extend([doc.id for doc in docs])
-            self._metas.extend([doc.metadata for doc in docs])
-            self._embeddings.extend([doc.embedding for doc in docs])
-            import numpy as np
-
-            new_vectors = np.array([doc.embedding for doc in docs], dtype="float32")
-            if removed or self.index is None:
-                # После удаления позиции в плоском индексе съехали — пересборка.
-                self._rebuild_index_locked()
-            else:
-                self.index.add(new_vectors)
-            self._persist()
+        ids = [doc.id for doc in docs]
+        metas = [doc.metadata for doc in docs]
+        with self._lock, self._file_lock():
+            self._sync_locked()
+            self._materialize_locked()
+            with self._rw.write():
+                # Upsert-семантика: повторно индексируемый id заменяет свой
+                # слот, а не дублируется.
+                self._insert_locked(ids, metas, [doc.embedding for doc in docs])
+            self._maybe_train_locked()
+            slots = [self._slots[doc_id] for doc_id in ids]
+            self._log_locked({"op": "upsert", "ids": ids, "metas": metas}, self._vectors[slots])
+            self._maybe_compact_slots()
 
     def search(
         self,
         query_vector: List[float],
         limit: int,
         filters: Optional[Dict[str, Any]] = None,
+        *,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
     ) -> List[SearchResult]:
-        with self._lock:
-            if self.index is None or not self._ids:
-                return []
+        return self.search_batch(
+            [query_vector], limit=limit, filters=filters, nprobe=nprobe, ef_search=ef_search
+        )[0]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+        *,
+        nprobe: Optional[int] = None,
+        ef_search: Optional[int] = None,
+    ) -> List[List[SearchResult]]:
+        """Все запросы — одной матрицей в ``index.search`` (BLAS вместо цикла).
+
+        ``nprobe`` / ``ef_search`` переопределяют параметры IVF / HNSW на этот
+        вызов; точный flat-индекс их игнорирует.
+        """
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        self._maybe_refresh()
+        with self._rw.read():
+            if self.index is None or not self._live_count():
+                return [[] for _ in vectors]
             import numpy as np
 
-            query = np.array([query_vector], dtype="float32")
-            # При фильтрах over-fetch: FAISS не умеет where-условия.
-            # Если после первого прохода не набрали limit — полный scan.
-            n_total = len(self._ids)
-            if not filters:
-                fetch_plan = [limit]
+            queries = self._normalized(np.array(vectors, dtype="float32"))
+            filters, exclude = split_exclude_ids(filters)
+            out = self._search_index_locked(
+                queries, limit, filters, exclude, nprobe=nprobe, ef_search=ef_search
+            )
+            if self._overlay is not None:
+                self._merge_overlay_locked(out, queries, limit, filters or {}, exclude)
+            return out
+
+    def _search_index_locked(
+        self,
+        queries: Any,
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+        exclude: FrozenSet[str],
+        *,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ) -> List[List[SearchResult]]:
+        """Поиск по индексу (у отображённого снапшота — без оверлея)."""
+        if not self.index.ntotal:
+            return [[] for _ in queries]
+        constrained = bool(filters) or bool(exclude)
+        rows: Any = None
+        if constrained:
+            rows = self._matching_slots_locked(filters or {}, exclude)
+            if not rows.size:
+                return [[] for _ in queries]
+            if self._is_ann and len(rows) <= self.exact_filter_rows:
+                return self._exact_search_locked(queries, rows, limit)
+        params = self._search_params(
+            rows, n_slots=len(self._ids), nprobe=nprobe, ef_search=ef_search
+        )
+        if rows is not None and params is not None:
+            # Поиск только среди подходящих строк: точный top-k без over-fetch.
+            return self._collect_locked(
+                queries,
+                fetch=min(limit, len(rows)),
+                limit=limit,
+                filters=None,
+                params=params[0],
+            )
+        # Без IDSelector (старый faiss, PQ) при фильтрах over-fetch;
+        # свободные и мёртвые слоты остаются строками индекса — запас и на них.
+        # Запросы, не набравшие limit после первого прохода, — полный scan.
+        n_total = int(self.index.ntotal)
+        stale = len(self._dead) if self._is_ann else len(self._free)
+        if self._overlay is not None:
+            stale += self._overlay.n_tombstones
+        if filters:
+            fetch = min(n_total, max(limit * 10, limit) + stale)
+        else:
+            fetch = min(n_total, limit + len(exclude) + stale)
+        search_params = params[0] if params is not None else None
+        out = self._collect_locked(
+            queries,
+            fetch=fetch,
+            limit=limit,
+            filters=filters,
+            params=search_params,
+            exclude=exclude,
+        )
+        if (constrained or stale) and fetch < n_total:
+            pending = [row for row, hits in enumerate(out) if len(hits) < limit]
+            if pending:
+                retry = self._collect_locked(
+                    queries[pending],
+                    fetch=n_total,
+                    limit=limit,
+                    filters=filters,
+                    params=search_params,
+                    exclude=exclude,
+                )
+                for row, hits in zip(pending, retry):
+                    out[row] = hits
+        return out
+
+    def _merge_overlay_locked(
+        self,
+        out: List[List[SearchResult]],
+        queries: Any,
+        limit: int,
+        filters: Dict[str, Any],
+        exclude: FrozenSet[str],
+    ) -> None:
+        """Добавить к хитам снапшота документы оверлея (по месту) и оставить
+        ``limit`` ближайших по ``vector_distance``."""
+        tail = self._overlay.search(queries, limit, filters, exclude, self.metric)
+        for results, extra in zip(out, tail):
+            if not extra:
+                continue
+            for raw, doc_id, meta in extra:
+                metadata = dict(meta)
+                score, metadata["vector_distance"] = self._score(raw)
+                results.append(SearchResult(id=doc_id, score=score, metadata=metadata))
+            results.sort(key=lambda hit: hit.metadata["vector_distance"])
+            del results[limit:]
+
+    def _search_params(
+        self,
+        rows: Any,
+        *,
+        n_slots: int,
+        nprobe: Optional[int],
+        ef_search: Optional[int],
+    ) -> Optional[Tuple[Any, Any]]:
+        """``SearchParameters`` с ``IDSelectorBitmap`` по слотам (faiss >= 1.7.3;
+        ``IDSelectorBatch`` на версиях без битмапа) и/или ``nprobe`` /
+        ``efSearch``; второй элемент держит ссылки на selector и его буфер.
+        ``None`` — параметры не нужны или не поддерживаются."""
+        try:
+            import faiss
+            import numpy as np
+
+            kwargs: Dict[str, Any] = {}
+            selector = None
+            # IndexPQ и прочие «other» отвергают любые SearchParameters.
+            if rows is not None and self._index_kind != "other":
+                if hasattr(faiss, "IDSelectorBitmap"):
+                    mask = np.zeros(n_slots, dtype=bool)
+                    mask[rows] = True
+                    bitmap = np.packbits(mask, bitorder="little")
+                    selector = (faiss.IDSelectorBitmap(bitmap), bitmap)
+                else:
+                    selector = (faiss.IDSelectorBatch(np.asarray(rows, dtype="int64")), None)
+                kwargs["sel"] = selector[0]
+            if self._index_kind == "ivf" and nprobe:
+                return faiss.SearchParametersIVF(nprobe=int(nprobe), **kwargs), selector
+            if self._index_kind == "hnsw" and ef_search:
+                return faiss.SearchParametersHNSW(efSearch=int(ef_search), **kwargs), selector
+            if selector is None:
+                return None
+            return faiss.SearchParameters(**kwargs), selector
+        except (ImportError, AttributeError, TypeError):
+            return None
+
+    def _exact_search_locked(
+        self, queries: Any, rows: List[int], limit: int
+    ) -> List[List[SearchResult]]:
+        """Точный top-k по подмножеству слотов (узкий фильтр в ANN-режиме)."""
+        import faiss
+        import numpy as np
+
+        row_array = np.asarray(rows, dtype="int64")
+        subset = self._flat_index(self._dim)
+        subset.add(self._vectors[row_array])
+        distances, positions = subset.search(queries, min(limit, len(rows)))
+        labels = np.where(positions >= 0, row_array[positions], -1)
+        return self._to_results_locked(distances, labels, limit=limit)
+
+    def _collect_locked(
+        self,
+        queries: Any,
+        *,
+        fetch: int,
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+        params: Any = None,
+        exclude: FrozenSet[str] = frozenset(),
+    ) -> List[List[SearchResult]]:
+        rescore = self._rescores
+        if rescore:
+            fetch = min(int(self.index.ntotal), fetch * self.rescore_factor)
+        if params is not None:
+            distances, indices = self.index.search(queries, fetch, params=params)
+        elif self._index_kind == "flat" and not self.quantizer and (
+            len(queries) >= _MATMUL_MIN_QUERIES
+        ):
+            distances, indices = self._matmul_search_locked(queries, fetch)
+        else:
+            distances, indices = self.index.search(queries, fetch)
+        if rescore:
+            distances, indices = self._rescore_locked(queries, indices)
+        return self._to_results_locked(
+            distances, indices, limit=limit, filters=filters, exclude=exclude
+        )
+
+    def _matmul_search_locked(self, queries: Any, k: int) -> Tuple[Any, Any]:
+        """Точный top-k батча одним умножением матриц (BLAS) по ``_vectors``.
+
+        Flat-поиск faiss ≥ 1.8 уходит в BLAS только по глобальному
+        ``distance_compute_blas_threshold``, который одинаково действует и на
+        одиночные запросы; батч (``search_batch``, микробатчер) считается здесь
+        в ~3 раза быстрее поочерёдного скана. Результат — как у
+        ``index.search``: расстояния (L2²) или сходства (IP) по убыванию
+        близости и слоты.
+        """
+        import numpy as np
+
+        n = int(self.index.ntotal)
+        base = self._vectors[:n]
+        k = min(k, n)
+        norms = np.einsum("ij,ij->i", base, base) if self.metric == "l2" else None
+        # Не больше ~16M элементов матрицы расстояний за раз.
+        step = max(1, (1 << 24) // max(1, n))
+        all_distances, all_indices = [], []
+        for start in range(0, len(queries), step):
+            chunk = queries[start : start + step]
+            scores = chunk @ base.T
+            if norms is not None:
+                scores *= -2.0
+                scores += norms[None, :]
+                scores += np.einsum("ij,ij->i", chunk, chunk)[:, None]
+                np.maximum(scores, 0.0, out=scores)
+                keys = scores
+            else:
+                keys = -scores
+            if k < n:
+                top = np.argpartition(keys, k - 1, axis=1)[:, :k]
             else:
-                first = min(n_total, max(limit * 10, limit))
-                fetch_plan = [first]
-                if first < n_total:
-                    fetch_plan.append(n_total)
+                top = np.broadcast_to(np.arange(n), keys.shape)
+            order = np.argsort(np.take_along_axis(keys, top, 1), axis=1, kind="stable")
+            indices = np.take_along_axis(top, order, 1)
+            all_distances.append(np.take_along_axis(scores, indices, 1))
+            all_indices.append(indices.astype("int64"))
+        return np.concatenate(all_distances), np.concatenate(all_indices)
+
+    @property
+    def _rescores(self) -> bool:
+        """Пересчитывать ли кандидатов: индекс сжатый или приближённый."""
+        if self.rescore_factor <= 1:
+            return False
+        return self._is_ann or not hasattr(self.index, "get_xb")
 
+    def _rescore_locked(self, queries: Any, indices: Any) -> Tuple[Any, Any]:
+        """Точные расстояния до кандидатов по ``_vectors`` и пересортировка
+        (для IP — сходство по убыванию, как отдаёт FAISS)."""
+        import numpy as np
+
+        valid = (indices >= 0) & (indices < len(self._ids))
+        rows = np.where(valid, indices, 0)
+        candidates = self._vectors[rows.ravel()].reshape(*rows.shape, self._dim)
+        if self.metric == "l2":
+            exact = ((candidates - queries[:, None, :]) ** 2).sum(axis=2)
+            exact[~valid] = np.inf
+            order = np.argsort(exact, axis=1, kind="stable")
+        else:
+            exact = np.einsum("qkd,qd->qk", candidates, queries)
+            exact[~valid] = -np.inf
+            order = np.argsort(-exact, axis=1, kind="stable")
+        labels = np.where(valid, indices, -1)
+        return np.take_along_axis(exact, order, 1), np.take_along_axis(labels, order, 1)
+
+    def _to_results_locked(
+        self,
+        distances: Any,
+        indices: Any,
+        *,
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+        exclude: FrozenSet[str] = frozenset(),
+    ) -> List[List[SearchResult]]:
+        n_slots = len(self._ids)
+        out: List[List[SearchResult]] = []
+        for row_indices, row_distances in zip(indices, distances):
             results: List[SearchResult] = []
-            for fetch in fetch_plan:
-                distances, indices = self.index.search(query, fetch)
-                results = []
-                for idx, dist in zip(indices[0], distances[0]):
-                    if idx < 0 or idx >= n_total:
-                        continue
-                    metadata = dict(self._metas[idx])
-                    if filters and not self._match_filters(metadata, filters):
-                        continue
-                    fdist = float(dist)
-                    metadata["vector_distance"] = fdist
-                    results.append(
-                        SearchResult(
-                            id=self._ids[idx],
-                            score=max(0.0, min(1.0, 1.0 / (1.0 + fdist))),
-                            metadata=metadata,
-                        )
-                    )
-                    if len(results) >= limit:
-                        return results
-                if len(results) >= limit or fetch >= n_total:
+            for idx, dist in zip(row_indices, row_distances):
+                if idx < 0 or idx >= n_slots:
+                    continue
+                doc_id = self._doc_id(idx)
+                if doc_id is None or doc_id in exclude:
+                    continue
+                if filters and not self._match_filters(self._metas[idx], filters):
+                    continue
+                metadata = dict(self._hit_metadata(idx))
+                score, metadata["vector_distance"] = self._score(float(dist))
+                results.append(SearchResult(id=doc_id, score=score, metadata=metadata))
+                if len(results) >= limit:
                     break
-            return results
+            out.append(results)
+        return out
+
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        wanted = set(doc_ids)
+        if not wanted:
+            return {}
+        self._maybe_refresh()
+        with self._rw.read():
+            found = {
+                doc_id: [float(v) for v in self._vectors[slot]]
+                for doc_id, slot in self._slot_of(wanted).items()
+            }
+            if self._overlay is not None:
+                rows = self._overlay.rows
+                found.update(
+                    (doc_id, [float(v) for v in self._overlay.vectors[rows[doc_id]]])
+                    for doc_id in wanted & rows.keys()
+                )
+            return found
 
     def delete(self, doc_ids: Iterable[str]) -> None:
-        ids = set(doc_ids)
-        if not ids:
+        wanted = set(doc_ids)
+        if not wanted:
             return
-        with self._lock:
-            remaining = [
-                (doc_id, meta, embedding)
-                for doc_id, meta, embedding in zip(self._ids, self._metas, self._embeddings)
-                if doc_id not in ids
-            ]
-            if len(remaining) == len(self._ids):
-                return
-            self._ids = [item[0] for item in remaining]
-            self._metas = [item[1] for item in remaining]
-            self._embeddings = [item[2] for item in remaining]
-            self._rebuild_index_locked()
-            self._persist()
+        with self._lock, self._file_lock():
+            self._sync_locked()
+            self._materialize_locked()
+            with self._rw.write():
+                removed = self._delete_locked(wanted)
+            if removed:
+                self._log_locked({"op": "delete", "ids": removed})
+            self._maybe_compact_slots()
+
+    def _delete_locked(self, doc_ids: Iterable[str]) -> List[str]:
+        removed = [doc_id for doc_id in doc_ids if doc_id in self._slots]
+        if removed:
+            self._release_slots_locked([self._slots.pop(doc_id) for doc_id in removed])
+        return removed
 
     def clear_collection(self) -> None:
-        with self._lock:
-            self.index = None
-            self._ids = []
-            self._metas = []
-            self._embeddings = []
-            self._persist()
+        with self._lock, self._file_lock():
+            with self._rw.write():
+                self._reset_locked()
+            self._write_snapshot_locked()
 
     def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
-        with self._lock:
-            if not self._metas:
-                return 0
+        self._maybe_refresh()
+        with self._rw.read():
             if filters is None:
-                return len(self._metas)
-            return sum(1 for m in self._metas if self._match_filters(m, filters))
+                return self._live_count()
+            filters, _ = split_exclude_ids(filters)
+            count = len(self._matching_slots_locked(filters or {}, frozenset()))
+            if self._overlay is not None:
+                count += len(self._overlay.matching_rows(filters or {}, frozenset()))
+            return count
+
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        """Popcount битмапов postings ``model`` — без выборки слотов."""
+        labels = list(models)
+        import numpy as np
+
+        self._maybe_refresh()
+        with self._rw.read():
+            postings = self._postings if "model" in self.filter_fields else None
+            if postings is not None:
+                by_value = postings.get("model", {})
+                n_bytes = (len(self._ids) + 7) // 8
+                out: Dict[str, int] = {}
+                for label in labels:
+                    bitmap = by_value.get(label)
+                    out[label] = (
+                        0 if bitmap is None else int(np.unpackbits(bitmap[:n_bytes]).sum())
+                    )
+                if self._overlay is not None:
+                    for row in self._overlay.rows.values():
+                        label = (self._overlay.metas[row] or {}).get("model")
+                        if label in out:
+                            out[label] += 1
+                return out
+        return super().count_by_model(labels)  # postings ``model`` нет или ещё строятся
 
     def _match_filters(self, metadata: Dict[str, Any], filters: Dict[str, Any]) -> bool:
-        for key, value in filters.items():
-            if metadata.get(key) != value:
-                return False
-        return True
+        return matches_filters(metadata, filters)
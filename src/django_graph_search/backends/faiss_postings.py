@@ -0,0 +1,132 @@
+"""
+Инвертированные postings ``FaissBackend`` по ``filter_fields``.
+
+Для каждого значения поля — битмап слотов (``np.packbits``, little):
+фильтр по этим полям собирается из битмапов без проверки metadata в Python.
+"""
+from __future__ import annotations
+
+from typing import Any, Dict, FrozenSet, List, Optional, Tuple
+
+from .base import MEMBERSHIP_TYPES
+
+# Значения metadata, по которым строятся postings (хешируемые и переживают JSON).
+_POSTING_TYPES = (str, int, float, bool, type(None))
+
+
+class FaissPostingsMixin:
+    """Postings слотов для :class:`~django_graph_search.backends.faiss.FaissBackend`."""
+
+    def _build_postings_locked(self) -> None:
+        """Построить postings по живым слотам, если их не было в снапшоте.
+
+        Только писатель под ``_lock`` (загрузка и обновление снапшота, запись
+        нового): O(слотов) проход идёт рядом, поиск тем временем проверяет
+        фильтр по metadata; готовые postings публикуются под ``_rw.write()``.
+        """
+        if self._postings is not None:
+            return
+        postings: Dict[str, Dict[Any, Any]] = {field: {} for field in self.filter_fields}
+        for slot in self._live_slots():
+            self._set_posting_bits(postings, int(slot), self._metas[slot], True)
+        with self._rw.write():
+            self._postings = postings
+
+    def _index_slot_locked(self, slot: int, meta: Optional[Dict[str, Any]]) -> None:
+        if self._postings is not None:
+            self._set_posting_bits(self._postings, slot, meta, True)
+
+    def _unindex_slot_locked(self, slot: int) -> None:
+        if self._postings is not None:
+            self._set_posting_bits(self._postings, slot, self._metas[slot], False)
+
+    def _clear_posting_bits_locked(self, slots: List[int]) -> None:
+        """Снять биты ``slots`` во всех битмапах — без metadata слотов."""
+        if self._postings is None or not slots:
+            return
+        import numpy as np
+
+        slot_array = np.asarray(slots, dtype="int64")
+        byte = slot_array >> 3
+        keep = ~(np.left_shift(1, slot_array & 7).astype("uint8"))
+        for by_value in self._postings.values():
+            for bitmap in by_value.values():
+                inside = byte < len(bitmap)
+                np.bitwise_and.at(bitmap, byte[inside], keep[inside])
+
+    def _set_posting_bits(
+        self,
+        postings: Dict[str, Dict[Any, Any]],
+        slot: int,
+        meta: Optional[Dict[str, Any]],
+        on: bool,
+    ) -> None:
+        if meta is None:
+            return
+        import numpy as np
+
+        byte, bit = slot >> 3, np.uint8(1 << (slot & 7))
+        for field in self.filter_fields:
+            value = meta.get(field)
+            if not isinstance(value, _POSTING_TYPES):
+                continue
+            by_value = postings.setdefault(field, {})
+            bitmap = by_value.get(value)
+            if not on:
+                if bitmap is not None and byte < len(bitmap):
+                    bitmap[byte] &= ~bit
+                continue
+            if bitmap is None or byte >= len(bitmap):
+                # Рост удвоением, как у матрицы векторов.
+                size = 0 if bitmap is None else len(bitmap)
+                grown = np.zeros(max(byte + 1, 2 * size, 16), dtype="uint8")
+                if bitmap is not None:
+                    grown[: len(bitmap)] = bitmap
+                bitmap = by_value[value] = grown
+            bitmap[byte] |= bit
+
+    def _matching_slots_locked(
+        self, filters: Dict[str, Any], exclude: FrozenSet[str]
+    ) -> Any:
+        """Отсортированный int64-массив живых слотов под фильтр.
+
+        Ключи из ``filter_fields`` — OR битмапов значений и AND между ключами
+        (O(слотов / 8) на NumPy); прочие ключи проверяются в Python только по
+        этим кандидатам. Пока postings не построены, все ключи — по metadata.
+        """
+        import numpy as np
+
+        indexed: Dict[str, Tuple[Any, ...]] = {}
+        residual: Dict[str, Any] = {}
+        for key, value in filters.items():
+            values = tuple(value) if isinstance(value, MEMBERSHIP_TYPES) else (value,)
+            if (
+                self._postings is not None
+                and key in self.filter_fields
+                and all(isinstance(v, _POSTING_TYPES) for v in values)
+            ):
+                indexed[key] = values
+            else:
+                residual[key] = value
+        n_slots = len(self._ids)
+        if indexed:
+            n_bytes = (n_slots + 7) // 8
+            selected: Any = None
+            for key, values in indexed.items():
+                union = np.zeros(n_bytes, dtype="uint8")
+                for value in values:
+                    bitmap = self._postings.get(key, {}).get(value)
+                    if bitmap is not None:
+                        head = bitmap[:n_bytes]
+                        union[: len(head)] |= head
+                selected = union if selected is None else selected & union
+            slots = np.flatnonzero(np.unpackbits(selected, count=n_slots, bitorder="little"))
+        else:
+            slots = np.asarray(self._live_slots(), dtype="int64")
+        if residual and len(slots):
+            keep = [self._match_filters(self._metas[slot], residual) for slot in slots]
+            slots = slots[np.asarray(keep, dtype=bool)]
+        if exclude and len(slots):
+            excluded = np.fromiter(self._slot_of(exclude).values(), dtype="int64")
+            slots = slots[~np.isin(slots, excluded)]
+        return np.sort(slots.astype("int64", copy=False))
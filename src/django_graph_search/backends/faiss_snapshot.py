@@ -0,0 +1,730 @@
+"""
+Снапшот и лог мутаций ``FaissBackend`` на диске.
+
+Снапшот — каталог ``persist_path/<snapshot>/`` (``index.faiss``,
+``vectors.npy``, ``ids.npy``, ``metadata.sqlite``, ``postings.npz``,
+``state.json``), на актуальный указывает ``persist_path/CURRENT``. Мутации
+дописываются в ``<snapshot>/wal.log`` и сворачиваются в новый снапшот.
+"""
+from __future__ import annotations
+
+import json
+import logging
+import os
+import pickle
+import shutil
+import sqlite3
+import struct
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from typing import (
+    Any,
+    BinaryIO,
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+)
+
+from .base import matches_filters
+
+try:
+    import fcntl
+except ImportError:  # pragma: no cover - Windows
+    fcntl = None
+
+log = logging.getLogger(__name__)
+
+# Файл-указатель на актуальный снапшот внутри persist_path.
+_CURRENT = "CURRENT"
+_SNAPSHOT_VERSION = 1
+# Лог мутаций внутри каталога снапшота. Запись: заголовок (magic, длина JSON,
+# длина векторов, crc32 тела), JSON ({"op": "upsert"|"delete", ...}) и
+# float32-векторы little-endian.
+_WAL = "wal.log"
+_WAL_MAGIC = b"DGSW"
+_WAL_HEADER = struct.Struct("<4sIII")
+
+
+def _read_wal(handle: BinaryIO) -> Iterator[Tuple[Dict[str, Any], bytes, int]]:
+    """Записи лога с текущей позиции: ``(record, vectors, end_offset)``.
+
+    Останавливается на оборванном или повреждённом хвосте (процесс упал
+    посреди записи) — такие записи не были подтверждены вызывающему.
+    """
+    while True:
+        header = handle.read(_WAL_HEADER.size)
+        if len(header) < _WAL_HEADER.size:
+            return
+        magic, record_len, vectors_len, crc = _WAL_HEADER.unpack(header)
+        if magic != _WAL_MAGIC:
+            return
+        body = handle.read(record_len + vectors_len)
+        if len(body) < record_len + vectors_len or zlib.crc32(body) != crc:
+            return
+        yield json.loads(body[:record_len]), body[record_len:], handle.tell()
+
+
+class SnapshotMetadata:
+    """Metadata слотов из ``metadata.sqlite`` снапшота (read-only).
+
+    Атрибуты для фильтров (всё, кроме ``text``) читаются одним запросом при
+    первом фильтрованном поиске; ``text`` — только для попавших в выдачу слотов.
+    """
+
+    def __init__(self, path: str, size: int) -> None:
+        self._conn = sqlite3.connect(f"file:{path}?mode=ro", uri=True, check_same_thread=False)
+        # Соединение делят конкурентные читатели.
+        self._conn_lock = threading.Lock()
+        self._size = size
+        self._attrs: Optional[List[Optional[Dict[str, Any]]]] = None
+
+    def __len__(self) -> int:
+        return self._size
+
+    def __getitem__(self, slot: int) -> Optional[Dict[str, Any]]:
+        if self._attrs is None:
+            attrs: List[Optional[Dict[str, Any]]] = [None] * self._size
+            with self._conn_lock:
+                rows = self._conn.execute("SELECT slot, attrs FROM metadata").fetchall()
+            for row_slot, raw in rows:
+                attrs[row_slot] = json.loads(raw)
+            self._attrs = attrs
+        return self._attrs[slot]
+
+    def hit(self, slot: int) -> Dict[str, Any]:
+        with self._conn_lock:
+            row = self._conn.execute(
+                "SELECT attrs, text FROM metadata WHERE slot = ?", (int(slot),)
+            ).fetchone()
+        if row is None:
+            return {}
+        meta = json.loads(row[0])
+        if row[1] is not None:
+            meta["text"] = row[1]
+        return meta
+
+    def slots_of(self, doc_ids: List[str]) -> Dict[str, int]:
+        out: Dict[str, int] = {}
+        # Лимит числа параметров SQLite — запрашиваем пачками.
+        for start in range(0, len(doc_ids), 500):
+            chunk = doc_ids[start : start + 500]
+            marks = ",".join("?" * len(chunk))
+            with self._conn_lock:
+                out.update(
+                    self._conn.execute(
+                        f"SELECT doc_id, slot FROM metadata WHERE doc_id IN ({marks})", chunk
+                    ).fetchall()
+                )
+        return out
+
+    def materialize(self) -> List[Optional[Dict[str, Any]]]:
+        metas: List[Optional[Dict[str, Any]]] = [None] * self._size
+        with self._conn_lock:
+            rows = self._conn.execute("SELECT slot, attrs, text FROM metadata").fetchall()
+        for slot, raw, text in rows:
+            meta = json.loads(raw)
+            if text is not None:
+                meta["text"] = text
+            metas[slot] = meta
+        return metas
+
+    def close(self) -> None:
+        with self._conn_lock:
+            self._conn.close()
+
+
+class WalOverlay:
+    """Хвост лога поверх отображённого снапшота у процесса, который только ищет.
+
+    Снапшот остаётся общим read-only mmap: слоты, которые хвост удалил или
+    перезаписал, скрыты маской ``tombstones``, а документы из upsert-ов хвоста
+    лежат в небольшой отдельной матрице и ищутся точно. Хвост ограничен
+    ``wal_max_bytes`` — после сжатия лога процесс отображает новый снапшот, а
+    оверлей выбрасывается.
+    """
+
+    def __init__(self, n_slots: int, dim: int) -> None:
+        import numpy as np
+
+        self.tombstones = np.zeros(n_slots, dtype=bool)
+        self.n_tombstones = 0
+        self.ids: List[Optional[str]] = []
+        self.metas: List[Optional[Dict[str, Any]]] = []
+        self.vectors = np.empty((16, dim), dtype="float32")
+        self.rows: Dict[str, int] = {}
+        self._free: List[int] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def hide(self, slots: Iterable[int]) -> List[int]:
+        """Скрыть слоты снапшота; возвращает те, что были видимы."""
+        hidden = [int(slot) for slot in slots if not self.tombstones[slot]]
+        self.tombstones[hidden] = True
+        self.n_tombstones += len(hidden)
+        return hidden
+
+    def upsert(self, ids: Sequence[str], metas: Sequence[Any], matrix: Any) -> None:
+        import numpy as np
+
+        for doc_id, meta, vector in zip(ids, metas, matrix):
+            row = self.rows.get(doc_id)
+            if row is None:
+                row = self._free.pop() if self._free else len(self.ids)
+                if row == len(self.ids):
+                    self.ids.append(None)
+                    self.metas.append(None)
+                if row >= self.vectors.shape[0]:
+                    grown = np.empty((2 * self.vectors.shape[0], self.vectors.shape[1]), "float32")
+                    grown[: len(self.vectors)] = self.vectors
+                    self.vectors = grown
+                self.rows[doc_id] = row
+            self.ids[row], self.metas[row] = doc_id, meta
+            self.vectors[row] = vector
+
+    def delete(self, doc_ids: Iterable[str]) -> None:
+        for doc_id in doc_ids:
+            row = self.rows.pop(doc_id, None)
+            if row is not None:
+                self.ids[row] = self.metas[row] = None
+                self._free.append(row)
+
+    def live(self) -> Tuple[List[str], List[Any], Any]:
+        """``(ids, metas, vectors)`` документов хвоста."""
+        rows = sorted(self.rows.values())
+        return [self.ids[row] for row in rows], [self.metas[row] for row in rows], (
+            self.vectors[rows]
+        )
+
+    def matching_rows(self, filters: Dict[str, Any], exclude: FrozenSet[str]) -> List[int]:
+        return [
+            row
+            for doc_id, row in self.rows.items()
+            if doc_id not in exclude and (not filters or matches_filters(self.metas[row], filters))
+        ]
+
+    def search(
+        self,
+        queries: Any,
+        limit: int,
+        filters: Dict[str, Any],
+        exclude: FrozenSet[str],
+        metric: str,
+    ) -> List[List[Tuple[float, str, Dict[str, Any]]]]:
+        """Точный top-``limit`` по документам хвоста: ``(distance, id, metadata)``;
+        distance — как у FAISS (L2² или сходство для ``ip``/``cosine``)."""
+        import numpy as np
+
+        rows = np.asarray(self.matching_rows(filters, exclude), dtype="int64")
+        if not rows.size:
+            return [[] for _ in range(len(queries))]
+        candidates = self.vectors[rows]
+        raw = queries @ candidates.T
+        if metric == "l2":
+            raw = (
+                np.einsum("ij,ij->i", queries, queries)[:, None]
+                - 2.0 * raw
+                + np.einsum("ij,ij->i", candidates, candidates)[None, :]
+            )
+            np.maximum(raw, 0.0, out=raw)
+            order = np.argsort(raw, axis=1, kind="stable")
+        else:
+            order = np.argsort(-raw, axis=1, kind="stable")
+        out = []
+        for q_raw, q_order in zip(raw, order[:, :limit]):
+            out.append(
+                [
+                    (float(q_raw[j]), self.ids[rows[j]], self.metas[rows[j]] or {})
+                    for j in q_order
+                ]
+            )
+        return out
+
+
+class FaissSnapshotMixin:
+    """Загрузка, лог мутаций, обновление из других процессов, сжатие лога и
+    мёртвых слотов для :class:`~django_graph_search.backends.faiss.FaissBackend`."""
+
+    def _load(self) -> None:
+        path = self.persist_path
+        if not path or not os.path.exists(path):
+            return
+        if os.path.isfile(path):
+            try:
+                self._migrate_pickle(path)
+            except Exception as exc:  # noqa: BLE001
+                log.warning("FAISS: failed to load %s (%s); starting empty", path, exc)
+                self._reset_locked()
+            return
+        with self._file_lock():
+            self._sync_locked()
+        if self._snapshot is not None:
+            log.info(
+                "FAISS: loaded %d documents from %s (%d log bytes replayed)",
+                self._live_count(),
+                self._snapshot,
+                self._wal_offset,
+            )
+
+    @contextmanager
+    def _file_lock(self) -> Iterator[None]:
+        """Межпроцессная блокировка записи (``flock``; без fcntl — только
+        внутрипроцессная через ``_lock``)."""
+        if not self.persist_path or fcntl is None:
+            yield
+            return
+        os.makedirs(self.persist_path, exist_ok=True)
+        with open(os.path.join(self.persist_path, "LOCK"), "ab") as handle:
+            fcntl.flock(handle, fcntl.LOCK_EX)
+            try:
+                yield
+            finally:
+                fcntl.flock(handle, fcntl.LOCK_UN)
+
+    def _sync_locked(self) -> None:
+        """Догнать диск: применить новые записи лога или, если ``CURRENT``
+        указывает на другой снапшот, перечитать его. Вызывается под
+        ``_file_lock``."""
+        if not self.persist_path:
+            return
+        current = self._current_snapshot(self.persist_path)
+        if current == self._snapshot:
+            self._replay_wal_locked()
+            return
+        if current is not None:
+            try:
+                self._load_snapshot_locked(current)
+                return
+            except Exception as exc:  # noqa: BLE001
+                # Следующая запись заменит битый снапшот новым.
+                log.warning("FAISS: failed to load %s (%s); starting empty", current, exc)
+        with self._rw.write():
+            self._reset_locked()
+            self._snapshot = None
+            self._wal_offset = 0
+
+    def _load_snapshot_locked(self, snapshot: str) -> None:
+        with open(os.path.join(snapshot, "state.json"), encoding="utf-8") as handle:
+            state = json.load(handle)
+        with self._rw.write():
+            self._reset_locked()
+            self._snapshot = snapshot
+            self._wal_offset = 0
+            if state.get("dim") is not None:
+                self._open_snapshot(snapshot, state)
+        # Снапшот без postings (другие filter_fields) — строим сразу при
+        # загрузке, не на пути поиска.
+        self._build_postings_locked()
+        # Другой тип индекса или метрика в настройках — пересобрать из векторов.
+        rebuild = state.get("dim") is not None and (
+            state.get("index_factory") != self.index_factory
+            or state.get("metric", "l2") != self.metric
+            or state.get("quantizer") != self.quantizer
+        )
+        if rebuild:
+            self._rebuild_from_mapped_locked()
+        self._replay_wal_locked()
+        if rebuild:
+            self._write_snapshot_locked()
+
+    def _replay_wal_locked(self) -> None:
+        """Применить записи лога после ``_wal_offset``: в память процесса или,
+        пока снапшот отображён, в :class:`WalOverlay` поверх него."""
+        if self._snapshot is None:
+            return
+        wal_path = os.path.join(self._snapshot, _WAL)
+        try:
+            if os.path.getsize(wal_path) <= self._wal_offset:
+                return
+        except FileNotFoundError:
+            return
+        import numpy as np
+
+        with open(wal_path, "rb") as handle:
+            handle.seek(self._wal_offset)
+            for record, payload, end in _read_wal(handle):
+                if self._mapped is not None:
+                    self._overlay_record_locked(record, payload)
+                elif record["op"] == "upsert":
+                    ids = record["ids"]
+                    vectors = np.frombuffer(payload, dtype="<f4").reshape(len(ids), -1)
+                    with self._rw.write():
+                        self._insert_locked(ids, record["metas"], vectors)
+                    self._maybe_train_locked()
+                elif record["op"] == "delete":
+                    with self._rw.write():
+                        self._delete_locked(record["ids"])
+                self._wal_offset = end
+
+    def _overlay_record_locked(self, record: Dict[str, Any], payload: bytes) -> None:
+        """Запись лога поверх отображённого снапшота — без копии снапшота в
+        память. Поиск SQLite идёт вне эксклюзивной секции."""
+        import numpy as np
+
+        ids = record["ids"]
+        hidden = self._metas.slots_of(ids).values()
+        with self._rw.write():
+            if self._overlay is None:
+                self._overlay = WalOverlay(len(self._ids), self._dim)
+            self._clear_posting_bits_locked(self._overlay.hide(hidden))
+            self._mapped_live = None
+            if record["op"] == "upsert":
+                vectors = np.frombuffer(payload, dtype="<f4").reshape(len(ids), -1)
+                self._overlay.upsert(ids, record["metas"], self._normalized(vectors))
+            elif record["op"] == "delete":
+                self._overlay.delete(ids)
+
+    def _log_locked(self, record: Dict[str, Any], vectors: Any = None) -> None:
+        """Дописать мутацию в лог и fsync; первая запись без снапшота
+        сохраняет состояние целиком."""
+        if not self.persist_path:
+            return
+        if self._snapshot is None:
+            self._write_snapshot_locked()
+            return
+        import numpy as np
+
+        body = json.dumps(record, ensure_ascii=False, default=str).encode("utf-8")
+        payload = b""
+        if vectors is not None:
+            payload = np.ascontiguousarray(vectors, dtype="<f4").tobytes()
+        data = body + payload
+        header = _WAL_HEADER.pack(_WAL_MAGIC, len(body), len(payload), zlib.crc32(data))
+        wal_path = os.path.join(self._snapshot, _WAL)
+        with open(wal_path, "ab") as handle:
+            if handle.tell() > self._wal_offset:
+                # Оборванный хвост упавшего писателя: _sync_locked его не применил.
+                handle.truncate(self._wal_offset)
+            handle.write(header + data)
+            handle.flush()
+            os.fsync(handle.fileno())
+        self._wal_offset += len(header) + len(data)
+        if self._wal_offset >= self.wal_max_bytes:
+            self._schedule_compaction()
+
+    def _schedule_compaction(self) -> None:
+        if self._compactor is not None and self._compactor.is_alive():
+            return
+        self._compactor = threading.Thread(
+            target=self._compact_in_background, name="faiss-compaction", daemon=True
+        )
+        self._compactor.start()
+
+    def _compact_in_background(self) -> None:
+        try:
+            self.compact()
+        except Exception as exc:  # noqa: BLE001
+            log.warning("FAISS: compaction of %s failed (%s)", self.persist_path, exc)
+
+    def _maybe_refresh(self) -> None:
+        """Дешёвая проверка (чтение ``CURRENT`` и stat лога) не чаще
+        ``refresh_interval``; при изменениях — фоновый ``refresh()``."""
+        if not self.persist_path or self.refresh_interval <= 0:
+            return
+        now = time.monotonic()
+        if now < self._next_refresh_check:
+            return
+        self._next_refresh_check = now + self.refresh_interval
+        if self._refresher is not None and self._refresher.is_alive():
+            return
+        current = self._current_snapshot(self.persist_path)
+        if current == self._snapshot:
+            if current is None:
+                return
+            try:
+                wal_size = os.path.getsize(os.path.join(current, _WAL))
+            except FileNotFoundError:
+                return
+            # Оборванный хвост не растёт — не дочитываем его каждую секунду.
+            if wal_size <= self._wal_offset or wal_size == self._seen_wal_size:
+                return
+            self._seen_wal_size = wal_size
+        self._refresher = threading.Thread(
+            target=self._refresh_in_background, name="faiss-refresh", daemon=True
+        )
+        self._refresher.start()
+
+    def _refresh_in_background(self) -> None:
+        try:
+            self.refresh()
+        except Exception as exc:  # noqa: BLE001
+            log.warning("FAISS: refresh from %s failed (%s)", self.persist_path, exc)
+
+    def refresh(self) -> None:
+        """Применить записи других процессов: хвост лога или новый снапшот."""
+        if not self.persist_path:
+            return
+        with self._lock, self._file_lock():
+            self._sync_locked()
+
+    def compact(self) -> None:
+        """Убрать мёртвые слоты ANN-индекса и свернуть лог мутаций в новый
+        снапшот."""
+        with self._lock, self._file_lock():
+            self._sync_locked()
+            reslotted = bool(self._dead)
+            if reslotted:
+                self._compact_slots_locked()
+            if not self.persist_path:
+                return
+            if not reslotted and self._snapshot is not None and not self._wal_offset:
+                return
+            self._write_snapshot_locked()
+
+    def slot_stats(self) -> Dict[str, int]:
+        """Счётчики слотов: живые документы, свободные (flat) и мёртвые (ANN
+        без ``remove_ids``) строки и всего строк в матрице и индексе."""
+        with self._rw.read():
+            return {
+                "live": self._live_count(),
+                "free": len(self._free),
+                "dead": len(self._dead),
+                "slots": len(self._ids),
+            }
+
+    def _maybe_compact_slots(self) -> None:
+        """Фоновый :meth:`compact`, когда мёртвых слотов больше
+        ``max_dead_ratio`` от живых."""
+        if self._dead and self.max_dead_ratio > 0 and (
+            len(self._dead) > self.max_dead_ratio * max(1, self._live_count())
+        ):
+            self._schedule_compaction()
+
+    def _compact_slots_locked(self) -> None:
+        """Перенести живые документы в слоты ``0..n-1`` нового ANN-индекса:
+        мёртвые строки уходят из индекса, матрицы векторов и postings.
+
+        Новое состояние строится рядом (поиск идёт по старому), эксклюзивно —
+        только подмена."""
+        import numpy as np
+
+        self._materialize_locked()
+        live = np.asarray(sorted(self._slots.values()), dtype="int64")
+        n_live = len(live)
+        vectors = self._new_matrix(max(n_live, 16))
+        vectors[:n_live] = self._vectors[live]
+        ids = [self._ids[slot] for slot in live]
+        metas = [self._metas[slot] for slot in live]
+        index, kind = self._build_ann_index(self._dim)
+        if n_live:
+            if not index.is_trained:
+                index.train(vectors[:n_live])
+            index.add_with_ids(vectors[:n_live], np.arange(n_live, dtype="int64"))
+        postings: Dict[str, Dict[Any, Any]] = {field: {} for field in self.filter_fields}
+        for slot, meta in enumerate(metas):
+            self._set_posting_bits(postings, slot, meta, True)
+        n_dead = len(self._dead)
+        with self._rw.write():
+            self.index, self._index_kind = index, kind
+            self._vectors, self._ids, self._metas = vectors, ids, metas
+            self._slots = {doc_id: slot for slot, doc_id in enumerate(ids)}
+            self._free, self._dead = [], set()
+            self._postings = postings
+        log.info("FAISS: dropped %d dead slots, %d documents re-indexed", n_dead, n_live)
+
+    def _migrate_pickle(self, path: str) -> None:
+        """Загрузить pickle-файл старого формата и заменить его снапшотом."""
+        with open(path, "rb") as handle:
+            payload = pickle.load(handle)
+        ids = list(payload.get("ids") or [])
+        metas = list(payload.get("metas") or [])
+        # "embeddings" — списки float из файлов до перехода на NumPy.
+        vectors = payload.get("vectors")
+        if vectors is None:
+            vectors = payload.get("embeddings") or []
+        if ids:
+            self._insert_locked(ids, metas, vectors)
+            self._maybe_train_locked()
+        legacy_path = f"{path}.legacy"
+        os.replace(path, legacy_path)
+        self._write_snapshot_locked()
+        log.warning(
+            "FAISS: converted pickle %s to a snapshot directory (%d documents); "
+            "old file kept as %s",
+            path,
+            len(self._slots),
+            legacy_path,
+        )
+
+    @staticmethod
+    def _current_snapshot(path: str) -> Optional[str]:
+        try:
+            with open(os.path.join(path, _CURRENT), encoding="utf-8") as handle:
+                name = handle.read().strip()
+        except FileNotFoundError:
+            return None
+        return os.path.join(path, name) if name else None
+
+    def _open_snapshot(self, snapshot: str, state: Dict[str, Any]) -> None:
+        import faiss
+        import numpy as np
+
+        flags = (
+            getattr(faiss, "IO_FLAG_MMAP", 0)
+            | getattr(faiss, "IO_FLAG_MMAP_IFC", 0)
+            | getattr(faiss, "IO_FLAG_READ_ONLY", 0)
+        )
+        self.index = faiss.read_index(os.path.join(snapshot, "index.faiss"), flags)
+        self._dim = int(state["dim"])
+        self._index_kind = state["index_kind"]
+        self._vectors = np.load(os.path.join(snapshot, "vectors.npy"), mmap_mode="r")
+        self._ids = np.load(os.path.join(snapshot, "ids.npy"), mmap_mode="r")
+        self._metas = SnapshotMetadata(os.path.join(snapshot, "metadata.sqlite"), len(self._ids))
+        self._slots = None
+        self._free = list(state.get("free") or [])
+        self._dead = set(state.get("dead") or [])
+        self._postings = None
+        if state.get("filter_fields") == list(self.filter_fields):
+            with np.load(os.path.join(snapshot, "postings.npz")) as bitmaps:
+                self._postings = {field: {} for field in self.filter_fields}
+                for i, (field, value) in enumerate(state.get("postings") or []):
+                    self._postings[field][value] = bitmaps[f"p{i}"]
+        self._mapped = snapshot
+        self._mapped_live = None
+        pending = bool(self.index_factory) and self._index_kind == "flat"
+        if state.get("pending_train", pending):
+            self._untrained = self._build_pending_index(self._dim)
+            self._next_train_at = int(state.get("next_train_at") or self.train_size)
+
+    def _materialize_locked(self) -> None:
+        """Прочитать отображённый снапшот в память перед мутацией (read-only
+        mmap-индекс нельзя менять). Чтение идёт параллельно с поиском по
+        отображённой версии; эксклюзивно — только подмена."""
+        if self._mapped is None:
+            return
+        import faiss
+        import numpy as np
+
+        index = faiss.read_index(os.path.join(self._mapped, "index.faiss"))
+        n_slots = len(self._ids)
+        vectors = self._new_matrix(max(n_slots, 16))
+        vectors[:n_slots] = self._vectors
+        ids: List[Optional[str]] = [doc_id or None for doc_id in self._ids.tolist()]
+        metas = self._metas.materialize()
+        slots = {doc_id: slot for slot, doc_id in enumerate(ids) if doc_id is not None}
+        overlay = self._overlay
+        with self._rw.write():
+            self._overlay = None
+            self._metas.close()
+            self.index = index
+            self._vectors = vectors
+            self._ids = ids
+            self._metas = metas
+            self._slots = slots
+            self._mapped = None
+            self._mapped_live = None
+            if overlay is not None:
+                # Хвост лога, применённый поверх снапшота, — в память процесса.
+                tail_ids, tail_metas, tail_vectors = overlay.live()
+                hidden = (ids[slot] for slot in np.flatnonzero(overlay.tombstones))
+                gone = [doc_id for doc_id in hidden if doc_id not in overlay.rows]
+                if tail_ids:
+                    self._insert_locked(tail_ids, tail_metas, tail_vectors)
+                self._delete_locked(gone)
+        if overlay is not None:
+            self._maybe_train_locked()
+
+    def _rebuild_from_mapped_locked(self) -> None:
+        self._materialize_locked()
+        live = sorted(self._slots.values())
+        ids = [self._ids[slot] for slot in live]
+        metas = [self._metas[slot] for slot in live]
+        vectors = self._vectors[live]
+        with self._rw.write():
+            self._reset_locked()
+            if ids:
+                self._insert_locked(ids, metas, vectors)
+        self._maybe_train_locked()
+
+    def _write_snapshot_locked(self) -> None:
+        """Записать полный снапшот с пустым логом и переключить ``CURRENT``."""
+        path = self.persist_path
+        if not path:
+            return
+        import faiss
+        import numpy as np
+
+        self._materialize_locked()
+
+        os.makedirs(path, exist_ok=True)
+        name = f"snapshot-{time.time_ns()}"
+        tmp_dir = os.path.join(path, f"{name}.tmp")
+        os.makedirs(tmp_dir)
+        n_slots = len(self._ids)
+        if self.index is not None:
+            faiss.write_index(self.index, os.path.join(tmp_dir, "index.faiss"))
+            np.save(os.path.join(tmp_dir, "vectors.npy"), self._vectors[:n_slots])
+        np.save(
+            os.path.join(tmp_dir, "ids.npy"),
+            np.array([doc_id or "" for doc_id in self._ids], dtype=str),
+        )
+        conn = sqlite3.connect(os.path.join(tmp_dir, "metadata.sqlite"))
+        try:
+            conn.execute(
+                "CREATE TABLE metadata (slot INTEGER PRIMARY KEY, doc_id TEXT NOT NULL UNIQUE, "
+                "attrs TEXT NOT NULL, text TEXT)"
+            )
+            conn.executemany(
+                "INSERT INTO metadata VALUES (?, ?, ?, ?)",
+                (
+                    (slot, doc_id, *self._split_text(self._metas[slot]))
+                    for doc_id, slot in self._slots.items()
+                ),
+            )
+            conn.commit()
+        finally:
+            conn.close()
+        state = {
+            "version": _SNAPSHOT_VERSION,
+            "dim": self._dim,
+            "index_factory": self.index_factory,
+            "metric": self.metric,
+            "quantizer": self.quantizer,
+            "pending_train": self._untrained is not None,
+            "index_kind": self._index_kind,
+            "next_train_at": self._next_train_at,
+            "free": self._free,
+            "dead": sorted(self._dead),
+        }
+        self._build_postings_locked()
+        postings = [
+            (field, value, bitmap)
+            for field, by_value in self._postings.items()
+            for value, bitmap in by_value.items()
+        ]
+        np.savez(
+            os.path.join(tmp_dir, "postings.npz"),
+            **{f"p{i}": bitmap for i, (_, _, bitmap) in enumerate(postings)},
+        )
+        state["filter_fields"] = list(self.filter_fields)
+        state["postings"] = [[field, value] for field, value, _ in postings]
+        with open(os.path.join(tmp_dir, "state.json"), "w", encoding="utf-8") as handle:
+            json.dump(state, handle)
+        final_dir = os.path.join(path, name)
+        os.rename(tmp_dir, final_dir)
+        pointer_tmp = os.path.join(path, f"{_CURRENT}.tmp")
+        with open(pointer_tmp, "w", encoding="utf-8") as handle:
+            handle.write(name)
+        os.replace(pointer_tmp, os.path.join(path, _CURRENT))
+        self._snapshot = final_dir
+        self._wal_offset = 0
+        # Процессы, отобразившие старый снапшот, держат открытые файлы — на
+        # POSIX удаление их не ломает.
+        for entry in os.listdir(path):
+            if entry.startswith("snapshot-") and entry != name:
+                shutil.rmtree(os.path.join(path, entry), ignore_errors=True)
+
+    @staticmethod
+    def _split_text(meta: Optional[Dict[str, Any]]) -> Tuple[str, Optional[str]]:
+        attrs = dict(meta or {})
+        text = attrs.pop("text", None)
+        return json.dumps(attrs, ensure_ascii=False, default=str), (
+            None if text is None else str(text)
+        )
@@ -14,24 +14,49 @@ pgvector backend для django-graph-search (опциональная extra ``[p
             "using": "default",
             "hnsw_m": 16,
             "hnsw_ef_construction": 64,
+            "async_pool_size": 0,   # >0: asearch через psycopg_pool (psycopg 3)
+            "model_counts": True,
+            "counts_reconcile_seconds": 86400,
         },
     }
+
+При ``model_counts`` рядом с таблицей векторов ведётся
+``<table_name>_model_counts``: число документов по ``metadata->>'model'``
+меняется в той же транзакции, что и upsert/delete, поэтому
+:meth:`PgvectorBackend.count_by_model` читает несколько строк вместо
+``COUNT(*)`` по JSONB. Раз в ``counts_reconcile_seconds`` счётчики
+пересчитываются ``GROUP BY`` в фоновом потоке (гонка двух транзакций,
+вставляющих один и тот же новый id, считает его дважды). Пока сверки не было
+(таблица счётчиков пуста, например сразу после обновления), ответ — точный
+``GROUP BY`` по таблице векторов.
 """
 from __future__ import annotations
 
+import asyncio
 import json
 import logging
 import re
-from typing import Any, Dict, Iterable, List, Optional
+import threading
+from typing import Any, Dict, Iterable, List, Optional, Sequence, Tuple
 
-from django.db import connections
+from asgiref.sync import sync_to_async
+from django.db import connections, transaction
 
 from ..exceptions import BackendError
-from .base import BaseVectorStore, Document, SearchResult
+from .base import (
+    MEMBERSHIP_TYPES,
+    BaseVectorStore,
+    Document,
+    SearchResult,
+    split_exclude_ids,
+)
+from .counts import BackgroundReconcile
 
 log = logging.getLogger(__name__)
 
 _IDENT_RE = re.compile(r"^[a-zA-Z_][a-zA-Z0-9_]*$")
+# Ключи get_connection_params(), которые понимает только Django-обёртка.
+_DJANGO_ONLY_CONNECT_PARAMS = ("cursor_factory", "context", "server_side_binding")
 
 
 def _quote_ident(name: str) -> str:
@@ -40,9 +65,18 @@ def _quote_ident(name: str) -> str:
     return name
 
 
+def _close_pool_on_new_loop(pool: Any) -> None:
+    try:
+        asyncio.run(pool.close())
+    except Exception as exc:  # noqa: BLE001 - пул просто отбрасывается
+        log.warning("pgvector: could not close async pool of a stopped loop: %s", exc)
+
+
 class PgvectorBackend(BaseVectorStore):
     """Векторное хранилище на PostgreSQL + pgvector."""
 
+    supports_exclude_ids = True
+
     def __init__(self, **options: Any) -> None:
         self.table_name = _quote_ident(options.get("table_name", "django_graph_search_vector"))
         self.dimension = int(options.get("dimension", 384))
@@ -51,6 +85,16 @@ class PgvectorBackend(BaseVectorStore):
         self.hnsw_m = int(options.get("hnsw_m", 16))
         self.hnsw_ef_construction = int(options.get("hnsw_ef_construction", 64))
         self._table_initialized = False
+        # Размер пула psycopg.AsyncConnection для asearch (0 — через потоки).
+        self.async_pool_size = int(options.get("async_pool_size", 0))
+        self._async_pool: Any = None
+        self._async_pool_loop: Any = None
+        self._async_pool_lock: Optional[asyncio.Lock] = None
+        self._async_pool_warned = False
+        self.model_counts = bool(options.get("model_counts", True))
+        self.counts_reconcile_seconds = float(options.get("counts_reconcile_seconds", 86400))
+        self.counts_table = f"{self.table_name}_model_counts"
+        self._reconciler = BackgroundReconcile(self._reconcile_and_close, "pgvector-counts")
 
     def _vector_literal(self, vector: List[float]) -> str:
         return "[" + ",".join(str(float(v)) for v in vector) + "]"
@@ -101,6 +145,19 @@ class PgvectorBackend(BaseVectorStore):
                 cursor.execute(index_sql)
             except Exception as exc:  # noqa: BLE001
                 log.warning("Could not create HNSW index: %s", exc)
+            # Фильтр по набору моделей (model = ANY(...)) — по B-tree выражению.
+            try:
+                cursor.execute(
+                    f"CREATE INDEX IF NOT EXISTS {tbl}_model_idx ON {tbl} ((metadata->>'model'));"
+                )
+            except Exception as exc:  # noqa: BLE001
+                log.warning("Could not create model index: %s", exc)
+            if self.model_counts:
+                # reconciled_at NULL — строка появилась инкрементально, без сверки.
+                cursor.execute(
+                    f"CREATE TABLE IF NOT EXISTS {self.counts_table} ("
+                    f"model TEXT PRIMARY KEY, n BIGINT NOT NULL, reconciled_at TIMESTAMPTZ);"
+                )
         self._table_initialized = True
 
     def add_documents(self, documents: Iterable[Document]) -> None:
@@ -119,54 +176,270 @@ class PgvectorBackend(BaseVectorStore):
             (doc.id, json.dumps(doc.metadata or {}), self._vector_literal(doc.embedding))
             for doc in docs
         ]
-        with conn.cursor() as cursor:
+        with transaction.atomic(using=self.using), conn.cursor() as cursor:
+            if self.model_counts:
+                # До upsert: новыми считаются id, которых ещё нет в таблице.
+                models = {doc.id: (doc.metadata or {}).get("model") for doc in docs}
+                cursor.execute(
+                    f"INSERT INTO {self.counts_table} (model, n) "
+                    f"SELECT i.model, COUNT(*) FROM unnest(%s::text[], %s::text[]) AS i(id, model) "
+                    f"WHERE i.model IS NOT NULL "
+                    f"AND NOT EXISTS (SELECT 1 FROM {tbl} t WHERE t.id = i.id) "
+                    f"GROUP BY i.model "
+                    f"ON CONFLICT (model) DO UPDATE SET n = {self.counts_table}.n + EXCLUDED.n",
+                    [
+                        list(models),
+                        [None if m is None else str(m) for m in models.values()],
+                    ],
+                )
             cursor.executemany(upsert, rows)
 
-    def search(
-        self,
-        query_vector: List[float],
-        limit: int,
-        filters: Optional[Dict[str, Any]] = None,
-    ) -> List[SearchResult]:
-        self._ensure_table()
-        tbl = self.table_name
-        vec = self._vector_literal(query_vector)
+    @staticmethod
+    def _where_sql(filters: Optional[Dict[str, Any]]) -> Tuple[str, List[Any]]:
+        """WHERE по metadata: скаляры — ``@>`` (GIN-совместимо), наборы —
+        ``metadata->>key = ANY(...)``, исключаемые id — ``id <> ALL(...)``."""
+        filters, exclude = split_exclude_ids(filters)
+        filters = filters or {}
+        if not filters and not exclude:
+            return "", []
+        clauses: List[str] = []
         params: List[Any] = []
-        where_sql = ""
-        if filters:
-            params.append(json.dumps(filters))
-            where_sql = "WHERE metadata @> %s::jsonb"
+        scalars = {k: v for k, v in filters.items() if not isinstance(v, MEMBERSHIP_TYPES)}
+        if scalars:
+            clauses.append("metadata @> %s::jsonb")
+            params.append(json.dumps(scalars))
+        for key, value in filters.items():
+            if isinstance(value, MEMBERSHIP_TYPES):
+                clauses.append("(metadata->>%s) = ANY(%s::text[])")
+                # ->> отдаёт текст: 1 → "1", true → "true".
+                params.extend(
+                    [key, [v if isinstance(v, str) else json.dumps(v) for v in value]]
+                )
+        if exclude:
+            clauses.append("id <> ALL(%s::text[])")
+            params.append(sorted(exclude))
+        return "WHERE " + " AND ".join(clauses), params
+
+    def _distance_sql(self, vector_sql: str) -> Tuple[str, str]:
+        """Оператор расстояния и выражение score для ``vector_sql``."""
         order_op = "<=>"
         if self.distance == "l2":
             order_op = "<->"
         elif self.distance in {"inner_product", "ip"}:
             order_op = "<#>"
         if self.distance == "cosine":
-            score_expr = f"(1 - (embedding {order_op} %s::vector))"
+            score_expr = f"(1 - (embedding {order_op} {vector_sql}))"
         elif self.distance == "l2":
-            score_expr = f"(1 / (1 + (embedding {order_op} %s::vector)))"
+            score_expr = f"(1 / (1 + (embedding {order_op} {vector_sql})))"
+        else:
+            score_expr = f"(-(embedding {order_op} {vector_sql}))"
+        return order_op, score_expr
+
+    @staticmethod
+    def _to_result(doc_id: Any, metadata_raw: Any, score: Any) -> SearchResult:
+        if isinstance(metadata_raw, dict):
+            meta = metadata_raw
         else:
-            score_expr = f"(-(embedding {order_op} %s::vector))"
+            meta = json.loads(metadata_raw or "{}")
+        s = max(0.0, min(1.0, float(score)))
+        return SearchResult(id=str(doc_id), score=s, metadata=meta)
+
+    def _search_query(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+    ) -> Tuple[str, List[Any]]:
+        tbl = self.table_name
+        vec = self._vector_literal(query_vector)
+        where_sql, where_params = self._where_sql(filters)
+        order_op, score_expr = self._distance_sql("%s::vector")
 
         sql = (
             f"SELECT id, metadata, {score_expr} AS score FROM {tbl} "
             f"{where_sql} ORDER BY embedding {order_op} %s::vector LIMIT %s"
         )
-        params.extend([vec, vec, limit])
+        # Порядок плейсхолдеров: score (SELECT), WHERE, ORDER BY, LIMIT.
+        return sql, [vec, *where_params, vec, limit]
+
+    def _search_batch_query(
+        self,
+        query_vectors: List[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+    ) -> Tuple[str, List[Any]]:
+        """Все запросы одним SQL: ``unnest`` векторов + ``CROSS JOIN LATERAL``
+        с тем же ORDER BY/LIMIT, что и в ``search`` (HNSW-индекс используется
+        для каждой строки)."""
+        tbl = self.table_name
+        params: List[Any] = [[self._vector_literal(vector) for vector in query_vectors]]
+        where_sql, where_params = self._where_sql(filters)
+        params.extend(where_params)
+        order_op, score_expr = self._distance_sql("q.vec::vector")
+        sql = (
+            f"SELECT q.ord, hit.id, hit.metadata, hit.score "
+            f"FROM unnest(%s::text[]) WITH ORDINALITY AS q(vec, ord) "
+            f"CROSS JOIN LATERAL ("
+            f"SELECT id, metadata, {score_expr} AS score, "
+            f"embedding {order_op} q.vec::vector AS distance FROM {tbl} "
+            f"{where_sql} ORDER BY embedding {order_op} q.vec::vector LIMIT %s"
+            f") AS hit ORDER BY q.ord, hit.distance"
+        )
+        params.append(limit)
+        return sql, params
+
+    def _batch_rows_to_results(self, rows: List[Any], size: int) -> List[List[SearchResult]]:
+        out: List[List[SearchResult]] = [[] for _ in range(size)]
+        for ord_, doc_id, metadata_raw, score in rows:
+            out[int(ord_) - 1].append(self._to_result(doc_id, metadata_raw, score))
+        return out
+
+    def search(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchResult]:
+        self._ensure_table()
+        sql, params = self._search_query(query_vector, limit, filters)
         conn = connections[self.using]
         with conn.cursor() as cursor:
             cursor.execute(sql, params)
             rows = cursor.fetchall()
-        results: List[SearchResult] = []
-        for row in rows:
-            doc_id, metadata_raw, score = row
-            if isinstance(metadata_raw, dict):
-                meta = metadata_raw
-            else:
-                meta = json.loads(metadata_raw or "{}")
-            s = max(0.0, min(1.0, float(score)))
-            results.append(SearchResult(id=str(doc_id), score=s, metadata=meta))
-        return results
+        return [self._to_result(*row) for row in rows]
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        if len(vectors) == 1:
+            return [self.search(vectors[0], limit=limit, filters=filters)]
+        self._ensure_table()
+        sql, params = self._search_batch_query(vectors, limit, filters)
+        conn = connections[self.using]
+        with conn.cursor() as cursor:
+            cursor.execute(sql, params)
+            rows = cursor.fetchall()
+        return self._batch_rows_to_results(rows, len(vectors))
+
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        ids = list(doc_ids)
+        if not ids:
+            return {}
+        self._ensure_table()
+        conn = connections[self.using]
+        with conn.cursor() as cursor:
+            cursor.execute(
+                f"SELECT id, embedding::text FROM {self.table_name} WHERE id = ANY(%s)",
+                [ids],
+            )
+            rows = cursor.fetchall()
+        # Текстовое представление vector — '[0.1,0.2,...]', валидный JSON.
+        return {str(doc_id): [float(v) for v in json.loads(raw)] for doc_id, raw in rows}
+
+    # ------------------------------------------------------------------ async
+
+    async def aget_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        # Django-соединения привязаны к потоку — thread_sensitive, как у search.
+        return await sync_to_async(self.get_vectors)(list(doc_ids))
+
+    async def asearch_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Через пул ``psycopg.AsyncConnection`` при ``async_pool_size > 0``.
+
+        Без пула (или без ``psycopg_pool``) — синхронный :meth:`search_batch`
+        через ``sync_to_async``: Django-соединения привязаны к потоку.
+        """
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        pool = await self._get_async_pool()
+        if pool is None:
+            return await sync_to_async(self.search_batch)(vectors, limit=limit, filters=filters)
+        if not self._table_initialized:
+            await sync_to_async(self._ensure_table)()
+        if len(vectors) == 1:
+            sql, params = self._search_query(vectors[0], limit, filters)
+        else:
+            sql, params = self._search_batch_query(vectors, limit, filters)
+        async with pool.connection() as aconn:
+            async with aconn.cursor() as cursor:
+                await cursor.execute(sql, params)
+                rows = await cursor.fetchall()
+        if len(vectors) == 1:
+            return [[self._to_result(*row) for row in rows]]
+        return self._batch_rows_to_results(rows, len(vectors))
+
+    async def _get_async_pool(self) -> Any:
+        """Пул соединений текущего event loop (``None`` — async-пул выключен)."""
+        if self.async_pool_size <= 0:
+            return None
+        try:
+            from psycopg_pool import AsyncConnectionPool
+        except ImportError:
+            if not self._async_pool_warned:
+                self._async_pool_warned = True
+                log.warning("psycopg_pool is not installed; pgvector async search uses threads.")
+            return None
+        loop = asyncio.get_running_loop()
+        if self._async_pool is not None and self._async_pool_loop is loop:
+            return self._async_pool
+        if self._async_pool_lock is None or self._async_pool_loop is not loop:
+            self._discard_async_pool()
+            self._async_pool_lock = asyncio.Lock()
+            self._async_pool_loop = loop
+        async with self._async_pool_lock:
+            if self._async_pool is None:
+                params = await sync_to_async(self._async_connect_kwargs)()
+                pool = AsyncConnectionPool(
+                    kwargs=params,
+                    min_size=1,
+                    max_size=self.async_pool_size,
+                    open=False,
+                )
+                await pool.open()
+                self._async_pool = pool
+        return self._async_pool
+
+    def _discard_async_pool(self) -> None:
+        """Закрыть пул прежнего event loop: пул привязан к loop, а брошенный
+        держал бы открытые соединения до конца процесса."""
+        pool, loop = self._async_pool, self._async_pool_loop
+        self._async_pool = None
+        if pool is None or loop is None:
+            return
+        if loop.is_running():
+            # Loop жив в другом потоке — закрываем пул в нём же.
+            asyncio.run_coroutine_threadsafe(pool.close(), loop)
+            return
+        # Loop остановлен (async_to_sync, закончившийся asyncio.run): публичный
+        # pool.close() на новом loop, в отдельном потоке — вызывающий код
+        # может сам работать внутри loop.
+        threading.Thread(
+            target=_close_pool_on_new_loop, args=(pool,), name="pgvector-pool-close", daemon=True
+        ).start()
+
+    def close(self) -> None:
+        """Закрыть async-пул соединений (если он создавался)."""
+        self._discard_async_pool()
+        self._async_pool_loop = None
+        self._async_pool_lock = None
+
+    def _async_connect_kwargs(self) -> Dict[str, Any]:
+        """Параметры подключения Django-алиаса для ``psycopg.AsyncConnection``."""
+        params = dict(connections[self.using].get_connection_params())
+        for key in _DJANGO_ONLY_CONNECT_PARAMS:
+            params.pop(key, None)
+        return params
 
     def delete(self, doc_ids: Iterable[str]) -> None:
         ids = list(doc_ids)
@@ -176,26 +449,92 @@ class PgvectorBackend(BaseVectorStore):
         tbl = self.table_name
         conn = connections[self.using]
         with conn.cursor() as cursor:
-            cursor.execute(f"DELETE FROM {tbl} WHERE id = ANY(%s)", [ids])
+            if not self.model_counts:
+                cursor.execute(f"DELETE FROM {tbl} WHERE id = ANY(%s)", [ids])
+                return
+            cursor.execute(
+                f"WITH gone AS (DELETE FROM {tbl} WHERE id = ANY(%s) "
+                f"RETURNING metadata->>'model' AS model) "
+                f"INSERT INTO {self.counts_table} (model, n) "
+                f"SELECT model, -COUNT(*) FROM gone WHERE model IS NOT NULL GROUP BY model "
+                f"ON CONFLICT (model) DO UPDATE SET n = {self.counts_table}.n + EXCLUDED.n",
+                [ids],
+            )
 
     def clear_collection(self) -> None:
         self._ensure_table()
         tbl = self.table_name
         conn = connections[self.using]
-        with conn.cursor() as cursor:
+        with transaction.atomic(using=self.using), conn.cursor() as cursor:
             cursor.execute(f"DELETE FROM {tbl};")
+            if self.model_counts:
+                cursor.execute(f"DELETE FROM {self.counts_table};")
 
     def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
         self._ensure_table()
         tbl = self.table_name
         conn = connections[self.using]
-        if filters:
-            sql = f"SELECT COUNT(*) FROM {tbl} WHERE metadata @> %s::jsonb"
-            params: List[Any] = [json.dumps(filters)]
-        else:
-            sql = f"SELECT COUNT(*) FROM {tbl}"
-            params = []
+        where_sql, params = self._where_sql(filters)
+        sql = f"SELECT COUNT(*) FROM {tbl} {where_sql}"
         with conn.cursor() as cursor:
             cursor.execute(sql, params)
             row = cursor.fetchone()
         return int(row[0]) if row else 0
+
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        labels = [str(label) for label in models]
+        if not labels:
+            return {}
+        self._ensure_table()
+        conn = connections[self.using]
+        seeded = False
+        if self.model_counts:
+            with conn.cursor() as cursor:
+                cursor.execute(
+                    f"SELECT max(reconciled_at) IS NOT NULL, "
+                    f"max(reconciled_at) < now() - make_interval(secs => %s) "
+                    f"FROM {self.counts_table}",
+                    [self.counts_reconcile_seconds],
+                )
+                seeded, stale = cursor.fetchone()
+            if not seeded or stale:
+                # Пересчёт всей таблицы под блокировкой — не в потоке запроса.
+                self._reconciler.start()
+        if seeded:
+            sql = f"SELECT model, n FROM {self.counts_table} WHERE model = ANY(%s)"
+        else:
+            # Несверенные счётчики (пустая таблица после обновления) врут —
+            # точный GROUP BY по B-tree выражению metadata->>'model'.
+            sql = (
+                f"SELECT metadata->>'model', COUNT(*) FROM {self.table_name} "
+                f"WHERE metadata->>'model' = ANY(%s) GROUP BY 1"
+            )
+        with conn.cursor() as cursor:
+            cursor.execute(sql, [labels])
+            found = {str(label): max(0, int(n)) for label, n in cursor.fetchall()}
+        return {label: found.get(label, 0) for label in labels}
+
+    def _reconcile_and_close(self) -> None:
+        try:
+            self.reconcile_counts()
+        finally:
+            # Соединение Django у фонового потока своё — не оставлять открытым.
+            connections[self.using].close()
+
+    def reconcile_counts(self) -> None:
+        """Пересчитать ``<table>_model_counts`` одним ``GROUP BY``."""
+        if not self.model_counts:
+            return
+        self._ensure_table()
+        cnt = self.counts_table
+        conn = connections[self.using]
+        with transaction.atomic(using=self.using), conn.cursor() as cursor:
+            # Писатели сначала трогают счётчики: после блокировки все начатые
+            # записи закоммичены, новые ждут конца пересчёта.
+            cursor.execute(f"LOCK TABLE {cnt} IN SHARE ROW EXCLUSIVE MODE")
+            cursor.execute(f"DELETE FROM {cnt}")
+            cursor.execute(
+                f"INSERT INTO {cnt} (model, n, reconciled_at) "
+                f"SELECT metadata->>'model', COUNT(*), now() FROM {self.table_name} "
+                f"WHERE metadata->>'model' IS NOT NULL GROUP BY 1"
+            )
@@ -1,16 +1,99 @@
+"""
+Qdrant backend для django-graph-search (опциональная extra ``[qdrant]``).
+
+Конфигурация ``VECTOR_STORE``::
+
+    {
+        "BACKEND": "django_graph_search.backends.qdrant.QdrantBackend",
+        "OPTIONS": {
+            "collection_name": "django_graph_search",
+            "distance": "Cosine",
+            "url": "http://localhost:6333",      # остальное — в QdrantClient
+            "payload_indexes": {"model": "keyword", "pk": "keyword"},
+            "filter_fields": ["lang"],
+            "on_disk": True,
+            "hnsw_config": {"m": 16, "ef_construct": 100},
+            "quantization": {"type": "scalar", "quantile": 0.99, "always_ram": True},
+            "search_hnsw_ef": 128,
+        },
+    }
+
+Id документа (``"shop.Product:1"``) — не валидный id точки Qdrant: точки
+получают детерминированный UUIDv5 (:func:`point_id`), исходный id лежит в
+payload ``doc_id`` и возвращается в ``SearchResult.id``.
+"""
 from __future__ import annotations
 
-from typing import Any, Dict, Iterable, List, Optional
+import logging
+import uuid
+from typing import Any, Dict, Iterable, List, Optional, Sequence
 
 from ..exceptions import BackendError
-from .base import BaseVectorStore, Document, SearchResult
+from .base import (
+    MEMBERSHIP_TYPES,
+    BaseVectorStore,
+    Document,
+    SearchResult,
+    split_exclude_ids,
+)
+
+log = logging.getLogger(__name__)
+
+# Пространство имён UUIDv5 для id точек (менять нельзя: id перестанут совпадать).
+_POINT_ID_NAMESPACE = uuid.uuid5(uuid.NAMESPACE_URL, "django-graph-search/qdrant")
+# Ключ payload с исходным id документа.
+DOC_ID_KEY = "doc_id"
+# pk — keyword: подходит и строковым/UUID ключам; для целых — {"pk": "integer"}.
+_DEFAULT_PAYLOAD_INDEXES = {"model": "keyword", "pk": "keyword"}
+_QUANTIZATION_TYPES = ("scalar", "binary")
+
+
+def point_id(doc_id: Any) -> str:
+    """Детерминированный UUIDv5 точки Qdrant для id документа."""
+    return str(uuid.uuid5(_POINT_ID_NAMESPACE, str(doc_id)))
 
 
 class QdrantBackend(BaseVectorStore):
+    """Коллекция Qdrant.
+
+    Options (кроме перечисленных — в ``QdrantClient``):
+        payload_indexes: индексы payload ``поле → тип`` (``keyword``,
+            ``integer``, ``float``, ``bool``, ``uuid``, ``text``, ``datetime``)
+            поверх ``{"model": "keyword", "pk": "keyword"}``; ``None`` убирает
+            поле по умолчанию. Без индекса фильтр и ``count`` перебирают payload.
+            Неизвестный тип — :class:`BackendError` при создании бэкенда.
+        filter_fields: дополнительные поля фильтров — keyword-индексы.
+        on_disk: хранить исходные векторы на диске (mmap), в памяти — HNSW
+            и квантованные векторы.
+        on_disk_payload: хранить payload на диске.
+        hnsw_config: ``m``, ``ef_construct``, ``full_scan_threshold``,
+            ``on_disk``, ``payload_m`` (``HnswConfigDiff``).
+        quantization: ``{"type": "scalar", "quantile": 0.99, "always_ram": True}``
+            (int8) или ``{"type": "binary", "always_ram": True}``;
+            ``rescore`` / ``oversampling`` — параметры поиска по квантованным
+            векторам.
+        search_hnsw_ef: ``hnsw_ef`` поиска (по умолчанию — ``ef_construct``).
+
+    Параметры векторов, HNSW и квантования задаются при создании коллекции;
+    индексы payload создаются и у существующей (повторное создание — no-op).
+    Если коллекцию удалили в обход бэкенда, upsert создаёт её заново (одна
+    повторная попытка).
+    """
+
+    supports_exclude_ids = True
+
     def __init__(
         self,
         collection_name: str = "django_graph_search",
         distance: str = "Cosine",
+        *,
+        payload_indexes: Optional[Dict[str, Optional[str]]] = None,
+        filter_fields: Sequence[str] = (),
+        on_disk: bool = False,
+        on_disk_payload: Optional[bool] = None,
+        hnsw_config: Optional[Dict[str, Any]] = None,
+        quantization: Optional[Dict[str, Any]] = None,
+        search_hnsw_ef: Optional[int] = None,
         **options: Any,
     ) -> None:
         try:
@@ -23,18 +106,97 @@ class QdrantBackend(BaseVectorStore):
         self.collection_name = collection_name
         self.client = QdrantClient(**options)
         self.distance = distance
+        self._client_options = options
+        self._async_client: Any = None
+        indexes: Dict[str, Optional[str]] = dict(_DEFAULT_PAYLOAD_INDEXES)
+        indexes.update({field: "keyword" for field in filter_fields})
+        indexes.update(payload_indexes or {})
+        self.payload_indexes = {
+            field: str(schema).lower() for field, schema in indexes.items() if schema
+        }
+        for field, schema in self.payload_indexes.items():
+            if getattr(qmodels.PayloadSchemaType, schema.upper(), None) is None:
+                raise BackendError(f"Unknown Qdrant payload index type {schema!r} for {field!r}.")
+        self.on_disk = bool(on_disk)
+        self.on_disk_payload = on_disk_payload
+        self.hnsw_config = dict(hnsw_config or {})
+        self.quantization = dict(quantization or {})
+        kind = str(self.quantization.get("type", "scalar")).lower()
+        if self.quantization and kind not in _QUANTIZATION_TYPES:
+            raise BackendError(
+                f"Qdrant quantization type must be 'scalar' or 'binary', not {kind!r}."
+            )
+        self.search_hnsw_ef = search_hnsw_ef
+        self._collection_ready = False
+
+    def _get_async_client(self) -> Any:
+        """``AsyncQdrantClient`` с теми же OPTIONS (создаётся при первом async-запросе)."""
+        if self._async_client is None:
+            try:
+                from qdrant_client import AsyncQdrantClient
+            except Exception as exc:  # pragma: no cover - dependency error
+                raise BackendError("qdrant-client>=1.6 is required for async search.") from exc
+            self._async_client = AsyncQdrantClient(**self._client_options)
+        return self._async_client
 
     def _ensure_collection(self, dim: int) -> None:
-        if self.client.collection_exists(self.collection_name):
+        if self._collection_ready:
             return
-        self.client.create_collection(
-            collection_name=self.collection_name,
-            vectors_config=self.qmodels.VectorParams(
-                size=dim,
-                distance=getattr(self.qmodels.Distance, self.distance),
-            ),
+        if not self.client.collection_exists(self.collection_name):
+            extra: Dict[str, Any] = {}
+            if self.on_disk_payload is not None:
+                extra["on_disk_payload"] = bool(self.on_disk_payload)
+            if self.hnsw_config:
+                extra["hnsw_config"] = self.qmodels.HnswConfigDiff(**self.hnsw_config)
+            if self.quantization:
+                extra["quantization_config"] = self._quantization_config()
+            self.client.create_collection(
+                collection_name=self.collection_name,
+                vectors_config=self.qmodels.VectorParams(
+                    size=dim,
+                    distance=getattr(self.qmodels.Distance, self.distance),
+                    on_disk=self.on_disk,
+                ),
+                **extra,
+            )
+        self._ensure_payload_indexes()
+        self._collection_ready = True
+
+    def _quantization_config(self) -> Any:
+        q = self.qmodels
+        always_ram = self.quantization.get("always_ram")
+        if str(self.quantization.get("type", "scalar")).lower() == "binary":
+            return q.BinaryQuantization(binary=q.BinaryQuantizationConfig(always_ram=always_ram))
+        return q.ScalarQuantization(
+            scalar=q.ScalarQuantizationConfig(
+                type=q.ScalarType.INT8,
+                quantile=self.quantization.get("quantile"),
+                always_ram=always_ram,
+            )
         )
 
+    def _ensure_payload_indexes(self) -> None:
+        """Индексы payload для фильтров и ``count``; у существующих — no-op на сервере."""
+        for field, schema in self.payload_indexes.items():
+            self.client.create_payload_index(
+                collection_name=self.collection_name,
+                field_name=field,
+                field_schema=getattr(self.qmodels.PayloadSchemaType, schema.upper()),
+            )
+
+    def _search_params(self) -> Any:
+        """``SearchParams`` из ``search_hnsw_ef`` и ``rescore``/``oversampling``."""
+        params: Dict[str, Any] = {}
+        if self.search_hnsw_ef is not None:
+            params["hnsw_ef"] = int(self.search_hnsw_ef)
+        rescore = self.quantization.get("rescore")
+        oversampling = self.quantization.get("oversampling")
+        if rescore is not None or oversampling is not None:
+            params["quantization"] = self.qmodels.QuantizationSearchParams(
+                rescore=rescore, oversampling=oversampling
+            )
+        return self.qmodels.SearchParams(**params) if params else None
+
     def add_documents(self, documents: Iterable[Document]) -> None:
         docs = list(documents)
         if not docs:
@@ -42,10 +204,78 @@ class QdrantBackend(BaseVectorStore):
         dim = len(docs[0].embedding)
         self._ensure_collection(dim)
         points = [
-            self.qmodels.PointStruct(id=doc.id, vector=doc.embedding, payload=doc.metadata)
+            self.qmodels.PointStruct(
+                id=point_id(doc.id),
+                vector=doc.embedding,
+                payload={**(doc.metadata or {}), DOC_ID_KEY: doc.id},
+            )
             for doc in docs
         ]
-        self.client.upsert(collection_name=self.collection_name, points=points)
+        try:
+            self.client.upsert(collection_name=self.collection_name, points=points)
+        except Exception:
+            # _collection_ready кэширует проверку: коллекцию могли удалить
+            # снаружи (другой процесс, clear_search_index) — создать и повторить.
+            if self.client.collection_exists(self.collection_name):
+                raise
+            log.warning("Qdrant: collection %r is gone, recreating it.", self.collection_name)
+            self._collection_ready = False
+            self._ensure_collection(dim)
+            self.client.upsert(collection_name=self.collection_name, points=points)
+
+    def _build_filter(self, filters: Optional[Dict[str, Any]]) -> Any:
+        filters, exclude = split_exclude_ids(filters)
+        if not filters and not exclude:
+            return None
+        conditions = []
+        for key, value in (filters or {}).items():
+            if isinstance(value, MEMBERSHIP_TYPES):
+                match = self.qmodels.MatchAny(any=list(value))
+            else:
+                match = self.qmodels.MatchValue(value=value)
+            conditions.append(self.qmodels.FieldCondition(key=key, match=match))
+        if not exclude:
+            return self.qmodels.Filter(must=conditions)
+        return self.qmodels.Filter(
+            must=conditions,
+            must_not=[self.qmodels.HasIdCondition(has_id=sorted(point_id(i) for i in exclude))],
+        )
+
+    def _to_results(self, points: Iterable[Any]) -> List[SearchResult]:
+        results = []
+        for item in points:
+            payload = dict(item.payload or {})
+            doc_id = payload.pop(DOC_ID_KEY, None)
+            results.append(
+                SearchResult(
+                    id=str(doc_id if doc_id is not None else item.id),
+                    score=max(0.0, min(1.0, float(item.score))),
+                    metadata=payload,
+                )
+            )
+        return results
+
+    def _search_requests(
+        self,
+        vectors: List[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]],
+    ) -> List[Any]:
+        query_filter = self._build_filter(filters)
+        extra: Dict[str, Any] = {}
+        search_params = self._search_params()
+        if search_params is not None:
+            extra["params"] = search_params
+        return [
+            self.qmodels.SearchRequest(
+                vector=vector,
+                limit=limit,
+                filter=query_filter,
+                with_payload=True,
+                **extra,
+            )
+            for vector in vectors
+        ]
 
     def search(
         self,
@@ -53,29 +283,79 @@ class QdrantBackend(BaseVectorStore):
         limit: int,
         filters: Optional[Dict[str, Any]] = None,
     ) -> List[SearchResult]:
-        query_filter = None
-        if filters:
-            conditions = [
-                self.qmodels.FieldCondition(
-                    key=key, match=self.qmodels.MatchValue(value=value)
-                )
-                for key, value in filters.items()
-            ]
-            query_filter = self.qmodels.Filter(must=conditions)
         results = self.client.search(
             collection_name=self.collection_name,
             query_vector=query_vector,
             limit=limit,
-            query_filter=query_filter,
+            query_filter=self._build_filter(filters),
+            search_params=self._search_params(),
         )
-        return [
-            SearchResult(
-                id=str(item.id),
-                score=max(0.0, min(1.0, float(item.score))),
-                metadata=item.payload or {},
-            )
-            for item in results
-        ]
+        return self._to_results(results)
+
+    def search_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        """Все запросы одним ``search_batch`` (один round-trip к Qdrant)."""
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        requests = self._search_requests(vectors, limit, filters)
+        batches = self.client.search_batch(
+            collection_name=self.collection_name,
+            requests=requests,
+        )
+        return [self._to_results(points) for points in batches]
+
+    async def asearch(
+        self,
+        query_vector: List[float],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[SearchResult]:
+        results = await self._get_async_client().search(
+            collection_name=self.collection_name,
+            query_vector=query_vector,
+            limit=limit,
+            query_filter=self._build_filter(filters),
+            search_params=self._search_params(),
+        )
+        return self._to_results(results)
+
+    async def asearch_batch(
+        self,
+        query_vectors: Sequence[List[float]],
+        limit: int,
+        filters: Optional[Dict[str, Any]] = None,
+    ) -> List[List[SearchResult]]:
+        vectors = list(query_vectors)
+        if not vectors:
+            return []
+        requests = self._search_requests(vectors, limit, filters)
+        batches = await self._get_async_client().search_batch(
+            collection_name=self.collection_name,
+            requests=requests,
+        )
+        return [self._to_results(points) for points in batches]
+
+    def get_vectors(self, doc_ids: Iterable[str]) -> Dict[str, List[float]]:
+        ids = list(doc_ids)
+        if not ids or not self.client.collection_exists(self.collection_name):
+            return {}
+        doc_ids_by_point = {point_id(doc_id): str(doc_id) for doc_id in ids}
+        points = self.client.retrieve(
+            collection_name=self.collection_name,
+            ids=list(doc_ids_by_point),
+            with_payload=False,
+            with_vectors=True,
+        )
+        return {
+            doc_ids_by_point.get(str(point.id), str(point.id)): [float(v) for v in point.vector]
+            for point in points
+            if point.vector is not None
+        }
 
     def delete(self, doc_ids: Iterable[str]) -> None:
         ids = list(doc_ids)
@@ -83,27 +363,41 @@ class QdrantBackend(BaseVectorStore):
             return
         self.client.delete(
             collection_name=self.collection_name,
-            points_selector=self.qmodels.PointIdsList(points=ids),
+            points_selector=self.qmodels.PointIdsList(points=[point_id(i) for i in ids]),
         )
 
     def clear_collection(self) -> None:
         self.client.delete_collection(collection_name=self.collection_name)
+        self._collection_ready = False
 
     def count_documents(self, filters: Optional[Dict[str, Any]] = None) -> int:
         if not self.client.collection_exists(self.collection_name):
             return 0
-        query_filter = None
-        if filters:
-            conditions = [
-                self.qmodels.FieldCondition(
-                    key=key, match=self.qmodels.MatchValue(value=value)
-                )
-                for key, value in filters.items()
-            ]
-            query_filter = self.qmodels.Filter(must=conditions)
         result = self.client.count(
             collection_name=self.collection_name,
-            count_filter=query_filter,
+            count_filter=self._build_filter(filters),
         )
         return int(result.count)
 
+    def count_by_model(self, models: Iterable[str]) -> Dict[str, int]:
+        """Один ``facet`` по ``model`` (qdrant-client >= 1.12, нужен keyword-индекс
+        payload), иначе — ``count`` на каждую модель."""
+        labels = [str(label) for label in models]
+        if not labels or not self.client.collection_exists(self.collection_name):
+            return {label: 0 for label in labels}
+        facet = getattr(self.client, "facet", None)
+        if callable(facet):
+            try:
+                response = facet(
+                    collection_name=self.collection_name,
+                    key="model",
+                    facet_filter=self._build_filter({"model": labels}),
+                    limit=len(labels),
+                    exact=True,
+                )
+            except Exception as exc:  # noqa: BLE001 - нет индекса model / старый сервер
+                log.debug("Qdrant facet by model failed, falling back to count: %s", exc)
+            else:
+                found = {str(hit.value): int(hit.count) for hit in response.hits}
+                return {label: found.get(label, 0) for label in labels}
+        return super().count_by_model(labels)
@@ -66,6 +66,22 @@ def get_shared_components(
     return config, vector_store, embedding_backend, resolver
 
 
+def get_registered_vector_store(config: "GraphSearchConfig") -> Optional[Any]:
+    """Уже созданный vector store с теми же ``VECTOR_STORE`` (без создания компонентов)."""
+    key = (config.vector_store.backend, _freeze_options(config.vector_store.options))
+    with _registry_lock:
+        for cached_key, (vector_store, _, _) in _component_registry.items():
+            if cached_key[:2] == key:
+                return vector_store
+    return None
+
+
 def clear_component_registry() -> None:
     with _registry_lock:
+        stores = [vector_store for vector_store, _, _ in _component_registry.values()]
         _component_registry.clear()
+    # Store из реестра больше никто не получит: остановить его фоновые потоки.
+    for vector_store in stores:
+        close = getattr(vector_store, "close", None)
+        if callable(close):
+            close()
@@ -1,10 +1,13 @@
 from .base import BaseEmbeddingBackend
+from .cached import CachedEmbeddingBackend, QueryEmbeddingCache
 from .cohere_backend import CohereEmbeddingBackend
 from .openai_backend import OpenAIEmbeddingBackend
 from .sentence_transformers import SentenceTransformerBackend
 
 __all__ = [
     "BaseEmbeddingBackend",
+    "CachedEmbeddingBackend",
+    "QueryEmbeddingCache",
     "CohereEmbeddingBackend",
     "OpenAIEmbeddingBackend",
     "SentenceTransformerBackend",
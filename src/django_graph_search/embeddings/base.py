@@ -1,5 +1,7 @@
 from abc import ABC, abstractmethod
-from typing import Iterable, List
+from typing import Any, Iterable, List
+
+from asgiref.sync import sync_to_async
 
 
 class BaseEmbeddingBackend(ABC):
@@ -11,3 +13,34 @@ class BaseEmbeddingBackend(ABC):
     def embed_batch(self, texts: Iterable[str], *, is_query: bool = False) -> List[List[float]]:
         raise NotImplementedError
 
+    async def aembed(self, text: str, *, is_query: bool = False) -> List[float]:
+        """Асинхронный :meth:`embed`; по умолчанию — в пуле потоков.
+
+        Бэкенды с async-клиентом (OpenAI, Cohere) переопределяют метод, чтобы
+        не занимать поток на время сетевого запроса.
+        """
+        return await sync_to_async(self.embed, thread_sensitive=False)(text, is_query=is_query)
+
+    async def aembed_batch(
+        self, texts: Iterable[str], *, is_query: bool = False
+    ) -> List[List[float]]:
+        """Асинхронный :meth:`embed_batch`; по умолчанию — в пуле потоков."""
+        return await sync_to_async(self.embed_batch, thread_sensitive=False)(
+            list(texts), is_query=is_query
+        )
+
+
+async def aembed_texts(
+    backend: Any, texts: Iterable[str], *, is_query: bool = False
+) -> List[List[float]]:
+    """``backend.aembed_batch`` с fallback на ``embed_batch`` в пуле потоков для
+    бэкендов, не наследующих :class:`BaseEmbeddingBackend`."""
+    texts_list = list(texts)
+    if not texts_list:
+        return []
+    aembed_batch = getattr(backend, "aembed_batch", None)
+    if callable(aembed_batch):
+        return list(await aembed_batch(texts_list, is_query=is_query))
+    return await sync_to_async(backend.embed_batch, thread_sensitive=False)(
+        texts_list, is_query=is_query
+    )
@@ -0,0 +1,295 @@
+"""
+Кэш векторов поисковых запросов.
+
+``embed(query, is_query=True)`` — основная CPU-стоимость запроса для локального
+SentenceTransformer и платный сетевой вызов для OpenAI/Cohere. Популярные
+запросы повторяются, поэтому вектор кэшируется по ключу
+``(профиль, модель, нормализованный запрос, is_query)``:
+
+* первый уровень — ограниченный LRU в памяти процесса с TTL;
+* второй (опционально) — Django cache alias, общий для всех воркеров.
+
+Конфигурация::
+
+    "QUERY_EMBEDDING_CACHE": {
+        "ENABLED": True,
+        "MAX_SIZE": 1024,
+        "TTL": 3600,
+        "ALIAS": "default",   # None — только локальный LRU
+        "KEY_PREFIX": "dgs:qemb",
+    }
+"""
+from __future__ import annotations
+
+import json
+import logging
+import threading
+import time
+from collections import OrderedDict
+from hashlib import sha256
+from typing import Any, Dict, Iterable, List, Optional, Tuple
+
+from asgiref.sync import sync_to_async
+
+from .base import BaseEmbeddingBackend, aembed_texts
+
+log = logging.getLogger(__name__)
+
+CacheKey = Tuple[str, str, str, bool]
+
+_registry_lock = threading.Lock()
+_cache_registry: Dict[Tuple[Any, ...], "QueryEmbeddingCache"] = {}
+
+
+def normalize_query(text: str) -> str:
+    """Схлопнуть пробелы: ``"  red   phone "`` и ``"red phone"`` — один ключ."""
+    return " ".join((text or "").split())
+
+
+class QueryEmbeddingCache:
+    """Потокобезопасный LRU с TTL и опциональным общим уровнем в Django cache."""
+
+    def __init__(
+        self,
+        max_size: int = 1024,
+        ttl: int = 3600,
+        alias: Optional[str] = None,
+        key_prefix: str = "dgs:qemb",
+    ) -> None:
+        self.max_size = max(1, int(max_size))
+        self.ttl = int(ttl)
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self._lock = threading.Lock()
+        self._entries: "OrderedDict[CacheKey, Tuple[Optional[float], List[float]]]" = (
+            OrderedDict()
+        )
+        self.hits = 0
+        self.shared_hits = 0
+        self.misses = 0
+
+    # ------------------------------------------------------------------ API
+
+    def get(self, key: CacheKey) -> Optional[List[float]]:
+        now = time.monotonic()
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                expires_at, vector = entry
+                if expires_at is None or now < expires_at:
+                    self._entries.move_to_end(key)
+                    self.hits += 1
+                    return vector
+                del self._entries[key]
+        vector = self._shared_get(key)
+        with self._lock:
+            if vector is None:
+                self.misses += 1
+                return None
+            self.shared_hits += 1
+        self._local_set(key, vector)
+        return vector
+
+    def set(self, key: CacheKey, vector: List[float]) -> None:
+        vector = list(vector)
+        self._local_set(key, vector)
+        self._shared_set(key, vector)
+
+    def clear(self) -> None:
+        with self._lock:
+            self._entries.clear()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "hits": self.hits,
+                "shared_hits": self.shared_hits,
+                "misses": self.misses,
+                "size": len(self._entries),
+            }
+
+    # ------------------------------------------------------------- internals
+
+    def _local_set(self, key: CacheKey, vector: List[float]) -> None:
+        expires_at = time.monotonic() + self.ttl if self.ttl > 0 else None
+        with self._lock:
+            self._entries[key] = (expires_at, vector)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def _shared_key(self, key: CacheKey) -> str:
+        digest = sha256(json.dumps(list(key), ensure_ascii=False).encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def _shared_cache(self):
+        if not self.alias:
+            return None
+        from django.core.cache import caches
+
+        return caches[self.alias]
+
+    def _shared_get(self, key: CacheKey) -> Optional[List[float]]:
+        try:
+            cache = self._shared_cache()
+            if cache is None:
+                return None
+            value = cache.get(self._shared_key(key))
+        except Exception as exc:  # noqa: BLE001 - недоступный Redis не ломает поиск
+            log.warning("Query embedding cache: shared get failed: %s", exc)
+            return None
+        return list(value) if value is not None else None
+
+    def _shared_set(self, key: CacheKey, vector: List[float]) -> None:
+        try:
+            cache = self._shared_cache()
+            if cache is None:
+                return
+            cache.set(self._shared_key(key), vector, timeout=self.ttl or None)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Query embedding cache: shared set failed: %s", exc)
+
+
+class CachedEmbeddingBackend(BaseEmbeddingBackend):
+    """Обёртка над embedding-бэкендом, кэширующая только векторы запросов.
+
+    Документы при индексации (``is_query=False``) проходят напрямую: их тексты
+    уникальны, и кэш только вытеснял бы популярные запросы.
+    """
+
+    def __init__(
+        self,
+        backend: BaseEmbeddingBackend,
+        cache: QueryEmbeddingCache,
+        *,
+        profile: str = "default",
+    ) -> None:
+        self.backend = backend
+        self.cache = cache
+        self.profile = profile
+
+    def __getattr__(self, name: str) -> Any:
+        # model_name, dimensions и т.п. — от исходного бэкенда.
+        return getattr(self.backend, name)
+
+    def _key(self, text: str, is_query: bool) -> CacheKey:
+        model_name = str(getattr(self.backend, "model_name", "") or "")
+        return (self.profile, model_name, normalize_query(text), bool(is_query))
+
+    def embed(self, text: str, *, is_query: bool = False) -> List[float]:
+        if not is_query:
+            return self.backend.embed(text, is_query=is_query)
+        key = self._key(text, is_query)
+        cached = self.cache.get(key)
+        if cached is not None:
+            return list(cached)
+        vector = self.backend.embed(text, is_query=is_query)
+        self.cache.set(key, vector)
+        return vector
+
+    def embed_batch(self, texts: Iterable[str], *, is_query: bool = False) -> List[List[float]]:
+        texts_list = list(texts)
+        if not is_query:
+            return self.backend.embed_batch(texts_list, is_query=is_query)
+        out, missing = self._lookup(texts_list, is_query)
+        if missing:
+            vectors = self.backend.embed_batch(
+                [texts_list[idxs[0]] for idxs in missing.values()], is_query=is_query
+            )
+            self._fill(out, missing, vectors)
+        return [vector or [] for vector in out]
+
+    async def aembed(self, text: str, *, is_query: bool = False) -> List[float]:
+        return (await self.aembed_batch([text], is_query=is_query))[0]
+
+    async def aembed_batch(
+        self, texts: Iterable[str], *, is_query: bool = False
+    ) -> List[List[float]]:
+        texts_list = list(texts)
+        if not is_query:
+            return await aembed_texts(self.backend, texts_list, is_query=is_query)
+        # Общий уровень — синхронный Django cache: в async-контексте через поток.
+        shared = bool(self.cache.alias)
+        if shared:
+            out, missing = await sync_to_async(self._lookup)(texts_list, is_query)
+        else:
+            out, missing = self._lookup(texts_list, is_query)
+        if missing:
+            vectors = await aembed_texts(
+                self.backend,
+                [texts_list[idxs[0]] for idxs in missing.values()],
+                is_query=is_query,
+            )
+            if shared:
+                await sync_to_async(self._fill)(out, missing, vectors)
+            else:
+                self._fill(out, missing, vectors)
+        return [vector or [] for vector in out]
+
+    def _lookup(
+        self, texts_list: List[str], is_query: bool
+    ) -> Tuple[List[Optional[List[float]]], Dict[CacheKey, List[int]]]:
+        """Векторы из кэша и индексы промахов (дубликаты запроса — один промах)."""
+        out: List[Optional[List[float]]] = [None] * len(texts_list)
+        missing: Dict[CacheKey, List[int]] = {}
+        for idx, text in enumerate(texts_list):
+            key = self._key(text, is_query)
+            if key in missing:
+                missing[key].append(idx)
+                continue
+            cached = self.cache.get(key)
+            if cached is not None:
+                out[idx] = list(cached)
+            else:
+                missing[key] = [idx]
+        return out, missing
+
+    def _fill(
+        self,
+        out: List[Optional[List[float]]],
+        missing: Dict[CacheKey, List[int]],
+        vectors: List[List[float]],
+    ) -> None:
+        for key, vector in zip(missing, vectors):
+            self.cache.set(key, vector)
+            for idx in missing[key]:
+                out[idx] = list(vector)
+
+
+def get_query_embedding_cache(config: Any) -> QueryEmbeddingCache:
+    """Один кэш на процесс для данной конфигурации (как реестр компонентов)."""
+    cfg = config.query_embedding_cache
+    key = (cfg.max_size, cfg.ttl, cfg.alias, cfg.key_prefix)
+    with _registry_lock:
+        cache = _cache_registry.get(key)
+        if cache is None:
+            cache = QueryEmbeddingCache(
+                max_size=cfg.max_size,
+                ttl=cfg.ttl,
+                alias=cfg.alias,
+                key_prefix=cfg.key_prefix,
+            )
+            _cache_registry[key] = cache
+        return cache
+
+
+def wrap_query_embedding_cache(
+    embedding_backend: Any,
+    config: Any,
+    profile: Optional[str] = None,
+) -> Any:
+    """Обернуть бэкенд кэшем, если ``QUERY_EMBEDDING_CACHE.ENABLED``."""
+    if not config.query_embedding_cache.enabled:
+        return embedding_backend
+    if isinstance(embedding_backend, CachedEmbeddingBackend):
+        return embedding_backend
+    return CachedEmbeddingBackend(
+        embedding_backend,
+        get_query_embedding_cache(config),
+        profile=profile or config.default_embedding,
+    )
+
+
+def clear_query_embedding_caches() -> None:
+    with _registry_lock:
+        _cache_registry.clear()
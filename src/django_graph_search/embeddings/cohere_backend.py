@@ -27,6 +27,7 @@ class CohereEmbeddingBackend(BaseEmbeddingBackend):
         self.api_key = options.get("api_key") or os.environ.get("COHERE_API_KEY")
         self.batch_size = int(options.get("batch_size", 96))
         self._client = None
+        self._async_client = None
 
     def _get_client(self):
         if self._client is None:
@@ -40,6 +41,18 @@ class CohereEmbeddingBackend(BaseEmbeddingBackend):
             self._client = cohere.Client(api_key=self.api_key)
         return self._client
 
+    def _get_async_client(self):
+        if self._async_client is None:
+            try:
+                import cohere
+            except ImportError as exc:
+                raise BackendError(
+                    "cohere package is required for CohereEmbeddingBackend. "
+                    "Install: pip install django-graph-search[cohere]"
+                ) from exc
+            self._async_client = cohere.AsyncClient(api_key=self.api_key)
+        return self._async_client
+
     def _input_type(self, *, is_query: bool) -> str:
         return "search_query" if is_query else "search_document"
 
@@ -62,20 +75,54 @@ class CohereEmbeddingBackend(BaseEmbeddingBackend):
                     input_type=input_type,
                     embedding_types=["float"],
                 )
-                emb = resp.embeddings
-                if emb is None:
-                    raise BackendError("Cohere embed response missing embeddings.")
-                floats = getattr(emb, "float", None)
-                if floats is None and isinstance(emb, list):
-                    vecs = emb
-                elif floats is not None:
-                    vecs = floats
-                else:
-                    vecs = list(emb)
-                results.extend([list(row) for row in vecs])
+                results.extend(self._vectors_from_response(resp))
+            except BackendError:
+                raise
+            except Exception as exc:  # noqa: BLE001
+                log.error("Cohere embeddings API failed: %s", exc, exc_info=True)
+                raise
+        return results
+
+    async def aembed(self, text: str, *, is_query: bool = False) -> List[float]:
+        return (await self.aembed_batch([text], is_query=is_query))[0]
+
+    async def aembed_batch(
+        self, texts: Iterable[str], *, is_query: bool = False
+    ) -> List[List[float]]:
+        """Как :meth:`embed_batch`, но через ``cohere.AsyncClient``."""
+        texts_list = list(texts)
+        if not texts_list:
+            return []
+        client = self._get_async_client()
+        input_type = self._input_type(is_query=is_query)
+        results: List[List[float]] = []
+        for i in range(0, len(texts_list), self.batch_size):
+            batch = texts_list[i : i + self.batch_size]
+            try:
+                resp = await client.embed(
+                    texts=batch,
+                    model=self.model_name,
+                    input_type=input_type,
+                    embedding_types=["float"],
+                )
+                results.extend(self._vectors_from_response(resp))
             except BackendError:
                 raise
             except Exception as exc:  # noqa: BLE001
                 log.error("Cohere embeddings API failed: %s", exc, exc_info=True)
                 raise
         return results
+
+    @staticmethod
+    def _vectors_from_response(resp: Any) -> List[List[float]]:
+        emb = resp.embeddings
+        if emb is None:
+            raise BackendError("Cohere embed response missing embeddings.")
+        floats = getattr(emb, "float", None)
+        if floats is None and isinstance(emb, list):
+            vecs = emb
+        elif floats is not None:
+            vecs = floats
+        else:
+            vecs = list(emb)
+        return [list(row) for row in vecs]
@@ -46,6 +46,7 @@ class OpenAIEmbeddingBackend(BaseEmbeddingBackend):
         self.timeout = float(options.get("timeout", 30))
         self.max_retries = int(options.get("max_retries", 3))
         self._client = None
+        self._async_client = None
 
     def _get_client(self):
         if self._client is None:
@@ -63,6 +64,31 @@ class OpenAIEmbeddingBackend(BaseEmbeddingBackend):
             )
         return self._client
 
+    def _get_async_client(self):
+        if self._async_client is None:
+            try:
+                from openai import AsyncOpenAI
+            except ImportError as exc:
+                raise BackendError(
+                    "openai package is required for OpenAIEmbeddingBackend. "
+                    "Install: pip install django-graph-search[openai]"
+                ) from exc
+            self._async_client = AsyncOpenAI(
+                api_key=self.api_key,
+                timeout=self.timeout,
+                max_retries=self.max_retries,
+            )
+        return self._async_client
+
+    def _request_kwargs(self, batch: List[str]) -> Dict[str, Any]:
+        kwargs: Dict[str, Any] = {
+            "input": [t.replace("\n", " ") for t in batch],
+            "model": self.model_name,
+        }
+        if "text-embedding-3" in self.model_name and self.dimensions:
+            kwargs["dimensions"] = self.dimensions
+        return kwargs
+
     def embed(self, text: str, *, is_query: bool = False) -> List[float]:
         return self.embed_batch([text], is_query=is_query)[0]
 
@@ -75,15 +101,32 @@ class OpenAIEmbeddingBackend(BaseEmbeddingBackend):
         results: List[List[float]] = []
         for i in range(0, len(texts_list), self.batch_size):
             batch = texts_list[i : i + self.batch_size]
-            cleaned = [t.replace("\n", " ") for t in batch]
-            kwargs: Dict[str, Any] = {
-                "input": cleaned,
-                "model": self.model_name,
-            }
-            if "text-embedding-3" in self.model_name and self.dimensions:
-                kwargs["dimensions"] = self.dimensions
             try:
-                response = client.embeddings.create(**kwargs)
+                response = client.embeddings.create(**self._request_kwargs(batch))
+                for item in sorted(response.data, key=lambda x: x.index):
+                    results.append(list(item.embedding))
+            except Exception as exc:  # noqa: BLE001
+                log.error("OpenAI embeddings API failed: %s", exc, exc_info=True)
+                raise
+        return results
+
+    async def aembed(self, text: str, *, is_query: bool = False) -> List[float]:
+        return (await self.aembed_batch([text], is_query=is_query))[0]
+
+    async def aembed_batch(
+        self, texts: Iterable[str], *, is_query: bool = False
+    ) -> List[List[float]]:
+        """Как :meth:`embed_batch`, но через ``AsyncOpenAI`` — без потока на запрос."""
+        del is_query
+        texts_list = list(texts)
+        if not texts_list:
+            return []
+        client = self._get_async_client()
+        results: List[List[float]] = []
+        for i in range(0, len(texts_list), self.batch_size):
+            batch = texts_list[i : i + self.batch_size]
+            try:
+                response = await client.embeddings.create(**self._request_kwargs(batch))
                 for item in sorted(response.data, key=lambda x: x.index):
                     results.append(list(item.embedding))
             except Exception as exc:  # noqa: BLE001
@@ -9,3 +9,6 @@ class ConfigurationError(GraphSearchError):
 class BackendError(GraphSearchError):
     pass
 
+
+class InvalidCursorError(GraphSearchError):
+    pass
@@ -2,11 +2,12 @@
 from __future__ import annotations
 
 from dataclasses import dataclass
-from typing import TYPE_CHECKING, List, Optional
+from typing import TYPE_CHECKING, Any, Dict, List, Optional, Sequence
 
 from django.apps import apps
 from django.utils.module_loading import import_string
 
+from .component_registry import get_registered_vector_store
 from .settings import GraphSearchConfig, get_settings
 
 if TYPE_CHECKING:
@@ -36,6 +37,15 @@ class IndexCoverageReport:
     vector_store_backend: str
 
 
+def _indexed_counts(vector_store: Any, labels: Sequence[str]) -> Dict[str, int]:
+    """Счётчики ``count_by_model`` одним вызовом; duck-typed стор без него —
+    ``count_documents`` на модель."""
+    count_by_model = getattr(vector_store, "count_by_model", None)
+    if callable(count_by_model):
+        return dict(count_by_model(list(labels)))
+    return {label: vector_store.count_documents({"model": label}) for label in labels}
+
+
 def get_index_coverage(
     config: Optional[GraphSearchConfig] = None,
     *,
@@ -47,6 +57,9 @@ def get_index_coverage(
     При db_count == 0 считаем покрытие тривиально полным (100%): индексировать нечего.
     """
     cfg = config or get_settings()
+    if vector_store is None:
+        # Стор воркера: его счётчики count_by_model и загруженный индекс.
+        vector_store = get_registered_vector_store(cfg)
     if vector_store is None:
         backend_cls = import_string(cfg.vector_store.backend)
         vector_store = backend_cls(**cfg.vector_store.options)
@@ -55,12 +68,15 @@ def get_index_coverage(
     total_db = 0
     total_indexed = 0
 
-    for model_cfg in cfg.models:
-        app_label, model_name = model_cfg.model.split(".", 1)
-        model_cls = apps.get_model(app_label, model_name)
+    model_classes = [
+        apps.get_model(*model_cfg.model.split(".", 1)) for model_cfg in cfg.models
+    ]
+    indexed = _indexed_counts(vector_store, [m._meta.label for m in model_classes])
+
+    for model_cls in model_classes:
         label = model_cls._meta.label
         db_count = model_cls.objects.count()
-        indexed_count = vector_store.count_documents({"model": label})
+        indexed_count = int(indexed.get(label, 0))
         total_db += db_count
         total_indexed += indexed_count
 
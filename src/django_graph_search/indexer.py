@@ -2,7 +2,8 @@ from __future__ import annotations
 
 # pylint: disable=duplicate-code
 
-from typing import Iterable, List, Optional
+from contextlib import contextmanager
+from typing import Iterable, Iterator, List, Optional, Set
 
 from django.apps import apps
 from django.db import models
@@ -11,7 +12,9 @@ from .cache import BaseDeltaCache, build_delta_cache
 from .exceptions import ConfigurationError
 from .components import ComponentMixin
 from .graph_resolver import GraphResolver
+from .result_cache import bump_index_generation
 from .settings import GraphSearchConfig, ModelConfig
+from .text_store import BaseTextStore, get_text_store
 from .utils import hash_text
 
 
@@ -19,6 +22,86 @@ def make_doc_id(model_label: str, pk: object) -> str:
     return f"{model_label}:{pk}"
 
 
+def make_document(
+    model_label: str,
+    pk: object,
+    embedding: List[float],
+    text: str,
+    *,
+    text_hash: str,
+    text_store: Optional[BaseTextStore] = None,
+) -> Document:
+    """Документ для vector store по ``TEXT_STORAGE``.
+
+    Без ``text_store`` текст кладётся в ``metadata["text"]``; иначе metadata —
+    только ``model`` / ``pk`` / ``text_hash``, а текст пишет в своё хранилище
+    вызывающий код (``text_store.put_many``).
+    """
+    metadata: dict = {"model": model_label, "pk": pk}
+    if text_store is None:
+        metadata["text"] = text
+    else:
+        metadata["text_hash"] = text_hash
+    keep_text = text_store is None or text_store.keeps_text_in_vector_store
+    return Document(
+        id=make_doc_id(model_label, pk),
+        embedding=embedding,
+        metadata=metadata,
+        text=text if keep_text else None,
+    )
+
+
+class BulkIngestRun:
+    """Один :func:`bulk_ingest`: id, записанные в delta-кэш (``None`` без
+    кэша), и модели, чьи поколения индекса поднимаются после flush."""
+
+    def __init__(self, track_written: bool) -> None:
+        self.written: Optional[List[str]] = [] if track_written else None
+        self.models: Set[str] = set()
+
+
+@contextmanager
+def bulk_ingest(
+    vector_store,
+    delta_cache: Optional[BaseDeltaCache] = None,
+    config: Optional[GraphSearchConfig] = None,
+) -> Iterator[BulkIngestRun]:
+    """``vector_store.bulk_ingest()`` для массовой индексации.
+
+    Запись пакета может идти в фоне, пока эмбеддится следующий, поэтому
+    ошибка записи всплывает позже, чем delta-кэш помечает документы
+    проиндексированными. Индексатор кладёт в ``run.written`` id с записанным
+    хэшем; при ошибке эти записи кэша удаляются, и следующий запуск
+    переиндексирует документы. Поколения ``run.models`` поднимаются на выходе,
+    после flush: раньше кэш результатов мог бы заново закэшировать выдачу без
+    ещё не записанных документов.
+    """
+    ingest = getattr(vector_store, "bulk_ingest", None)
+    run = BulkIngestRun(track_written=delta_cache is not None)
+    try:
+        if callable(ingest):
+            with ingest():
+                yield run
+        else:
+            yield run
+    except BaseException:
+        for doc_id in run.written or ():
+            delta_cache.delete(doc_id)
+        raise
+    finally:
+        # И после ошибки: часть пакетов могла записаться.
+        if run.models and config is not None:
+            bump_index_generation(config, run.models)
+
+
+def compact_vector_store(vector_store) -> None:
+    """Сжать store после полной переиндексации, если он это умеет (FAISS:
+    мёртвые слоты HNSW и лог мутаций)."""
+    compact = getattr(vector_store, "compact", None)
+    if callable(compact):
+        compact()
+
+
 def get_indexer(
     config: Optional[GraphSearchConfig] = None,
     **kwargs,
@@ -66,6 +149,9 @@ class Indexer(ComponentMixin):
         self.delta_cache = delta_cache
         if self.delta_cache is None and self.config.delta_indexing:
             self.delta_cache = build_delta_cache(self.config)
+        # Текущий bulk_ingest (index_queryset), иначе None.
+        self._bulk: Optional[BulkIngestRun] = None
+        self.text_store = get_text_store(self.config, self.vector_store)
 
     def index_queryset(
         self,
@@ -75,14 +161,20 @@ class Indexer(ComponentMixin):
     ) -> int:
         total = 0
         batch: List[models.Model] = []
-        # chunk_size=batch_size: иначе iterator() игнорирует prefetch_related.
-        for instance in self._apply_prefetch(queryset, config).iterator(chunk_size=batch_size):
-            batch.append(instance)
-            if len(batch) >= batch_size:
-                total += self._index_batch(batch, config)
-                batch = []
-        if batch:
-            total += self._index_batch(batch, config)
+        queryset = self._apply_prefetch(queryset, config)
+        with bulk_ingest(self.vector_store, self.delta_cache, self.config) as run:
+            self._bulk = run
+            try:
+                # chunk_size=batch_size: иначе iterator() игнорирует prefetch_related.
+                for instance in queryset.iterator(chunk_size=batch_size):
+                    batch.append(instance)
+                    if len(batch) >= batch_size:
+                        total += self._index_batch(batch, config)
+                        batch = []
+                if batch:
+                    total += self._index_batch(batch, config)
+            finally:
+                self._bulk = None
         return total
 
     @staticmethod
@@ -121,8 +213,11 @@ class Indexer(ComponentMixin):
     def delete_instance(self, model_name: str, pk: object) -> None:
         doc_id = make_doc_id(model_name, pk)
         self.vector_store.delete([doc_id])
+        if self.text_store is not None:
+            self.text_store.delete_many([doc_id])
         if self.delta_cache is not None:
             self.delta_cache.delete(doc_id)
+        bump_index_generation(self.config, [model_name])
 
     def rebuild_all(self) -> dict:
         result = {}
@@ -130,6 +225,7 @@ class Indexer(ComponentMixin):
             model_cls = self._get_model_class(model_cfg.model)
             count = self.index_queryset(model_cls.objects.all(), model_cfg)
             result[model_cfg.model] = count
+        compact_vector_store(self.vector_store)
         return result
 
     def _index_batch(self, batch: Iterable[models.Model], config: ModelConfig) -> int:
@@ -149,28 +245,35 @@ class Indexer(ComponentMixin):
 
         texts = [item[1] for item in prepared]
         embeddings = self.embedding_backend.embed_batch(texts, is_query=False)
-        documents: List[Document] = []
-        for (instance, text, text_hash), embedding in zip(prepared, embeddings):
-            model_label = instance._meta.label
-            doc_id = make_doc_id(model_label, instance.pk)
-            documents.append(
-                Document(
-                    id=doc_id,
-                    embedding=embedding,
-                    metadata={
-                        "model": model_label,
-                        "pk": instance.pk,
-                        "text": text,
-                    },
-                    text=text,
-                )
+        documents = [
+            make_document(
+                instance._meta.label,
+                instance.pk,
+                embedding,
+                text,
+                text_hash=text_hash,
+                text_store=self.text_store,
+            )
+            for (instance, text, text_hash), embedding in zip(prepared, embeddings)
+        ]
+        if self.text_store is not None:
+            # Текст — раньше вектора: найденный hit всегда может его дочитать.
+            self.text_store.put_many(
+                {doc.id: text for doc, (_, text, _) in zip(documents, prepared)}
             )
         self.vector_store.add_documents(documents)
+        touched = {doc.metadata["model"] for doc in documents}
+        if self._bulk is not None:
+            self._bulk.models.update(touched)
+        else:
+            bump_index_generation(self.config, touched)
         if self.delta_cache is not None:
             ttl = self.config.cache.ttl
             for instance, _text, text_hash in prepared:
                 doc_id = make_doc_id(instance._meta.label, instance.pk)
                 self.delta_cache.set(doc_id, text_hash, ttl=ttl)
+                if self._bulk is not None and self._bulk.written is not None:
+                    self._bulk.written.append(doc_id)
         return len(documents)
 
     def _get_model_class(self, model_path: str):
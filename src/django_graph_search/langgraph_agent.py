@@ -23,9 +23,11 @@ from __future__ import annotations
 import logging
 from typing import Any, Callable, Dict, List, Optional, TypedDict
 
+from .backends.base import batched_search, model_filters
 from .events import EventHub
 from .llm.base import BaseLLMBackend, RerankCandidate
 from .settings import GraphSearchConfig
+from .text_store import BaseTextStore, get_text_store, missing_texts
 
 log = logging.getLogger(__name__)
 
@@ -131,16 +133,20 @@ def vector_search_node(
     queries = [q for q in queries if q]
     limit = int(state.get("limit") or 0) or 20
 
+    # Ограничение по моделям — фильтром в vector store, а не пост-фильтром.
+    filters = model_filters(state.get("models"))
+
     # Multi-query merge keyed by document id.
     merged: Dict[str, Any] = {}
-    for q in queries:
-        try:
-            vec = embedding_backend.embed(q, is_query=True)
-            hits = vector_store.search(vec, limit=limit, filters=None)
-        except Exception as exc:  # noqa: BLE001
-            log.warning("Vector search failed for query=%r: %s", q, exc)
-            state.setdefault("errors", []).append(f"vector_search: {exc}")
-            continue
+    hits_per_query = _search_queries(
+        state,
+        queries,
+        limit,
+        filters,
+        embedding_backend=embedding_backend,
+        vector_store=vector_store,
+    )
+    for hits in hits_per_query:
         for hit in hits:
             key = _doc_key(hit)
             existing = merged.get(key)
@@ -149,6 +155,7 @@ def vector_search_node(
 
     results = list(merged.values())
 
+    # Страховка для сторов, не поддерживающих фильтр (duck typing).
     models_filter = state.get("models")
     if models_filter:
         allowed = set(models_filter)
@@ -163,13 +170,50 @@ def vector_search_node(
     return state
 
 
+def _search_queries(
+    state: SearchState,
+    queries: List[str],
+    limit: int,
+    filters: Optional[Dict[str, Any]],
+    *,
+    embedding_backend,
+    vector_store,
+) -> List[List[Any]]:
+    """Hits for every query: one ``embed_batch`` plus one ``search_batch``.
+
+    If the batched call fails we retry query by query so that a single bad
+    query only drops its own hits (and is recorded in ``state["errors"]``).
+    """
+    if not queries:
+        return []
+    try:
+        vectors = embedding_backend.embed_batch(queries, is_query=True)
+        return batched_search(vector_store, vectors, limit=limit, filters=filters)
+    except Exception as exc:  # noqa: BLE001
+        log.warning("Batched vector search failed, retrying per query: %s", exc)
+    out: List[List[Any]] = []
+    for q in queries:
+        try:
+            vec = embedding_backend.embed(q, is_query=True)
+            out.append(vector_store.search(vec, limit=limit, filters=filters))
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Vector search failed for query=%r: %s", q, exc)
+            state.setdefault("errors", []).append(f"vector_search: {exc}")
+    return out
+
+
 def rerank_results_node(
     state: SearchState,
     *,
     config: GraphSearchConfig,
     llm: BaseLLMBackend,
+    text_store: Optional[BaseTextStore] = None,
 ) -> SearchState:
-    """Optionally rerank the top-K candidates via the LLM backend."""
+    """Optionally rerank the top-K candidates via the LLM backend.
+
+    With ``TEXT_STORAGE`` ``external`` the text of the top-K candidates is
+    fetched from ``text_store`` in one call; the tail is never read.
+    """
     candidates = state.get("merged_results") or []
     if not candidates:
         state["reranked_results"] = []
@@ -178,10 +222,11 @@ def rerank_results_node(
     head = candidates[:top_k]
     tail = candidates[top_k:]
 
+    texts = missing_texts(text_store, head)
     rerank_inputs = [
         RerankCandidate(
             id=_doc_key(item),
-            text=_candidate_rerank_text(item),
+            text=_candidate_rerank_text(item) or texts.get(str(getattr(item, "id", "")), ""),
             score=_score_value(item),
             metadata=dict(item.metadata or {}),
         )
@@ -262,6 +307,8 @@ def build_search_graph(
             event_hub=event_hub,
         )
 
+    text_store = get_text_store(config, vector_store)
+
     def _wrap(name: str, fn):
         if event_hub is None:
             return fn
@@ -303,7 +350,10 @@ def build_search_graph(
     )
     graph.add_node(
         "rerank_results",
-        _wrap("rerank_results", lambda s: rerank_results_node(s, config=config, llm=llm)),
+        _wrap(
+            "rerank_results",
+            lambda s: rerank_results_node(s, config=config, llm=llm, text_store=text_store),
+        ),
     )
     graph.add_node("postprocess_results", _wrap("postprocess_results", postprocess_results_node))
 
@@ -348,6 +398,7 @@ class _FallbackGraph:
         self.vector_store = vector_store
         self.llm = llm
         self.event_hub = event_hub
+        self.text_store = get_text_store(config, vector_store)
 
     def _emit(self, event: Dict[str, Any]) -> None:
         if self.event_hub is not None:
@@ -372,7 +423,9 @@ class _FallbackGraph:
             "candidate_count": len(state.get("merged_results") or []),
         })
         if self.config.langgraph.reranking:
-            state = rerank_results_node(state, config=self.config, llm=self.llm)
+            state = rerank_results_node(
+                state, config=self.config, llm=self.llm, text_store=self.text_store
+            )
             self._emit({
                 "type": "rerank_completed",
                 "candidate_count": len(state.get("reranked_results") or []),
@@ -31,8 +31,16 @@ from django.db import models
 from .backends.base import Document
 from .components import ComponentMixin
 from .graph_resolver import GraphResolver
-from .indexer import make_doc_id
+from .indexer import (
+    BulkIngestRun,
+    bulk_ingest,
+    compact_vector_store,
+    make_doc_id,
+    make_document,
+)
+from .result_cache import bump_index_generation
 from .settings import GraphSearchConfig, ModelConfig
+from .text_store import BaseTextStore, get_text_store
 from .utils import hash_text
 
 log = logging.getLogger(__name__)
@@ -194,10 +202,13 @@ def persist_node(
     vector_store,
     delta_cache,
     cache_ttl: int,
+    written_ids: Optional[List[str]] = None,
+    text_store: Optional[BaseTextStore] = None,
 ) -> Dict[str, Any]:
     documents = state["documents"]
     embeddings = state["embeddings"]
     payload: List[Document] = []
+    texts: Dict[str, str] = {}
     for doc, embedding in zip(documents, embeddings):
         instance: models.Model = doc["instance"]
         doc_id = make_doc_id(instance._meta.label, instance.pk)
@@ -206,29 +217,29 @@ def persist_node(
             if cached_hash == doc["text_hash"]:
                 continue
         payload.append(
-            Document(
-                id=doc_id,
-                embedding=embedding,
-                metadata={
-                    "model": instance._meta.label,
-                    "pk": instance.pk,
-                    "text": doc["text"],
-                },
-                text=doc["text"],
+            make_document(
+                instance._meta.label,
+                instance.pk,
+                embedding,
+                doc["text"],
+                text_hash=doc["text_hash"],
+                text_store=text_store,
             )
         )
+        texts[doc_id] = doc["text"]
     if not payload:
         state["written"] = 0
         return state
+    if text_store is not None:
+        text_store.put_many(texts)
     vector_store.add_documents(payload)
     if delta_cache is not None:
         for doc in documents:
             instance = doc["instance"]
-            delta_cache.set(
-                make_doc_id(instance._meta.label, instance.pk),
-                doc["text_hash"],
-                ttl=cache_ttl,
-            )
+            doc_id = make_doc_id(instance._meta.label, instance.pk)
+            delta_cache.set(doc_id, doc["text_hash"], ttl=cache_ttl)
+            if written_ids is not None:
+                written_ids.append(doc_id)
     state["written"] = len(payload)
     return state
 
@@ -274,6 +285,8 @@ class SmartIndexer(ComponentMixin):
             from .cache import build_delta_cache
 
             self.delta_cache = build_delta_cache(self.config)
+        self._bulk: Optional[BulkIngestRun] = None
+        self.text_store = get_text_store(self.config, self.vector_store)
 
     @staticmethod
     def _normalise_templates(
@@ -299,8 +312,11 @@ class SmartIndexer(ComponentMixin):
         """Mirror :meth:`Indexer.delete_instance` for compatibility."""
         doc_id = make_doc_id(model_name, pk)
         self.vector_store.delete([doc_id])
+        if self.text_store is not None:
+            self.text_store.delete_many([doc_id])
         if self.delta_cache is not None:
             self.delta_cache.delete(doc_id)
+        bump_index_generation(self.config, [model_name])
 
     def rebuild_all(self) -> dict:
         from django.apps import apps
@@ -311,6 +327,7 @@ class SmartIndexer(ComponentMixin):
             model_cls = apps.get_model(app_label, model_name)
             count = self.index_queryset(model_cls.objects.all(), model_cfg)
             result[model_cfg.model] = count
+        compact_vector_store(self.vector_store)
         return result
 
     def index_queryset(
@@ -321,13 +338,18 @@ class SmartIndexer(ComponentMixin):
     ) -> int:
         total = 0
         batch: List[models.Model] = []
-        for instance in queryset.iterator():
-            batch.append(instance)
-            if len(batch) >= batch_size:
-                total += self._index_batch(batch, config)
-                batch = []
-        if batch:
-            total += self._index_batch(batch, config)
+        with bulk_ingest(self.vector_store, self.delta_cache, self.config) as run:
+            self._bulk = run
+            try:
+                for instance in queryset.iterator():
+                    batch.append(instance)
+                    if len(batch) >= batch_size:
+                        total += self._index_batch(batch, config)
+                        batch = []
+                if batch:
+                    total += self._index_batch(batch, config)
+            finally:
+                self._bulk = None
         return total
 
     def _index_batch(
@@ -347,8 +369,15 @@ class SmartIndexer(ComponentMixin):
             vector_store=self.vector_store,
             delta_cache=self.delta_cache,
             cache_ttl=self.config.cache.ttl,
+            written_ids=self._bulk.written if self._bulk is not None else None,
+            text_store=self.text_store,
         )
-        return int(state.get("written", 0))
+        written = int(state.get("written", 0))
+        if written and self._bulk is not None:
+            self._bulk.models.add(cfg.model)
+        elif written:
+            bump_index_generation(self.config, [cfg.model])
+        return written
 
 
 # ---------------------------------------------------------------------------
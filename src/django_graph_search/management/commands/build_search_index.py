@@ -1,7 +1,7 @@
 from django.apps import apps
 from django.core.management.base import BaseCommand
 
-from ...indexer import get_indexer
+from ...indexer import compact_vector_store, get_indexer
 from ...settings import get_settings
 
 
@@ -10,6 +10,12 @@ class Command(BaseCommand):
 
     def add_arguments(self, parser):
         parser.add_argument("--model", help="Model label in 'app.Model' format.")
+        parser.add_argument(
+            "--batch-size",
+            type=int,
+            default=100,
+            help="Objects per embed_batch / add_documents call (default: 100).",
+        )
 
     def handle(self, *args, **options):
         config = get_settings()
@@ -28,8 +34,11 @@ class Command(BaseCommand):
         for cfg in model_cfgs:
             app_label, model_name = cfg.model.split(".", 1)
             model_cls = apps.get_model(app_label, model_name)
-            count = indexer.index_queryset(model_cls.objects.all(), cfg)
+            count = indexer.index_queryset(
+                model_cls.objects.all(), cfg, batch_size=max(1, options["batch_size"])
+            )
             result[cfg.model] = count
+        compact_vector_store(indexer.vector_store)
 
         for model_name, count in result.items():
             self.stdout.write(f"{model_name}: {count}")
@@ -1,7 +1,9 @@
 from django.core.management.base import BaseCommand
 from django.utils.module_loading import import_string
 
+from ...result_cache import bump_index_generation
 from ...settings import get_settings
+from ...text_store import get_text_store
 
 
 class Command(BaseCommand):
@@ -12,5 +14,9 @@ class Command(BaseCommand):
         backend_cls = import_string(config.vector_store.backend)
         vector_store = backend_cls(**config.vector_store.options)
         vector_store.clear_collection()
+        text_store = get_text_store(config, vector_store)
+        if text_store is not None:
+            text_store.clear()
+        bump_index_generation(config)
         self.stdout.write(self.style.SUCCESS("Search index cleared."))
 
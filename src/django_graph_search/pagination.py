@@ -0,0 +1,111 @@
+"""
+Курсорная пагинация поверх закэшированного списка кандидатов.
+
+Первая страница один раз выполняет векторный поиск с ``MAX_CANDIDATES`` и
+кладёт ранжированный список hits в Django cache. Курсор — подписанный
+(``django.core.signing``) токен со ссылкой на этот список и смещением, поэтому
+следующие страницы стоят одно чтение из кэша и гидрацию одной страницы —
+без повторного embed и ANN-запроса.
+
+Конфигурация::
+
+    "PAGINATION": {
+        "ENABLED": True,
+        "ALIAS": "default",
+        "MAX_CANDIDATES": 200,
+        "TTL": 600,
+    }
+"""
+from __future__ import annotations
+
+import uuid
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Tuple
+
+from django.core import signing
+from django.core.cache import caches
+
+from .backends.base import SearchResult
+from .exceptions import InvalidCursorError
+
+_CURSOR_SALT = "django_graph_search.pagination.cursor"
+# Из metadata кандидата сохраняем только то, что нужно для форматирования.
+_KEPT_METADATA = ("model", "pk", "text", "vector_distance")
+
+
+@dataclass(frozen=True)
+class Cursor:
+    token: str
+    offset: int
+    page_size: int
+    fields: Optional[Tuple[str, ...]] = None
+
+
+def encode_cursor(cursor: Cursor) -> str:
+    payload = {
+        "t": cursor.token,
+        "o": cursor.offset,
+        "n": cursor.page_size,
+        "f": list(cursor.fields) if cursor.fields is not None else None,
+    }
+    return signing.dumps(payload, salt=_CURSOR_SALT, compress=True)
+
+
+def decode_cursor(value: str) -> Cursor:
+    """Разобрать курсор клиента.
+
+    Raises:
+        InvalidCursorError: подпись не сошлась или формат неверен.
+    """
+    try:
+        payload = signing.loads(value, salt=_CURSOR_SALT)
+        fields = payload.get("f")
+        return Cursor(
+            token=str(payload["t"]),
+            offset=int(payload["o"]),
+            page_size=int(payload["n"]),
+            fields=tuple(fields) if fields is not None else None,
+        )
+    except (signing.BadSignature, KeyError, TypeError, ValueError, AttributeError) as exc:
+        raise InvalidCursorError("Invalid cursor.") from exc
+
+
+class CandidateCache:
+    """Ранжированные списки кандидатов в Django cache под случайным токеном."""
+
+    def __init__(self, alias: str = "default", key_prefix: str = "dgs:page", ttl: int = 600):
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self.ttl = int(ttl)
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _key(self, token: str) -> str:
+        return f"{self.key_prefix}:{token}"
+
+    def store(self, hits: List[Any]) -> str:
+        token = uuid.uuid4().hex
+        payload = [_serialize_hit(hit) for hit in hits]
+        self._cache.set(self._key(token), payload, timeout=self.ttl or None)
+        return token
+
+    def load(self, token: str) -> List[SearchResult]:
+        """Raises InvalidCursorError, если список истёк или вытеснен."""
+        payload = self._cache.get(self._key(token))
+        if payload is None:
+            raise InvalidCursorError("Cursor has expired.")
+        return [
+            SearchResult(id=item["id"], score=item["score"], metadata=item["metadata"])
+            for item in payload
+        ]
+
+
+def _serialize_hit(hit: Any) -> Dict[str, Any]:
+    metadata = getattr(hit, "metadata", None) or {}
+    return {
+        "id": str(getattr(hit, "id", "")),
+        "score": float(hit.score) if hit.score is not None else 0.0,
+        "metadata": {key: metadata[key] for key in _KEPT_METADATA if key in metadata},
+    }
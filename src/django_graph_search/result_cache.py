@@ -0,0 +1,119 @@
+"""
+Кэш готовой выдачи ``Searcher.search`` / ``find_similar``.
+
+Инвалидация — через «поколение индекса» модели: счётчик в Django cache,
+который увеличивают индексатор (``_index_batch``, ``delete_instance``) и
+``clear_search_index``. Поколения всех моделей запроса входят в ключ, поэтому
+после переиндексации старые записи просто перестают находиться и истекают
+по TTL — устаревшая выдача не отдаётся никогда.
+
+Конфигурация::
+
+    "RESULT_CACHE": {
+        "ENABLED": True,
+        "ALIAS": "default",   # Django cache (Redis — общий для воркеров и Celery)
+        "TTL": 300,
+        "KEY_PREFIX": "dgs:results",
+    }
+"""
+from __future__ import annotations
+
+import json
+import logging
+import time
+from hashlib import sha256
+from typing import TYPE_CHECKING, Any, Iterable, List, Optional, Sequence
+
+from django.core.cache import caches
+
+if TYPE_CHECKING:
+    from .settings import GraphSearchConfig
+
+log = logging.getLogger(__name__)
+
+# Поколение «всего индекса»: увеличивается при clear_collection.
+ALL_MODELS = "__all__"
+
+
+class SearchResultCache:
+    """Выдача поиска в Django cache с ключом, зависящим от поколений моделей."""
+
+    def __init__(
+        self,
+        alias: str = "default",
+        key_prefix: str = "dgs:results",
+        ttl: int = 300,
+    ) -> None:
+        self.alias = alias
+        self.key_prefix = key_prefix
+        self.ttl = int(ttl)
+
+    @property
+    def _cache(self):
+        return caches[self.alias]
+
+    def _generation_key(self, model_label: str) -> str:
+        return f"{self.key_prefix}:gen:{model_label}"
+
+    def generations(self, model_labels: Iterable[str]) -> List[Any]:
+        """Текущие поколения ``model_labels`` (+ глобальное) одним ``get_many``."""
+        labels = sorted(set(model_labels)) + [ALL_MODELS]
+        keys = [self._generation_key(label) for label in labels]
+        found = self._cache.get_many(keys)
+        out: List[Any] = []
+        for key in keys:
+            value = found.get(key)
+            if value is None:
+                # Уникальная стартовая метка: если счётчик вытеснят из кэша,
+                # он не вернётся к значению, под которым лежат старые записи.
+                self._cache.add(key, time.time_ns(), timeout=None)
+                value = self._cache.get(key)
+            out.append(value)
+        return out
+
+    def make_key(self, parts: Sequence[Any], model_labels: Iterable[str]) -> str:
+        payload = json.dumps(
+            [list(parts), self.generations(model_labels)],
+            sort_keys=True,
+            default=str,
+            ensure_ascii=False,
+        )
+        digest = sha256(payload.encode("utf-8")).hexdigest()
+        return f"{self.key_prefix}:{digest}"
+
+    def get(self, key: str) -> Optional[List[dict]]:
+        return self._cache.get(key)
+
+    def set(self, key: str, results: List[dict]) -> None:
+        self._cache.set(key, results, timeout=self.ttl or None)
+
+    def bump(self, model_labels: Optional[Iterable[str]] = None) -> None:
+        """Увеличить поколение моделей; ``None`` — инвалидировать весь индекс."""
+        labels = [ALL_MODELS] if model_labels is None else sorted(set(model_labels))
+        for label in labels:
+            key = self._generation_key(label)
+            try:
+                self._cache.incr(key)
+            except ValueError:
+                self._cache.set(key, time.time_ns(), timeout=None)
+
+
+def build_result_cache(config: "GraphSearchConfig") -> Optional[SearchResultCache]:
+    cfg = config.result_cache
+    if not cfg.enabled:
+        return None
+    return SearchResultCache(alias=cfg.alias, key_prefix=cfg.key_prefix, ttl=cfg.ttl)
+
+
+def bump_index_generation(
+    config: "GraphSearchConfig",
+    model_labels: Optional[Iterable[str]] = None,
+) -> None:
+    """Инвалидировать кэш выдачи после записи в индекс (no-op, если кэш выключен)."""
+    cache = build_result_cache(config)
+    if cache is None:
+        return
+    try:
+        cache.bump(model_labels)
+    except Exception as exc:  # noqa: BLE001 - индексация не должна падать из-за кэша
+        log.warning("Result cache: failed to bump index generation: %s", exc)
@@ -3,20 +3,66 @@ from __future__ import annotations
 # pylint: disable=duplicate-code
 
 import logging
-from typing import Iterable, List, Optional
+from collections import defaultdict
+from typing import Any, Awaitable, Callable, Dict, Iterable, List, Optional, Sequence, Tuple
 
+from asgiref.sync import sync_to_async
 from django.apps import apps
 from django.urls import reverse
 
+from .backends.base import EXCLUDE_IDS_KEY, abatched_search, batched_search, model_filters
+from .backends.batching import wrap_search_batching
 from .components import ComponentMixin
+from .embeddings.base import aembed_texts
+from .embeddings.cached import wrap_query_embedding_cache
 from .events import EventHub
 from .graph_resolver import GraphResolver
 from .langgraph_agent import sort_vector_hits
 from .llm import BaseLLMBackend, build_llm_backend
+from .pagination import CandidateCache, Cursor, decode_cursor, encode_cursor
+from .result_cache import build_result_cache
 from .settings import GraphSearchConfig, ModelConfig
+from .text_store import get_text_store, missing_texts
 
 log = logging.getLogger(__name__)
 
+# Ключи hit в выдаче; ``fields`` в search/find_similar выбирает их подмножество.
+RESULT_FIELDS: Tuple[str, ...] = (
+    "model",
+    "pk",
+    "score",
+    "text",
+    "text_preview",
+    "data",
+    "admin_url",
+)
+# Ключи, для которых нужен объект из БД.
+_HYDRATED_FIELDS = frozenset({"data", "admin_url"})
+
+
+def normalize_result_fields(fields: Optional[Iterable[str]]) -> Optional[Tuple[str, ...]]:
+    """Проверить проекцию полей hit; ``None`` — все поля.
+
+    Raises:
+        ValueError: если запрошено неизвестное поле.
+    """
+    if fields is None:
+        return None
+    wanted = {str(f).strip() for f in fields if str(f).strip()}
+    unknown = wanted.difference(RESULT_FIELDS)
+    if unknown:
+        raise ValueError(
+            f"Unknown result fields: {', '.join(sorted(unknown))}. "
+            f"Allowed: {', '.join(RESULT_FIELDS)}."
+        )
+    return tuple(f for f in RESULT_FIELDS if f in wanted)
+
+
+def _clamped_score(item: Any) -> float:
+    raw_score = item.score
+    score = float(raw_score) if raw_score is not None else 0.0
+    return max(0.0, min(1.0, score))
+
 
 class Searcher(ComponentMixin):
     """High-level search facade.
@@ -47,9 +93,21 @@ class Searcher(ComponentMixin):
             resolver=resolver,
             embedding_profile=embedding_profile,
         )
+        # Векторы запросов (в т.ч. в vector_search_node) берутся из кэша, если он включён.
+        self.embedding_backend = wrap_query_embedding_cache(
+            self.embedding_backend, self.config, profile=embedding_profile
+        )
+        # Конкурентные запросы к store склеиваются в один search_batch, если включено.
+        self.vector_store = wrap_search_batching(self.vector_store, self.config)
+        self._embedding_profile = embedding_profile or self.config.default_embedding
+        self._result_cache = build_result_cache(self.config)
+        # TEXT_STORAGE external: текст hits дочитывается одним запросом при форматировании.
+        self.text_store = get_text_store(self.config, self.vector_store)
         self._llm_backend = llm_backend
         self._event_hub = event_hub
         self._compiled_graph = None  # Lazy.
+        # Число ORM-запросов последней гидрации (по одному на модель в выдаче).
+        self.last_hydration_queries = 0
 
     # ------------------------------------------------------------------ public
 
@@ -58,32 +116,301 @@ class Searcher(ComponentMixin):
         query: str,
         models: Optional[Iterable[str]] = None,
         limit: Optional[int] = None,
+        *,
+        min_score: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
     ) -> List[dict]:
+        """Семантический поиск.
+
+        ``fields`` — проекция ключей каждого hit (см. ``RESULT_FIELDS``); без неё
+        отдаются все. Незапрошенные ``data``/``admin_url`` не грузят объекты из БД.
+        """
         limit = limit or self.config.default_results_limit
         model_list = list(models) if models else None
-        if self.config.langgraph.enabled:
-            try:
-                return self._search_via_graph(query, models=model_list, limit=limit)
-            except Exception as exc:  # noqa: BLE001
-                if not self.config.langgraph.fallback_on_error:
-                    raise
-                log.warning("LangGraph search failed, falling back to linear path: %s", exc)
-        return self._search_linear(query, models=model_list, limit=limit)
+        projection = normalize_result_fields(fields)
+
+        def _compute() -> List[dict]:
+            hits = self._search_uncached(query, models=model_list, limit=limit)
+            if min_score is not None:
+                hits = [item for item in hits if _clamped_score(item) >= min_score]
+            return self._format_results(hits, fields=projection)
+
+        scope = model_list or [cfg.model for cfg in self.config.models]
+        return self._cached(
+            ("search", query, sorted(model_list or []), limit, min_score, projection),
+            scope,
+            _compute,
+        )
 
     def find_similar(
         self,
         instance,
         limit: Optional[int] = None,
+        *,
+        fields: Optional[Iterable[str]] = None,
     ) -> List[dict]:
         limit = limit or self.config.default_results_limit
-        model_cfg = self._find_model_config(instance._meta.label)
-        text = self.resolver.build_searchable_text(instance, model_cfg)
+        label = instance._meta.label
+        projection = normalize_result_fields(fields)
+        return self._cached(
+            ("similar", label, str(instance.pk), limit, projection),
+            [label],
+            lambda: self._format_results(
+                self._find_similar_uncached(instance, limit=limit), fields=projection
+            ),
+        )
+
+    async def asearch(
+        self,
+        query: str,
+        models: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        *,
+        min_score: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[dict]:
+        """Асинхронный :meth:`search` для ASGI.
+
+        Embedding и vector store вызываются через их async-варианты
+        (``aembed_batch``, ``asearch_batch``), так что ожидание OpenAI/Qdrant не
+        занимает поток. Гидрация и RESULT_CACHE идут через ``sync_to_async``.
+        LangGraph-пайплайн синхронный — с ним вызов целиком уходит в поток.
+        """
+        if self.config.langgraph.enabled:
+            return await sync_to_async(self.search)(
+                query, models, limit, min_score=min_score, fields=fields
+            )
+        limit = limit or self.config.default_results_limit
+        model_list = list(models) if models else None
+        projection = normalize_result_fields(fields)
+
+        async def _compute() -> List[dict]:
+            vectors = await aembed_texts(self.embedding_backend, [query], is_query=True)
+            hits = (await self._asearch_vectors(vectors, models=model_list, limit=limit))[0]
+            if min_score is not None:
+                hits = [item for item in hits if _clamped_score(item) >= min_score]
+            return await sync_to_async(self._format_results)(hits, fields=projection)
+
+        scope = model_list or [cfg.model for cfg in self.config.models]
+        return await self._acached(
+            ("search", query, sorted(model_list or []), limit, min_score, projection),
+            scope,
+            _compute,
+        )
+
+    async def afind_similar(
+        self,
+        instance,
+        limit: Optional[int] = None,
+        *,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[dict]:
+        """Асинхронный :meth:`find_similar` (см. :meth:`asearch`)."""
+        if self.config.langgraph.enabled and self.config.langgraph.use_for_similar:
+            return await sync_to_async(self.find_similar)(instance, limit, fields=fields)
+        limit = limit or self.config.default_results_limit
+        label = instance._meta.label
+        projection = normalize_result_fields(fields)
+
+        async def _compute() -> List[dict]:
+            hits = await self._afind_similar_linear(instance, limit=limit)
+            return await sync_to_async(self._format_results)(hits, fields=projection)
+
+        return await self._acached(
+            ("similar", label, str(instance.pk), limit, projection),
+            [label],
+            _compute,
+        )
+
+    def search_many(
+        self,
+        queries: Iterable[str],
+        models: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        *,
+        min_score: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+    ) -> List[List[dict]]:
+        """Пакетный поиск: по списку результатов на каждый запрос (в том же порядке).
+
+        Все запросы эмбеддятся одним ``embed_batch``, а hits всех запросов
+        гидрируются вместе — один запрос к БД на модель на весь пакет. С
+        включённым LangGraph каждый запрос идёт через :meth:`search`, чтобы
+        сохранить расширение и rerank.
+        """
+        query_list = list(queries)
+        if not query_list:
+            return []
+        limit = limit or self.config.default_results_limit
+        model_list = list(models) if models else None
+        projection = normalize_result_fields(fields)
+        if self.config.langgraph.enabled:
+            return [
+                self.search(
+                    q, models=model_list, limit=limit, min_score=min_score, fields=projection
+                )
+                for q in query_list
+            ]
+        vectors = self.embedding_backend.embed_batch(query_list, is_query=True)
+        batches = self._search_vectors(list(vectors), models=model_list, limit=limit)
+        if min_score is not None:
+            batches = [
+                [item for item in hits if _clamped_score(item) >= min_score] for hits in batches
+            ]
+        formatted = self._format_results(
+            [item for hits in batches for item in hits], fields=projection
+        )
+        out: List[List[dict]] = []
+        offset = 0
+        for hits in batches:
+            out.append(formatted[offset:offset + len(hits)])
+            offset += len(hits)
+        return out
+
+    def search_page(
+        self,
+        query: Optional[str] = None,
+        models: Optional[Iterable[str]] = None,
+        limit: Optional[int] = None,
+        *,
+        min_score: Optional[float] = None,
+        fields: Optional[Iterable[str]] = None,
+        cursor: Optional[str] = None,
+    ) -> Tuple[List[dict], Optional[str]]:
+        """Страница выдачи и курсор следующей (``None`` — страниц больше нет).
+
+        Без ``cursor`` выполняется поиск на ``PAGINATION.MAX_CANDIDATES`` (но не
+        меньше ``limit``) кандидатов, список кэшируется, возвращается первая
+        страница. С ``cursor`` параметры запроса берутся из него, а страница —
+        срез закэшированного списка; гидрируется только она.
+
+        Raises:
+            InvalidCursorError: курсор подделан или список кандидатов истёк.
+        """
+        pagination = self.config.pagination
+        candidates = CandidateCache(
+            alias=pagination.alias,
+            key_prefix=pagination.key_prefix,
+            ttl=pagination.ttl,
+        )
+        if cursor:
+            page_cursor = decode_cursor(cursor)
+            hits = candidates.load(page_cursor.token)
+        else:
+            page_size = limit or self.config.default_results_limit
+            hits = self._search_uncached(
+                query or "",
+                models=list(models) if models else None,
+                limit=min(max(pagination.max_candidates, page_size), 1000),
+            )
+            if min_score is not None:
+                hits = [item for item in hits if _clamped_score(item) >= min_score]
+            page_cursor = Cursor(
+                token=candidates.store(hits),
+                offset=0,
+                page_size=page_size,
+                fields=normalize_result_fields(fields),
+            )
+        end = page_cursor.offset + page_cursor.page_size
+        results = self._format_results(hits[page_cursor.offset:end], fields=page_cursor.fields)
+        next_cursor = None
+        if end < len(hits):
+            next_cursor = encode_cursor(
+                Cursor(
+                    token=page_cursor.token,
+                    offset=end,
+                    page_size=page_cursor.page_size,
+                    fields=page_cursor.fields,
+                )
+            )
+        return results, next_cursor
+
+    # ------------------------------------------------------------ result cache
+
+    def _cached(
+        self,
+        parts: Sequence[Any],
+        model_labels: Iterable[str],
+        compute: Callable[[], List[dict]],
+    ) -> List[dict]:
+        """Отдать выдачу из RESULT_CACHE или посчитать и сохранить её."""
+        if self._result_cache is None:
+            return compute()
+        key, cached = self._cache_lookup(parts, model_labels)
+        if cached is not None:
+            return cached
+        results = compute()
+        self._cache_store(key, results)
+        return results
+
+    async def _acached(
+        self,
+        parts: Sequence[Any],
+        model_labels: Iterable[str],
+        compute: Callable[[], Awaitable[List[dict]]],
+    ) -> List[dict]:
+        """Async-вариант :meth:`_cached` (Django cache — через ``sync_to_async``)."""
+        if self._result_cache is None:
+            return await compute()
+        key, cached = await sync_to_async(self._cache_lookup)(parts, list(model_labels))
+        if cached is not None:
+            return cached
+        results = await compute()
+        await sync_to_async(self._cache_store)(key, results)
+        return results
+
+    def _cache_lookup(
+        self,
+        parts: Sequence[Any],
+        model_labels: Iterable[str],
+    ) -> Tuple[Optional[str], Optional[List[dict]]]:
+        cache = self._result_cache
+        if cache is None:
+            return None, None
+        key = None
+        try:
+            key = cache.make_key(
+                (self._embedding_profile, self.config.langgraph.enabled, *parts),
+                model_labels,
+            )
+            return key, cache.get(key)
+        except Exception as exc:  # noqa: BLE001 - недоступный кэш не ломает поиск
+            log.warning("Result cache lookup failed: %s", exc)
+            return key, None
+
+    def _cache_store(self, key: Optional[str], results: List[dict]) -> None:
+        if self._result_cache is None or key is None:
+            return
+        try:
+            self._result_cache.set(key, results)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Result cache store failed: %s", exc)
+
+    # ----------------------------------------------------------- search paths
+
+    def _search_uncached(
+        self,
+        query: str,
+        *,
+        models: Optional[List[str]],
+        limit: int,
+    ) -> List[Any]:
+        if self.config.langgraph.enabled:
+            try:
+                return self._search_via_graph(query, models=models, limit=limit)
+            except Exception as exc:  # noqa: BLE001
+                if not self.config.langgraph.fallback_on_error:
+                    raise
+                log.warning("LangGraph search failed, falling back to linear path: %s", exc)
+        return self._search_linear(query, models=models, limit=limit)
+
+    def _find_similar_uncached(self, instance, *, limit: int) -> List[Any]:
         # Reuse the same graph if requested; otherwise stay on the linear path
         # because instance-level similarity has historically been simpler.
         if self.config.langgraph.enabled and self.config.langgraph.use_for_similar:
             try:
                 return self._search_via_graph(
-                    text,
+                    self._similar_text(instance),
                     models=[instance._meta.label],
                     limit=limit,
                 )
@@ -92,28 +419,65 @@ class Searcher(ComponentMixin):
                     raise
                 log.warning("LangGraph find_similar failed, falling back: %s", exc)
 
-        query_vector = self.embedding_backend.embed(text, is_query=True)
+        own_doc_id, filters, fetch = self._similar_query(instance, limit)
+        query_vector = self._stored_vector(own_doc_id)
+        if query_vector is None:
+            # Документа ещё нет в индексе — собираем текст и эмбеддим заново.
+            query_vector = self.embedding_backend.embed(
+                self._similar_text(instance), is_query=True
+            )
+        results = batched_search(self.vector_store, [query_vector], fetch, filters)[0]
+        return sort_vector_hits([item for item in results if item.id != own_doc_id][:limit])
+
+    async def _afind_similar_linear(self, instance, *, limit: int) -> List[Any]:
+        own_doc_id, filters, fetch = self._similar_query(instance, limit)
+        query_vector = await self._astored_vector(own_doc_id)
+        if query_vector is None:
+            text = await sync_to_async(self._similar_text)(instance)
+            query_vector = (await aembed_texts(self.embedding_backend, [text], is_query=True))[0]
+        results = (await abatched_search(self.vector_store, [query_vector], fetch, filters))[0]
+        return sort_vector_hits([item for item in results if item.id != own_doc_id][:limit])
+
+    def _similar_text(self, instance) -> str:
+        model_cfg = self._find_model_config(instance._meta.label)
+        return self.resolver.build_searchable_text(instance, model_cfg)
+
+    def _similar_query(self, instance, limit: int) -> Tuple[str, Dict[str, Any], int]:
+        """doc_id объекта, фильтр «та же модель, кроме него самого» и limit поиска.
+
+        ``EXCLUDE_IDS_KEY`` уходит только в store с ``supports_exclude_ids``;
+        другим — фильтр по модели и ``limit + 1``, свой документ
+        отбрасывается после поиска.
+        """
         from .indexer import make_doc_id
 
         own_doc_id = make_doc_id(instance._meta.label, instance.pk)
-        # Запас: self + возможные дубликаты из старых индексов до upsert-фикса.
-        fetch_limit = max(limit + 1, min(limit * 3, 100))
-        results = self.vector_store.search(
-            query_vector,
-            limit=fetch_limit,
-            filters={"model": instance._meta.label},
-        )
-        results = [item for item in results if item.id != own_doc_id][:limit]
-        if len(results) < limit and fetch_limit < 1000:
-            # Редкий кейс: self/дубликаты съели выдачу — второй проход шире.
-            results = self.vector_store.search(
-                query_vector,
-                limit=min(max(limit * 10, fetch_limit), 1000),
-                filters={"model": instance._meta.label},
-            )
-            results = [item for item in results if item.id != own_doc_id][:limit]
-        results = sort_vector_hits(results)
-        return [self._format_result(item) for item in results]
+        filters: Dict[str, Any] = {"model": instance._meta.label}
+        if not getattr(self.vector_store, "supports_exclude_ids", False):
+            return own_doc_id, filters, limit + 1
+        filters[EXCLUDE_IDS_KEY] = [own_doc_id]
+        return own_doc_id, filters, limit
+
+    def _stored_vector(self, doc_id: str) -> Optional[List[float]]:
+        """Вектор документа из стора; ``None`` — нет в индексе или стор не умеет."""
+        get_vectors = getattr(self.vector_store, "get_vectors", None)
+        if get_vectors is None:
+            return None
+        try:
+            return get_vectors([doc_id]).get(doc_id)
+        except Exception as exc:  # noqa: BLE001 - падаем обратно на re-embed
+            log.warning("Failed to load stored vector for %s: %s", doc_id, exc)
+            return None
+
+    async def _astored_vector(self, doc_id: str) -> Optional[List[float]]:
+        aget_vectors = getattr(self.vector_store, "aget_vectors", None)
+        if aget_vectors is None:
+            return await sync_to_async(self._stored_vector, thread_sensitive=False)(doc_id)
+        try:
+            return (await aget_vectors([doc_id])).get(doc_id)
+        except Exception as exc:  # noqa: BLE001
+            log.warning("Failed to load stored vector for %s: %s", doc_id, exc)
+            return None
 
     # ----------------------------------------------------------- legacy path
 
@@ -123,27 +487,40 @@ class Searcher(ComponentMixin):
         *,
         models: Optional[List[str]],
         limit: int,
-    ) -> List[dict]:
+    ) -> List[Any]:
         """Original deterministic search path. Kept for backwards compatibility."""
         query_vector = self.embedding_backend.embed(query, is_query=True)
-        filters = None
-        fetch_limit = limit
-        if models:
-            if len(models) == 1:
-                # Одна модель — фильтр на стороне vector store (иначе после
-                # пост-фильтрации возвращалось бы меньше limit результатов).
-                filters = {"model": models[0]}
-            else:
-                # Несколько моделей: over-fetch и пост-фильтр по metadata.
-                fetch_limit = min(max(limit * 10, limit), 5000)
-        results = self.vector_store.search(query_vector, limit=fetch_limit, filters=filters)
-        if models and filters is None:
-            allowed = set(models)
-            results = [item for item in results if item.metadata.get("model") in allowed][
-                :limit
-            ]
-        results = sort_vector_hits(results)
-        return [self._format_result(item) for item in results]
+        return self._search_vectors([query_vector], models=models, limit=limit)[0]
+
+    def _search_vectors(
+        self,
+        query_vectors: List[List[float]],
+        *,
+        models: Optional[List[str]],
+        limit: int,
+    ) -> List[List[Any]]:
+        """Поиск по готовым векторам запросов; по списку hits на каждый вектор.
+
+        Ограничение по моделям уходит в vector store (равенство для одной
+        модели, set-membership для нескольких), поэтому store сразу отдаёт
+        ровно ``limit`` подходящих hits.
+        """
+        batches = batched_search(
+            self.vector_store, query_vectors, limit=limit, filters=model_filters(models)
+        )
+        return [sort_vector_hits(results) for results in batches]
+
+    async def _asearch_vectors(
+        self,
+        query_vectors: List[List[float]],
+        *,
+        models: Optional[List[str]],
+        limit: int,
+    ) -> List[List[Any]]:
+        batches = await abatched_search(
+            self.vector_store, query_vectors, limit=limit, filters=model_filters(models)
+        )
+        return [sort_vector_hits(results) for results in batches]
 
     # ---------------------------------------------------------- LangGraph path
 
@@ -153,7 +530,7 @@ class Searcher(ComponentMixin):
         *,
         models: Optional[List[str]],
         limit: int,
-    ) -> List[dict]:
+    ) -> List[Any]:
         graph = self._get_or_build_graph()
         state = {
             "query": query,
@@ -168,8 +545,7 @@ class Searcher(ComponentMixin):
             from .langgraph_agent import postprocess_results_node
 
             out = postprocess_results_node(dict(out))
-        results = out.get("final_results") or []
-        return [self._format_result(item) for item in results]
+        return list(out.get("final_results") or [])
 
     def _get_or_build_graph(self):
         if self._compiled_graph is not None:
@@ -198,30 +574,125 @@ class Searcher(ComponentMixin):
 
     # --------------------------------------------------------------- helpers
 
-    def _format_result(self, item) -> dict:
+    def _format_results(
+        self,
+        items: List[Any],
+        *,
+        fields: Optional[Tuple[str, ...]] = None,
+    ) -> List[dict]:
+        """Отформатировать выдачу, подгрузив объекты одним запросом на модель."""
+        objects: Dict[Tuple[str, str], Any] = {}
+        if fields is None or _HYDRATED_FIELDS.intersection(fields):
+            objects = self._hydrate(items, with_data=fields is None or "data" in fields)
+        else:
+            self.last_hydration_queries = 0
+        texts: Dict[str, str] = {}
+        if fields is None or {"text", "text_preview"}.intersection(fields):
+            texts = missing_texts(self.text_store, items)
+        return [
+            self._format_result(item, objects=objects, fields=fields, texts=texts)
+            for item in items
+        ]
+
+    def _hydrate(
+        self,
+        items: Iterable[Any],
+        *,
+        with_data: bool = True,
+    ) -> Dict[Tuple[str, str], Any]:
+        """
+        Bulk-загрузка объектов для hits: ``{(model_label, str(pk)): instance}``.
+
+        Hits группируются по ``metadata["model"]``, каждая модель грузится одним
+        ``in_bulk`` с ``.only()`` по полям, нужным ``_model_to_dict``. Отсутствующие
+        в БД строки просто не попадают в результат. Количество выполненных
+        запросов сохраняется в ``last_hydration_queries``. ``with_data=False``
+        грузит только pk (проверка существования для ``admin_url``).
+        """
+        pks_by_model: Dict[str, List[Any]] = defaultdict(list)
+        for item in items:
+            model_label = item.metadata.get("model")
+            pk = item.metadata.get("pk")
+            if model_label and pk is not None:
+                pks_by_model[model_label].append(pk)
+
+        objects: Dict[Tuple[str, str], Any] = {}
+        queries = 0
+        for model_label, pks in pks_by_model.items():
+            model_cls = self._get_model_class(model_label)
+            model_cfg = next((c for c in self.config.models if c.model == model_label), None)
+            if with_data:
+                queryset = self._hydration_queryset(model_cls, model_cfg)
+            else:
+                queryset = model_cls.objects.only(model_cls._meta.pk.name)
+            queries += 1
+            for obj in queryset.in_bulk(list(dict.fromkeys(pks))).values():
+                objects[(model_label, str(obj.pk))] = obj
+        self.last_hydration_queries = queries
+        log.debug("Hydrated %d objects with %d queries", len(objects), queries)
+        return objects
+
+    @staticmethod
+    def _hydration_queryset(model_cls, model_cfg: Optional[ModelConfig]):
+        """QuerySet с ``.only()``/``select_related`` под whitelist ``_model_to_dict``."""
+        queryset = model_cls.objects.all()
+        if model_cfg is not None and model_cfg.fields == ["__all__"]:
+            return queryset
+        allowed = set()
+        if model_cfg is not None:
+            allowed = {f.split("__", 1)[0] for f in model_cfg.fields}
+        only = [model_cls._meta.pk.name]
+        related = []
+        for field in model_cls._meta.concrete_fields:
+            if field.name not in allowed or field.primary_key:
+                continue
+            only.append(field.name)
+            if field.is_relation:
+                # str(fk) иначе даст по запросу на каждый объект.
+                related.append(field.name)
+        queryset = queryset.only(*only)
+        if related:
+            queryset = queryset.select_related(*related)
+        return queryset
+
+    def _format_result(
+        self,
+        item,
+        *,
+        objects: Optional[Dict[Tuple[str, str], Any]] = None,
+        fields: Optional[Tuple[str, ...]] = None,
+        texts: Optional[Dict[str, str]] = None,
+    ) -> dict:
+        wanted = RESULT_FIELDS if fields is None else fields
         model_label = item.metadata.get("model")
         pk = item.metadata.get("pk")
-        raw_score = item.score
-        score = float(raw_score) if raw_score is not None else 0.0
-        score = max(0.0, min(1.0, score))
-        text = item.metadata.get("text") or ""
-        preview = f"{text[:200]}…" if len(text) > 200 else (text or None)
-        data = {
-            "model": model_label,
-            "pk": pk,
-            "score": score,
-            "text": text,
-            "text_preview": preview,
-        }
-        if model_label and pk is not None:
-            model_cls = self._get_model_class(model_label)
-            obj = model_cls.objects.filter(pk=pk).first()
+        data: Dict[str, Any] = {}
+        if "model" in wanted:
+            data["model"] = model_label
+        if "pk" in wanted:
+            data["pk"] = pk
+        if "score" in wanted:
+            data["score"] = _clamped_score(item)
+        if "text" in wanted or "text_preview" in wanted:
+            text = item.metadata.get("text") or ""
+            if not text and texts:
+                text = texts.get(str(getattr(item, "id", "")), "")
+            if "text" in wanted:
+                data["text"] = text
+            if "text_preview" in wanted:
+                data["text_preview"] = f"{text[:200]}…" if len(text) > 200 else (text or None)
+        if model_label and pk is not None and _HYDRATED_FIELDS.intersection(wanted):
+            if objects is None:
+                objects = self._hydrate([item], with_data="data" in wanted)
+            obj = objects.get((model_label, str(pk)))
             if obj is not None:
-                model_cfg = next(
-                    (c for c in self.config.models if c.model == model_label), None
-                )
-                data["data"] = self._model_to_dict(obj, model_cfg)
-                data["admin_url"] = self._admin_url(obj)
+                if "data" in wanted:
+                    model_cfg = next(
+                        (c for c in self.config.models if c.model == model_label), None
+                    )
+                    data["data"] = self._model_to_dict(obj, model_cfg)
+                if "admin_url" in wanted:
+                    data["admin_url"] = self._admin_url(obj)
         return data
 
     def _model_to_dict(self, instance, model_cfg: Optional[ModelConfig]) -> dict:
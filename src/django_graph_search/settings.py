@@ -42,6 +42,41 @@ DEFAULTS: Dict[str, Any] = {
         "KEY_PREFIX": "dgs",
         "TTL": 86400,
     },
+    # Кэш векторов запросов: LRU в процессе + опциональный общий уровень в Django cache.
+    "QUERY_EMBEDDING_CACHE": {
+        "ENABLED": False,
+        "MAX_SIZE": 1024,
+        "TTL": 3600,
+        "ALIAS": None,
+        "KEY_PREFIX": "dgs:qemb",
+    },
+    # Кэш готовой выдачи, инвалидируется поколением индекса модели.
+    "RESULT_CACHE": {
+        "ENABLED": False,
+        "ALIAS": "default",
+        "TTL": 300,
+        "KEY_PREFIX": "dgs:results",
+    },
+    # Курсорная пагинация /api/search/ по закэшированному списку кандидатов.
+    "PAGINATION": {
+        "ENABLED": False,
+        "ALIAS": "default",
+        "MAX_CANDIDATES": 200,
+        "TTL": 600,
+        "KEY_PREFIX": "dgs:page",
+    },
+    # Где хранится индексированный текст: в metadata векторов или отдельно.
+    "TEXT_STORAGE": {
+        "MODE": "inline",
+        "BACKEND": "sqlite",
+        "PATH": "vector_db/texts.sqlite",
+    },
+    # Микробатчинг конкурентных search() к vector store в процессе.
+    "SEARCH_BATCHING": {
+        "ENABLED": False,
+        "WINDOW_MS": 2,
+        "MAX_BATCH": 32,
+    },
     "LANGGRAPH": {
         "ENABLED": False,
         "SEARCH_GRAPH": "django_graph_search.langgraph_agent.build_search_graph",
@@ -130,6 +165,56 @@ class CacheConfig:
     ttl: int = 86400
 
 
+@dataclass(frozen=True)
+class QueryEmbeddingCacheConfig:
+    """Кэш векторов поисковых запросов (``embed(..., is_query=True)``)."""
+
+    enabled: bool = False
+    max_size: int = 1024
+    ttl: int = 3600
+    alias: Optional[str] = None
+    key_prefix: str = "dgs:qemb"
+
+
+@dataclass(frozen=True)
+class ResultCacheConfig:
+    """Кэш выдачи ``Searcher.search`` / ``find_similar`` в Django cache."""
+
+    enabled: bool = False
+    alias: str = "default"
+    ttl: int = 300
+    key_prefix: str = "dgs:results"
+
+
+@dataclass(frozen=True)
+class PaginationConfig:
+    """Курсорная пагинация: один ANN-запрос на первую страницу, дальше — срезы."""
+
+    enabled: bool = False
+    alias: str = "default"
+    max_candidates: int = 200
+    ttl: int = 600
+    key_prefix: str = "dgs:page"
+
+
+@dataclass(frozen=True)
+class TextStorageConfig:
+    """``inline`` — текст в metadata векторов; ``external`` — в отдельном хранилище."""
+
+    mode: str = "inline"
+    backend: str = "sqlite"
+    path: str = "vector_db/texts.sqlite"
+
+
+@dataclass(frozen=True)
+class SearchBatchingConfig:
+    """Склейка конкурентных ``search()`` в один ``search_batch`` (in-process store)."""
+
+    enabled: bool = False
+    window_ms: float = 2.0
+    max_batch: int = 32
+
+
 @dataclass(frozen=True)
 class LLMConfig:
     backend: Optional[str] = None
@@ -221,6 +306,13 @@ class GraphSearchConfig:
     streaming: StreamingConfig = field(default_factory=StreamingConfig)
     api: ApiConfig = field(default_factory=ApiConfig)
     async_indexing: AsyncIndexingConfig = field(default_factory=AsyncIndexingConfig)
+    query_embedding_cache: QueryEmbeddingCacheConfig = field(
+        default_factory=QueryEmbeddingCacheConfig
+    )
+    result_cache: ResultCacheConfig = field(default_factory=ResultCacheConfig)
+    pagination: PaginationConfig = field(default_factory=PaginationConfig)
+    search_batching: SearchBatchingConfig = field(default_factory=SearchBatchingConfig)
+    text_storage: TextStorageConfig = field(default_factory=TextStorageConfig)
 
 
 def _merge_dicts(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
@@ -346,6 +438,13 @@ def get_settings() -> GraphSearchConfig:
     streaming_cfg = _build_streaming_config(merged.get("STREAMING") or {})
     api_cfg = _build_api_config(merged.get("API") or {})
     async_indexing_cfg = _build_async_indexing_config(merged.get("ASYNC_INDEXING") or {})
+    query_embedding_cache_cfg = _build_query_embedding_cache_config(
+        merged.get("QUERY_EMBEDDING_CACHE") or {}
+    )
+    result_cache_cfg = _build_result_cache_config(merged.get("RESULT_CACHE") or {})
+    pagination_cfg = _build_pagination_config(merged.get("PAGINATION") or {})
+    search_batching_cfg = _build_search_batching_config(merged.get("SEARCH_BATCHING") or {})
+    text_storage_cfg = _build_text_storage_config(merged.get("TEXT_STORAGE") or {})
     skip_update_raw = merged.get("AUTO_INDEX_SKIP_UPDATE_FIELDS")
     if skip_update_raw is None:
         skip_update_fields: Tuple[str, ...] = ("last_login",)
@@ -387,6 +486,11 @@ def get_settings() -> GraphSearchConfig:
         streaming=streaming_cfg,
         api=api_cfg,
         async_indexing=async_indexing_cfg,
+        query_embedding_cache=query_embedding_cache_cfg,
+        result_cache=result_cache_cfg,
+        pagination=pagination_cfg,
+        search_batching=search_batching_cfg,
+        text_storage=text_storage_cfg,
     )
 
 
@@ -423,6 +527,106 @@ def _build_async_indexing_config(payload: Dict[str, Any]) -> AsyncIndexingConfig
     )
 
 
+def _build_query_embedding_cache_config(payload: Dict[str, Any]) -> QueryEmbeddingCacheConfig:
+    """Построить QueryEmbeddingCacheConfig из GRAPH_SEARCH['QUERY_EMBEDDING_CACHE']."""
+    if not isinstance(payload, dict):
+        raise ConfigurationError("QUERY_EMBEDDING_CACHE must be a dict.")
+    merged = _merge_dicts(DEFAULTS["QUERY_EMBEDDING_CACHE"], payload)
+    max_size = int(merged.get("MAX_SIZE", 1024))
+    if max_size < 1:
+        raise ConfigurationError("QUERY_EMBEDDING_CACHE.MAX_SIZE must be >= 1.")
+    ttl = int(merged.get("TTL", 3600))
+    if ttl < 0:
+        raise ConfigurationError("QUERY_EMBEDDING_CACHE.TTL must be >= 0.")
+    alias = merged.get("ALIAS")
+    if alias is not None and not isinstance(alias, str):
+        raise ConfigurationError("QUERY_EMBEDDING_CACHE.ALIAS must be a cache alias string.")
+    return QueryEmbeddingCacheConfig(
+        enabled=bool(merged.get("ENABLED", False)),
+        max_size=max_size,
+        ttl=ttl,
+        alias=alias or None,
+        key_prefix=str(merged.get("KEY_PREFIX") or "dgs:qemb"),
+    )
+
+
+def _build_result_cache_config(payload: Dict[str, Any]) -> ResultCacheConfig:
+    """Построить ResultCacheConfig из GRAPH_SEARCH['RESULT_CACHE']."""
+    if not isinstance(payload, dict):
+        raise ConfigurationError("RESULT_CACHE must be a dict.")
+    merged = _merge_dicts(DEFAULTS["RESULT_CACHE"], payload)
+    alias = merged.get("ALIAS") or "default"
+    if not isinstance(alias, str):
+        raise ConfigurationError("RESULT_CACHE.ALIAS must be a cache alias string.")
+    ttl = int(merged.get("TTL", 300))
+    if ttl < 0:
+        raise ConfigurationError("RESULT_CACHE.TTL must be >= 0.")
+    return ResultCacheConfig(
+        enabled=bool(merged.get("ENABLED", False)),
+        alias=alias,
+        ttl=ttl,
+        key_prefix=str(merged.get("KEY_PREFIX") or "dgs:results"),
+    )
+
+
+def _build_pagination_config(payload: Dict[str, Any]) -> PaginationConfig:
+    """Построить PaginationConfig из GRAPH_SEARCH['PAGINATION']."""
+    if not isinstance(payload, dict):
+        raise ConfigurationError("PAGINATION must be a dict.")
+    merged = _merge_dicts(DEFAULTS["PAGINATION"], payload)
+    alias = merged.get("ALIAS") or "default"
+    if not isinstance(alias, str):
+        raise ConfigurationError("PAGINATION.ALIAS must be a cache alias string.")
+    max_candidates = int(merged.get("MAX_CANDIDATES", 200))
+    if not 1 <= max_candidates <= 1000:
+        raise ConfigurationError("PAGINATION.MAX_CANDIDATES must be between 1 and 1000.")
+    ttl = int(merged.get("TTL", 600))
+    if ttl < 0:
+        raise ConfigurationError("PAGINATION.TTL must be >= 0.")
+    return PaginationConfig(
+        enabled=bool(merged.get("ENABLED", False)),
+        alias=alias,
+        max_candidates=max_candidates,
+        ttl=ttl,
+        key_prefix=str(merged.get("KEY_PREFIX") or "dgs:page"),
+    )
+
+
+def _build_text_storage_config(payload: Dict[str, Any]) -> TextStorageConfig:
+    """Построить TextStorageConfig из GRAPH_SEARCH['TEXT_STORAGE']."""
+    if not isinstance(payload, dict):
+        raise ConfigurationError("TEXT_STORAGE must be a dict.")
+    merged = _merge_dicts(DEFAULTS["TEXT_STORAGE"], payload)
+    mode = str(merged.get("MODE") or "inline").lower()
+    if mode not in {"inline", "external"}:
+        raise ConfigurationError("TEXT_STORAGE.MODE must be 'inline' or 'external'.")
+    backend = str(merged.get("BACKEND") or "sqlite").lower()
+    if backend not in {"sqlite", "vector_store"}:
+        raise ConfigurationError("TEXT_STORAGE.BACKEND must be 'sqlite' or 'vector_store'.")
+    path = merged.get("PATH") or DEFAULTS["TEXT_STORAGE"]["PATH"]
+    if not isinstance(path, str):
+        raise ConfigurationError("TEXT_STORAGE.PATH must be a file path string.")
+    return TextStorageConfig(mode=mode, backend=backend, path=path)
+
+
+def _build_search_batching_config(payload: Dict[str, Any]) -> SearchBatchingConfig:
+    """Построить SearchBatchingConfig из GRAPH_SEARCH['SEARCH_BATCHING']."""
+    if not isinstance(payload, dict):
+        raise ConfigurationError("SEARCH_BATCHING must be a dict.")
+    merged = _merge_dicts(DEFAULTS["SEARCH_BATCHING"], payload)
+    window_ms = float(merged.get("WINDOW_MS", 2))
+    if window_ms < 0:
+        raise ConfigurationError("SEARCH_BATCHING.WINDOW_MS must be >= 0.")
+    max_batch = int(merged.get("MAX_BATCH", 32))
+    if max_batch < 1:
+        raise ConfigurationError("SEARCH_BATCHING.MAX_BATCH must be >= 1.")
+    return SearchBatchingConfig(
+        enabled=bool(merged.get("ENABLED", False)),
+        window_ms=window_ms,
+        max_batch=max_batch,
+    )
+
+
 def _build_langgraph_config(payload: Dict[str, Any]) -> LangGraphConfig:
     if not isinstance(payload, dict):
         raise ConfigurationError("LANGGRAPH must be a dict.")
@@ -558,8 +762,12 @@ def clear_graph_search_caches() -> None:
     """Сброс кэша настроек и реестра тяжёлых компонентов (для тестов и reload)."""
     get_settings.cache_clear()
     from .component_registry import clear_component_registry
+    from .embeddings.cached import clear_query_embedding_caches
+    from .text_store import clear_text_stores
 
     clear_component_registry()
+    clear_query_embedding_caches()
+    clear_text_stores()
 
 
 def reload_settings() -> GraphSearchConfig:
@@ -0,0 +1,191 @@
+"""
+Хранение индексированного текста вне metadata векторов.
+
+По умолчанию (``TEXT_STORAGE.MODE = "inline"``) текст документа лежит в
+``metadata["text"]`` каждого вектора: каждый поиск тянет до
+``MAX_TEXT_LENGTH`` символов на кандидата, включая отброшенных фильтром и
+over-fetch. В режиме ``"external"`` metadata содержит только ``model``,
+``pk`` и ``text_hash``, а текст пишется в отдельное хранилище и читается
+одним запросом только для итоговых hits (и кандидатов rerank):
+
+* ``"sqlite"`` — файл SQLite (``PATH``), текст сжат zlib;
+* ``"vector_store"`` — поле документа самого стора (``documents`` ChromaDB)
+  через ``BaseVectorStore.get_texts``.
+
+Конфигурация::
+
+    "TEXT_STORAGE": {
+        "MODE": "external",
+        "BACKEND": "sqlite",
+        "PATH": "vector_db/texts.sqlite",
+    }
+"""
+from __future__ import annotations
+
+import os
+import sqlite3
+import threading
+import zlib
+from abc import ABC, abstractmethod
+from typing import Any, Dict, Iterable, List, Optional
+
+from .backends.base import BaseVectorStore
+from .exceptions import ConfigurationError
+
+# Лимит параметров в одном SQL-запросе SQLite (SQLITE_MAX_VARIABLE_NUMBER).
+_SQLITE_CHUNK = 500
+
+_registry_lock = threading.Lock()
+_sqlite_stores: Dict[str, "SqliteTextStore"] = {}
+
+
+class BaseTextStore(ABC):
+    """Тексты документов по id (тот же id, что у вектора)."""
+
+    #: Передавать ли текст в ``Document.text`` (его хранит сам vector store).
+    keeps_text_in_vector_store = False
+
+    @abstractmethod
+    def put_many(self, texts: Dict[str, str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        """Тексты найденных id; отсутствующие в результат не входят."""
+        raise NotImplementedError
+
+    @abstractmethod
+    def delete_many(self, doc_ids: Iterable[str]) -> None:
+        raise NotImplementedError
+
+    @abstractmethod
+    def clear(self) -> None:
+        raise NotImplementedError
+
+
+class SqliteTextStore(BaseTextStore):
+    """SQLite-таблица ``id → zlib(text)``; соединение на поток, WAL."""
+
+    def __init__(self, path: str) -> None:
+        self.path = path
+        directory = os.path.dirname(os.path.abspath(path))
+        os.makedirs(directory, exist_ok=True)
+        self._local = threading.local()
+        with self._connect() as conn:
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS texts (id TEXT PRIMARY KEY, body BLOB NOT NULL) "
+                "WITHOUT ROWID"
+            )
+
+    def _connect(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("PRAGMA synchronous=NORMAL")
+            self._local.conn = conn
+        return conn
+
+    def put_many(self, texts: Dict[str, str]) -> None:
+        if not texts:
+            return
+        rows = [
+            (str(doc_id), zlib.compress((text or "").encode("utf-8"), 1))
+            for doc_id, text in texts.items()
+        ]
+        with self._connect() as conn:
+            conn.executemany("INSERT OR REPLACE INTO texts (id, body) VALUES (?, ?)", rows)
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        ids = list(dict.fromkeys(str(doc_id) for doc_id in doc_ids))
+        out: Dict[str, str] = {}
+        conn = self._connect()
+        for start in range(0, len(ids), _SQLITE_CHUNK):
+            chunk = ids[start : start + _SQLITE_CHUNK]
+            marks = ",".join("?" * len(chunk))
+            for doc_id, body in conn.execute(
+                f"SELECT id, body FROM texts WHERE id IN ({marks})", chunk
+            ):
+                out[doc_id] = zlib.decompress(body).decode("utf-8")
+        return out
+
+    def delete_many(self, doc_ids: Iterable[str]) -> None:
+        ids = [(str(doc_id),) for doc_id in doc_ids]
+        if not ids:
+            return
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM texts WHERE id = ?", ids)
+
+    def clear(self) -> None:
+        with self._connect() as conn:
+            conn.execute("DELETE FROM texts")
+
+
+class VectorStoreTextStore(BaseTextStore):
+    """Текст в поле документа vector store; запись и удаление — вместе с вектором."""
+
+    keeps_text_in_vector_store = True
+
+    def __init__(self, vector_store: Any) -> None:
+        self.vector_store = vector_store
+
+    def put_many(self, texts: Dict[str, str]) -> None:
+        del texts
+
+    def get_many(self, doc_ids: Iterable[str]) -> Dict[str, str]:
+        return self.vector_store.get_texts(list(doc_ids))
+
+    def delete_many(self, doc_ids: Iterable[str]) -> None:
+        del doc_ids
+
+    def clear(self) -> None:
+        pass
+
+
+def get_text_store(config: Any, vector_store: Any = None) -> Optional[BaseTextStore]:
+    """Хранилище текста по ``TEXT_STORAGE``; ``None`` — текст в metadata.
+
+    При ``BACKEND="vector_store"`` у стора выключается ``query_documents``:
+    текст дочитывается через ``get_texts`` только для нужных hits.
+
+    Raises:
+        ConfigurationError: ``BACKEND="vector_store"`` у стора без ``get_texts``.
+    """
+    cfg = config.text_storage
+    if cfg.mode != "external":
+        return None
+    if cfg.backend == "vector_store":
+        store = getattr(vector_store, "store", vector_store)  # MicroBatchingVectorStore
+        get_texts = getattr(type(store), "get_texts", None)
+        if get_texts is None or get_texts is BaseVectorStore.get_texts:
+            raise ConfigurationError(
+                "TEXT_STORAGE.BACKEND='vector_store' needs a vector store that keeps "
+                "document text (ChromaDBBackend); use 'sqlite'."
+            )
+        if getattr(store, "query_documents", False):
+            store.query_documents = False
+        return VectorStoreTextStore(vector_store)
+    path = os.path.abspath(cfg.path)
+    with _registry_lock:
+        store = _sqlite_stores.get(path)
+        if store is None:
+            store = _sqlite_stores[path] = SqliteTextStore(path)
+        return store
+
+
+def missing_texts(text_store: Optional[BaseTextStore], items: Iterable[Any]) -> Dict[str, str]:
+    """Одним запросом дочитать текст hits, у которых его нет в metadata."""
+    if text_store is None:
+        return {}
+    wanted: List[str] = [
+        str(item.id)
+        for item in items
+        if getattr(item, "id", None) is not None
+        and not (getattr(item, "metadata", None) or {}).get("text")
+    ]
+    return text_store.get_many(wanted) if wanted else {}
+
+
+def clear_text_stores() -> None:
+    with _registry_lock:
+        _sqlite_stores.clear()
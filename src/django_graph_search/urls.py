@@ -1,6 +1,7 @@
 from django.urls import path
 
 from .views import (
+    BatchSearchAPIView,
     ConversationalSearchAPIView,
     SearchAPIView,
     SimilarAPIView,
@@ -10,6 +11,7 @@ from .views import (
 
 urlpatterns = [
     path("", SearchAPIView.as_view(), name="graph_search"),
+    path("batch/", BatchSearchAPIView.as_view(), name="graph_search_batch"),
     path("similar/<str:model>/<str:pk>/", SimilarAPIView.as_view(), name="graph_search_similar"),
     path(
         "conversation/",
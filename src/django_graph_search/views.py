@@ -7,8 +7,9 @@ import queue
 import threading
 import uuid
 import warnings
-from typing import Any, Dict, Iterable, Optional, Tuple, Union
+from typing import Any, Dict, Iterable, List, Optional, Tuple, Union
 
+from asgiref.sync import sync_to_async
 from django.apps import apps
 from django.conf import settings as django_settings
 from django.http import HttpRequest, JsonResponse, StreamingHttpResponse
@@ -17,7 +18,8 @@ from django.views import View
 from django.views.decorators.csrf import csrf_exempt
 
 from .events import EventHub
-from .searcher import Searcher
+from .exceptions import InvalidCursorError
+from .searcher import Searcher, normalize_result_fields
 from .settings import GraphSearchConfig, get_settings
 
 log = logging.getLogger(__name__)
@@ -25,6 +27,8 @@ log = logging.getLogger(__name__)
 # Реестр бэкендов памяти диалога: один экземпляр на процесс (in-memory не шарится между воркерами).
 _memory_backend_lock = threading.Lock()
 _memory_backend_registry: Dict[Tuple[Any, ...], Any] = {}
+# Верхняя граница числа запросов в одном POST /api/search/batch/.
+MAX_BATCH_QUERIES = 100
 # Флаг однократного production-warning про inmemory-бэкенд (иначе warning на каждый POST).
 _inmemory_prod_warning_emitted = False
 
@@ -171,6 +175,101 @@ def _stringify_numeric_param(
     return out, err
 
 
+def _parse_fields_param(
+    value: Optional[Union[str, Iterable[str]]],
+) -> Tuple[Optional[Tuple[str, ...]], Optional[JsonResponse]]:
+    """
+    Разобрать проекцию ``fields`` (``"model,pk,score"`` или список из JSON).
+
+    Returns:
+        ``(кортеж_полей_или_None, None)`` либо ``(None, JsonResponse)`` с 400.
+    """
+    if value is None or value == "":
+        return None, None
+    if isinstance(value, str):
+        value = value.split(",")
+    try:
+        return normalize_result_fields(value), None
+    except (TypeError, ValueError) as exc:
+        return None, JsonResponse({"error": f"'fields': {exc}"}, status=400)
+
+
+def _parse_queries_param(value: Any) -> Tuple[List[str], Optional[JsonResponse]]:
+    """``queries`` пакетного поиска: непустой список строк (не больше
+    ``MAX_BATCH_QUERIES``), пробелы по краям обрезаются."""
+    if (
+        not isinstance(value, list)
+        or not value
+        or not all(isinstance(q, str) and q.strip() for q in value)
+    ):
+        return [], JsonResponse(
+            {"error": "Parameter 'queries' must be a non-empty list of strings."},
+            status=400,
+        )
+    if len(value) > MAX_BATCH_QUERIES:
+        return [], JsonResponse(
+            {"error": f"At most {MAX_BATCH_QUERIES} queries per request."},
+            status=400,
+        )
+    return [q.strip() for q in value], None
+
+
+def _parse_models_param(value: Any) -> Tuple[Optional[List[str]], Optional[JsonResponse]]:
+    """``models``: ``"app.A,app.B"`` или список меток; ``None`` — все модели."""
+    if value is None:
+        return None, None
+    if isinstance(value, str):
+        value = value.split(",")
+    if not isinstance(value, list) or not all(isinstance(m, str) for m in value):
+        return None, JsonResponse(
+            {"error": "Parameter 'models' must be a list of model labels."},
+            status=400,
+        )
+    return [m.strip() for m in value if m.strip()], None
+
+
+def _parse_batch_payload(body: bytes) -> Tuple[Dict[str, Any], Optional[JsonResponse]]:
+    """
+    Разобрать JSON-тело ``POST /api/search/batch/``.
+
+    Returns:
+        ``(параметры search_many, None)`` либо ``({}, JsonResponse)`` с 400.
+    """
+    try:
+        payload = json.loads(body.decode("utf-8") or "{}")
+    except (ValueError, UnicodeDecodeError):
+        return {}, JsonResponse({"error": "Request body must be valid JSON."}, status=400)
+    if not isinstance(payload, dict):
+        return {}, JsonResponse({"error": "Request body must be a JSON object."}, status=400)
+    queries, queries_err = _parse_queries_param(payload.get("queries"))
+    models, models_err = _parse_models_param(payload.get("models"))
+    limit_value, limit_err = _parse_int_param(
+        payload.get("limit"),
+        "limit",
+        default=None,
+        min_value=1,
+        max_value=1000,
+    )
+    min_score, score_err = _parse_float_param(
+        payload.get("min_score"),
+        "min_score",
+        default=None,
+        min_value=0.0,
+        max_value=1.0,
+    )
+    fields, fields_err = _parse_fields_param(payload.get("fields"))
+    err = queries_err or models_err or limit_err or score_err or fields_err
+    if err is not None:
+        return {}, err
+    return {
+        "queries": queries,
+        "models": models,
+        "limit": limit_value,
+        "min_score": min_score,
+        "fields": fields,
+    }, None
+
+
 class SearchPermissionMixin:
     """Mixin that applies GRAPH_SEARCH.API permission and throttle checks."""
 
@@ -230,47 +329,158 @@ def get_conversation_memory_backend(cfg: GraphSearchConfig) -> Any:
         return backend
 
 
+def _parse_search_params(
+    request: HttpRequest,
+) -> Tuple[Dict[str, Any], Optional[JsonResponse]]:
+    """Параметры ``Searcher.search`` из query string или ``({}, JsonResponse)`` с 400."""
+    query = request.GET.get("q", "").strip()
+    if not query:
+        return {}, JsonResponse({"error": "Parameter 'q' is required."}, status=400)
+    models = request.GET.get("models")
+    model_list = [m.strip() for m in models.split(",")] if models else None
+    limit_value, err = _parse_int_param(
+        request.GET.get("limit"),
+        "limit",
+        default=None,
+        min_value=1,
+        max_value=1000,
+    )
+    if err is not None:
+        return {}, err
+    min_score, err = _parse_float_param(
+        request.GET.get("min_score"),
+        "min_score",
+        default=None,
+        min_value=0.0,
+        max_value=1.0,
+    )
+    if err is not None:
+        return {}, err
+    fields, err = _parse_fields_param(request.GET.get("fields"))
+    if err is not None:
+        return {}, err
+    return {
+        "query": query,
+        "models": model_list,
+        "limit": limit_value,
+        "min_score": min_score,
+        "fields": fields,
+    }, None
+
+
+def _page_response(
+    params: Dict[str, Any], results: List[dict], next_cursor: Optional[str]
+) -> JsonResponse:
+    page: Dict[str, Any] = {
+        "query": params["query"],
+        "results": results,
+        "total": len(results),
+        "next_cursor": next_cursor,
+    }
+    if params["min_score"] is not None:
+        page["min_score_applied"] = params["min_score"]
+    return JsonResponse(page, status=200)
+
+
+def _search_response(params: Dict[str, Any], results: List[dict]) -> JsonResponse:
+    min_score = params["min_score"]
+    if min_score is not None:
+        # Searcher уже отфильтровал по score; при проекции без "score" ключа нет.
+        results = [
+            r for r in results if "score" not in r or float(r["score"] or 0) >= min_score
+        ]
+    payload: Dict[str, Any] = {
+        "query": params["query"],
+        "results": results,
+        "total": len(results),
+    }
+    if min_score is not None:
+        payload["min_score_applied"] = min_score
+    return JsonResponse(payload, status=200)
+
+
+def _next_page(cursor: str) -> JsonResponse:
+    if not get_settings().pagination.enabled:
+        return JsonResponse({"error": "Pagination is disabled."}, status=400)
+    try:
+        results, next_cursor = Searcher().search_page(cursor=cursor)
+    except InvalidCursorError as exc:
+        return JsonResponse({"error": str(exc)}, status=400)
+    return JsonResponse(
+        {"results": results, "total": len(results), "next_cursor": next_cursor},
+        status=200,
+    )
+
+
 class SearchAPIView(SearchPermissionMixin, View):
+    """Semantic search endpoint.
+
+    With ``PAGINATION.ENABLED`` the response carries ``next_cursor``; pass it
+    back as ``?cursor=...`` to get the next page from the cached candidate
+    list (``q`` and other parameters are taken from the cursor).
+    """
+
     def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
         denied = self._check_access(request)
         if denied is not None:
             return denied
-        query = request.GET.get("q", "").strip()
-        if not query:
-            return JsonResponse({"error": "Parameter 'q' is required."}, status=400)
-        models = request.GET.get("models")
-        model_list = [m.strip() for m in models.split(",")] if models else None
-        limit_value, err = _parse_int_param(
-            request.GET.get("limit"),
-            "limit",
-            default=None,
-            min_value=1,
-            max_value=1000,
-        )
+        cursor = request.GET.get("cursor", "").strip()
+        if cursor:
+            return _next_page(cursor)
+        params, err = _parse_search_params(request)
         if err is not None:
             return err
-        min_score, err = _parse_float_param(
-            request.GET.get("min_score"),
-            "min_score",
-            default=None,
-            min_value=0.0,
-            max_value=1.0,
-        )
+
+        searcher = Searcher()
+        if get_settings().pagination.enabled:
+            results, next_cursor = searcher.search_page(**params)
+            return _page_response(params, results, next_cursor)
+        results = searcher.search(**params)
+        return _search_response(params, results)
+
+
+@method_decorator(csrf_exempt, name="dispatch")
+class BatchSearchAPIView(SearchPermissionMixin, View):
+    """Run many searches in one request.
+
+    Accepts ``POST`` with a JSON body:
+
+    .. code-block:: json
+
+        {
+          "queries": ["red phone", "blue phone"],
+          "models": ["shop.Product"],
+          "limit": 5,
+          "min_score": 0.3,
+          "fields": ["model", "pk", "score"]
+        }
+
+    All queries are embedded with one ``embed_batch`` call and all hits are
+    hydrated with one query per model (see :meth:`Searcher.search_many`).
+    Results come back in the order of ``queries``.
+    """
+
+    def post(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        denied = self._check_access(request)
+        if denied is not None:
+            return denied
+        params, err = _parse_batch_payload(request.body)
         if err is not None:
             return err
 
-        searcher = Searcher()
-        results = searcher.search(query, models=model_list, limit=limit_value)
-        if min_score is not None:
-            results = [r for r in results if float(r.get("score") or 0) >= min_score]
-        payload: Dict[str, Any] = {
-            "query": query,
-            "results": results,
-            "total": len(results),
+        queries = params.pop("queries")
+        min_score = params["min_score"]
+        batches = Searcher().search_many(queries, **params)
+        body: Dict[str, Any] = {
+            "results": [
+                {"query": query, "results": results, "total": len(results)}
+                for query, results in zip(queries, batches)
+            ],
+            "total": len(batches),
         }
         if min_score is not None:
-            payload["min_score_applied"] = min_score
-        return JsonResponse(payload, status=200)
+            body["min_score_applied"] = min_score
+        return JsonResponse(body, status=200)
 
 
 @method_decorator(csrf_exempt, name="dispatch")
@@ -579,6 +789,49 @@ def _format_event(event: Dict[str, Any], fmt: str) -> bytes:
     return (payload + "\n").encode("utf-8")
 
 
+def _get_similar_instance(model: str, pk: str) -> Tuple[Any, Optional[JsonResponse]]:
+    if "." not in model:
+        return None, JsonResponse({"error": "Model must be in 'app.Model' format."}, status=400)
+    app_label, model_name = model.split(".", 1)
+    model_cls = apps.get_model(app_label, model_name)
+    if model_cls is None:
+        return None, JsonResponse({"error": "Model not found."}, status=404)
+    instance = model_cls.objects.filter(pk=pk).first()
+    if instance is None:
+        return None, JsonResponse({"error": "Object not found."}, status=404)
+    return instance, None
+
+
+def _parse_similar_params(
+    request: HttpRequest,
+) -> Tuple[Dict[str, Any], Optional[JsonResponse]]:
+    limit_value, err = _parse_int_param(
+        request.GET.get("limit"),
+        "limit",
+        default=None,
+        min_value=1,
+        max_value=1000,
+    )
+    if err is not None:
+        return {}, err
+    fields, err = _parse_fields_param(request.GET.get("fields"))
+    if err is not None:
+        return {}, err
+    return {"limit": limit_value, "fields": fields}, None
+
+
+def _similar_response(model: str, pk: str, results: List[dict]) -> JsonResponse:
+    return JsonResponse(
+        {
+            "model": model,
+            "pk": pk,
+            "results": results,
+            "total": len(results),
+        },
+        status=200,
+    )
+
+
 class SimilarAPIView(SearchPermissionMixin, View):
     def get(
         self,
@@ -591,32 +844,64 @@ class SimilarAPIView(SearchPermissionMixin, View):
         denied = self._check_access(request)
         if denied is not None:
             return denied
-        if "." not in model:
-            return JsonResponse({"error": "Model must be in 'app.Model' format."}, status=400)
-        app_label, model_name = model.split(".", 1)
-        model_cls = apps.get_model(app_label, model_name)
-        if model_cls is None:
-            return JsonResponse({"error": "Model not found."}, status=404)
-        instance = model_cls.objects.filter(pk=pk).first()
-        if instance is None:
-            return JsonResponse({"error": "Object not found."}, status=404)
-        limit_value, err = _parse_int_param(
-            request.GET.get("limit"),
-            "limit",
-            default=None,
-            min_value=1,
-            max_value=1000,
-        )
+        instance, err = _get_similar_instance(model, pk)
+        if err is not None:
+            return err
+        params, err = _parse_similar_params(request)
         if err is not None:
             return err
         searcher = Searcher()
-        results = searcher.find_similar(instance, limit=limit_value)
-        return JsonResponse(
-            {
-                "model": model,
-                "pk": pk,
-                "results": results,
-                "total": len(results),
-            },
-            status=200,
-        )
+        results = searcher.find_similar(instance, **params)
+        return _similar_response(model, pk, results)
+
+
+class AsyncSearchAPIView(SearchPermissionMixin, View):
+    """ASGI-вариант :class:`SearchAPIView` на :meth:`Searcher.asearch`.
+
+    Ожидание embedding API и vector store не держит поток воркера. Проверка
+    доступа, пагинация и гидрация (ORM) выполняются через ``sync_to_async``.
+    Подключение: ``include("django_graph_search.async_urls")``.
+    """
+
+    async def get(self, request: HttpRequest, *args: Any, **kwargs: Any) -> JsonResponse:
+        denied = await sync_to_async(self._check_access)(request)
+        if denied is not None:
+            return denied
+        cursor = request.GET.get("cursor", "").strip()
+        if cursor:
+            return await sync_to_async(_next_page)(cursor)
+        params, err = _parse_search_params(request)
+        if err is not None:
+            return err
+
+        searcher = Searcher()
+        if get_settings().pagination.enabled:
+            results, next_cursor = await sync_to_async(searcher.search_page)(**params)
+            return _page_response(params, results, next_cursor)
+        results = await searcher.asearch(**params)
+        return _search_response(params, results)
+
+
+class AsyncSimilarAPIView(SearchPermissionMixin, View):
+    """ASGI-вариант :class:`SimilarAPIView` на :meth:`Searcher.afind_similar`."""
+
+    async def get(
+        self,
+        request: HttpRequest,
+        model: str,
+        pk: str,
+        *args: Any,
+        **kwargs: Any,
+    ) -> JsonResponse:
+        denied = await sync_to_async(self._check_access)(request)
+        if denied is not None:
+            return denied
+        instance, err = await sync_to_async(_get_similar_instance)(model, pk)
+        if err is not None:
+            return err
+        params, err = _parse_similar_params(request)
+        if err is not None:
+            return err
+        searcher = Searcher()
+        results = await searcher.afind_similar(instance, **params)
+        return _similar_response(model, pk, results)
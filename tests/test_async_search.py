@@ -0,0 +1,243 @@
+"""Async-путь поиска: Searcher.asearch/afind_similar, async-бэкенды и вьюхи."""
+from __future__ import annotations
+
+import json
+import sys
+from types import ModuleType
+from typing import Any, Dict, List
+from unittest import mock
+
+import pytest
+from asgiref.sync import async_to_sync
+from django.conf import settings as django_settings
+from django.test import RequestFactory
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.embeddings.cached import CachedEmbeddingBackend, QueryEmbeddingCache
+from django_graph_search.embeddings.openai_backend import OpenAIEmbeddingBackend
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import ModelConfig, clear_graph_search_caches
+from django_graph_search.views import AsyncSearchAPIView, AsyncSimilarAPIView
+
+from .dummy_embedding_backend import DummyEmbeddingBackend
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+class HitsStore(DummyVectorBackend):
+    def __init__(self, hits: List[SearchResult]) -> None:
+        super().__init__()
+        self.hits = hits
+        self.calls: List[Dict[str, Any]] = []
+
+    def search(self, query_vector, limit, filters=None):
+        self.calls.append({"limit": limit, "filters": filters})
+        return [h for h in self.hits if not filters or h.metadata["model"] == filters["model"]][
+            :limit
+        ]
+
+
+class NativeAsyncStore(HitsStore):
+    def __init__(self, hits: List[SearchResult]) -> None:
+        super().__init__(hits)
+        self.async_calls = 0
+
+    async def asearch_batch(self, query_vectors, limit, filters=None):
+        self.async_calls += 1
+        return [self.search(v, limit, filters) for v in query_vectors]
+
+
+def _hit(pk, score):
+    return SearchResult(
+        id=f"test_app.Product:{pk}",
+        score=score,
+        metadata={"model": "test_app.Product", "pk": pk, "text": "t"},
+    )
+
+
+def _searcher(store):
+    cfg = make_basic_config(
+        delta_indexing=False,
+        models=[ModelConfig(model="test_app.Product", fields=["name"])],
+    )
+    return Searcher(
+        config=cfg,
+        vector_store=store,
+        embedding_backend=DummyEmbeddingBackend(model_name="x"),
+        resolver=GraphResolver(),
+    )
+
+
+@pytest.mark.django_db
+def test_asearch_matches_sync_search():
+    category = Category.objects.create(name="c")
+    p1 = Product.objects.create(name="p1", category=category)
+    p2 = Product.objects.create(name="p2", category=category)
+    store = NativeAsyncStore([_hit(p1.pk, 0.9), _hit(p2.pk, 0.4)])
+    searcher = _searcher(store)
+
+    expected = searcher.search("phone", models=["test_app.Product"], min_score=0.5)
+    results = async_to_sync(searcher.asearch)(
+        "phone", models=["test_app.Product"], min_score=0.5
+    )
+
+    assert results == expected
+    assert [r["pk"] for r in results] == [p1.pk]
+    assert results[0]["data"] == {"name": "p1"}
+    assert store.async_calls == 1
+
+
+@pytest.mark.django_db
+def test_afind_similar_excludes_instance_itself():
+    category = Category.objects.create(name="c")
+    p1 = Product.objects.create(name="p1", category=category)
+    p2 = Product.objects.create(name="p2", category=category)
+    store = HitsStore([_hit(p1.pk, 1.0), _hit(p2.pk, 0.7)])
+    searcher = _searcher(store)
+
+    results = async_to_sync(searcher.afind_similar)(p1, limit=5, fields=["pk", "score"])
+
+    assert results == [{"pk": p2.pk, "score": 0.7}]
+    # HitsStore не понимает $exclude_ids: только фильтр модели и limit + 1.
+    assert store.calls[0] == {"limit": 6, "filters": {"model": "test_app.Product"}}
+
+
+def test_openai_aembed_batch_uses_async_client():
+    resp = mock.Mock()
+    resp.data = [mock.Mock(index=1, embedding=[0.2]), mock.Mock(index=0, embedding=[0.1])]
+    client = mock.Mock()
+    client.embeddings.create = mock.AsyncMock(return_value=resp)
+    fake_openai = ModuleType("openai")
+    fake_openai.OpenAI = mock.Mock(side_effect=AssertionError("sync client used"))
+    fake_openai.AsyncOpenAI = mock.Mock(return_value=client)
+
+    with mock.patch.dict(sys.modules, {"openai": fake_openai}):
+        backend = OpenAIEmbeddingBackend("text-embedding-3-small", api_key="sk-test")
+        out = async_to_sync(backend.aembed_batch)(["a", "b"], is_query=True)
+
+    assert out == [[0.1], [0.2]]
+    client.embeddings.create.assert_awaited_once()
+
+
+def test_cached_backend_aembed_batch_embeds_only_misses():
+    class AsyncCounting:
+        model_name = "m"
+
+        def __init__(self) -> None:
+            self.batches: List[List[str]] = []
+
+        async def aembed_batch(self, texts, *, is_query=False):
+            self.batches.append(list(texts))
+            return [[float(len(t))] for t in texts]
+
+    backend = AsyncCounting()
+    cached = CachedEmbeddingBackend(backend, QueryEmbeddingCache(max_size=10))
+    assert async_to_sync(cached.aembed)("red", is_query=True) == [3.0]
+    out = async_to_sync(cached.aembed_batch)(["red", "blue", "blue"], is_query=True)
+    assert out == [[3.0], [4.0], [4.0]]
+    assert backend.batches == [["red"], ["blue"]]
+
+
+def test_base_vector_store_asearch_runs_sync_search():
+    store = HitsStore([_hit(1, 0.5)])
+    hits = async_to_sync(store.asearch)([0.0], limit=3)
+    assert [h.id for h in hits] == ["test_app.Product:1"]
+    assert store.calls == [{"limit": 3, "filters": None}]
+
+
+@pytest.fixture(name="async_view_settings")
+def _async_view_settings_fixture():
+    original = getattr(django_settings, "GRAPH_SEARCH", None)
+    django_settings.GRAPH_SEARCH = {
+        "MODELS": [{"model": "test_app.Product", "fields": ["name"]}],
+        "VECTOR_STORE": {"BACKEND": "tests.dummy_vector_backend.DummyVectorBackend"},
+        "EMBEDDINGS": {
+            "default": {
+                "BACKEND": "tests.dummy_embedding_backend.DummyEmbeddingBackend",
+                "MODEL_NAME": "x",
+            }
+        },
+    }
+    clear_graph_search_caches()
+    yield
+    if original is None:
+        delattr(django_settings, "GRAPH_SEARCH")
+    else:
+        django_settings.GRAPH_SEARCH = original
+    clear_graph_search_caches()
+
+
+@pytest.mark.django_db
+def test_async_search_view(async_view_settings):
+    factory = RequestFactory()
+    view = AsyncSearchAPIView.as_view()
+
+    response = async_to_sync(view)(factory.get("/api/search/", {"q": "phone", "limit": "3"}))
+    assert response.status_code == 200
+    assert json.loads(response.content) == {"query": "phone", "results": [], "total": 0}
+
+    missing = async_to_sync(view)(factory.get("/api/search/"))
+    assert missing.status_code == 400
+
+
+@pytest.mark.django_db
+def test_async_similar_view(async_view_settings):
+    category = Category.objects.create(name="c")
+    product = Product.objects.create(name="p", category=category)
+    factory = RequestFactory()
+    view = AsyncSimilarAPIView.as_view()
+
+    response = async_to_sync(view)(
+        factory.get("/x/"), model="test_app.Product", pk=str(product.pk)
+    )
+    assert response.status_code == 200
+    assert json.loads(response.content)["total"] == 0
+
+    missing = async_to_sync(view)(factory.get("/x/"), model="test_app.Product", pk="999999")
+    assert missing.status_code == 404
+
+
+def test_pgvector_async_pool_of_previous_loop_is_closed():
+    import asyncio
+    import threading
+    from types import SimpleNamespace
+
+    from django_graph_search.backends.pgvector import PgvectorBackend
+
+    closed = threading.Event()
+
+    class _Pool:
+        async def close(self) -> None:
+            closed.set()
+
+    class _BrokenPool:
+        async def close(self) -> None:
+            raise RuntimeError("bound to a closed loop")
+
+    backend = PgvectorBackend(table_name="t", dimension=2)
+    # Loop закончился (async_to_sync): pool.close() на новом loop.
+    stopped = asyncio.new_event_loop()
+    stopped.close()
+    backend._async_pool, backend._async_pool_loop = _Pool(), stopped
+    backend._discard_async_pool()
+    assert closed.wait(5) and backend._async_pool is None
+    # Ошибка закрытия только логируется — пул отбрасывается.
+    backend._async_pool = _BrokenPool()
+    backend.close()
+    assert backend._async_pool is None and backend._async_pool_loop is None
+    closed.clear()
+
+    # Loop ещё работает в другом потоке: close() выполняется в нём.
+    running = asyncio.new_event_loop()
+    thread = threading.Thread(target=running.run_forever, daemon=True)
+    thread.start()
+    try:
+        backend._async_pool, backend._async_pool_loop = _Pool(), running
+        backend._discard_async_pool()
+        assert closed.wait(5)
+    finally:
+        running.call_soon_threadsafe(running.stop)
+        thread.join(5)
+        running.close()
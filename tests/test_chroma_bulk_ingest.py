@@ -0,0 +1,192 @@
+"""ChromaDB: upsert пакетами по max_batch_size и фоновая запись в bulk_ingest."""
+from __future__ import annotations
+
+import sys
+import threading
+import types
+from contextlib import contextmanager
+
+import pytest
+
+from django_graph_search.backends.base import Document
+from django_graph_search.indexer import Indexer
+from django_graph_search.settings import ModelConfig
+
+from .test_app.models import Category, Product
+from .test_indexer import DummyDeltaCache, DummyEmbeddingBackend
+from .utils import make_basic_config
+
+
+class _Collection:
+    def __init__(self) -> None:
+        self.upserts = []
+        self.release = threading.Event()
+        self.release.set()
+        self.fail = False
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        self.release.wait(5)
+        if self.fail:
+            raise RuntimeError("chroma is down")
+        self.upserts.append(list(ids))
+
+    def get(self, ids, include):
+        return {"ids": []}
+
+
+@pytest.fixture(name="fake_chromadb")
+def _fake_chromadb_fixture(monkeypatch):
+    collection = _Collection()
+
+    class _Client:
+        def __init__(self, **options):
+            del options
+
+        def get_max_batch_size(self):
+            return 3
+
+        def get_or_create_collection(self, name, metadata=None, configuration=None):
+            return collection
+
+    module = types.ModuleType("chromadb")
+    module.Client = _Client
+    module.PersistentClient = _Client
+    monkeypatch.setitem(sys.modules, "chromadb", module)
+    return collection
+
+
+def _docs(n):
+    return [Document(id=f"d:{i}", embedding=[float(i)], metadata={}) for i in range(n)]
+
+
+def test_upsert_is_split_by_client_max_batch_size(fake_chromadb):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    backend = ChromaDBBackend()
+    backend.add_documents(_docs(7))
+    assert [len(ids) for ids in fake_chromadb.upserts] == [3, 3, 1]
+
+    fake_chromadb.upserts.clear()
+    ChromaDBBackend(upsert_batch_size=2, upsert_workers=4).add_documents(_docs(5))
+    assert sorted(len(ids) for ids in fake_chromadb.upserts) == [1, 2, 2]
+
+
+def test_bulk_ingest_writes_in_background_until_flush(fake_chromadb):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    backend = ChromaDBBackend(upsert_workers=2)
+    fake_chromadb.release.clear()
+    with backend.bulk_ingest():
+        backend.add_documents(_docs(6))
+        # Оба пакета в очереди, запись ещё не закончилась.
+        assert fake_chromadb.upserts == []
+        fake_chromadb.release.set()
+    assert sorted(i for ids in fake_chromadb.upserts for i in ids) == sorted(
+        d.id for d in _docs(6)
+    )
+
+    fake_chromadb.fail = True
+    with pytest.raises(RuntimeError, match="chroma is down"):
+        with backend.bulk_ingest():
+            backend.add_documents(_docs(2))
+
+
+class _FailingBulkStore:
+    """Стор, чья фоновая запись падает на барьере в конце bulk_ingest."""
+
+    def __init__(self) -> None:
+        self.docs = []
+
+    def add_documents(self, documents):
+        self.docs.extend(documents)
+
+    @contextmanager
+    def bulk_ingest(self):
+        yield self
+        raise RuntimeError("flush failed")
+
+
+@pytest.mark.django_db
+def test_indexer_forgets_delta_hashes_when_bulk_write_fails():
+    category = Category.objects.create(name="Phones")
+    Product.objects.create(name="Pixel", description="Good camera", category=category)
+    delta = DummyDeltaCache()
+    indexer = Indexer(
+        config=make_basic_config(delta_indexing=True),
+        vector_store=_FailingBulkStore(),
+        embedding_backend=DummyEmbeddingBackend(),
+        delta_cache=delta,
+    )
+    cfg = ModelConfig(model="test_app.Product", fields=["name"])
+
+    with pytest.raises(RuntimeError, match="flush failed"):
+        indexer.index_queryset(Product.objects.all(), cfg)
+    assert not delta.store
+
+
+class _RecordingBulkStore:
+    """Стор, записывающий порядок add_documents и flush в bulk_ingest."""
+
+    def __init__(self, events) -> None:
+        self.events = events
+
+    def add_documents(self, documents):
+        self.events.append("add")
+
+    @contextmanager
+    def bulk_ingest(self):
+        yield self
+        self.events.append("flush")
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("smart", [False, True])
+def test_index_generations_are_bumped_after_bulk_flush(monkeypatch, smart):
+    from django_graph_search import indexer as indexer_module
+    from django_graph_search import langgraph_indexer
+    from django_graph_search.langgraph_indexer import SmartIndexer
+
+    events = []
+
+    def _bump(config, models=None):
+        events.append(("bump", sorted(models)))
+
+    monkeypatch.setattr(indexer_module, "bump_index_generation", _bump)
+    monkeypatch.setattr(langgraph_indexer, "bump_index_generation", _bump)
+    category = Category.objects.create(name="Phones")
+    for name in ("Pixel", "Galaxy", "Xperia"):
+        Product.objects.create(name=name, description="Phone", category=category)
+    indexer_cls = SmartIndexer if smart else Indexer
+    indexer = indexer_cls(
+        config=make_basic_config(delta_indexing=False),
+        vector_store=_RecordingBulkStore(events),
+        embedding_backend=DummyEmbeddingBackend(),
+    )
+    cfg = ModelConfig(model="test_app.Product", fields=["name"])
+
+    assert indexer.index_queryset(Product.objects.all(), cfg, batch_size=2) == 3
+    # Одно поднятие поколения — после барьера записи, а не после каждого пакета.
+    assert events == ["add", "add", "flush", ("bump", ["test_app.Product"])]
+
+    events.clear()
+    indexer.index_instance(Product.objects.first(), cfg)
+    assert events == ["add", ("bump", ["test_app.Product"])]
+
+
+def test_submit_slots_are_released_and_close_stops_the_pool(fake_chromadb):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    backend = ChromaDBBackend(upsert_workers=2, upsert_batch_size=2)
+    with backend.bulk_ingest():
+        backend.add_documents(_docs(6))
+    executor = backend._executor
+    # Все слоты очереди свободны: каждый submit вернул свой слот.
+    assert backend._slots._value == 2
+
+    backend.close()
+    assert backend._executor is None
+    with pytest.raises(RuntimeError):
+        executor.submit(print)
+    backend.add_documents(_docs(4))
+    assert backend._executor is not None
+    backend.close()
@@ -0,0 +1,117 @@
+"""ChromaDB: HttpClient с пулом соединений и параметры HNSW."""
+from __future__ import annotations
+
+import sys
+import types
+
+import pytest
+
+from django_graph_search.exceptions import BackendError
+
+
+class _Collection:
+    def __init__(self, configuration=None, metadata=None):
+        self.configuration = configuration
+        self.metadata = metadata
+        self.modified = []
+
+    def modify(self, configuration=None, metadata=None):
+        self.modified.append(configuration)
+
+
+class _Settings:
+    def __init__(self):
+        self.chroma_http_keepalive_secs = 40.0
+        self.chroma_http_max_connections = None
+        self.chroma_http_max_keepalive_connections = None
+
+
+def _install(monkeypatch, *, existing=None, configuration_api=True):
+    created = {}
+
+    class _Client:
+        def __init__(self, **options):
+            created["client"] = options
+
+        def get_max_batch_size(self):
+            return 100
+
+        def get_or_create_collection(self, name, metadata=None, configuration=None):
+            created["create"] = {"configuration": configuration, "metadata": metadata}
+            if existing is not None:
+                return existing
+            return _Collection(configuration=configuration, metadata=metadata)
+
+    chromadb = types.ModuleType("chromadb")
+    chromadb.__path__ = []
+    chromadb.Client = chromadb.PersistentClient = chromadb.HttpClient = _Client
+    config = types.ModuleType("chromadb.config")
+    config.Settings = _Settings
+    monkeypatch.setitem(sys.modules, "chromadb", chromadb)
+    monkeypatch.setitem(sys.modules, "chromadb.config", config)
+    if configuration_api:
+        api = types.ModuleType("chromadb.api")
+        api.__path__ = []
+        coll_cfg = types.ModuleType("chromadb.api.collection_configuration")
+        coll_cfg.CreateCollectionConfiguration = dict
+        coll_cfg.CreateHNSWConfiguration = dict
+        coll_cfg.UpdateCollectionConfiguration = dict
+        coll_cfg.UpdateHNSWConfiguration = dict
+        monkeypatch.setitem(sys.modules, "chromadb.api", api)
+        monkeypatch.setitem(sys.modules, "chromadb.api.collection_configuration", coll_cfg)
+    else:
+        monkeypatch.setitem(sys.modules, "chromadb.api.collection_configuration", None)
+    return created
+
+
+def test_http_client_with_pool_settings(monkeypatch):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    created = _install(monkeypatch)
+    ChromaDBBackend(
+        host="chroma.local",
+        port="8001",
+        headers={"X-Token": "t"},
+        http_keepalive_secs=120,
+        http_max_connections=32,
+    )
+    options = created["client"]
+    assert (options["host"], options["port"], options["ssl"]) == ("chroma.local", 8001, False)
+    assert options["headers"] == {"X-Token": "t"}
+    assert options["settings"].chroma_http_keepalive_secs == 120
+    assert options["settings"].chroma_http_max_connections == 32
+
+    with pytest.raises(BackendError):
+        ChromaDBBackend(host="chroma.local", persist_directory="/tmp/chroma")
+
+
+def test_hnsw_params_on_create_and_existing_collection(monkeypatch):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    created = _install(monkeypatch)
+    backend = ChromaDBBackend(hnsw_m=32, hnsw_ef_construction=200, hnsw_ef_search=64)
+    assert created["create"]["configuration"] == {
+        "hnsw": {"space": "cosine", "max_neighbors": 32, "ef_construction": 200, "ef_search": 64}
+    }
+    assert backend.collection.modified == []
+
+    existing = _Collection(configuration={"hnsw": {"space": "cosine", "ef_search": 10}})
+    _install(monkeypatch, existing=existing)
+    backend = ChromaDBBackend(hnsw_m=32, hnsw_ef_search=64, hnsw_num_threads=2)
+    assert existing.modified == [{"hnsw": {"ef_search": 64, "num_threads": 2}}]
+
+    backend.configure_hnsw(ef_search=128)
+    assert existing.modified[-1] == {"hnsw": {"ef_search": 128}}
+    assert backend.hnsw_params["ef_search"] == 128
+
+
+def test_hnsw_params_go_to_legacy_metadata_on_old_chroma(monkeypatch):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    created = _install(monkeypatch, configuration_api=False)
+    ChromaDBBackend(hnsw_m=24, hnsw_ef_search=50)
+    assert created["create"]["metadata"] == {
+        "hnsw:space": "cosine",
+        "hnsw:M": 24,
+        "hnsw:search_ef": 50,
+    }
@@ -0,0 +1,538 @@
+"""FaissBackend: float32-матрица по слотам, upsert/delete без пересборок."""
+from __future__ import annotations
+
+import pickle
+import threading
+
+import pytest
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.faiss import FaissBackend
+from django_graph_search.exceptions import BackendError
+
+pytest.importorskip("faiss")
+
+
+def _doc(i, x, model="a"):
+    return Document(id=f"m:{i}", embedding=[float(x), 0.0], metadata={"model": model, "pk": i})
+
+
+def test_upsert_and_delete_touch_only_own_slots(monkeypatch):
+    backend = FaissBackend()
+    backend.add_documents([_doc(i, i) for i in range(5)])
+    index = backend.index
+
+    def _no_rebuild(*args, **kwargs):  # pragma: no cover
+        raise AssertionError("index must not be rebuilt")
+
+    monkeypatch.setattr(backend, "_reset_locked", _no_rebuild)
+    backend.add_documents([_doc(2, 10.0)])
+    assert backend.index is index
+    assert backend.index.ntotal == 5
+    assert backend.get_vectors(["m:2"]) == {"m:2": [10.0, 0.0]}
+    assert backend.search([10.0, 0.0], limit=1)[0].id == "m:2"
+
+    slot = backend._slots["m:1"]
+    backend.delete(["m:1", "missing"])
+    assert backend.index.ntotal == 5  # строка ждёт переиспользования слота
+    assert backend.count_documents() == 4
+    assert [h.id for h in backend.search([1.0, 0.0], limit=5)] == ["m:0", "m:3", "m:4", "m:2"]
+
+    # Освободившийся слот уходит следующему документу.
+    backend.add_documents([_doc(7, 1.0, model="b")])
+    assert backend._slots["m:7"] == slot
+    assert backend.index.ntotal == 5
+    assert backend._vectors.dtype.name == "float32"
+    assert [h.id for h in backend.search([1.0, 0.0], limit=1, filters={"model": "b"})] == [
+        "m:7"
+    ]
+
+
+def test_dimension_mismatch_raises():
+    backend = FaissBackend()
+    backend.add_documents([_doc(1, 1.0)])
+    with pytest.raises(BackendError):
+        backend.add_documents([Document(id="x", embedding=[1.0, 2.0, 3.0], metadata={})])
+
+
+def test_loads_legacy_list_payload(tmp_path):
+    path = tmp_path / "faiss.pkl"
+    with open(path, "wb") as handle:
+        pickle.dump(
+            {
+                "ids": ["m:1", "m:2"],
+                "metas": [{"model": "a"}, {"model": "b"}],
+                "embeddings": [[0.0, 0.0], [1.0, 0.0]],
+            },
+            handle,
+        )
+    backend = FaissBackend(persist_path=str(path))
+    assert backend.count_documents({"model": "b"}) == 1
+    backend.delete(["m:1"])
+
+    reloaded = FaissBackend(persist_path=str(path))
+    assert reloaded.get_vectors(["m:1", "m:2"]) == {"m:2": [1.0, 0.0]}
+    backend.clear_collection()
+    assert FaissBackend(persist_path=str(path)).count_documents() == 0
+
+
+def _random_docs(n, dim=8, seed=0, prefix="m"):
+    import numpy as np
+
+    rng = np.random.default_rng(seed)
+    return [
+        Document(
+            id=f"{prefix}:{i}",
+            embedding=rng.random(dim, dtype="float32").tolist(),
+            metadata={"model": "a" if i % 2 else "b", "pk": i},
+        )
+        for i in range(n)
+    ]
+
+
+def test_ivf_trains_after_train_size_and_accepts_nprobe():
+    backend = FaissBackend(index_factory="IVF4,Flat", train_size=200, nprobe=1)
+    docs = _random_docs(300)
+    backend.add_documents(docs[:150])
+    # Пока обучать не на чем — точный flat-индекс.
+    assert backend._index_kind == "flat"
+    assert backend.search(docs[3].embedding, limit=1)[0].id == "m:3"
+
+    backend.add_documents(docs[150:])
+    assert backend._index_kind == "ivf"
+    assert backend.index.is_trained and backend.index.ntotal == 300
+    # nprobe = число списков — полный просмотр, точный ответ.
+    hits = backend.search(docs[7].embedding, limit=3, nprobe=4)
+    assert hits[0].id == "m:7"
+    assert len(backend.search_batch([d.embedding for d in docs[:5]], limit=2, nprobe=4)) == 5
+
+    backend.add_documents([Document(id="m:7", embedding=docs[8].embedding, metadata={})])
+    backend.delete(["m:8"])
+    assert backend.index.ntotal == 299
+    assert backend.search(docs[8].embedding, limit=1, nprobe=4)[0].id == "m:7"
+
+
+def test_hnsw_keeps_dead_rows_on_upsert():
+    backend = FaissBackend(index_factory="HNSW8", ef_search=16)
+    docs = _random_docs(50)
+    backend.add_documents(docs)
+    assert backend._index_kind == "hnsw"
+
+    moved = Document(id="m:1", embedding=docs[2].embedding, metadata={"model": "a"})
+    backend.add_documents([moved])
+    backend.delete(["m:2"])
+    assert backend.count_documents() == 49
+    assert len(backend._dead) == 2
+    hits = backend.search(docs[2].embedding, limit=5, ef_search=64)
+    assert hits[0].id == "m:1"
+    assert "m:2" not in [h.id for h in hits]
+
+
+def test_hnsw_dead_slots_are_compacted(tmp_path):
+    import numpy as np
+
+    path = tmp_path / "faiss"
+    backend = FaissBackend(persist_path=str(path), index_factory="HNSW8", max_dead_ratio=0)
+    docs = _random_docs(20)
+    backend.add_documents(docs)
+    backend.add_documents(docs)
+    assert backend.slot_stats() == {"live": 20, "free": 0, "dead": 20, "slots": 40}
+
+    backend.compact()
+    assert backend.slot_stats() == {"live": 20, "free": 0, "dead": 0, "slots": 20}
+    assert backend.index.ntotal == 20
+    assert backend.search(docs[7].embedding, limit=1, ef_search=64)[0].id == "m:7"
+    assert backend.count_by_model(["a", "b"]) == {"a": 10, "b": 10}
+    # Снапшот на диске тоже без мёртвых строк.
+    reopened = FaissBackend(persist_path=str(path), index_factory="HNSW8")
+    assert len(np.load(path / _snapshots(path)[0] / "vectors.npy")) == 20
+    assert reopened.search(docs[3].embedding, limit=1, ef_search=64)[0].id == "m:3"
+
+
+def test_hnsw_compacts_in_background_past_dead_ratio():
+    backend = FaissBackend(index_factory="HNSW8", max_dead_ratio=0.5)
+    docs = _random_docs(20)
+    backend.add_documents(docs)
+    backend.add_documents(docs[:5])
+    assert backend._compactor is None
+    backend.add_documents(docs[5:15])
+    backend._compactor.join(5)
+    assert backend.slot_stats() == {"live": 20, "free": 0, "dead": 0, "slots": 20}
+    hits = backend.search(docs[12].embedding, limit=3, filters={"model": "b"}, ef_search=64)
+    assert hits[0].id == "m:12"
+
+
+def test_ann_narrow_filter_is_exact():
+    backend = FaissBackend(index_factory="HNSW8", exact_filter_rows=100)
+    docs = _random_docs(60)
+    backend.add_documents(docs)
+    filters = {"model": "a", "$exclude_ids": ["m:5"]}
+    hits = backend.search(docs[5].embedding, limit=3, filters=filters)
+    expected = sorted(
+        (d for d in docs if d.metadata["model"] == "a" and d.id != "m:5"),
+        key=lambda d: sum((x - y) ** 2 for x, y in zip(d.embedding, docs[5].embedding)),
+    )[:3]
+    assert [h.id for h in hits] == [d.id for d in expected]
+
+
+def test_invalid_index_factory_raises():
+    backend = FaissBackend(index_factory="NotAnIndex42")
+    with pytest.raises(BackendError):
+        backend.add_documents(_random_docs(1))
+
+
+def test_snapshot_is_memory_mapped_and_materialized_on_write(tmp_path):
+    path = tmp_path / "faiss"
+    backend = FaissBackend(persist_path=str(path))
+    docs = _random_docs(20)
+    for doc in docs:
+        doc.metadata["text"] = f"text {doc.id}"
+    backend.add_documents(docs)
+    backend.delete(["m:4"])
+    backend.compact()
+    assert not (tmp_path / "faiss.legacy").exists()
+    assert len([p for p in path.iterdir() if p.name.startswith("snapshot-")]) == 1
+
+    worker = FaissBackend(persist_path=str(path))
+    assert worker._mapped is not None and worker._slots is None
+    assert worker.count_documents() == 19
+    assert worker.count_documents({"model": "a"}) == 10
+    hit = worker.search(docs[3].embedding, limit=1, filters={"model": "a"})[0]
+    assert hit.id == "m:3" and hit.metadata["text"] == "text m:3"
+    assert worker.get_vectors(["m:3", "m:4"]) == backend.get_vectors(["m:3"])
+    assert "m:4" not in [h.id for h in worker.search(docs[4].embedding, limit=3)]
+
+    worker.add_documents([Document(id="m:4", embedding=docs[4].embedding, metadata={})])
+    assert worker._mapped is None
+    assert worker.count_documents() == 20
+    assert FaissBackend(persist_path=str(path)).search(docs[4].embedding, limit=1)[0].id == "m:4"
+
+
+def test_snapshot_rebuilds_when_index_factory_changes(tmp_path):
+    path = tmp_path / "faiss"
+    docs = _random_docs(40)
+    FaissBackend(persist_path=str(path)).add_documents(docs)
+
+    hnsw = FaissBackend(persist_path=str(path), index_factory="HNSW8")
+    assert hnsw._index_kind == "hnsw"
+    assert hnsw.search(docs[9].embedding, limit=1)[0].id == "m:9"
+    assert FaissBackend(persist_path=str(path), index_factory="HNSW8")._mapped is not None
+
+
+def _snapshots(path):
+    return sorted(p.name for p in path.iterdir() if p.name.startswith("snapshot-"))
+
+
+def test_mutations_append_to_log_and_replay_on_load(tmp_path):
+    path = tmp_path / "faiss"
+    docs = _random_docs(10)
+    backend = FaissBackend(persist_path=str(path))
+    backend.add_documents(docs[:5])
+    snapshots = _snapshots(path)
+    wal = path / snapshots[0] / "wal.log"
+    assert not wal.exists()
+
+    backend.add_documents(docs[5:])
+    backend.add_documents([Document(id="m:1", embedding=docs[9].embedding, metadata={"pk": 1})])
+    backend.delete(["m:2", "missing"])
+    assert _snapshots(path) == snapshots
+    size = wal.stat().st_size
+    assert 0 < size < 2048
+
+    # Оборванная запись упавшего процесса не применяется и затирается.
+    with open(wal, "ab") as handle:
+        handle.write(b"DGSW\x10\x00")
+    reloaded = FaissBackend(persist_path=str(path))
+    assert reloaded.count_documents() == 9
+    assert reloaded.get_vectors(["m:1", "m:2"]) == {"m:1": backend.get_vectors(["m:9"])["m:9"]}
+    assert reloaded.search(docs[9].embedding, limit=2, filters={"pk": 1})[0].id == "m:1"
+    reloaded.delete(["m:3"])
+    assert FaissBackend(persist_path=str(path)).count_documents() == 8
+
+    reloaded.compact()
+    assert _snapshots(path) != snapshots
+    assert not (path / _snapshots(path)[0] / "wal.log").exists()
+    worker = FaissBackend(persist_path=str(path))
+    assert worker._mapped is not None and worker.count_documents() == 8
+
+
+def test_writers_catch_up_with_each_other(tmp_path):
+    path = tmp_path / "faiss"
+    docs = _random_docs(6)
+    first = FaissBackend(persist_path=str(path))
+    second = FaissBackend(persist_path=str(path))
+    first.add_documents(docs[:3])
+    second.add_documents(docs[3:])
+    assert second.count_documents() == 6
+    first.delete(["m:4"])
+    assert first.count_documents() == 5
+
+    second.compact()
+    first.add_documents([Document(id="m:9", embedding=docs[0].embedding, metadata={})])
+    assert first._snapshot == second._snapshot
+    stored = FaissBackend(persist_path=str(path)).get_vectors([d.id for d in docs] + ["m:9"])
+    assert sorted(stored) == ["m:0", "m:1", "m:2", "m:3", "m:5", "m:9"]
+
+
+def test_log_is_compacted_in_background(tmp_path):
+    path = tmp_path / "faiss"
+    backend = FaissBackend(persist_path=str(path), wal_max_bytes=256)
+    docs = _random_docs(20)
+    backend.add_documents(docs[:1])
+    snapshots = _snapshots(path)
+    backend.add_documents(docs[1:])
+    backend._compactor.join(timeout=10)
+    assert _snapshots(path) != snapshots
+    assert backend._wal_offset == 0
+    assert FaissBackend(persist_path=str(path)).count_documents() == 20
+
+
+def test_filter_postings_follow_upserts_and_deletes(monkeypatch):
+    backend = FaissBackend(filter_fields=["model", "lang"])
+    backend.add_documents(
+        [
+            Document(id=f"m:{i}", embedding=[float(i), 0.0], metadata={"model": "a", "pk": i})
+            for i in range(40)
+        ]
+    )
+    backend.add_documents([Document(id="m:3", embedding=[3.0, 0.0], metadata={"model": "b"})])
+    backend.delete(["m:4"])
+    backend.add_documents(
+        [Document(id="m:50", embedding=[4.0, 0.0], metadata={"model": "b", "lang": "en"})]
+    )
+
+    def _no_scan(*args, **kwargs):  # pragma: no cover
+        raise AssertionError("indexed filters must not scan metadata")
+
+    monkeypatch.setattr(backend, "_match_filters", _no_scan)
+    assert [h.id for h in backend.search([4.0, 0.0], limit=5, filters={"model": "b"})] == [
+        "m:50",
+        "m:3",
+    ]
+    assert backend.count_documents({"model": ["a", "b"]}) == 40
+    assert backend.count_documents({"model": "b", "lang": "en"}) == 1
+    # Документы без поля попадают в postings значения None.
+    assert backend.count_documents({"lang": None}) == 39
+    monkeypatch.undo()
+    hits = backend.search([4.0, 0.0], limit=3, filters={"model": "a", "pk": [5, 6, 7]})
+    assert [h.id for h in hits] == ["m:5", "m:6", "m:7"]
+
+
+def test_snapshot_stores_postings(tmp_path):
+    path = tmp_path / "faiss"
+    docs = _random_docs(30)
+    FaissBackend(persist_path=str(path)).add_documents(docs)
+
+    worker = FaissBackend(persist_path=str(path))
+    assert worker._mapped is not None and set(worker._postings["model"]) == {"a", "b"}
+    assert worker.count_documents({"model": "a"}) == 15
+    assert worker._metas._attrs is None  # metadata из SQLite не декодировалась
+
+    # Другой набор filter_fields — postings строятся заново при загрузке.
+    other = FaissBackend(persist_path=str(path), filter_fields=["pk"])
+    assert set(other._postings) == {"pk"} and len(other._postings["pk"]) == 30
+    hits = other.search(docs[7].embedding, limit=3, filters={"pk": [7, 8]})
+    assert [h.id for h in hits][0] == "m:7" and len(hits) == 2
+
+    # Поиск и подсчёт не строят postings сами: пока их нет — фильтр по metadata.
+    other._postings = None
+    hits = other.search(docs[7].embedding, limit=3, filters={"pk": [7, 8]})
+    assert [h.id for h in hits][0] == "m:7" and len(hits) == 2
+    assert worker.count_by_model(["a"]) == {"a": 15}
+    worker._postings = None
+    assert worker.count_by_model(["a"]) == {"a": 15}
+    assert other._postings is None and worker._postings is None
+
+
+def test_cosine_metric_normalizes_and_scores_like_chroma(tmp_path):
+    with pytest.raises(BackendError):
+        FaissBackend(metric="manhattan")
+    path = tmp_path / "faiss"
+    backend = FaissBackend(persist_path=str(path), metric="cosine")
+    backend.add_documents(
+        [
+            Document(id="near", embedding=[10.0, 1.0], metadata={"model": "a"}),
+            Document(id="far", embedding=[0.5, 0.5], metadata={"model": "a"}),
+            Document(id="opposite", embedding=[-1.0, 0.0], metadata={"model": "b"}),
+        ]
+    )
+    assert backend.get_vectors(["far"])["far"] == pytest.approx([0.70710677, 0.70710677])
+    hits = backend.search([3.0, 0.0], limit=3)
+    assert [h.id for h in hits] == ["near", "far", "opposite"]
+    assert hits[0].score == pytest.approx(10 / (101**0.5), rel=1e-5)
+    assert hits[1].score == pytest.approx(0.5**0.5, rel=1e-5)
+    assert hits[2].score == 0.0
+    assert hits[1].metadata["vector_distance"] == pytest.approx(1 - 0.5**0.5, rel=1e-5)
+    # Смена метрики в настройках пересобирает снапшот.
+    l2 = FaissBackend(persist_path=str(path))
+    assert type(l2.index).__name__ == "IndexFlatL2" and l2.count_documents() == 3
+
+    hnsw = FaissBackend(persist_path=str(path), metric="cosine", index_factory="HNSW8")
+    assert hnsw.search([3.0, 0.0], limit=1, filters={"model": "a"})[0].id == "near"
+
+
+def test_ip_metric_with_ivf():
+    backend = FaissBackend(metric="ip", index_factory="IVF2,Flat", train_size=50, nprobe=2)
+    docs = _random_docs(60)
+    backend.add_documents(docs)
+    assert backend._index_kind == "ivf"
+    query = docs[0].embedding
+    expected = max(docs, key=lambda d: sum(x * y for x, y in zip(d.embedding, query)))
+    hit = backend.search(query, limit=1)[0]
+    assert hit.id == expected.id
+    assert hit.score == 1.0  # скалярное произведение > 1 обрезается, как у Chroma
+
+
+class _SlowTrain:
+    """Обёртка ANN-индекса: train ждёт сигнала теста."""
+
+    def __init__(self, index, started, release):
+        self._index = index
+        self._started = started
+        self._release = release
+
+    def train(self, vectors):
+        self._started.set()
+        assert self._release.wait(10)
+        self._index.train(vectors)
+
+    def __getattr__(self, name):
+        return getattr(self._index, name)
+
+
+def test_search_runs_while_ann_index_trains():
+    backend = FaissBackend(index_factory="IVF4,Flat", train_size=100)
+    docs = _random_docs(200)
+    backend.add_documents(docs[:50])
+    started, release = threading.Event(), threading.Event()
+    index, kind = backend._untrained
+    backend._untrained = (_SlowTrain(index, started, release), kind)
+    writer = threading.Thread(target=backend.add_documents, args=(docs[50:],))
+    writer.start()
+    try:
+        assert started.wait(10)
+        # Писатель держит _lock и обучает индекс; поиск идёт по flat-индексу
+        # и уже видит применённый батч.
+        assert backend._lock.locked() and backend._index_kind == "flat"
+        assert backend.search(docs[120].embedding, limit=1)[0].id == "m:120"
+        assert backend.count_documents({"model": "a"}) == 100
+    finally:
+        release.set()
+        writer.join(10)
+    assert backend._index_kind == "ivf"
+    assert backend.search(docs[120].embedding, limit=1, nprobe=4)[0].id == "m:120"
+
+
+def test_reader_process_picks_up_log_tail_and_new_snapshots(tmp_path):
+    path = tmp_path / "faiss"
+    docs = _random_docs(12)
+    writer = FaissBackend(persist_path=str(path), refresh_interval=0)
+    writer.add_documents(docs[:4])
+    reader = FaissBackend(persist_path=str(path), refresh_interval=0.01)
+    assert reader._mapped is not None
+
+    def _search_until_refreshed(expected_count):
+        reader._next_refresh_check = 0
+        reader.search(docs[0].embedding, limit=1)
+        if reader._refresher is not None:
+            reader._refresher.join(10)
+        return reader.count_documents() == expected_count
+
+    writer.add_documents(docs[4:8])
+    writer.delete(["m:0"])
+    assert _search_until_refreshed(7)
+    assert reader.search(docs[5].embedding, limit=1)[0].id == "m:5"
+
+    writer.compact()
+    writer.add_documents(docs[8:])
+    assert _search_until_refreshed(11)
+    assert reader._snapshot == writer._snapshot
+
+    # Без изменений на диске фоновый поток не запускается.
+    reader._refresher = None
+    reader._next_refresh_check = 0
+    reader.search(docs[0].embedding, limit=1)
+    assert reader._refresher is None
+
+
+def test_reader_layers_log_tail_over_mapped_snapshot(tmp_path):
+    np = pytest.importorskip("numpy")
+    path = tmp_path / "faiss"
+    writer = FaissBackend(persist_path=str(path), refresh_interval=0)
+    writer.add_documents([_doc(i, i) for i in range(6)])
+    reader = FaissBackend(persist_path=str(path), refresh_interval=0)
+    index, vectors, ids = reader.index, reader._vectors, reader._ids
+
+    writer.add_documents([_doc(10, 2.4, model="b"), _doc(1, 7.0)])
+    writer.delete(["m:3"])
+    reader.refresh()
+
+    # Хвост лога — в оверлее; снапшот по-прежнему общий read-only mmap.
+    assert reader._mapped is not None
+    assert reader.index is index and reader._vectors is vectors and reader._ids is ids
+    assert isinstance(reader._vectors, np.memmap) and not reader._vectors.flags.writeable
+    assert len(reader._overlay) == 2 and reader._overlay.n_tombstones == 2
+    assert reader.count_documents() == 6
+    assert reader.count_documents({"model": "a"}) == 5
+    assert reader.count_by_model(["a", "b"]) == {"a": 5, "b": 1}
+    assert [h.id for h in reader.search([2.5, 0.0], limit=3)] == ["m:10", "m:2", "m:4"]
+    assert reader.search([2.4, 0.0], limit=1) == writer.search([2.4, 0.0], limit=1)
+    hits = reader.search([7.0, 0.0], limit=2, filters={"model": "a"})
+    assert [h.id for h in hits] == ["m:1", "m:5"]
+    hits = reader.search([2.5, 0.0], limit=1, filters={"$exclude_ids": ["m:10"]})
+    assert hits[0].id == "m:2"
+    assert reader.get_vectors(["m:1", "m:3", "m:10"]) == writer.get_vectors(["m:1", "m:10"])
+
+    # Своя запись читателя переносит снапшот вместе с хвостом в память.
+    reader.delete(["m:0"])
+    assert reader._mapped is None and reader._overlay is None
+    assert reader.count_documents() == 5
+    assert [h.id for h in reader.search([7.0, 0.0], limit=2)] == ["m:1", "m:5"]
+    assert FaissBackend(persist_path=str(path)).count_documents() == 5
+
+
+def test_sq8_quantizer_trains_updates_codes_in_place_and_rescores(tmp_path):
+    import numpy as np
+
+    with pytest.raises(BackendError):
+        FaissBackend(quantizer="int4")
+    path = tmp_path / "faiss"
+    backend = FaissBackend(
+        persist_path=str(path), quantizer="sq8", train_size=100, rescore_factor=4
+    )
+    docs = _random_docs(150, dim=16)
+    backend.add_documents(docs[:60])
+    assert type(backend.index).__name__ == "IndexFlatL2"
+    backend.add_documents(docs[60:])
+    assert type(backend.index).__name__ == "IndexScalarQuantizer"
+    assert backend.index.code_size == 16 and isinstance(backend._vectors, np.memmap)
+
+    backend.add_documents([Document(id="m:3", embedding=docs[90].embedding, metadata={})])
+    backend.delete(["m:90"])
+    hit = backend.search(docs[90].embedding, limit=1)[0]
+    # Пересчёт по полным векторам: расстояние точное, не по кодам.
+    assert hit.id == "m:3" and hit.metadata["vector_distance"] == 0.0
+    exact = sorted(
+        (d for d in docs if d.id not in {"m:3", "m:90"}),
+        key=lambda d: sum((x - y) ** 2 for x, y in zip(d.embedding, docs[7].embedding)),
+    )
+    assert [h.id for h in backend.search(docs[7].embedding, limit=5)] == [
+        d.id for d in exact[:5]
+    ]
+
+    backend.compact()
+    mapped = FaissBackend(persist_path=str(path), quantizer="sq8", rescore_factor=4)
+    assert mapped._mapped is not None and mapped._untrained is None
+    assert mapped.search(docs[90].embedding, limit=1)[0].id == "m:3"
+    # Без quantizer в настройках снапшот пересобирается в точный flat.
+    assert type(FaissBackend(persist_path=str(path)).index).__name__ == "IndexFlatL2"
+
+
+def test_fp16_quantizer_needs_no_training_and_keeps_cosine_scores():
+    backend = FaissBackend(quantizer="fp16", metric="cosine", rescore_factor=2)
+    docs = _random_docs(20)
+    backend.add_documents(docs)
+    assert type(backend.index).__name__ == "IndexScalarQuantizer"
+    hits = backend.search(docs[4].embedding, limit=3, filters={"model": "b"})
+    assert hits[0].id == "m:4" and hits[0].score == pytest.approx(1.0, abs=1e-6)
+    assert all(h.metadata["model"] == "b" for h in hits)
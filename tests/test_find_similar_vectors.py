@@ -0,0 +1,247 @@
+"""find_similar по сохранённому вектору документа (get_vectors + $exclude_ids)."""
+from __future__ import annotations
+
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django_graph_search.backends.base import (
+    EXCLUDE_IDS_KEY,
+    Document,
+    SearchResult,
+    matches_filters,
+    split_exclude_ids,
+)
+from django_graph_search.backends.chromadb import ChromaDBBackend
+from django_graph_search.backends.pgvector import PgvectorBackend
+from django_graph_search.backends.qdrant import QdrantBackend, point_id
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import ModelConfig
+
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+class StoredVectorStore(DummyVectorBackend):
+    supports_exclude_ids = True
+
+    def __init__(self, vectors: Dict[str, List[float]], hits: List[SearchResult]) -> None:
+        super().__init__()
+        self.vectors = vectors
+        self.hits = hits
+        self.queries: List[Dict[str, Any]] = []
+
+    def get_vectors(self, doc_ids):
+        return {doc_id: self.vectors[doc_id] for doc_id in doc_ids if doc_id in self.vectors}
+
+    def search(self, query_vector, limit, filters=None):
+        self.queries.append({"vector": list(query_vector), "limit": limit, "filters": filters})
+        _, exclude = split_exclude_ids(filters)
+        return [h for h in self.hits if h.id not in exclude][:limit]
+
+
+class FailingEmbedding:
+    model_name = "x"
+
+    def embed(self, text, *, is_query=False):
+        raise AssertionError("re-embed is not expected")
+
+    def embed_batch(self, texts, *, is_query=False):
+        raise AssertionError("re-embed is not expected")
+
+
+class FailingResolver:
+    def build_searchable_text(self, instance, model_cfg):
+        raise AssertionError("graph resolve is not expected")
+
+
+def _hit(pk, score):
+    return SearchResult(
+        id=f"test_app.Product:{pk}",
+        score=score,
+        metadata={"model": "test_app.Product", "pk": pk, "text": "t"},
+    )
+
+
+def _searcher(store, embedding, resolver=None):
+    cfg = make_basic_config(
+        delta_indexing=False,
+        models=[ModelConfig(model="test_app.Product", fields=["name"])],
+    )
+    kwargs = {"resolver": resolver} if resolver is not None else {}
+    return Searcher(config=cfg, vector_store=store, embedding_backend=embedding, **kwargs)
+
+
+@pytest.mark.django_db
+def test_find_similar_uses_stored_vector():
+    category = Category.objects.create(name="c")
+    p1 = Product.objects.create(name="p1", category=category)
+    p2 = Product.objects.create(name="p2", category=category)
+    own_id = f"test_app.Product:{p1.pk}"
+    store = StoredVectorStore({own_id: [0.5, 0.5]}, [_hit(p1.pk, 1.0), _hit(p2.pk, 0.7)])
+    searcher = _searcher(store, FailingEmbedding(), FailingResolver())
+
+    results = searcher.find_similar(p1, limit=3, fields=["pk"])
+    async_results = async_to_sync(searcher.afind_similar)(p1, limit=3, fields=["pk"])
+
+    assert results == async_results == [{"pk": p2.pk}]
+    assert store.queries[0] == {
+        "vector": [0.5, 0.5],
+        "limit": 3,
+        "filters": {"model": "test_app.Product", EXCLUDE_IDS_KEY: [own_id]},
+    }
+
+
+class EqualityFilterStore(StoredVectorStore):
+    """Store без ``supports_exclude_ids``: фильтр — равенство metadata."""
+
+    supports_exclude_ids = False
+
+    def search(self, query_vector, limit, filters=None):
+        self.queries.append({"vector": list(query_vector), "limit": limit, "filters": filters})
+        return [h for h in self.hits if matches_filters(h.metadata, filters)][:limit]
+
+
+@pytest.mark.django_db
+def test_find_similar_without_exclude_ids_support_overfetches():
+    category = Category.objects.create(name="c")
+    products = [Product.objects.create(name=f"p{i}", category=category) for i in range(4)]
+    own_id = f"test_app.Product:{products[0].pk}"
+    hits = [_hit(p.pk, 1.0 - i / 10) for i, p in enumerate(products)]
+    store = EqualityFilterStore({own_id: [0.5, 0.5]}, hits)
+    searcher = _searcher(store, FailingEmbedding(), FailingResolver())
+
+    results = searcher.find_similar(products[0], limit=3, fields=["pk"])
+    async_results = async_to_sync(searcher.afind_similar)(products[0], limit=3, fields=["pk"])
+
+    # Свой документ отброшен, но выдача всё равно полная: limit + 1 у store.
+    assert results == async_results == [{"pk": p.pk} for p in products[1:]]
+    assert store.queries[0] == {
+        "vector": [0.5, 0.5],
+        "limit": 4,
+        "filters": {"model": "test_app.Product"},
+    }
+
+
+def test_builtin_backends_declare_exclude_ids_support():
+    from django_graph_search.backends.faiss import FaissBackend
+
+    for backend_cls in (ChromaDBBackend, QdrantBackend, PgvectorBackend, FaissBackend):
+        assert backend_cls.supports_exclude_ids
+    assert not DummyVectorBackend.supports_exclude_ids
+
+
+@pytest.mark.django_db
+def test_find_similar_reembeds_when_document_is_not_indexed():
+    category = Category.objects.create(name="c")
+    p1 = Product.objects.create(name="p1", category=category)
+    p2 = Product.objects.create(name="p2", category=category)
+    store = StoredVectorStore({}, [_hit(p2.pk, 0.7)])
+    embedded: List[str] = []
+
+    class _Embedding:
+        model_name = "x"
+
+        def embed(self, text, *, is_query=False):
+            embedded.append(text)
+            return [1.0]
+
+    searcher = _searcher(store, _Embedding())
+    assert searcher.find_similar(p1, limit=3, fields=["pk"]) == [{"pk": p2.pk}]
+    assert len(embedded) == 1
+    assert store.queries[0]["vector"] == [1.0]
+
+
+def test_matches_filters_ignores_exclude_key():
+    assert split_exclude_ids({"model": "a", EXCLUDE_IDS_KEY: ["x"]}) == (
+        {"model": "a"},
+        frozenset({"x"}),
+    )
+    assert split_exclude_ids({EXCLUDE_IDS_KEY: ["x"]}) == (None, frozenset({"x"}))
+    assert matches_filters({"model": "a"}, {"model": "a", EXCLUDE_IDS_KEY: ["x"]})
+
+
+def test_faiss_get_vectors_and_exclusion():
+    pytest.importorskip("faiss")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    backend = FaissBackend()
+    backend.add_documents(
+        [
+            Document(id=f"m:{i}", embedding=[float(i), 0.0], metadata={"model": "a"})
+            for i in range(10)
+        ]
+    )
+    assert backend.get_vectors(["m:3", "missing"]) == {"m:3": [3.0, 0.0]}
+    hits = backend.search([3.0, 0.0], limit=2, filters={EXCLUDE_IDS_KEY: ["m:3"]})
+    assert [h.id for h in hits] == ["m:2", "m:4"] or [h.id for h in hits] == ["m:4", "m:2"]
+    hits = backend.search(
+        [3.0, 0.0], limit=2, filters={"model": "a", EXCLUDE_IDS_KEY: ["m:3", "m:2"]}
+    )
+    assert [h.id for h in hits] == ["m:4", "m:1"] or [h.id for h in hits] == ["m:1", "m:4"]
+
+
+def test_chroma_exclusion_and_get_vectors():
+    calls: List[Dict[str, Any]] = []
+
+    class _Collection:
+        def query(self, query_embeddings, n_results, where, include):
+            calls.append({"n_results": n_results, "where": where})
+            return {
+                "ids": [["m:1", "m:2", "m:3"]],
+                "distances": [[0.0, 0.1, 0.2]],
+                "metadatas": [[{"model": "a"}] * 3],
+                "documents": [["t"] * 3],
+            }
+
+        def get(self, ids, include):
+            return {"ids": ["m:1"], "embeddings": [[0.25, 0.5]]}
+
+    backend = ChromaDBBackend.__new__(ChromaDBBackend)
+    backend.collection = _Collection()
+    backend._effective_space = "cosine"
+    hits = backend.search([0.1], limit=2, filters={"model": "a", EXCLUDE_IDS_KEY: ["m:1"]})
+    assert calls == [{"n_results": 3, "where": {"model": "a"}}]
+    assert [h.id for h in hits] == ["m:2", "m:3"]
+    assert backend.get_vectors(["m:1", "m:9"]) == {"m:1": [0.25, 0.5]}
+
+
+def test_qdrant_exclusion_uses_has_id_and_retrieve():
+    backend = QdrantBackend.__new__(QdrantBackend)
+    backend.qmodels = SimpleNamespace(
+        FieldCondition=lambda key, match: (key, match),
+        MatchValue=lambda value: value,
+        HasIdCondition=lambda has_id: ("has_id", has_id),
+        Filter=lambda must, must_not=None: {"must": must, "must_not": must_not},
+    )
+    assert backend._build_filter({"model": "a", EXCLUDE_IDS_KEY: ["p1"]}) == {
+        "must": [("model", "a")],
+        "must_not": [("has_id", [point_id("p1")])],
+    }
+
+    class _Client:
+        def collection_exists(self, name):
+            return True
+
+        def retrieve(self, collection_name, ids, with_payload, with_vectors):
+            assert with_vectors and not with_payload
+            assert ids == [point_id("p1"), point_id("p2")]
+            return [SimpleNamespace(id=point_id("p1"), vector=[1, 2])]
+
+    backend.client = _Client()
+    backend.collection_name = "c"
+    assert backend.get_vectors(["p1", "p2"]) == {"p1": [1.0, 2.0]}
+
+
+def test_pgvector_where_sql_excludes_ids():
+    backend = PgvectorBackend(table_name="t", dimension=2)
+    where, params = backend._where_sql({"model": "a", EXCLUDE_IDS_KEY: ["x:2", "x:1"]})
+    assert where == "WHERE metadata @> %s::jsonb AND id <> ALL(%s::text[])"
+    assert params == ['{"model": "a"}', ["x:1", "x:2"]]
+    assert backend._where_sql({EXCLUDE_IDS_KEY: ["x:1"]}) == (
+        "WHERE id <> ALL(%s::text[])",
+        [["x:1"]],
+    )
@@ -114,3 +114,18 @@ class IndexerTests(TestCase):
 
         self.assertEqual(len(vector_store.docs), 1)
 
+
+    def test_rebuild_all_compacts_the_store(self):
+        config = make_basic_config(
+            delta_indexing=False,
+            models=[ModelConfig(model="test_app.Product", fields=["name"])],
+        )
+        vector_store = DummyVectorStore()
+        indexer = Indexer(
+            config=config,
+            vector_store=vector_store,
+            embedding_backend=DummyEmbeddingBackend(),
+        )
+        with mock.patch.object(vector_store, "compact", create=True) as compact:
+            self.assertEqual(indexer.rebuild_all(), {"test_app.Product": 1})
+        compact.assert_called_once_with()
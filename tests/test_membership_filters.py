@@ -0,0 +1,127 @@
+"""Set-membership фильтры (``{"model": [a, b]}``) в vector store."""
+from __future__ import annotations
+
+import json
+import sys
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from django_graph_search.backends.base import Document, matches_filters, model_filters
+from django_graph_search.backends.chromadb import chroma_where
+from django_graph_search.backends.pgvector import PgvectorBackend
+from django_graph_search.backends.qdrant import QdrantBackend
+from django_graph_search.langgraph_agent import vector_search_node
+
+
+def test_matches_filters_equality_and_membership():
+    meta = {"model": "a.B", "pk": 1}
+    assert matches_filters(meta, {"model": ["a.B", "a.C"]})
+    assert matches_filters(meta, {"model": "a.B", "pk": 1})
+    assert not matches_filters(meta, {"model": ("a.C",)})
+    assert matches_filters(meta, None)
+
+
+def test_model_filters():
+    assert model_filters(None) is None
+    assert model_filters(["a.B"]) == {"model": "a.B"}
+    assert model_filters(["a.B", "a.C"]) == {"model": ["a.B", "a.C"]}
+
+
+def _faiss_docs():
+    return [
+        Document(
+            id=f"m:{i}",
+            embedding=[float(i), 0.0],
+            metadata={"model": ("a", "b", "c")[i % 3], "pk": i},
+        )
+        for i in range(30)
+    ]
+
+
+def test_faiss_membership_filter_is_exact_top_k():
+    pytest.importorskip("faiss")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    backend = FaissBackend()
+    backend.add_documents(_faiss_docs())
+    hits = backend.search([15.0, 0.0], limit=3, filters={"model": ["a", "b"]})
+    assert [h.id for h in hits] == ["m:15", "m:16", "m:13"]
+    assert backend.search([15.0, 0.0], limit=4, filters={"model": ["zzz"]}) == []
+    assert backend.count_documents({"model": ["a", "c"]}) == 20
+
+
+@pytest.fixture(name="faiss_without_selector")
+def _faiss_without_selector_fixture(monkeypatch):
+    """faiss без IDSelector/SearchParameters (как версии до 1.7.3)."""
+    faiss = pytest.importorskip("faiss")
+    module = types.ModuleType("faiss")
+    module.IndexFlatL2 = faiss.IndexFlatL2
+    module.rev_swig_ptr = faiss.rev_swig_ptr
+    monkeypatch.setitem(sys.modules, "faiss", module)
+    return module
+
+
+def test_faiss_membership_filter_without_id_selector(faiss_without_selector):
+    from django_graph_search.backends.faiss import FaissBackend
+
+    backend = FaissBackend()
+    backend.add_documents(_faiss_docs())
+    hits = backend.search([15.0, 0.0], limit=4, filters={"model": ["b"]})
+    assert [h.id for h in hits] == ["m:16", "m:13", "m:19", "m:10"]
+
+
+def test_chroma_where_translation():
+    assert chroma_where(None) is None
+    assert chroma_where({"model": "a"}) == {"model": "a"}
+    assert chroma_where({"model": ["a", "b"]}) == {"model": {"$in": ["a", "b"]}}
+    assert chroma_where({"model": ["a"], "pk": 1}) == {
+        "$and": [{"model": {"$in": ["a"]}}, {"pk": 1}]
+    }
+
+
+def test_qdrant_filter_uses_match_any():
+    backend = QdrantBackend.__new__(QdrantBackend)
+    backend.qmodels = SimpleNamespace(
+        FieldCondition=lambda key, match: (key, match),
+        MatchValue=lambda value: ("value", value),
+        MatchAny=lambda any: ("any", any),
+        Filter=lambda must: must,
+    )
+    assert backend._build_filter({"model": ["a", "b"], "pk": 1}) == [
+        ("model", ("any", ["a", "b"])),
+        ("pk", ("value", 1)),
+    ]
+
+
+def test_pgvector_where_sql_and_placeholder_order():
+    backend = PgvectorBackend(table_name="t", dimension=2)
+    where, params = backend._where_sql({"model": ["a", "b"], "lang": "en", "pk": [1]})
+    assert where == (
+        "WHERE metadata @> %s::jsonb AND (metadata->>%s) = ANY(%s::text[]) "
+        "AND (metadata->>%s) = ANY(%s::text[])"
+    )
+    assert params == [json.dumps({"lang": "en"}), "model", ["a", "b"], "pk", ["1"]]
+
+    sql, params = backend._search_query([1.0, 0.0], 5, {"model": "a"})
+    # Плейсхолдеры: score-вектор, WHERE, ORDER BY-вектор, LIMIT.
+    assert sql.index("AS score") < sql.index("WHERE") < sql.index("ORDER BY")
+    assert params == ["[1.0,0.0]", json.dumps({"model": "a"}), "[1.0,0.0]", 5]
+
+
+def test_vector_search_node_pushes_model_filter():
+    seen = []
+
+    class _Store:
+        def search_batch(self, query_vectors, limit, filters=None):
+            seen.append(filters)
+            return [[] for _ in query_vectors]
+
+    class _Embedding:
+        def embed_batch(self, texts, *, is_query=False):
+            return [[0.0] for _ in texts]
+
+    state = {"expanded_queries": ["q"], "limit": 5, "models": ["a.B", "a.C"]}
+    vector_search_node(state, embedding_backend=_Embedding(), vector_store=_Store())
+    assert seen == [{"model": ["a.B", "a.C"]}]
@@ -0,0 +1,316 @@
+"""count_by_model: счётчики документов по модели для покрытия индекса."""
+from __future__ import annotations
+
+import sys
+import threading
+import types
+from types import SimpleNamespace
+
+import pytest
+
+from django_graph_search.backends.base import Document
+from django_graph_search.backends.counts import ModelCounters
+from django_graph_search.index_coverage import get_index_coverage
+from django_graph_search.settings import ModelConfig
+
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+class _Collection:
+    """In-memory коллекция Chroma: upsert/get/delete по id и постранично."""
+
+    def __init__(self) -> None:
+        self.docs = {}
+        self.where_gets = 0
+
+    def upsert(self, ids, embeddings, metadatas, documents):
+        for doc_id, meta in zip(ids, metadatas):
+            self.docs[doc_id] = meta
+
+    def get(self, ids=None, where=None, include=None, limit=None, offset=None):
+        if where is not None:
+            self.where_gets += 1
+        keys = [i for i in ids if i in self.docs] if ids is not None else list(self.docs)
+        if where:
+            keys = [k for k in keys if all(self.docs[k].get(f) == v for f, v in where.items())]
+        if limit is not None:
+            keys = keys[offset or 0 : (offset or 0) + limit]
+        return {"ids": keys, "metadatas": [self.docs[k] for k in keys]}
+
+    def delete(self, ids=None, where=None):
+        for doc_id in list(self.docs if where is not None else ids):
+            self.docs.pop(doc_id, None)
+
+
+@pytest.fixture(name="chroma_collection")
+def _chroma_collection_fixture(monkeypatch):
+    collection = _Collection()
+
+    class _Client:
+        def __init__(self, **options):
+            del options
+
+        def get_max_batch_size(self):
+            return 2
+
+        def get_or_create_collection(self, name, metadata=None, configuration=None):
+            return collection
+
+    module = types.ModuleType("chromadb")
+    module.Client = _Client
+    module.PersistentClient = _Client
+    module.HttpClient = _Client
+    monkeypatch.setitem(sys.modules, "chromadb", module)
+    return collection
+
+
+def _doc(model, pk):
+    return Document(id=f"{model}:{pk}", embedding=[0.1], metadata={"model": model, "pk": pk})
+
+
+def test_faiss_count_by_model_uses_postings():
+    pytest.importorskip("faiss", reason="faiss-cpu not installed")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    store = FaissBackend()
+    store.add_documents([_doc("a", i) for i in range(20)] + [_doc("b", 1)])
+    store.add_documents([_doc("a", 3)])
+    store.delete(["a:0", "a:1"])
+    assert store.count_by_model(["a", "b", "c"]) == {"a": 18, "b": 1, "c": 0}
+    assert store.count_by_model(["a"]) == {"a": store.count_documents({"model": "a"})}
+
+
+def test_chroma_counters_track_writes_and_reconcile(chroma_collection, tmp_path):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    chroma_collection.docs["old:1"] = {"model": "old"}
+    path = str(tmp_path / "counts.sqlite")
+    backend = ChromaDBBackend(model_counts_path=path)
+    # Сверка — постраничный проход по коллекции.
+    backend.reconcile_counts()
+    assert backend.count_by_model(["old", "a"]) == {"old": 1, "a": 0}
+
+    backend.add_documents([_doc("a", i) for i in range(5)])
+    backend.add_documents([_doc("a", 0), _doc("a", 0), _doc("b", 1)])
+    backend.delete(["a:1", "missing:1"])
+    assert backend.count_by_model(["a", "b", "old"]) == {"a": 4, "b": 1, "old": 1}
+    assert chroma_collection.where_gets == 0
+
+    # Счётчики в файле видны другим экземплярам (процессам).
+    other = ChromaDBBackend(model_counts_path=path)
+    other.add_documents([_doc("b", 2)])
+    assert backend.count_by_model(["b"]) == {"b": 2}
+
+    backend.clear_collection()
+    assert backend.count_by_model(["a", "b"]) == {"a": 0, "b": 0}
+
+    # Запись в обход бэкенда видна после сверки.
+    chroma_collection.docs["c:1"] = {"model": "c"}
+    assert backend.count_by_model(["c"]) == {"c": 0}
+    backend.reconcile_counts()
+    assert backend.count_by_model(["c"]) == {"c": 1}
+
+
+def test_chroma_http_client_counts_need_shared_path(chroma_collection, tmp_path):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    chroma_collection.docs["a:1"] = {"model": "a"}
+    backend = ChromaDBBackend(host="chroma.local")
+    backend.add_documents([_doc("a", 2)])
+    # Без общего файла счётчиков — точный подсчёт по коллекции.
+    assert backend._counts is None
+    assert backend.count_by_model(["a"]) == {"a": 2}
+    assert chroma_collection.where_gets == 1
+
+    shared = ChromaDBBackend(host="chroma.local", model_counts_path=str(tmp_path / "c.sqlite"))
+    assert shared._counts is not None
+
+
+@pytest.fixture(name="started_threads")
+def _started_threads_fixture(monkeypatch):
+    """Фоновые сверки не стартуют сами: тест вызывает их target вручную."""
+    from django_graph_search.backends import counts as counts_module
+
+    started = []
+
+    def _thread(target, **kwargs):
+        del kwargs
+        return SimpleNamespace(start=lambda: started.append(target))
+
+    # Подмена только в модуле counts: пулы потоков upsert остаются настоящими.
+    fake_threading = SimpleNamespace(Lock=threading.Lock, Thread=_thread)
+    monkeypatch.setattr(counts_module, "threading", fake_threading)
+    return started
+
+
+def test_chroma_stale_counters_reconcile_in_background(chroma_collection, started_threads):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    backend = ChromaDBBackend(counts_reconcile_seconds=0)
+    backend.add_documents([_doc("a", 1)])
+    chroma_collection.docs["a:2"] = {"model": "a"}
+    # Несверенные счётчики не отдаются: точный подсчёт, сверка — в фоне.
+    assert backend.count_by_model(["a", "b"]) == {"a": 2, "b": 0}
+    assert chroma_collection.where_gets == 2
+    assert backend.count_by_model(["a"]) == {"a": 2}
+    assert len(started_threads) == 1  # одна сверка за раз
+    started_threads.pop()()
+    chroma_collection.docs["a:3"] = {"model": "a"}
+    # Сверенные, но устаревшие — текущие значения, новая сверка в фоне.
+    assert backend.count_by_model(["a"]) == {"a": 2}
+    assert chroma_collection.where_gets == 3
+    started_threads.pop()()
+    assert backend.count_by_model(["a"]) == {"a": 3}
+
+
+def test_chroma_bulk_ingest_skips_id_probe_and_invalidates_counts(
+    chroma_collection, started_threads
+):
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    probes = []
+    original_get = chroma_collection.get
+
+    def _get(ids=None, **kwargs):
+        if ids is not None:
+            probes.append(ids)
+        return original_get(ids=ids, **kwargs)
+
+    chroma_collection.get = _get
+    backend = ChromaDBBackend(upsert_batch_size=2)
+    backend.reconcile_counts()
+    backend.add_documents([_doc("a", 0)])
+    assert len(probes) == 1
+
+    probes.clear()
+    with backend.bulk_ingest():
+        backend.add_documents([_doc("a", i) for i in range(6)])
+    # Пакеты bulk пишутся без предварительного collection.get по id.
+    assert not probes
+    assert backend._counts.reconciled_at() is None
+    assert backend.count_by_model(["a"]) == {"a": 6}
+    started_threads.pop()()
+    assert backend.count_by_model(["a"]) == {"a": 6}
+    assert backend._counts.reconciled_at() is not None
+
+
+def test_pgvector_stale_counters_reconcile_in_background(monkeypatch, started_threads):
+    from django_graph_search.backends import pgvector as pgvector_module
+
+    class _Cursor:
+        def __enter__(self):
+            return self
+
+        def __exit__(self, *exc):
+            return False
+
+        def execute(self, sql, params=None):
+            del params
+            queries.append(sql)
+
+        def fetchone(self):
+            return state  # (сверены ли, устарели ли)
+
+        def fetchall(self):
+            return [("a", 3)]
+
+    queries = []
+    state = (True, True)
+    closed = []
+    conn = SimpleNamespace(cursor=_Cursor, close=lambda: closed.append(True))
+    monkeypatch.setattr(pgvector_module, "connections", {"default": conn})
+    backend = pgvector_module.PgvectorBackend(table_name="dgs_counts")
+    backend._table_initialized = True
+    reconciled = []
+    backend.reconcile_counts = lambda: reconciled.append(True)
+
+    assert backend.count_by_model(["a", "b"]) == {"a": 3, "b": 0}
+    assert "FROM dgs_counts_model_counts WHERE" in queries[-1]
+    assert not reconciled and len(started_threads) == 1
+    started_threads.pop()()
+    # Соединение фонового потока закрывается после сверки.
+    assert reconciled == [True] and closed == [True]
+
+    # Таблица счётчиков пуста (сразу после обновления): точный GROUP BY.
+    state = (False, None)
+    assert backend.count_by_model(["a"]) == {"a": 3}
+    assert "FROM dgs_counts WHERE" in queries[-1] and "GROUP BY" in queries[-1]
+    assert len(started_threads) == 1
+
+
+def test_model_counters_apply_and_replace(tmp_path):
+    counters = ModelCounters(str(tmp_path / "c.sqlite"), reconcile_seconds=60)
+    assert counters.is_stale() and counters.snapshot() == {}
+    counters.apply({"a": 3, "b": 0})
+    counters.apply({"a": -1})
+    assert counters.snapshot() == {"a": 2} and counters.reconciled_at() is None
+    counters.replace({"b": 5})
+    assert counters.snapshot() == {"b": 5} and not counters.is_stale()
+
+
+def test_qdrant_count_by_model_uses_facet():
+    from django_graph_search.backends.qdrant import QdrantBackend
+
+    class _Client:
+        def __init__(self, facet_error=None):
+            self.facet_error = facet_error
+            self.counts = []
+
+        def collection_exists(self, name):
+            return True
+
+        def facet(self, collection_name, key, facet_filter, limit, exact):
+            if self.facet_error:
+                raise self.facet_error
+            assert (key, limit, exact) == ("model", 2, True)
+            return SimpleNamespace(hits=[SimpleNamespace(value="a", count=7)])
+
+        def count(self, collection_name, count_filter):
+            self.counts.append(count_filter)
+            return SimpleNamespace(count=4)
+
+    backend = QdrantBackend.__new__(QdrantBackend)
+    backend.qmodels = SimpleNamespace(
+        FieldCondition=lambda key, match: (key, match),
+        MatchValue=lambda value: value,
+        MatchAny=lambda any: (*any,),
+        Filter=lambda must: {"must": must},
+    )
+    backend.collection_name = "c"
+    backend.client = _Client()
+    assert backend.count_by_model(["a", "b"]) == {"a": 7, "b": 0}
+
+    backend.client = _Client(facet_error=RuntimeError("no payload index"))
+    assert backend.count_by_model(["a", "b"]) == {"a": 4, "b": 4}
+    assert backend.client.counts == [{"must": [("model", "a")]}, {"must": [("model", "b")]}]
+
+
+@pytest.mark.django_db
+def test_index_coverage_reads_all_models_in_one_call():
+    category = Category.objects.create(name="c")
+    Product.objects.create(name="p", category=category)
+
+    class _Store(DummyVectorBackend):
+        calls = []
+
+        def count_by_model(self, models):
+            self.calls.append(list(models))
+            return {label: 1 for label in models}
+
+        def count_documents(self, filters=None):  # pragma: no cover
+            raise AssertionError("count_by_model expected")
+
+    config = make_basic_config(
+        delta_indexing=False,
+        models=[
+            ModelConfig(model="test_app.Product", fields=["name"]),
+            ModelConfig(model="test_app.Category", fields=["name"]),
+        ],
+    )
+    store = _Store()
+    report = get_index_coverage(config=config, vector_store=store)
+    assert store.calls == [["test_app.Product", "test_app.Category"]]
+    assert [row.indexed_count for row in report.rows] == [1, 1]
+    assert report.total_indexed == 2
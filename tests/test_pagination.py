@@ -0,0 +1,99 @@
+"""Курсорная пагинация /api/search/ по закэшированному списку кандидатов."""
+from __future__ import annotations
+
+import json
+from typing import Any, Dict
+
+import pytest
+from django.conf import settings as django_settings
+from django.core.cache import caches
+from django.test import RequestFactory
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.component_registry import get_shared_components
+from django_graph_search.exceptions import InvalidCursorError
+from django_graph_search.pagination import Cursor, decode_cursor, encode_cursor
+from django_graph_search.settings import clear_graph_search_caches, get_settings
+from django_graph_search.views import SearchAPIView
+
+
+@pytest.fixture(name="paginated")
+def _paginated_fixture(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    caches["default"].clear()
+    original = getattr(django_settings, "GRAPH_SEARCH", None)
+    payload: Dict[str, Any] = {
+        "MODELS": [],
+        "VECTOR_STORE": {"BACKEND": "tests.dummy_vector_backend.DummyVectorBackend"},
+        "EMBEDDINGS": {
+            "default": {
+                "BACKEND": "tests.dummy_embedding_backend.DummyEmbeddingBackend",
+                "MODEL_NAME": "x",
+            }
+        },
+        "PAGINATION": {"ENABLED": True, "MAX_CANDIDATES": 5},
+    }
+    django_settings.GRAPH_SEARCH = payload
+    clear_graph_search_caches()
+    _, store, _, _ = get_shared_components(get_settings())
+    calls = []
+
+    def _search(query_vector, limit, filters=None):
+        calls.append(limit)
+        return [
+            SearchResult(
+                id=f"test_app.Tag:{i}",
+                score=1.0 - i * 0.1,
+                metadata={"model": "test_app.Tag", "pk": i, "text": f"t{i}"},
+            )
+            for i in range(limit)
+        ]
+
+    store.search = _search
+    yield calls
+    if original is None:
+        delattr(django_settings, "GRAPH_SEARCH")
+    else:
+        django_settings.GRAPH_SEARCH = original
+    clear_graph_search_caches()
+
+
+def _get(params):
+    response = SearchAPIView.as_view()(RequestFactory().get("/api/search/", params))
+    return response.status_code, json.loads(response.content.decode())
+
+
+@pytest.mark.django_db
+def test_pages_are_sliced_from_cached_candidates(paginated):
+    status, first = _get({"q": "x", "limit": 2, "fields": "pk"})
+    assert status == 200
+    assert [r["pk"] for r in first["results"]] == [0, 1]
+    assert paginated == [5]
+
+    _, second = _get({"cursor": first["next_cursor"]})
+    assert second["results"] == [{"pk": 2}, {"pk": 3}]
+    _, third = _get({"cursor": second["next_cursor"]})
+    assert [r["pk"] for r in third["results"]] == [4]
+    assert third["next_cursor"] is None
+    # Повторного ANN-запроса не было.
+    assert paginated == [5]
+
+
+@pytest.mark.django_db
+def test_tampered_or_expired_cursor_returns_400(paginated):
+    _, first = _get({"q": "x", "limit": 2})
+    status, body = _get({"cursor": first["next_cursor"] + "x"})
+    assert status == 400
+    caches["default"].clear()
+    status, body = _get({"cursor": first["next_cursor"]})
+    assert status == 400
+    assert body["error"] == "Cursor has expired."
+
+
+def test_cursor_roundtrip():
+    cursor = Cursor(token="abc", offset=20, page_size=10, fields=("pk",))
+    assert decode_cursor(encode_cursor(cursor)) == cursor
+    with pytest.raises(InvalidCursorError):
+        decode_cursor("garbage")
@@ -0,0 +1,168 @@
+"""Qdrant: индексы payload, UUIDv5 id точек, on_disk/HNSW/квантование."""
+from __future__ import annotations
+
+import sys
+import types
+import uuid
+from types import SimpleNamespace
+
+import pytest
+
+from django_graph_search.backends.base import Document
+from django_graph_search.exceptions import BackendError
+
+
+def _model(name):
+    return lambda **kwargs: {"_": name, **kwargs}
+
+
+class _Client:
+    def __init__(self, **options):
+        self.options = options
+        self.exists = False
+        self.created = None
+        self.indexes = []
+        self.upserts = []
+        self.searches = []
+
+    def collection_exists(self, name):
+        return self.exists
+
+    def create_collection(self, collection_name, vectors_config, **kwargs):
+        self.exists = True
+        self.created = {"vectors_config": vectors_config, **kwargs}
+
+    def create_payload_index(self, collection_name, field_name, field_schema):
+        self.indexes.append((field_name, field_schema))
+
+    def delete_collection(self, collection_name):
+        self.exists = False
+        self.upserts.clear()
+
+    def upsert(self, collection_name, points):
+        if not self.exists:
+            raise RuntimeError(f"Collection {collection_name} not found")
+        self.upserts.extend(points)
+
+    def search(self, collection_name, query_vector, limit, query_filter, search_params):
+        self.searches.append(search_params)
+        point = self.upserts[0]
+        return [SimpleNamespace(id=point["id"], score=0.9, payload=point["payload"])]
+
+
+@pytest.fixture(name="qdrant")
+def _qdrant_fixture(monkeypatch):
+    qmodels = SimpleNamespace(
+        Distance=SimpleNamespace(Cosine="cosine"),
+        PayloadSchemaType=SimpleNamespace(KEYWORD="keyword", INTEGER="integer"),
+        ScalarType=SimpleNamespace(INT8="int8"),
+        **{
+            name: _model(name)
+            for name in (
+                "VectorParams",
+                "HnswConfigDiff",
+                "ScalarQuantization",
+                "ScalarQuantizationConfig",
+                "BinaryQuantization",
+                "BinaryQuantizationConfig",
+                "SearchParams",
+                "QuantizationSearchParams",
+                "PointStruct",
+            )
+        },
+    )
+    package = types.ModuleType("qdrant_client")
+    package.__path__ = []
+    package.QdrantClient = _Client
+    http = types.ModuleType("qdrant_client.http")
+    http.models = qmodels
+    monkeypatch.setitem(sys.modules, "qdrant_client", package)
+    monkeypatch.setitem(sys.modules, "qdrant_client.http", http)
+    monkeypatch.setitem(sys.modules, "qdrant_client.http.models", qmodels)
+
+
+def test_collection_is_created_with_storage_options_and_payload_indexes(qdrant):
+    from django_graph_search.backends.qdrant import QdrantBackend
+
+    backend = QdrantBackend(
+        url="http://qdrant:6333",
+        filter_fields=["lang"],
+        on_disk=True,
+        hnsw_config={"m": 32, "ef_construct": 200},
+        quantization={"type": "scalar", "quantile": 0.99, "always_ram": True},
+    )
+    assert backend.client.options == {"url": "http://qdrant:6333"}
+    backend.add_documents([Document(id="shop.Product:1", embedding=[0.1, 0.2], metadata={})])
+    backend.add_documents([Document(id="shop.Product:2", embedding=[0.1, 0.2], metadata={})])
+
+    created = backend.client.created
+    assert created["vectors_config"]["on_disk"] is True
+    assert created["vectors_config"]["size"] == 2
+    assert created["hnsw_config"] == {"_": "HnswConfigDiff", "m": 32, "ef_construct": 200}
+    assert created["quantization_config"]["scalar"] == {
+        "_": "ScalarQuantizationConfig",
+        "type": "int8",
+        "quantile": 0.99,
+        "always_ram": True,
+    }
+    # Индексы — один раз на экземпляр, не на каждый add_documents.
+    assert backend.client.indexes == [("model", "keyword"), ("pk", "keyword"), ("lang", "keyword")]
+
+
+def test_existing_collection_gets_payload_indexes_only(qdrant):
+    from django_graph_search.backends.qdrant import QdrantBackend
+
+    backend = QdrantBackend(payload_indexes={"pk": None})
+    backend.client.exists = True
+    backend.add_documents([Document(id="a:1", embedding=[0.1], metadata={"model": "a"})])
+    assert backend.client.created is None
+    assert backend.client.indexes == [("model", "keyword")]
+
+    with pytest.raises(BackendError):
+        QdrantBackend(quantization={"type": "product"})
+    # Опечатка в типе индекса — при создании бэкенда, а не на первой записи.
+    with pytest.raises(BackendError, match="payload index type"):
+        QdrantBackend(payload_indexes={"pk": "intger"})
+    assert QdrantBackend(payload_indexes={"pk": "integer"}).payload_indexes == {
+        "model": "keyword",
+        "pk": "integer",
+    }
+
+
+def test_upsert_recreates_collection_deleted_elsewhere(qdrant):
+    from django_graph_search.backends.qdrant import QdrantBackend
+
+    backend = QdrantBackend()
+    backend.add_documents([Document(id="a:1", embedding=[0.1], metadata={"model": "a"})])
+    # Коллекцию удалил другой процесс: кэш _collection_ready устарел.
+    backend.client.delete_collection("django_graph_search")
+    backend.add_documents([Document(id="a:2", embedding=[0.1], metadata={"model": "a"})])
+    assert backend.client.exists
+    assert [p["payload"]["doc_id"] for p in backend.client.upserts] == ["a:2"]
+
+    backend.client.upsert = lambda collection_name, points: 1 / 0
+    with pytest.raises(ZeroDivisionError):
+        backend.add_documents([Document(id="a:3", embedding=[0.1], metadata={"model": "a"})])
+
+
+def test_doc_ids_map_to_uuid5_point_ids(qdrant):
+    from django_graph_search.backends.qdrant import QdrantBackend, point_id
+
+    backend = QdrantBackend(
+        search_hnsw_ef=128, quantization={"type": "binary", "rescore": True, "oversampling": 2.0}
+    )
+    meta = {"model": "shop.Product", "pk": 1}
+    backend.add_documents([Document(id="shop.Product:1", embedding=[0.1], metadata=meta)])
+    point = backend.client.upserts[0]
+    assert point["id"] == point_id("shop.Product:1")
+    assert uuid.UUID(point["id"]).version == 5
+    assert point["payload"]["doc_id"] == "shop.Product:1"
+
+    hits = backend.search([0.1], limit=1)
+    assert hits[0].id == "shop.Product:1"
+    assert hits[0].metadata == {"model": "shop.Product", "pk": 1}
+    assert backend.client.searches[0] == {
+        "_": "SearchParams",
+        "hnsw_ef": 128,
+        "quantization": {"_": "QuantizationSearchParams", "rescore": True, "oversampling": 2.0},
+    }
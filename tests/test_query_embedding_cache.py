@@ -0,0 +1,121 @@
+"""Кэш векторов запросов: LRU, TTL, общий уровень в Django cache, счётчики."""
+from __future__ import annotations
+
+from dataclasses import replace
+from unittest import mock
+
+import pytest
+from django.core.cache import caches
+
+from django_graph_search.embeddings.cached import (
+    CachedEmbeddingBackend,
+    QueryEmbeddingCache,
+    wrap_query_embedding_cache,
+)
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import QueryEmbeddingCacheConfig
+
+from .dummy_vector_backend import DummyVectorBackend
+from .utils import make_basic_config
+
+
+class CountingEmbeddingBackend:
+    def __init__(self, model_name: str = "m") -> None:
+        self.model_name = model_name
+        self.calls = []
+
+    def embed(self, text, *, is_query=False):
+        self.calls.append(("embed", text, is_query))
+        return [float(len(text))]
+
+    def embed_batch(self, texts, *, is_query=False):
+        texts = list(texts)
+        self.calls.append(("embed_batch", tuple(texts), is_query))
+        return [[float(len(t))] for t in texts]
+
+
+def test_cache_hits_on_normalized_query():
+    backend = CountingEmbeddingBackend()
+    cached = CachedEmbeddingBackend(backend, QueryEmbeddingCache(max_size=10))
+    assert cached.embed("red  phone", is_query=True) == [10.0]
+    assert cached.embed(" red phone ", is_query=True) == [10.0]
+    assert len(backend.calls) == 1
+    assert cached.cache.stats()["hits"] == 1
+    assert cached.cache.stats()["misses"] == 1
+    assert cached.model_name == "m"
+
+
+def test_documents_bypass_cache():
+    backend = CountingEmbeddingBackend()
+    cached = CachedEmbeddingBackend(backend, QueryEmbeddingCache(max_size=10))
+    cached.embed("doc", is_query=False)
+    cached.embed("doc", is_query=False)
+    assert len(backend.calls) == 2
+    assert cached.cache.stats()["size"] == 0
+
+
+def _key(query):
+    return ("default", "m", query, True)
+
+
+def test_lru_eviction_and_ttl():
+    cache = QueryEmbeddingCache(max_size=2, ttl=10)
+    with mock.patch("django_graph_search.embeddings.cached.time") as mt:
+        mt.monotonic.return_value = 100.0
+        cache.set(_key("a"), [1.0])
+        cache.set(_key("b"), [2.0])
+        assert cache.get(_key("a")) == [1.0]  # "a" становится самым свежим
+        cache.set(_key("c"), [3.0])
+        assert cache.get(_key("b")) is None
+        assert cache.get(_key("a")) == [1.0]
+        mt.monotonic.return_value = 111.0
+        assert cache.get(_key("a")) is None
+
+
+def test_embed_batch_embeds_only_misses():
+    backend = CountingEmbeddingBackend()
+    cached = CachedEmbeddingBackend(backend, QueryEmbeddingCache(max_size=10))
+    cached.embed("aa", is_query=True)
+    out = cached.embed_batch(["aa", "bbb", "bbb"], is_query=True)
+    assert out == [[2.0], [3.0], [3.0]]
+    assert backend.calls[-1] == ("embed_batch", ("bbb",), True)
+
+
+def test_shared_tier_serves_other_process_cache(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    caches["default"].clear()
+    first = CachedEmbeddingBackend(
+        CountingEmbeddingBackend(), QueryEmbeddingCache(alias="default")
+    )
+    first.embed("phone", is_query=True)
+    other_backend = CountingEmbeddingBackend()
+    other = CachedEmbeddingBackend(other_backend, QueryEmbeddingCache(alias="default"))
+    assert other.embed("phone", is_query=True) == [5.0]
+    assert not other_backend.calls
+    assert other.cache.stats()["shared_hits"] == 1
+
+
+@pytest.mark.django_db
+def test_searcher_reuses_query_vector_when_enabled():
+    cfg = replace(
+        make_basic_config(delta_indexing=False),
+        query_embedding_cache=QueryEmbeddingCacheConfig(enabled=True, max_size=8),
+    )
+    backend = CountingEmbeddingBackend()
+    for _ in range(3):
+        Searcher(
+            config=cfg,
+            vector_store=DummyVectorBackend(),
+            embedding_backend=backend,
+            resolver=GraphResolver(),
+        ).search("phone")
+    assert len(backend.calls) == 1
+
+
+def test_wrap_is_noop_when_disabled():
+    backend = CountingEmbeddingBackend()
+    cfg = make_basic_config(delta_indexing=False)
+    assert wrap_query_embedding_cache(backend, cfg) is backend
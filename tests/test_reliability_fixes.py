@@ -45,20 +45,30 @@ def _gs_settings_fixture():
 
 class _FakeFaissIndex:
     def __init__(self, dim: int) -> None:
+        import numpy as np
+
         self.dim = dim
-        self._vectors: List[List[float]] = []
+        self._vectors = np.zeros((0, dim), dtype="float32")
+
+    @property
+    def ntotal(self) -> int:
+        return len(self._vectors)
 
     def add(self, vectors) -> None:
-        for row in vectors:
-            self._vectors.append([float(v) for v in row])
+        import numpy as np
+
+        self._vectors = np.concatenate([self._vectors, np.asarray(vectors, dtype="float32")])
+
+    def get_xb(self):
+        return self._vectors.reshape(-1)
 
     def search(self, query, k: int):
         import numpy as np
 
         q = np.array(query[0], dtype="float32")
-        if not self._vectors:
+        if not self._vectors.size:
             return np.array([[]], dtype="float32"), np.array([[-1]])
-        dists = [float(np.sum((np.array(v, dtype="float32") - q) ** 2)) for v in self._vectors]
+        dists = [float(np.sum((v - q) ** 2)) for v in self._vectors]
         order = sorted(range(len(dists)), key=lambda i: dists[i])[:k]
         order += [-1] * (k - len(order))
         dd = [dists[i] if i >= 0 else 0.0 for i in order]
@@ -69,6 +79,24 @@ class _FakeFaissIndex:
 def _fake_faiss_fixture(monkeypatch):
     module = types.ModuleType("faiss")
     module.IndexFlatL2 = _FakeFaissIndex
+    module.rev_swig_ptr = lambda ptr, size: ptr[:size]
+
+    def _write_index(index, path):
+        import numpy as np
+
+        with open(path, "wb") as handle:
+            np.save(handle, index._vectors)
+
+    def _read_index(path, flags=0):
+        import numpy as np
+
+        index = _FakeFaissIndex(0)
+        index._vectors = np.load(path)
+        index.dim = index._vectors.shape[1]
+        return index
+
+    module.write_index = _write_index
+    module.read_index = _read_index
     monkeypatch.setitem(sys.modules, "faiss", module)
     return module
 
@@ -103,7 +131,10 @@ class _FakeChromaCollection:
         if where is not None:
             self.docs.clear()
 
-    def get(self, where, include):
+    def get(self, ids=None, where=None, include=None):
+        if ids is not None:
+            found = [doc_id for doc_id in ids if doc_id in self.docs]
+            return {"ids": found, "metadatas": [self.docs[i]["metadata"] for i in found]}
         return {"ids": list(self.docs)}
 
     def count(self) -> int:
@@ -265,8 +296,10 @@ def test_find_similar_excludes_self(gs_settings):
     ids = {r["pk"] for r in results}
     assert product.pk not in ids
     assert len(results) == 5
-    # max(limit+1, min(limit*3, 100)) при limit=5 → 15; второго прохода нет
-    assert store.last_limit == 15
+    # Стор не объявил supports_exclude_ids: self отбрасывается после поиска,
+    # поэтому у стора просят на один hit больше.
+    assert store.last_limit == 6
+    assert store.last_filters == {"model": "test_app.Product"}
 
 
 def test_search_linear_pushes_single_model_filter(gs_settings):
@@ -277,12 +310,13 @@ def test_search_linear_pushes_single_model_filter(gs_settings):
     assert store.last_limit == 5
 
 
-def test_search_linear_multi_model_overfetch(gs_settings):
+def test_search_linear_pushes_multi_model_filter(gs_settings):
     store = RecordingVectorStore()
     searcher = _make_searcher(gs_settings, store)
     searcher.search("q", models=["test_app.Product", "test_app.Category"], limit=5)
-    assert store.last_filters is None
-    assert store.last_limit == 50  # over-fetch x10
+    # Set-membership в vector store вместо over-fetch x10 и пост-фильтра.
+    assert store.last_filters == {"model": ["test_app.Product", "test_app.Category"]}
+    assert store.last_limit == 5
 
 
 @pytest.mark.django_db
@@ -0,0 +1,120 @@
+"""Кэш выдачи Searcher с инвалидацией по поколению индекса модели."""
+from __future__ import annotations
+
+from dataclasses import replace
+
+import pytest
+from django.core.cache import caches
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.indexer import Indexer
+from django_graph_search.result_cache import SearchResultCache, bump_index_generation
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import ModelConfig, ResultCacheConfig
+
+from .dummy_embedding_backend import DummyEmbeddingBackend
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+class CountingStore(DummyVectorBackend):
+    def __init__(self, results=None) -> None:
+        super().__init__()
+        self.results = results or []
+        self.search_calls = 0
+
+    def search(self, query_vector, limit, filters=None):
+        self.search_calls += 1
+        return list(self.results)
+
+
+@pytest.fixture(name="cfg")
+def _cfg_fixture(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    caches["default"].clear()
+    return replace(
+        make_basic_config(
+            delta_indexing=False,
+            models=[ModelConfig(model="test_app.Product", fields=["name"])],
+        ),
+        result_cache=ResultCacheConfig(enabled=True, ttl=60),
+    )
+
+
+def _searcher(cfg, store):
+    return Searcher(
+        config=cfg,
+        vector_store=store,
+        embedding_backend=DummyEmbeddingBackend(model_name="x"),
+        resolver=GraphResolver(),
+    )
+
+
+def _hit(pk, score):
+    return SearchResult(
+        id=f"test_app.Product:{pk}",
+        score=score,
+        metadata={"model": "test_app.Product", "pk": pk, "text": "t"},
+    )
+
+
+@pytest.mark.django_db
+def test_repeated_search_served_from_cache(cfg):
+    store = CountingStore([_hit(1, 0.9), _hit(2, 0.3)])
+    first = _searcher(cfg, store).search("phone", limit=5)
+    second = _searcher(cfg, store).search("phone", limit=5)
+    assert first == second
+    assert store.search_calls == 1
+
+    _searcher(cfg, store).search("phone", limit=6)
+    assert store.search_calls == 2
+    filtered = _searcher(cfg, store).search("phone", limit=5, min_score=0.5)
+    assert [r["pk"] for r in filtered] == [1]
+    assert store.search_calls == 3
+
+
+@pytest.mark.django_db
+def test_index_write_invalidates_cached_results(cfg):
+    store = CountingStore([_hit(1, 0.9)])
+    _searcher(cfg, store).search("phone")
+    product = Product.objects.create(name="Pixel", category=Category.objects.create(name="c"))
+    indexer = Indexer(
+        config=cfg,
+        vector_store=DummyVectorBackend(),
+        embedding_backend=DummyEmbeddingBackend(model_name="x"),
+        resolver=GraphResolver(),
+    )
+    indexer.index_instance(product, cfg.models[0])
+    _searcher(cfg, store).search("phone")
+    assert store.search_calls == 2
+
+    indexer.delete_instance("test_app.Product", product.pk)
+    _searcher(cfg, store).search("phone")
+    assert store.search_calls == 3
+
+
+@pytest.mark.django_db
+def test_clear_bumps_global_generation(cfg):
+    store = CountingStore([_hit(1, 0.9)])
+    _searcher(cfg, store).search("phone", models=["test_app.Product"])
+    bump_index_generation(cfg)
+    _searcher(cfg, store).search("phone", models=["test_app.Product"])
+    assert store.search_calls == 2
+
+
+def test_generation_survives_eviction(settings):
+    settings.CACHES = {
+        "default": {"BACKEND": "django.core.cache.backends.locmem.LocMemCache"},
+    }
+    cache = SearchResultCache(alias="default")
+    caches["default"].clear()
+    before = cache.generations(["m"])
+    cache.bump(["m"])
+    assert cache.generations(["m"]) != before
+    caches["default"].delete(cache._generation_key("m"))
+    # Сброшенный счётчик не возвращается к старому значению.
+    assert cache.generations(["m"])[0] != before[0]
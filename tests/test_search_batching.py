@@ -0,0 +1,171 @@
+"""Микробатчинг конкурентных search() в один search_batch."""
+from __future__ import annotations
+
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import replace
+
+import pytest
+from asgiref.sync import async_to_sync
+
+from django_graph_search.backends.base import Document, SearchResult
+from django_graph_search.backends.batching import (
+    MicroBatchingVectorStore,
+    wrap_search_batching,
+)
+from django_graph_search.exceptions import ConfigurationError
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import SearchBatchingConfig, _build_search_batching_config
+
+from .dummy_embedding_backend import DummyEmbeddingBackend
+from .dummy_vector_backend import DummyVectorBackend
+from .utils import make_basic_config
+
+
+class RecordingStore(DummyVectorBackend):
+    """Возвращает по одному хиту с id = первая координата запроса."""
+
+    supports_micro_batching = True
+
+    def __init__(self) -> None:
+        super().__init__()
+        self.batches = []
+        self.lock = threading.Lock()
+
+    def search_batch(self, query_vectors, limit, filters=None):
+        vectors = list(query_vectors)
+        with self.lock:
+            self.batches.append((len(vectors), filters))
+        if filters and filters.get("fail"):
+            raise RuntimeError("boom")
+        return [
+            [SearchResult(id=str(v[0]), score=1.0, metadata={"filters": filters})]
+            for v in vectors
+        ]
+
+
+def _parallel(batcher, calls):
+    barrier = threading.Barrier(len(calls))
+
+    def _one(call):
+        vector, filters = call
+        barrier.wait()
+        return batcher.search(vector, limit=3, filters=filters)
+
+    with ThreadPoolExecutor(len(calls)) as pool:
+        return list(pool.map(_one, calls))
+
+
+def test_concurrent_searches_share_one_batch():
+    store = RecordingStore()
+    batcher = MicroBatchingVectorStore(store, window_ms=200, max_batch=8)
+    results = _parallel(batcher, [([float(i)], None) for i in range(8)])
+
+    assert [hits[0].id for hits in results] == [str(float(i)) for i in range(8)]
+    assert store.batches == [(8, None)]
+
+
+def test_batches_are_grouped_by_filters_and_errors_fan_out():
+    store = RecordingStore()
+    batcher = MicroBatchingVectorStore(store, window_ms=20, max_batch=64)
+    calls = [([float(i)], {"model": "a" if i % 2 else "b"}) for i in range(6)]
+    results = _parallel(batcher, calls)
+
+    for (vector, filters), hits in zip(calls, results):
+        assert hits[0].id == str(vector[0]) and hits[0].metadata["filters"] == filters
+    assert sorted(n for n, _ in store.batches) == [3, 3]
+
+    with pytest.raises(RuntimeError, match="boom"):
+        batcher.search([1.0], limit=3, filters={"fail": True})
+
+
+def test_large_batches_and_writes_bypass_the_window():
+    store = RecordingStore()
+    batcher = MicroBatchingVectorStore(store, window_ms=10_000, max_batch=2)
+    hits = batcher.search_batch([[1.0], [2.0]], limit=1)
+    assert [h[0].id for h in hits] == ["1.0", "2.0"]
+    assert async_to_sync(batcher.asearch_batch)([[3.0], [4.0]], limit=1)[1][0].id == "4.0"
+
+    batcher.add_documents([Document(id="d", embedding=[1.0], metadata={})])
+    assert batcher.count_documents() == store.count_documents() == 1
+    assert batcher.batches is store.batches
+
+
+def test_searcher_wraps_store_once_per_process():
+    store = RecordingStore()
+    cfg = replace(
+        make_basic_config(delta_indexing=False),
+        search_batching=SearchBatchingConfig(enabled=True, window_ms=0, max_batch=4),
+    )
+    first, second = (
+        Searcher(
+            config=cfg,
+            vector_store=store,
+            embedding_backend=DummyEmbeddingBackend("x"),
+            resolver=GraphResolver(),
+        )
+        for _ in range(2)
+    )
+    assert isinstance(first.vector_store, MicroBatchingVectorStore)
+    assert first.vector_store is second.vector_store
+    assert wrap_search_batching(store, make_basic_config(delta_indexing=False)) is store
+
+
+def test_only_opted_in_stores_are_wrapped():
+    cfg = replace(
+        make_basic_config(delta_indexing=False),
+        search_batching=SearchBatchingConfig(enabled=True, window_ms=0, max_batch=4),
+    )
+    # Сетевые клиенты и pgvector батчинг не объявляют — ходят напрямую.
+    plain = DummyVectorBackend()
+    assert wrap_search_batching(plain, cfg) is plain
+    assert wrap_search_batching(None, cfg) is None
+    pytest.importorskip("faiss")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    assert isinstance(wrap_search_batching(FaissBackend(), cfg), MicroBatchingVectorStore)
+
+
+def test_search_batching_settings_validation():
+    cfg = _build_search_batching_config({"ENABLED": True, "WINDOW_MS": 1.5})
+    assert cfg == SearchBatchingConfig(enabled=True, window_ms=1.5, max_batch=32)
+    with pytest.raises(ConfigurationError):
+        _build_search_batching_config({"MAX_BATCH": 0})
+    with pytest.raises(ConfigurationError):
+        _build_search_batching_config({"WINDOW_MS": -1})
+
+
+def test_faiss_omp_threads_option():
+    faiss = pytest.importorskip("faiss")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    before = faiss.omp_get_max_threads()
+    try:
+        FaissBackend(omp_threads=1)
+        assert faiss.omp_get_max_threads() == 1
+    finally:
+        faiss.omp_set_num_threads(before)
+
+
+@pytest.mark.parametrize("metric", ["l2", "cosine"])
+def test_faiss_matmul_batch_matches_single_queries(metric):
+    pytest.importorskip("faiss")
+    np = pytest.importorskip("numpy")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    rng = np.random.default_rng(1)
+    vectors = rng.standard_normal((300, 8)).astype("float32")
+    backend = FaissBackend(metric=metric)
+    backend.add_documents(
+        Document(id=f"d:{i}", embedding=vectors[i], metadata={"model": "a"})
+        for i in range(len(vectors))
+    )
+    backend.delete([f"d:{i}" for i in range(0, 300, 5)])
+    queries = rng.standard_normal((12, 8)).astype("float32").tolist()
+
+    batch = backend.search_batch(queries, limit=5)
+    for query, hits in zip(queries, batch):
+        single = backend.search(query, limit=5)
+        assert [h.id for h in hits] == [h.id for h in single]
+        assert [h.score for h in hits] == pytest.approx([h.score for h in single], abs=1e-5)
@@ -0,0 +1,115 @@
+"""Пакетный поиск: Searcher.search_many и POST /api/search/batch/."""
+from __future__ import annotations
+
+import json
+from unittest import mock
+
+import pytest
+from django.test import RequestFactory
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import ModelConfig
+from django_graph_search.views import MAX_BATCH_QUERIES, BatchSearchAPIView
+
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+class BatchEmbeddingBackend:
+    def __init__(self) -> None:
+        self.model_name = "x"
+        self.batch_calls = []
+
+    def embed(self, text, *, is_query=False):  # pragma: no cover - не должен вызываться
+        raise AssertionError("search_many must use embed_batch")
+
+    def embed_batch(self, texts, *, is_query=False):
+        texts = list(texts)
+        self.batch_calls.append(texts)
+        return [[float(i)] for i in range(len(texts))]
+
+
+class PerQueryStore(DummyVectorBackend):
+    """Отдаёт hits в зависимости от вектора запроса."""
+
+    def __init__(self, hits_by_vector) -> None:
+        super().__init__()
+        self.hits_by_vector = hits_by_vector
+
+    def search(self, query_vector, limit, filters=None):
+        return list(self.hits_by_vector[query_vector[0]])[:limit]
+
+
+@pytest.mark.django_db
+def test_search_many_embeds_once_and_hydrates_once(django_assert_num_queries):
+    category = Category.objects.create(name="c")
+    p1 = Product.objects.create(name="p1", category=category)
+    p2 = Product.objects.create(name="p2", category=category)
+
+    def _hit(pk, score):
+        return SearchResult(
+            id=f"test_app.Product:{pk}",
+            score=score,
+            metadata={"model": "test_app.Product", "pk": pk, "text": "t"},
+        )
+
+    store = PerQueryStore({0.0: [_hit(p1.pk, 0.9)], 1.0: [_hit(p2.pk, 0.8), _hit(p1.pk, 0.2)]})
+    embedding = BatchEmbeddingBackend()
+    searcher = Searcher(
+        config=make_basic_config(
+            delta_indexing=False,
+            models=[ModelConfig(model="test_app.Product", fields=["name"])],
+        ),
+        vector_store=store,
+        embedding_backend=embedding,
+        resolver=GraphResolver(),
+    )
+
+    with django_assert_num_queries(1):
+        batches = searcher.search_many(["a", "b"], limit=5, min_score=0.5)
+
+    assert embedding.batch_calls == [["a", "b"]]
+    assert [[r["pk"] for r in results] for results in batches] == [[p1.pk], [p2.pk]]
+    assert batches[1][0]["data"] == {"name": "p2"}
+
+
+@pytest.mark.django_db
+def test_batch_view_returns_results_per_query():
+    body = json.dumps({"queries": ["a", " b "], "limit": 3, "fields": "pk"})
+    request = RequestFactory().post("/api/search/batch/", body, content_type="application/json")
+    with mock.patch("django_graph_search.views.Searcher") as sc:
+        sc.return_value.search_many.return_value = [[{"pk": 1}], []]
+        response = BatchSearchAPIView.as_view()(request)
+    assert response.status_code == 200
+    payload = json.loads(response.content.decode())
+    assert payload["results"] == [
+        {"query": "a", "results": [{"pk": 1}], "total": 1},
+        {"query": "b", "results": [], "total": 0},
+    ]
+    args, kwargs = sc.return_value.search_many.call_args
+    assert args[0] == ["a", "b"]
+    assert kwargs["fields"] == ("pk",)
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize(
+    "payload",
+    [
+        {},
+        {"queries": []},
+        {"queries": ["ok", ""]},
+        {"queries": ["q"] * (MAX_BATCH_QUERIES + 1)},
+        {"queries": ["q"], "limit": "abc"},
+        {"queries": ["q"], "models": 5},
+        {"queries": ["q"], "models": ["test_app.Product", 1]},
+    ],
+)
+def test_batch_view_rejects_bad_payload(payload):
+    request = RequestFactory().post(
+        "/api/search/batch/", json.dumps(payload), content_type="application/json"
+    )
+    response = BatchSearchAPIView.as_view()(request)
+    assert response.status_code == 400
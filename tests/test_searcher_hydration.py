@@ -0,0 +1,116 @@
+"""Bulk-гидрация выдачи Searcher: один запрос на модель вместо запроса на hit."""
+from __future__ import annotations
+
+import pytest
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.graph_resolver import GraphResolver
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import ModelConfig
+
+from .dummy_embedding_backend import DummyEmbeddingBackend
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .utils import make_basic_config
+
+
+def _searcher(fields):
+    cfg = make_basic_config(
+        delta_indexing=False,
+        models=[ModelConfig(model="test_app.Product", fields=fields)],
+    )
+    return Searcher(
+        config=cfg,
+        vector_store=DummyVectorBackend(),
+        embedding_backend=DummyEmbeddingBackend(model_name="x"),
+        resolver=GraphResolver(),
+    )
+
+
+def _hit(model, pk, score):
+    return SearchResult(
+        id=f"{model}:{pk}", score=score, metadata={"model": model, "pk": pk, "text": "t"}
+    )
+
+
+@pytest.mark.django_db
+def test_format_results_single_query_per_model(django_assert_num_queries):
+    category = Category.objects.create(name="Phones")
+    products = [Product.objects.create(name=f"p{i}", category=category) for i in range(5)]
+    hits = [_hit("test_app.Product", p.pk, 0.9 - i * 0.1) for i, p in enumerate(products)]
+    # pk из метаданных может прийти строкой (JSON-хранилища).
+    hits.append(_hit("test_app.Product", str(products[0].pk), 0.1))
+    searcher = _searcher(["name", "category__name"])
+
+    with django_assert_num_queries(1):
+        results = searcher._format_results(hits)
+
+    assert [r["pk"] for r in results[:5]] == [p.pk for p in products]
+    assert results[0]["data"] == {"name": "p0", "category": "Phones"}
+    assert results[5]["data"]["name"] == "p0"
+    assert searcher.last_hydration_queries == 1
+
+
+@pytest.mark.django_db
+def test_format_results_skips_missing_rows():
+    category = Category.objects.create(name="c")
+    product = Product.objects.create(name="kept", category=category)
+    hits = [_hit("test_app.Product", 999_999, 0.9), _hit("test_app.Product", product.pk, 0.5)]
+    searcher = _searcher(["name"])
+
+    results = searcher._format_results(hits)
+
+    assert [r["pk"] for r in results] == [999_999, product.pk]
+    assert "data" not in results[0]
+    assert results[1]["data"] == {"name": "kept"}
+
+
+@pytest.mark.django_db
+def test_format_results_groups_models():
+    category = Category.objects.create(name="c")
+    product = Product.objects.create(name="p", category=category)
+    hits = [_hit("test_app.Product", product.pk, 0.9), _hit("test_app.Category", category.pk, 0.8)]
+    searcher = _searcher(["name"])
+
+    results = searcher._format_results(hits)
+
+    assert searcher.last_hydration_queries == 2
+    assert results[0]["data"] == {"name": "p"}
+    # Модель без конфига: объект найден, но поля не отдаются.
+    assert results[1]["data"] == {}
+
+
+@pytest.mark.django_db
+def test_projection_without_data_skips_orm(django_assert_num_queries):
+    category = Category.objects.create(name="c")
+    product = Product.objects.create(name="p", category=category)
+    hits = [_hit("test_app.Product", product.pk, 0.7)]
+    searcher = _searcher(["name"])
+
+    with django_assert_num_queries(0):
+        results = searcher._format_results(hits, fields=("model", "pk", "score"))
+
+    assert results == [{"model": "test_app.Product", "pk": product.pk, "score": 0.7}]
+    assert searcher.last_hydration_queries == 0
+
+
+@pytest.mark.django_db
+def test_projection_data_only():
+    category = Category.objects.create(name="c")
+    product = Product.objects.create(name="p", category=category)
+    searcher = _searcher(["name"])
+
+    results = searcher._format_results(
+        [_hit("test_app.Product", product.pk, 0.7)], fields=("pk", "data")
+    )
+
+    assert results == [{"pk": product.pk, "data": {"name": "p"}}]
+
+
+def test_normalize_result_fields_rejects_unknown():
+    from django_graph_search.searcher import normalize_result_fields
+
+    assert normalize_result_fields(None) is None
+    assert normalize_result_fields(["score", " pk", ""]) == ("pk", "score")
+    with pytest.raises(ValueError):
+        normalize_result_fields(["pk", "password"])
@@ -0,0 +1,148 @@
+"""TEXT_STORAGE external: текст вне metadata векторов, дочитывается для hits."""
+from __future__ import annotations
+
+from dataclasses import replace
+
+import pytest
+
+from django_graph_search.backends.base import SearchResult
+from django_graph_search.backends.chromadb import ChromaDBBackend
+from django_graph_search.exceptions import ConfigurationError
+from django_graph_search.indexer import Indexer
+from django_graph_search.searcher import Searcher
+from django_graph_search.settings import (
+    ModelConfig,
+    TextStorageConfig,
+    _build_text_storage_config,
+)
+from django_graph_search.text_store import SqliteTextStore, get_text_store
+
+from .dummy_vector_backend import DummyVectorBackend
+from .test_app.models import Category, Product
+from .test_indexer import DummyEmbeddingBackend
+from .utils import make_basic_config
+
+
+class _CountingTextStore(SqliteTextStore):
+    def __init__(self, path):
+        super().__init__(path)
+        self.reads = []
+
+    def get_many(self, doc_ids):
+        doc_ids = list(doc_ids)
+        self.reads.append(doc_ids)
+        return super().get_many(doc_ids)
+
+
+class _HitsStore(DummyVectorBackend):
+    """Отдаёт сохранённые документы как hits (в порядке вставки)."""
+
+    def search(self, query_vector, limit, filters=None):
+        return [
+            SearchResult(id=d.id, score=0.9, metadata=dict(d.metadata))
+            for d in self._documents
+        ][:limit]
+
+
+def _external_config(tmp_path):
+    return replace(
+        make_basic_config(
+            delta_indexing=False,
+            models=[ModelConfig(model="test_app.Product", fields=["name"])],
+        ),
+        text_storage=TextStorageConfig(mode="external", path=str(tmp_path / "texts.sqlite")),
+    )
+
+
+def test_sqlite_text_store_roundtrip(tmp_path):
+    store = SqliteTextStore(str(tmp_path / "sub" / "texts.sqlite"))
+    texts = {f"m:{i}": f"текст {i} " * 50 for i in range(1200)}
+    store.put_many(texts)
+    store.put_many({"m:1": "new"})
+
+    assert store.get_many(["m:1", "m:1199", "missing"]) == {
+        "m:1": "new",
+        "m:1199": texts["m:1199"],
+    }
+    assert len(store.get_many(texts)) == 1200
+    store.delete_many(["m:1"])
+    assert not store.get_many(["m:1"])
+    store.clear()
+    assert not store.get_many(["m:2"])
+
+
+@pytest.mark.django_db
+def test_external_text_is_read_only_for_final_hits(tmp_path):
+    category = Category.objects.create(name="c")
+    products = [Product.objects.create(name=f"p{i}", category=category) for i in range(3)]
+    cfg = _external_config(tmp_path)
+    vector_store = _HitsStore()
+    text_store = _CountingTextStore(cfg.text_storage.path)
+    indexer = Indexer(
+        config=cfg, vector_store=vector_store, embedding_backend=DummyEmbeddingBackend()
+    )
+    indexer.text_store = text_store
+    indexer.index_queryset(Product.objects.all(), cfg.models[0])
+
+    doc = vector_store._documents[0]
+    assert set(doc.metadata) == {"model", "pk", "text_hash"} and doc.text is None
+
+    searcher = Searcher(
+        config=cfg, vector_store=vector_store, embedding_backend=DummyEmbeddingBackend()
+    )
+    searcher.text_store = text_store
+    results = searcher.search("p", limit=2, fields=["pk", "text"])
+    assert [r["pk"] for r in results] == [products[0].pk, products[1].pk]
+    assert all("p" in r["text"] for r in results)
+    assert text_store.reads == [[vector_store._documents[0].id, vector_store._documents[1].id]]
+
+    searcher.search("p", limit=2, fields=["pk"])
+    assert len(text_store.reads) == 1
+
+    indexer.delete_instance("test_app.Product", products[0].pk)
+    assert not text_store.get_many([doc.id])
+
+
+def test_vector_store_backend_needs_get_texts(tmp_path):
+    cfg = replace(
+        make_basic_config(delta_indexing=False),
+        text_storage=TextStorageConfig(mode="external", backend="vector_store"),
+    )
+    with pytest.raises(ConfigurationError):
+        get_text_store(cfg, DummyVectorBackend())
+    assert get_text_store(make_basic_config(delta_indexing=False), DummyVectorBackend()) is None
+
+    calls = []
+
+    class _Collection:
+        def query(self, query_embeddings, n_results, where, include):
+            calls.append(include)
+            return {
+                "ids": [["m:1"]],
+                "distances": [[0.1]],
+                "metadatas": [[{"model": "a", "pk": 1}]],
+            }
+
+        def get(self, ids, include):
+            calls.append(include)
+            return {"ids": ["m:1"], "documents": ["full text"]}
+
+    backend = ChromaDBBackend.__new__(ChromaDBBackend)
+    backend.collection = _Collection()
+    backend._effective_space = "cosine"
+    backend.query_documents = True
+    text_store = get_text_store(cfg, backend)
+    # Текст дочитывается отдельно — поиск перестаёт тянуть ``documents``.
+    assert backend.query_documents is False
+    hits = backend.search([0.1], limit=1)
+    assert [h.id for h in hits] == ["m:1"] and "text" not in hits[0].metadata
+    assert text_store.get_many(["m:1"]) == {"m:1": "full text"}
+    assert calls == [["distances", "metadatas"], ["documents"]]
+
+
+def test_text_storage_settings_validation():
+    assert _build_text_storage_config({"MODE": "External"}).mode == "external"
+    with pytest.raises(ConfigurationError):
+        _build_text_storage_config({"MODE": "lazy"})
+    with pytest.raises(ConfigurationError):
+        _build_text_storage_config({"BACKEND": "redis"})
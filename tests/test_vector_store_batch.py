@@ -0,0 +1,235 @@
+"""Пакетный поиск в vector store: search_batch и его использование."""
+from __future__ import annotations
+
+import sys
+import types
+from types import SimpleNamespace
+from typing import Any, Dict, List
+
+import pytest
+
+from django_graph_search.backends.base import (
+    BaseVectorStore,
+    Document,
+    SearchResult,
+    batched_search,
+)
+from django_graph_search.langgraph_agent import vector_search_node
+from django_graph_search.searcher import Searcher
+
+from .utils import make_basic_config
+
+
+class SequentialStore(BaseVectorStore):
+    """Минимальный стор без собственного search_batch."""
+
+    def __init__(self) -> None:
+        self.calls: List[List[float]] = []
+
+    def add_documents(self, documents) -> None:
+        pass
+
+    def search(self, query_vector, limit, filters=None):
+        self.calls.append(list(query_vector))
+        return [SearchResult(id=str(query_vector[0]), score=1.0, metadata={"f": filters})]
+
+    def delete(self, doc_ids) -> None:
+        pass
+
+    def clear_collection(self) -> None:
+        pass
+
+    def count_documents(self, filters=None) -> int:
+        return 0
+
+
+class BatchOnlyStore(SequentialStore):
+    def __init__(self) -> None:
+        super().__init__()
+        self.batch_calls: List[List[List[float]]] = []
+
+    def search(self, query_vector, limit, filters=None):  # pragma: no cover
+        raise AssertionError("search_batch expected")
+
+    def search_batch(self, query_vectors, limit, filters=None):
+        self.batch_calls.append([list(v) for v in query_vectors])
+        return [
+            [
+                SearchResult(
+                    id=f"test_app.Product:{int(v[0])}",
+                    score=0.5,
+                    metadata={"model": "test_app.Product", "pk": int(v[0])},
+                )
+            ]
+            for v in query_vectors
+        ]
+
+
+class DuckStore:
+    def __init__(self) -> None:
+        self.calls = 0
+
+    def search(self, query_vector, limit, filters=None):
+        self.calls += 1
+        return [query_vector[0]]
+
+
+def test_base_search_batch_defaults_to_sequential_search():
+    store = SequentialStore()
+    out = store.search_batch([[1.0], [2.0]], limit=3, filters={"model": "m"})
+    assert [[hit.id for hit in hits] for hits in out] == [["1.0"], ["2.0"]]
+    assert store.calls == [[1.0], [2.0]]
+    assert out[0][0].metadata["f"] == {"model": "m"}
+
+
+def test_batched_search_falls_back_for_duck_typed_store():
+    store = DuckStore()
+    assert batched_search(store, [[1.0], [2.0]], limit=1) == [[1.0], [2.0]]
+    assert store.calls == 2
+    assert batched_search(store, [], limit=1) == []
+
+
+def test_faiss_search_batch_matches_single_search():
+    pytest.importorskip("faiss")
+    from django_graph_search.backends.faiss import FaissBackend
+
+    backend = FaissBackend()
+    backend.add_documents(
+        [
+            Document(
+                id=f"m:{i}",
+                embedding=[float(i), 0.0],
+                metadata={"model": "a" if i % 3 else "b", "pk": i},
+            )
+            for i in range(30)
+        ]
+    )
+    queries = [[0.0, 0.0], [14.2, 0.0], [29.0, 0.0]]
+    for filters in (None, {"model": "b"}):
+        batched = backend.search_batch(queries, limit=4, filters=filters)
+        single = [backend.search(q, limit=4, filters=filters) for q in queries]
+        assert [[h.id for h in hits] for hits in batched] == [
+            [h.id for h in hits] for hits in single
+        ]
+    # Фильтр с редкой моделью добирает результаты полным scan.
+    rare = backend.search_batch(queries, limit=10, filters={"model": "b"})
+    assert all(len(hits) == 10 for hits in rare)
+    assert backend.search_batch([], limit=3) == []
+
+
+def test_chromadb_search_batch_is_single_query(monkeypatch):
+    calls: List[Dict[str, Any]] = []
+
+    class _Collection:
+        configuration = None
+        metadata = {"hnsw:space": "cosine"}
+
+        def query(self, query_embeddings, n_results, where, include):
+            calls.append({"n": len(query_embeddings), "where": where})
+            return {
+                "ids": [[f"m:{i}"] for i in range(len(query_embeddings))],
+                "distances": [[0.25] for _ in query_embeddings],
+                "metadatas": [[{"model": "m", "pk": i}] for i in range(len(query_embeddings))],
+                "documents": [["text"] for _ in query_embeddings],
+            }
+
+    module = types.ModuleType("chromadb")
+
+    class _Client:
+        def __init__(self, *args, **kwargs) -> None:
+            pass
+
+        def get_or_create_collection(self, name, configuration=None, metadata=None):
+            return _Collection()
+
+    module.Client = _Client
+    module.PersistentClient = _Client
+    monkeypatch.setitem(sys.modules, "chromadb", module)
+    from django_graph_search.backends.chromadb import ChromaDBBackend
+
+    backend = ChromaDBBackend()
+    out = backend.search_batch([[0.1], [0.2], [0.3]], limit=5, filters={"model": "m"})
+    assert calls == [{"n": 3, "where": {"model": "m"}}]
+    assert [[h.id for h in hits] for hits in out] == [["m:0"], ["m:1"], ["m:2"]]
+    assert out[1][0].score == pytest.approx(0.75)
+    assert out[1][0].metadata["text"] == "text"
+
+
+def test_qdrant_search_batch_uses_client_search_batch():
+    from django_graph_search.backends.qdrant import QdrantBackend
+
+    class _Client:
+        def __init__(self) -> None:
+            self.requests = None
+
+        def search_batch(self, collection_name, requests):
+            self.requests = requests
+            return [
+                [SimpleNamespace(id=f"p{i}", score=1.5, payload={"pk": i})]
+                for i, _ in enumerate(requests)
+            ]
+
+    qmodels = SimpleNamespace(
+        SearchRequest=lambda **kwargs: kwargs,
+        FieldCondition=lambda key, match: (key, match),
+        MatchValue=lambda value: value,
+        Filter=lambda must: {"must": must},
+    )
+    backend = QdrantBackend.__new__(QdrantBackend)
+    backend.qmodels = qmodels
+    backend.collection_name = "c"
+    backend.client = _Client()
+    backend.search_hnsw_ef = None
+    backend.quantization = {}
+    out = backend.search_batch([[0.1], [0.2]], limit=3, filters={"model": "m"})
+    assert len(backend.client.requests) == 2
+    assert backend.client.requests[0]["filter"] == {"must": [("model", "m")]}
+    assert [[h.id for h in hits] for hits in out] == [["p0"], ["p1"]]
+    assert out[0][0].score == 1.0
+
+
+def test_searcher_search_vectors_uses_one_search_batch():
+    store = BatchOnlyStore()
+    searcher = Searcher(
+        config=make_basic_config(delta_indexing=False),
+        vector_store=store,
+        embedding_backend=SimpleNamespace(),
+    )
+    out = searcher._search_vectors([[1.0], [2.0]], models=["test_app.Product"], limit=5)
+    assert len(store.batch_calls) == 1
+    assert [[h.id for h in hits] for hits in out] == [
+        ["test_app.Product:1"],
+        ["test_app.Product:2"],
+    ]
+
+
+def test_vector_search_node_batches_expanded_queries():
+    class _Embedding:
+        def embed(self, text, *, is_query=False):  # pragma: no cover
+            raise AssertionError("embed_batch expected")
+
+        def embed_batch(self, texts, *, is_query=False):
+            return [[float(i + 1)] for i, _ in enumerate(texts)]
+
+    store = BatchOnlyStore()
+    state = {"expanded_queries": ["a", "b", "c"], "limit": 5, "models": None}
+    out = vector_search_node(state, embedding_backend=_Embedding(), vector_store=store)
+    assert len(store.batch_calls) == 1
+    assert len(out["raw_results"]) == 3
+
+
+def test_vector_search_node_retries_per_query_when_batch_fails():
+    class _Embedding:
+        def embed(self, text, *, is_query=False):
+            if text == "bad":
+                raise RuntimeError("boom")
+            return [1.0]
+
+        def embed_batch(self, texts, *, is_query=False):
+            raise RuntimeError("batch down")
+
+    store = SequentialStore()
+    state = {"expanded_queries": ["ok", "bad"], "limit": 5, "models": None}
+    out = vector_search_node(state, embedding_backend=_Embedding(), vector_store=store)
+    assert [hit.id for hit in out["raw_results"]] == ["1.0"]
+    assert out["errors"] == ["vector_search: boom"]
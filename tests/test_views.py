@@ -109,6 +109,27 @@ def test_search_get_without_min_score_omits_applied_field(apply_view_settings):
     assert "min_score_applied" not in body
 
 
+@pytest.mark.django_db
+def test_search_get_passes_fields_projection(apply_view_settings):
+    apply_view_settings(_minimal_graph_search())
+    request = RequestFactory().get("/api/search/", {"q": "x", "fields": "pk,score,model"})
+    with mock.patch("django_graph_search.views.Searcher") as sc:
+        sc.return_value.search.return_value = []
+        response = SearchAPIView.as_view()(request)
+    assert response.status_code == 200
+    _, kwargs = sc.return_value.search.call_args
+    assert kwargs["fields"] == ("model", "pk", "score")
+
+
+@pytest.mark.django_db
+def test_search_get_unknown_field_returns_400(apply_view_settings):
+    apply_view_settings(_minimal_graph_search())
+    request = RequestFactory().get("/api/search/", {"q": "x", "fields": "pk,secret"})
+    response = SearchAPIView.as_view()(request)
+    assert response.status_code == 400
+    assert "secret" in json.loads(response.content.decode())["error"]
+
+
 @pytest.mark.django_db
 def test_streaming_returns_429_when_throttled(apply_view_settings):
     from django_graph_search.permissions import SimpleScopedRateThrottle